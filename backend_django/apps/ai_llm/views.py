@@ -2,6 +2,7 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from apps.learning.pagination import KeysetPagination
 from .models import (
     AIModel, AIConversation, AIMessage, AIPromptTemplate, 
     AIResponseCache, AIInteractionLog, AIModerationLog,
@@ -46,9 +47,17 @@ class AIConversationDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Vistas para AIMessage
+class AIMessagePagination(KeysetPagination):
+    """Historial de la conversación en orden cronológico"""
+    page_size = 50
+    max_page_size = 200
+    ordering = ('created_at', 'id')
+
+
 class AIMessageListView(generics.ListCreateAPIView):
     serializer_class = AIMessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = AIMessagePagination
     
     def get_queryset(self):
         conversation_uuid = self.kwargs.get('uuid')
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="userevent",
+            name="user_events_user_id_cf6bea_idx",
+        ),
+        migrations.AddIndex(
+            model_name="userevent",
+            index=models.Index(
+                fields=["user", "-timestamp", "-id"], name="user_events_user_keyset"
+            ),
+        ),
+    ]
@@ -64,7 +64,7 @@ class UserEvent(models.Model):
     class Meta:
         db_table = 'user_events'
         indexes = [
-            models.Index(fields=['user', 'timestamp']),
+            models.Index(fields=['user', '-timestamp', '-id'], name='user_events_user_keyset'),
             models.Index(fields=['event_type', 'timestamp']),
             models.Index(fields=['category', 'timestamp']),
             models.Index(fields=['session_id']),
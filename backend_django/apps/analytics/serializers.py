@@ -0,0 +1,12 @@
+from rest_framework import serializers
+from .models import UserEvent
+
+
+class UserEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserEvent
+        fields = [
+            'id', 'event_type', 'category', 'event_data', 'session_id',
+            'page_url', 'duration_seconds', 'success', 'timestamp'
+        ]
+        read_only_fields = fields
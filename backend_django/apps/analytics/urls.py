@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import views
 
 app_name = 'analytics'
 
@@ -8,5 +9,6 @@ router = DefaultRouter()
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('events/', views.UserEventListView.as_view(), name='event-list'),
     # URLs adicionales se añadirán cuando se implementen las vistas
 ] 
\ No newline at end of file
@@ -0,0 +1,34 @@
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from apps.learning.pagination import KeysetPagination
+from .models import UserEvent
+from .serializers import UserEventSerializer
+
+
+class UserEventPagination(KeysetPagination):
+    """Eventos por (timestamp, id), del más reciente al más antiguo"""
+    page_size = 50
+    max_page_size = 200
+    ordering = ('-timestamp', '-id')
+
+
+class UserEventListView(generics.ListAPIView):
+    """
+    Eventos del usuario con paginación por cursor
+    Filtros opcionales: ?event_type=<tipo>&category=<categoría>
+    """
+    serializer_class = UserEventSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = UserEventPagination
+
+    def get_queryset(self):
+        queryset = UserEvent.objects.filter(user=self.request.user)
+
+        event_type = self.request.query_params.get('event_type')
+        if event_type:
+            queryset = queryset.filter(event_type=event_type.upper())
+        category = self.request.query_params.get('category')
+        if category:
+            queryset = queryset.filter(category=category.upper())
+
+        return queryset
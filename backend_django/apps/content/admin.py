@@ -10,6 +10,7 @@ from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.core.exceptions import ValidationError
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Avg, Count, Sum
 from django.utils import timezone
 
@@ -17,6 +18,8 @@ from .models import (
     ContentCategory, ContentUnit, ContentLesson, 
     UserContentProgress, ContentRating, ContentBookmark
 )
+from .category_tree import CategoryTree
+from .lesson_progress import LessonProgressStore
 
 
 class AdminTextareaWidget(Textarea):
@@ -115,23 +118,29 @@ class ContentCategoryAdmin(admin.ModelAdmin):
             )
     status_badge.short_description = '🔄 Estado'
     
+    def _update_categories(self, queryset, **fields):
+        # update() no dispara signals: invalidar el snapshot del árbol al confirmar
+        updated = queryset.update(**fields)
+        transaction.on_commit(CategoryTree.invalidate)
+        return updated
+    
     def activate_categories(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = self._update_categories(queryset, is_active=True)
         self.message_user(request, f"✅ {updated} categorías activadas exitosamente.", messages.SUCCESS)
     activate_categories.short_description = "✅ Activar categorías seleccionadas"
     
     def deactivate_categories(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = self._update_categories(queryset, is_active=False)
         self.message_user(request, f"❌ {updated} categorías desactivadas.", messages.WARNING)
     deactivate_categories.short_description = "❌ Desactivar categorías seleccionadas"
     
     def feature_categories(self, request, queryset):
-        updated = queryset.update(is_featured=True)
+        updated = self._update_categories(queryset, is_featured=True)
         self.message_user(request, f"⭐ {updated} categorías marcadas como destacadas.", messages.SUCCESS)
     feature_categories.short_description = "⭐ Marcar como destacadas"
     
     def unfeature_categories(self, request, queryset):
-        updated = queryset.update(is_featured=False)
+        updated = self._update_categories(queryset, is_featured=False)
         self.message_user(request, f"📝 {updated} categorías ya no están destacadas.", messages.INFO)
     unfeature_categories.short_description = "📝 Quitar de destacadas"
 
@@ -477,13 +486,22 @@ class ContentLessonAdmin(admin.ModelAdmin):
         self.message_user(request, f"✅ {updated} lecciones activadas.", messages.SUCCESS)
     activate_lessons.short_description = "✅ Activar lecciones seleccionadas"
     
+    def _refresh_lesson_counters(self, unit_ids):
+        # update() no dispara signals: recalcular el avance de las unidades afectadas
+        for content_unit_id in unit_ids:
+            LessonProgressStore.refresh_unit(content_unit_id)
+    
     def make_mandatory(self, request, queryset):
+        unit_ids = set(queryset.values_list('content_unit_id', flat=True))
         updated = queryset.update(is_mandatory=True)
+        self._refresh_lesson_counters(unit_ids)
         self.message_user(request, f"🔴 {updated} lecciones marcadas como obligatorias.", messages.WARNING)
     make_mandatory.short_description = "🔴 Marcar como obligatorias"
     
     def make_optional(self, request, queryset):
+        unit_ids = set(queryset.values_list('content_unit_id', flat=True))
         updated = queryset.update(is_mandatory=False)
+        self._refresh_lesson_counters(unit_ids)
         self.message_user(request, f"🟢 {updated} lecciones marcadas como opcionales.", messages.SUCCESS)
     make_optional.short_description = "🟢 Marcar como opcionales"
     
@@ -543,7 +561,7 @@ class UserContentProgressAdmin(admin.ModelAdmin):
             'description': 'Puntos de experiencia y vidas utilizadas'
         }),
         ('📋 Información Detallada', {
-            'fields': ('lesson_progress', 'mistakes_data', 'metadata'),
+            'fields': ('mandatory_lessons_completed', 'mistakes_data', 'metadata'),
             'classes': ['collapse'],
             'description': 'Datos específicos de progreso por lección y errores'
         }),
@@ -639,7 +657,9 @@ class UserContentProgressAdmin(admin.ModelAdmin):
             progress.attempts_count = 0
             progress.best_score = 0
             progress.xp_earned = 0
+            progress.mandatory_lessons_completed = 0
             progress.save()
+            progress.lesson_completions.all().delete()
             count += 1
         self.message_user(request, f"🔄 Progreso reiniciado para {count} registros.", messages.WARNING)
     reset_progress.short_description = "🔄 Reiniciar progreso seleccionado"
@@ -0,0 +1,173 @@
+"""
+Agregados incrementales de contenido
+
+Cada UserContentProgress aporta a su unidad un intento, una completitud y
+(si se completó con tiempo registrado) un sumando al tiempo promedio, y a
+su usuario sus segundos de estudio. Cada ContentRating aporta un sumando al
+rating promedio. En lugar de re-agregar todas las filas en cada guardado se
+calcula la diferencia entre el aporte anterior y el nuevo de la fila y se
+aplica con un único UPDATE con F(); los promedios se derivan de las sumas y
+conteos acumulados en el mismo UPDATE, así que quedan exactos sin leer la
+unidad ni el perfil.
+
+rebuild() recalcula todo desde cero (backfill y reparación).
+"""
+
+from django.db.models import (
+    Count, ExpressionWrapper, F, FloatField, IntegerField, Q, Sum, Value
+)
+from django.db.models.functions import Coalesce, NullIf
+
+
+# Campos que aporta una fila de progreso
+PROGRESS_FIELDS = ('is_completed', 'completion_time_seconds', 'total_time_seconds')
+
+EMPTY_PROGRESS = {
+    'completions': 0,
+    'completion_time_sum': 0,
+    'completion_time_count': 0,
+    'study_seconds': 0,
+}
+
+
+def progress_contribution(is_completed, completion_time_seconds, total_time_seconds):
+    """Aporte de una fila de progreso a los agregados de su unidad y usuario"""
+    timed = bool(is_completed) and (completion_time_seconds or 0) > 0
+    return {
+        'completions': int(bool(is_completed)),
+        'completion_time_sum': completion_time_seconds if timed else 0,
+        'completion_time_count': int(timed),
+        'study_seconds': total_time_seconds or 0,
+    }
+
+
+def _running_average(sum_field, sum_delta, count_field, count_delta, scale=1.0):
+    """(suma + Δ) / (conteo + Δ) evaluado en el UPDATE; 0 si no quedan filas"""
+    return Coalesce(
+        ExpressionWrapper(
+            (F(sum_field) + sum_delta) * Value(1.0)
+            / NullIf(F(count_field) + count_delta, 0)
+            / Value(scale),
+            output_field=FloatField()
+        ),
+        Value(0.0),
+        output_field=FloatField()
+    )
+
+
+class ContentAggregates:
+    """
+    Aplicación atómica de deltas a ContentUnit y UserProfile
+    """
+
+    @staticmethod
+    def progress_delta(previous, current):
+        return {key: current[key] - previous[key] for key in EMPTY_PROGRESS}
+
+    @staticmethod
+    def apply_progress_delta(content_unit_id, user_id, delta, attempts=0):
+        """Aplica el delta de una fila de progreso; no hace nada si es nulo"""
+        from .models import ContentUnit
+        from apps.learning.dashboard import DashboardSnapshot
+        from apps.users.models import UserProfile
+
+        unit_changes = {}
+        if attempts:
+            unit_changes['total_attempts'] = F('total_attempts') + attempts
+        if delta['completions']:
+            unit_changes['total_completions'] = F('total_completions') + delta['completions']
+        if delta['completion_time_sum'] or delta['completion_time_count']:
+            unit_changes.update({
+                'completion_time_sum': F('completion_time_sum') + delta['completion_time_sum'],
+                'completion_time_count': F('completion_time_count') + delta['completion_time_count'],
+                # average_completion_time se guarda en minutos
+                'average_completion_time': _running_average(
+                    'completion_time_sum', delta['completion_time_sum'],
+                    'completion_time_count', delta['completion_time_count'],
+                    scale=60.0
+                ),
+            })
+        if unit_changes:
+            ContentUnit.objects.filter(pk=content_unit_id).update(**unit_changes)
+
+        if delta['study_seconds']:
+            seconds = F('content_study_seconds') + delta['study_seconds']
+            UserProfile.objects.filter(user_id=user_id).update(
+                content_study_seconds=seconds,
+                total_study_minutes=ExpressionWrapper(seconds / 60, output_field=IntegerField())
+            )
+            DashboardSnapshot.invalidate(user_id, 'profile')
+
+    @staticmethod
+    def apply_rating_delta(content_unit_id, sum_delta, count_delta):
+        from .models import ContentUnit
+
+        if not sum_delta and not count_delta:
+            return
+        ContentUnit.objects.filter(pk=content_unit_id).update(
+            rating_sum=F('rating_sum') + sum_delta,
+            rating_count=F('rating_count') + count_delta,
+            average_rating=_running_average('rating_sum', sum_delta, 'rating_count', count_delta)
+        )
+
+    @staticmethod
+    def rebuild():
+        """Recalcula sumas, conteos y promedios desde las filas; retorna unidades actualizadas"""
+        from .models import ContentUnit, UserContentProgress, ContentRating
+        from apps.users.models import UserProfile
+
+        completed = Q(is_completed=True)
+        timed = Q(is_completed=True, completion_time_seconds__gt=0)
+        progress = {
+            row['content_unit']: row
+            for row in UserContentProgress.objects.values('content_unit').annotate(
+                attempts=Count('id'),
+                completions=Count('id', filter=completed),
+                time_sum=Coalesce(Sum('completion_time_seconds', filter=timed), 0),
+                time_count=Count('id', filter=timed),
+            ).order_by()
+        }
+        ratings = {
+            row['content_unit']: row
+            for row in ContentRating.objects.values('content_unit').annotate(
+                total=Sum('rating'), count=Count('id')
+            ).order_by()
+        }
+
+        units = list(ContentUnit.objects.only('id'))
+        for unit in units:
+            row = progress.get(unit.id, {})
+            unit.total_attempts = row.get('attempts', 0)
+            unit.total_completions = row.get('completions', 0)
+            unit.completion_time_sum = row.get('time_sum', 0)
+            unit.completion_time_count = row.get('time_count', 0)
+            unit.average_completion_time = (
+                unit.completion_time_sum / unit.completion_time_count / 60.0
+                if unit.completion_time_count else 0.0
+            )
+            rating = ratings.get(unit.id, {})
+            unit.rating_sum = rating.get('total', 0)
+            unit.rating_count = rating.get('count', 0)
+            unit.average_rating = unit.rating_sum / unit.rating_count if unit.rating_count else 0.0
+
+        ContentUnit.objects.bulk_update(units, [
+            'total_attempts', 'total_completions', 'completion_time_sum',
+            'completion_time_count', 'average_completion_time',
+            'rating_sum', 'rating_count', 'average_rating',
+        ], batch_size=1000)
+
+        study = {
+            row['user']: row['seconds']
+            for row in UserContentProgress.objects.values('user').annotate(
+                seconds=Coalesce(Sum('total_time_seconds'), 0)
+            ).order_by()
+        }
+        profiles = list(UserProfile.objects.filter(user_id__in=study).only('id', 'user_id'))
+        for profile in profiles:
+            profile.content_study_seconds = study[profile.user_id]
+            profile.total_study_minutes = study[profile.user_id] // 60
+        UserProfile.objects.bulk_update(
+            profiles, ['content_study_seconds', 'total_study_minutes'], batch_size=1000
+        )
+
+        return len(units)
@@ -0,0 +1,180 @@
+"""
+Árbol de categorías con ruta materializada
+
+Cada ContentCategory guarda en tree_path los ids de sus ancestros y el
+propio ("1/5/12/") y su profundidad. El subárbol de una categoría es un
+único filtro por prefijo (tree_path LIKE '1/5/%') sobre un índice
+varchar_pattern_ops, sin recorrer parent_category nivel por nivel. Mover
+una categoría reescribe el prefijo de todos sus descendientes en un UPDATE.
+
+El árbol completo se serializa una vez y se guarda en caché; los
+endpoints de categorías lo renderizan sin tocar la base de datos y se
+invalida al guardar o borrar cualquier categoría.
+"""
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+
+from apps.learning.cache import CacheKeys, CacheTimeouts
+
+
+def _segments(tree_path):
+    return [int(segment) for segment in tree_path.split('/') if segment]
+
+
+class CategoryTree:
+    """
+    Mantenimiento de rutas, consultas por subárbol y snapshot en caché
+    """
+
+    @staticmethod
+    def _stored_path(category_id):
+        from .models import ContentCategory
+
+        if category_id is None:
+            return ''
+        return ContentCategory.objects.filter(pk=category_id).values_list(
+            'tree_path', flat=True
+        ).first() or ''
+
+    @classmethod
+    def validate_parent(cls, category):
+        """Impide que una categoría cuelgue de sí misma o de un descendiente"""
+        if not category.pk or not category.parent_category_id:
+            return
+        if category.pk in _segments(cls._stored_path(category.parent_category_id)) \
+                or category.parent_category_id == category.pk:
+            raise ValidationError({
+                'parent_category': 'La categoría padre no puede ser la misma categoría ni una subcategoría suya.'
+            })
+
+    @classmethod
+    def prepare(cls, category):
+        """
+        Antes de guardar: valida el padre y calcula la nueva ruta.
+        Retorna la ruta almacenada hasta ahora ('' si es nueva).
+        """
+        cls.validate_parent(category)
+        previous_path = cls._stored_path(category.pk)
+        category._parent_tree_path = cls._stored_path(category.parent_category_id)
+        if category.pk:
+            category.tree_path = f"{category._parent_tree_path}{category.pk}/"
+            category.depth = len(_segments(category.tree_path)) - 1
+        return previous_path
+
+    @staticmethod
+    def finalize(category, previous_path):
+        """Después de guardar: fija la ruta de filas nuevas y mueve el subárbol"""
+        from .models import ContentCategory
+
+        if not category.tree_path:
+            category.tree_path = f"{category._parent_tree_path}{category.pk}/"
+            category.depth = len(_segments(category.tree_path)) - 1
+            ContentCategory.objects.filter(pk=category.pk).update(
+                tree_path=category.tree_path, depth=category.depth
+            )
+            return
+
+        if previous_path and previous_path != category.tree_path:
+            depth_delta = category.depth - (len(_segments(previous_path)) - 1)
+            ContentCategory.objects.filter(
+                tree_path__startswith=previous_path
+            ).exclude(pk=category.pk).update(
+                tree_path=Concat(
+                    Value(category.tree_path),
+                    Substr('tree_path', len(previous_path) + 1)
+                ),
+                depth=F('depth') + depth_delta
+            )
+
+    @staticmethod
+    def save(category, save, *args, **kwargs):
+        """Envuelve Model.save para mantener la ruta y la de los descendientes"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'tree_path', 'depth'}
+
+        with transaction.atomic():
+            previous_path = CategoryTree.prepare(category)
+            save(*args, **kwargs)
+            CategoryTree.finalize(category, previous_path)
+
+    @staticmethod
+    def subtree(category, include_self=True):
+        """Categorías bajo category en una consulta por prefijo"""
+        from .models import ContentCategory
+
+        queryset = ContentCategory.objects.filter(tree_path__startswith=category.tree_path)
+        if not include_self:
+            queryset = queryset.exclude(pk=category.pk)
+        return queryset
+
+    @staticmethod
+    def units_under(category):
+        """Unidades de la categoría y de todas sus subcategorías"""
+        from .models import ContentUnit
+
+        return ContentUnit.objects.filter(category__tree_path__startswith=category.tree_path)
+
+    @staticmethod
+    def _build_snapshot():
+        from .models import ContentCategory
+        from .serializers import ContentCategorySerializer
+
+        categories = list(ContentCategory.objects.order_by('depth', 'order', 'name'))
+        names = {category.id: category.name for category in categories}
+        nodes = ContentCategorySerializer(
+            categories, many=True, context={'category_names': names}
+        ).data
+        return {
+            'nodes': [dict(node) for node in nodes],
+            'names': names,
+        }
+
+    @classmethod
+    def snapshot(cls):
+        """{'nodes': [categoría serializada], 'names': {id: nombre}} desde caché"""
+        data = cache.get(CacheKeys.CONTENT_CATEGORY_TREE)
+        if data is None:
+            data = cls._build_snapshot()
+            cache.set(CacheKeys.CONTENT_CATEGORY_TREE, data, CacheTimeouts.CONTENT_CATEGORY_TREE)
+        return data
+
+    @staticmethod
+    def invalidate():
+        cache.delete(CacheKeys.CONTENT_CATEGORY_TREE)
+
+    @classmethod
+    def categories(cls, active_only=True):
+        nodes = cls.snapshot()['nodes']
+        return [node for node in nodes if node['is_active'] or not active_only]
+
+    @classmethod
+    def find(cls, slug, active_only=True):
+        return next((node for node in cls.categories(active_only) if node['slug'] == slug), None)
+
+    @classmethod
+    def nested(cls, active_only=True):
+        """Árbol anidado con 'children'; una rama inactiva oculta sus descendientes"""
+        nodes = {node['id']: {**node, 'children': []} for node in cls.categories(active_only)}
+        roots = []
+        for node in nodes.values():
+            parent = nodes.get(node['parent_category'])
+            if node['parent_category'] is None:
+                roots.append(node)
+            elif parent is not None:
+                parent['children'].append(node)
+        return roots
+
+    @classmethod
+    def full_path(cls, category, names=None):
+        """"Matemáticas > Álgebra > Ecuaciones" a partir de la ruta materializada"""
+        if not category.tree_path:
+            return category.name
+        if names is None:
+            names = cls.snapshot()['names']
+        ancestors = [names.get(category_id, '') for category_id in _segments(category.tree_path)[:-1]]
+        return ' > '.join([*ancestors, category.name])
@@ -0,0 +1,112 @@
+"""
+Progreso por lección normalizado
+
+Cada lección completada es una fila de UserLessonCompletion (única por
+progreso y lección) en lugar de una entrada del JSON lesson_progress, así
+que completar una lección inserta una fila estrecha en vez de reescribir el
+blob completo. ContentUnit guarda cuántas lecciones obligatorias tiene y
+UserContentProgress cuántas de ellas completó el usuario; el porcentaje se
+actualiza en el mismo UPDATE atómico que incrementa el contador, de modo
+que dos lecciones completadas a la vez no se pisan.
+
+refresh_unit() recalcula ambos contadores cuando cambian las lecciones
+obligatorias de una unidad.
+"""
+
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+
+
+def _percentage(completed, total):
+    """Expresión del porcentaje de avance (tope 100) para un total conocido"""
+    if not total:
+        return Value(0.0)
+    return Least(
+        Value(100.0),
+        ExpressionWrapper(completed * Value(100.0) / Value(total), output_field=FloatField())
+    )
+
+
+class LessonProgressStore:
+    """
+    Registro de lecciones completadas y contadores de avance por unidad
+    """
+
+    @staticmethod
+    def complete_lesson(progress, lesson, score=100, time_seconds=0):
+        """
+        Marca la lección como completada dentro del progreso de su unidad.
+        Repetir una lección actualiza su puntaje sin volver a contarla.
+        Retorna el progreso actualizado desde la base de datos.
+        """
+        from .models import ContentUnit, UserContentProgress, UserLessonCompletion
+
+        with transaction.atomic():
+            completion, created = UserLessonCompletion.objects.get_or_create(
+                progress=progress,
+                lesson=lesson,
+                defaults={'score': score, 'time_seconds': time_seconds}
+            )
+            if not created:
+                UserLessonCompletion.objects.filter(pk=completion.pk).update(
+                    score=score, time_seconds=time_seconds
+                )
+            elif lesson.is_mandatory:
+                total = ContentUnit.objects.filter(
+                    pk=lesson.content_unit_id
+                ).values_list('mandatory_lessons_count', flat=True).get()
+                completed = F('mandatory_lessons_completed') + 1
+                # El UPDATE bloquea la fila hasta el commit: serializa completitudes concurrentes
+                UserContentProgress.objects.filter(pk=progress.pk).update(
+                    mandatory_lessons_completed=completed,
+                    progress_percentage=_percentage(completed, total),
+                    updated_at=timezone.now()
+                )
+
+            progress.refresh_from_db()
+            if progress.progress_percentage >= 100.0 and not progress.is_completed:
+                # save() para que los signals otorguen XP y actualicen agregados
+                progress.is_completed = True
+                progress.completed_at = progress.completed_at or timezone.now()
+                progress.save(update_fields=['is_completed', 'completed_at', 'updated_at'])
+
+        return progress
+
+    @staticmethod
+    def completed_lessons(progress):
+        """{lesson_id: datos} con la forma del antiguo JSON lesson_progress"""
+        return {
+            str(completion.lesson_id): {
+                'completed': True,
+                'completed_at': completion.completed_at.isoformat(),
+                'score': completion.score,
+                'time_seconds': completion.time_seconds,
+            }
+            for completion in progress.lesson_completions.all()
+        }
+
+    @staticmethod
+    def refresh_unit(content_unit_id):
+        """Recalcula obligatorias de la unidad y el avance de todos sus progresos"""
+        from .models import ContentLesson, ContentUnit, UserContentProgress, UserLessonCompletion
+
+        total = ContentLesson.objects.filter(
+            content_unit_id=content_unit_id, is_mandatory=True
+        ).count()
+        ContentUnit.objects.filter(pk=content_unit_id).update(mandatory_lessons_count=total)
+
+        completed = Coalesce(
+            Subquery(
+                UserLessonCompletion.objects.filter(
+                    progress=OuterRef('pk'), lesson__is_mandatory=True
+                ).values('progress').annotate(total=Count('id')).values('total'),
+                output_field=IntegerField()
+            ),
+            0
+        )
+        return UserContentProgress.objects.filter(content_unit_id=content_unit_id).update(
+            mandatory_lessons_completed=completed,
+            progress_percentage=_percentage(completed, total)
+        )
@@ -0,0 +1 @@
+# Management package for content app
@@ -0,0 +1 @@
+# Management commands for content app
@@ -0,0 +1,19 @@
+"""
+Comando Django para recalcular los agregados incrementales de contenido
+Corrige sumas y conteos si el progreso o los ratings se modificaron sin signals
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.content.aggregates import ContentAggregates
+
+
+class Command(BaseCommand):
+    help = 'Recalcula métricas de ContentUnit y minutos de estudio de los perfiles'
+
+    def handle(self, *args, **options):
+        units = ContentAggregates.rebuild()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Agregados de contenido recalculados: {units} unidades')
+        )
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # GIN solo existe en PostgreSQL; en otros motores la columna queda sin índice
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS "content_units_search" ON "content_units" USING gin ("search_vector")'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute('DROP INDEX IF EXISTS "content_units_search"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentunit",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="contentunit",
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="content_units_search"
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:57
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_aggregates(apps, schema_editor):
+    ContentUnit = apps.get_model("content", "ContentUnit")
+    UserContentProgress = apps.get_model("content", "UserContentProgress")
+    ContentRating = apps.get_model("content", "ContentRating")
+    UserProfile = apps.get_model("users", "UserProfile")
+
+    timed = Q(is_completed=True, completion_time_seconds__gt=0)
+    for row in (
+        UserContentProgress.objects.values("content_unit")
+        .annotate(total=Sum("completion_time_seconds", filter=timed), count=Count("id", filter=timed))
+        .filter(count__gt=0)
+        .order_by()
+    ):
+        ContentUnit.objects.filter(pk=row["content_unit"]).update(
+            completion_time_sum=row["total"], completion_time_count=row["count"]
+        )
+
+    for row in ContentRating.objects.values("content_unit").annotate(total=Sum("rating"), count=Count("id")).order_by():
+        ContentUnit.objects.filter(pk=row["content_unit"]).update(
+            rating_sum=row["total"],
+            rating_count=row["count"],
+            average_rating=row["total"] / row["count"],
+        )
+
+    for row in UserContentProgress.objects.values("user").annotate(seconds=Sum("total_time_seconds")).order_by():
+        seconds = row["seconds"] or 0
+        UserProfile.objects.filter(user_id=row["user"]).update(
+            content_study_seconds=seconds, total_study_minutes=seconds // 60
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0002_search_vector"),
+        ("users", "0002_userprofile_content_study_seconds"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentunit",
+            name="completion_time_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="contentunit",
+            name="completion_time_sum",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="contentunit",
+            name="rating_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="contentunit",
+            name="rating_sum",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_aggregates, migrations.RunPython.noop),
+    ]
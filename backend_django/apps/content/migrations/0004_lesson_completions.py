@@ -0,0 +1,108 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def move_lesson_progress(apps, schema_editor):
+    ContentUnit = apps.get_model("content", "ContentUnit")
+    ContentLesson = apps.get_model("content", "ContentLesson")
+    UserContentProgress = apps.get_model("content", "UserContentProgress")
+    UserLessonCompletion = apps.get_model("content", "UserLessonCompletion")
+
+    mandatory = {}
+    for lesson_id, unit_id, is_mandatory in ContentLesson.objects.values_list(
+        "id", "content_unit_id", "is_mandatory"
+    ):
+        mandatory[lesson_id] = (unit_id, is_mandatory)
+
+    for row in (
+        ContentLesson.objects.filter(is_mandatory=True)
+        .values("content_unit")
+        .annotate(total=Count("id"))
+        .order_by()
+    ):
+        ContentUnit.objects.filter(pk=row["content_unit"]).update(
+            mandatory_lessons_count=row["total"]
+        )
+
+    progresses = UserContentProgress.objects.exclude(lesson_progress={}).only(
+        "id", "content_unit_id", "lesson_progress"
+    )
+    for progress in progresses.iterator(chunk_size=2000):
+        rows = []
+        for key, data in (progress.lesson_progress or {}).items():
+            lesson_id = int(key) if str(key).isdigit() else None
+            if mandatory.get(lesson_id, (None,))[0] != progress.content_unit_id:
+                continue
+            if not isinstance(data, dict) or not data.get("completed"):
+                continue
+            rows.append(
+                UserLessonCompletion(
+                    progress_id=progress.id,
+                    lesson_id=lesson_id,
+                    score=data.get("score") or 0,
+                    time_seconds=data.get("time_seconds") or 0,
+                )
+            )
+        UserLessonCompletion.objects.bulk_create(rows, ignore_conflicts=True)
+        UserContentProgress.objects.filter(pk=progress.id).update(
+            mandatory_lessons_completed=sum(1 for row in rows if mandatory[row.lesson_id][1])
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0003_incremental_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentunit",
+            name="mandatory_lessons_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="usercontentprogress",
+            name="mandatory_lessons_completed",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="UserLessonCompletion",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("score", models.FloatField(default=100.0)),
+                ("time_seconds", models.IntegerField(default=0)),
+                ("completed_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "lesson",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="completions",
+                        to="content.contentlesson",
+                    ),
+                ),
+                (
+                    "progress",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lesson_completions",
+                        to="content.usercontentprogress",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Lección Completada",
+                "verbose_name_plural": "Lecciones Completadas",
+                "db_table": "content_lesson_completions",
+                "unique_together": {("progress", "lesson")},
+            },
+        ),
+        migrations.RunPython(move_lesson_progress, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="usercontentprogress",
+            name="lesson_progress",
+        ),
+    ]
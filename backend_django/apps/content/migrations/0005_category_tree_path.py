@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:04
+
+from django.db import migrations, models
+
+
+def populate_tree_paths(apps, schema_editor):
+    ContentCategory = apps.get_model("content", "ContentCategory")
+
+    children = {}
+    for category_id, parent_id in ContentCategory.objects.values_list("id", "parent_category_id"):
+        children.setdefault(parent_id, []).append(category_id)
+
+    pending = [(category_id, "") for category_id in children.get(None, [])]
+    while pending:
+        category_id, parent_path = pending.pop()
+        tree_path = f"{parent_path}{category_id}/"
+        ContentCategory.objects.filter(pk=category_id).update(
+            tree_path=tree_path, depth=tree_path.count("/") - 1
+        )
+        pending.extend((child_id, tree_path) for child_id in children.get(category_id, []))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0004_lesson_completions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contentcategory",
+            name="depth",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="contentcategory",
+            name="tree_path",
+            field=models.CharField(
+                blank=True, default="", editable=False, max_length=255
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contentcategory",
+            index=models.Index(
+                fields=["tree_path"],
+                name="content_categories_tree",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.RunPython(populate_tree_paths, migrations.RunPython.noop),
+    ]
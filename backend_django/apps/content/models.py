@@ -3,9 +3,11 @@ Modelos de contenido educativo para Ciudadela del Conocimiento ICFES
 Sistema de contenido tipo Duolingo/Khan Academy
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.urls import reverse
 from django.utils.text import slugify
 import uuid
@@ -44,6 +46,9 @@ class ContentCategory(models.Model):
         related_name='subcategories'
     )
     order = models.IntegerField(default=0)
+    # Ruta materializada de ids ("1/5/12/"), mantenida en save (apps.content.category_tree)
+    tree_path = models.CharField(max_length=255, blank=True, default='', editable=False)
+    depth = models.IntegerField(default=0, editable=False)
     
     # Estado
     is_active = models.BooleanField(default=True)
@@ -73,6 +78,10 @@ class ContentCategory(models.Model):
             models.Index(fields=['category_type', 'is_active']),
             models.Index(fields=['parent_category', 'order']),
             models.Index(fields=['is_featured', 'is_active']),
+            models.Index(
+                fields=['tree_path'], name='content_categories_tree',
+                opclasses=['varchar_pattern_ops']
+            ),
         ]
         verbose_name = 'Categoría de Contenido'
         verbose_name_plural = 'Categorías de Contenido'
@@ -80,20 +89,25 @@ class ContentCategory(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_category_type_display()})"
     
+    def clean(self):
+        from .category_tree import CategoryTree
+        CategoryTree.validate_parent(self)
+    
     def save(self, *args, **kwargs):
+        from .category_tree import CategoryTree
+        
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        CategoryTree.save(self, super().save, *args, **kwargs)
     
     def get_absolute_url(self):
         return reverse('content:category_detail', kwargs={'slug': self.slug})
     
     @property
     def full_path(self):
-        """Ruta completa de la categoría incluyendo padres"""
-        if self.parent_category:
-            return f"{self.parent_category.full_path} > {self.name}"
-        return self.name
+        """Ruta completa de la categoría incluyendo padres (desde el árbol en caché)"""
+        from .category_tree import CategoryTree
+        return CategoryTree.full_path(self)
 
 
 class ContentUnit(models.Model):
@@ -176,12 +190,22 @@ class ContentUnit(models.Model):
     total_completions = models.IntegerField(default=0)
     average_completion_time = models.FloatField(default=0.0)
     average_rating = models.FloatField(default=0.0)
+    mandatory_lessons_count = models.IntegerField(default=0)  # Lecciones obligatorias (apps.content.lesson_progress)
+    
+    # Sumas y conteos acumulados de los promedios (apps.content.aggregates)
+    completion_time_sum = models.BigIntegerField(default=0)  # Segundos
+    completion_time_count = models.IntegerField(default=0)
+    rating_sum = models.BigIntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
     
     # Metadatos
     learning_objectives = models.JSONField(default=list)  # Objetivos de aprendizaje
     tags = models.JSONField(default=list)
     metadata = models.JSONField(default=dict)
     
+    # Búsqueda de texto completo (apps.learning.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -195,6 +219,7 @@ class ContentUnit(models.Model):
             models.Index(fields=['difficulty_level', 'is_active']),
             models.Index(fields=['unit_type', 'is_active']),
             models.Index(fields=['is_featured', 'is_active']),
+            GinIndex(fields=['search_vector'], name='content_units_search'),
         ]
         verbose_name = 'Unidad de Contenido'
         verbose_name_plural = 'Unidades de Contenido'
@@ -348,8 +373,8 @@ class UserContentProgress(models.Model):
     xp_earned = models.IntegerField(default=0)
     hearts_spent = models.IntegerField(default=0)
     
-    # Datos detallados de progreso
-    lesson_progress = models.JSONField(default=dict)  # {lesson_id: completion_data}
+    # Datos detallados de progreso (el detalle por lección vive en UserLessonCompletion)
+    mandatory_lessons_completed = models.IntegerField(default=0)
     mistakes_data = models.JSONField(default=list)    # Errores cometidos para aprendizaje
     
     # Metadatos
@@ -372,18 +397,19 @@ class UserContentProgress(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.content_unit.title} ({self.progress_percentage:.1f}%)"
     
+    def save(self, *args, **kwargs):
+        # pre_save bloquea la fila original (select_for_update) y post_save aplica
+        # el delta de agregados: ambos deben quedar en la misma transacción
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     def calculate_progress(self):
-        """Calcula el progreso basado en las lecciones completadas"""
-        total_lessons = self.content_unit.lessons.filter(is_mandatory=True).count()
+        """Calcula el progreso con los contadores de lecciones obligatorias"""
+        total_lessons = self.content_unit.mandatory_lessons_count
         if total_lessons == 0:
             return 0.0
         
-        completed_lessons = sum(
-            1 for lesson_id, data in self.lesson_progress.items()
-            if data.get('completed', False)
-        )
-        
-        return (completed_lessons / total_lessons) * 100
+        return min(100.0, (self.mandatory_lessons_completed / total_lessons) * 100)
     
     def update_progress(self):
         """Actualiza el progreso automáticamente"""
@@ -397,6 +423,31 @@ class UserContentProgress(models.Model):
         self.save()
 
 
+class UserLessonCompletion(models.Model):
+    """Lección completada por un usuario dentro de su progreso de unidad"""
+    
+    id = models.BigAutoField(primary_key=True)
+    progress = models.ForeignKey(
+        UserContentProgress,
+        on_delete=models.CASCADE,
+        related_name='lesson_completions'
+    )
+    lesson = models.ForeignKey(ContentLesson, on_delete=models.CASCADE, related_name='completions')
+    
+    score = models.FloatField(default=100.0)
+    time_seconds = models.IntegerField(default=0)
+    completed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'content_lesson_completions'
+        unique_together = ['progress', 'lesson']
+        verbose_name = 'Lección Completada'
+        verbose_name_plural = 'Lecciones Completadas'
+    
+    def __str__(self):
+        return f"{self.progress_id} - {self.lesson_id}"
+
+
 class ContentRating(models.Model):
     """Calificaciones y reseñas de contenido por usuarios"""
     
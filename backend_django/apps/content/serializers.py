@@ -7,15 +7,21 @@ from .models import (
     ContentCategory, ContentUnit, ContentLesson,
     UserContentProgress, ContentRating, ContentBookmark
 )
+from .category_tree import CategoryTree
+from .lesson_progress import LessonProgressStore
 
 
 class ContentCategorySerializer(serializers.ModelSerializer):
     """Serializer para categorías de contenido"""
+    full_path = serializers.SerializerMethodField()
     
     class Meta:
         model = ContentCategory
         fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['tree_path', 'depth', 'created_at', 'updated_at']
+    
+    def get_full_path(self, obj):
+        return CategoryTree.full_path(obj, self.context.get('category_names'))
 
 
 class ContentLessonSerializer(serializers.ModelSerializer):
@@ -45,11 +51,15 @@ class ContentUnitSerializer(serializers.ModelSerializer):
 class UserContentProgressSerializer(serializers.ModelSerializer):
     """Serializer para progreso de contenido del usuario"""
     content_unit_title = serializers.CharField(source='content_unit.title', read_only=True)
+    lesson_progress = serializers.SerializerMethodField()
     
     class Meta:
         model = UserContentProgress
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at']
+    
+    def get_lesson_progress(self, obj):
+        return LessonProgressStore.completed_lessons(obj)
 
 
 class ContentRatingSerializer(serializers.ModelSerializer):
@@ -2,79 +2,76 @@
 Signals para la app de contenido educativo
 """
 
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from django.db.models import Avg, Count
 from django.utils import timezone
 
 from .models import (
     UserContentProgress, ContentRating, ContentUnit, 
-    ContentBookmark, ContentLesson
+    ContentBookmark, ContentLesson, ContentCategory
 )
+from .aggregates import (
+    ContentAggregates, EMPTY_PROGRESS, PROGRESS_FIELDS, progress_contribution
+)
+from .category_tree import CategoryTree
+from .lesson_progress import LessonProgressStore
+
+
+def _previous_progress_contribution(instance, created):
+    original = None if created else getattr(instance, '_original_state', None)
+    if original is None:
+        return dict(EMPTY_PROGRESS)
+    return progress_contribution(*(getattr(original, field) for field in PROGRESS_FIELDS))
 
 
 @receiver(post_save, sender=UserContentProgress)
-def update_content_unit_metrics(sender, instance, created, **kwargs):
-    """Actualiza métricas de la unidad de contenido cuando cambia el progreso"""
-    content_unit = instance.content_unit
-    
-    # Actualizar contador de intentos
-    if created:
-        content_unit.total_attempts += 1
-    
-    # Actualizar contador de completados
-    if instance.is_completed and 'is_completed' in getattr(instance, '_dirty_fields', {}):
-        content_unit.total_completions += 1
-    
-    # Actualizar tiempo promedio de completitud
-    completed_progress = UserContentProgress.objects.filter(
-        content_unit=content_unit,
-        is_completed=True,
-        completion_time_seconds__gt=0
+def update_content_aggregates(sender, instance, created, **kwargs):
+    """
+    Aplica a la unidad y al perfil el delta de este progreso (O(1), sin
+    re-agregar). El estado previo se leyó con la fila bloqueada en la misma
+    transacción del save (UserContentProgress.save)
+    """
+    current = progress_contribution(*(getattr(instance, field) for field in PROGRESS_FIELDS))
+    delta = ContentAggregates.progress_delta(
+        _previous_progress_contribution(instance, created), current
     )
-    
-    if completed_progress.exists():
-        avg_time = completed_progress.aggregate(
-            avg_time=Avg('completion_time_seconds')
-        )['avg_time']
-        content_unit.average_completion_time = avg_time / 60.0 if avg_time else 0.0
-    
-    content_unit.save(update_fields=[
-        'total_attempts', 'total_completions', 'average_completion_time'
-    ])
+    ContentAggregates.apply_progress_delta(
+        instance.content_unit_id, instance.user_id, delta, attempts=1 if created else 0
+    )
+
+
+@receiver(post_delete, sender=UserContentProgress)
+def remove_content_aggregates(sender, instance, **kwargs):
+    """Descuenta el aporte del progreso eliminado (el intento se conserva)"""
+    current = progress_contribution(*(getattr(instance, field) for field in PROGRESS_FIELDS))
+    delta = ContentAggregates.progress_delta(current, EMPTY_PROGRESS)
+    ContentAggregates.apply_progress_delta(instance.content_unit_id, instance.user_id, delta)
+
+
+@receiver(pre_save, sender=ContentRating)
+def track_previous_rating(sender, instance, **kwargs):
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = ContentRating.objects.filter(
+            pk=instance.pk
+        ).values_list('rating', flat=True).first()
 
 
 @receiver(post_save, sender=ContentRating)
-@receiver(post_delete, sender=ContentRating)
 def update_content_unit_rating(sender, instance, **kwargs):
-    """Actualiza el rating promedio de la unidad de contenido"""
-    content_unit = instance.content_unit
-    
-    ratings = ContentRating.objects.filter(content_unit=content_unit)
-    if ratings.exists():
-        avg_rating = ratings.aggregate(avg_rating=Avg('rating'))['avg_rating']
-        content_unit.average_rating = avg_rating or 0.0
+    """Ajusta suma y conteo de ratings de la unidad con el cambio de esta calificación"""
+    previous = getattr(instance, '_previous_rating', None)
+    if previous is None:
+        ContentAggregates.apply_rating_delta(instance.content_unit_id, instance.rating, 1)
     else:
-        content_unit.average_rating = 0.0
-    
-    content_unit.save(update_fields=['average_rating'])
+        ContentAggregates.apply_rating_delta(instance.content_unit_id, instance.rating - previous, 0)
+    instance._previous_rating = instance.rating
 
 
-@receiver(post_save, sender=UserContentProgress)
-def update_user_profile_stats(sender, instance, created, **kwargs):
-    """Actualiza estadísticas del perfil del usuario"""
-    if hasattr(instance.user, 'profile'):
-        profile = instance.user.profile
-        
-        # Actualizar tiempo total de estudio
-        total_time = UserContentProgress.objects.filter(
-            user=instance.user
-        ).aggregate(
-            total=Avg('total_time_seconds')
-        )['total'] or 0
-        
-        profile.total_study_minutes = int(total_time / 60)
-        profile.save(update_fields=['total_study_minutes'])
+@receiver(post_delete, sender=ContentRating)
+def remove_content_unit_rating(sender, instance, **kwargs):
+    ContentAggregates.apply_rating_delta(instance.content_unit_id, -instance.rating, -1)
 
 
 @receiver(post_save, sender=UserContentProgress)
@@ -83,11 +80,13 @@ def award_xp_for_content_progress(sender, instance, created, **kwargs):
     if instance.is_completed and 'is_completed' in getattr(instance, '_dirty_fields', {}):
         # Solo otorgar XP cuando se completa por primera vez
         xp_to_award = instance.content_unit.xp_reward
-        instance.user.add_experience(xp_to_award)
+        instance.user.add_experience(
+            xp_to_award, source='CONTENT', reference=f'content_progress:{instance.pk}'
+        )
         
-        # Registrar XP ganado
+        # Registrar XP ganado sin re-disparar los signals de esta fila
         instance.xp_earned = xp_to_award
-        instance.save(update_fields=['xp_earned'])
+        UserContentProgress.objects.filter(pk=instance.pk).update(xp_earned=xp_to_award)
 
 
 @receiver(pre_save, sender=UserContentProgress)
@@ -95,7 +94,9 @@ def track_dirty_fields(sender, instance, **kwargs):
     """Rastrea campos que han cambiado para optimizar signals"""
     if instance.pk:
         try:
-            original = UserContentProgress.objects.get(pk=instance.pk)
+            # Bloqueada hasta el commit: dos saves concurrentes de la fila no
+            # descuentan el mismo aporte previo en los agregados
+            original = UserContentProgress.objects.select_for_update().get(pk=instance.pk)
             dirty_fields = []
             
             for field in instance._meta.fields:
@@ -104,5 +105,42 @@ def track_dirty_fields(sender, instance, **kwargs):
                     dirty_fields.append(field_name)
             
             instance._dirty_fields = dirty_fields
+            instance._original_state = original
         except UserContentProgress.DoesNotExist:
-            instance._dirty_fields = [] 
\ No newline at end of file
+            instance._dirty_fields = []
+            instance._original_state = None 
+
+
+@receiver(pre_save, sender=ContentLesson)
+def track_lesson_mandatory(sender, instance, **kwargs):
+    instance._previous_mandatory = None
+    if instance.pk:
+        instance._previous_mandatory = ContentLesson.objects.filter(
+            pk=instance.pk
+        ).values_list('content_unit_id', 'is_mandatory').first()
+
+
+@receiver(post_save, sender=ContentLesson)
+def refresh_unit_lesson_counters(sender, instance, **kwargs):
+    """Recalcula contadores de avance solo si cambió el conjunto de obligatorias"""
+    previous = getattr(instance, '_previous_mandatory', None)
+    current = (instance.content_unit_id, instance.is_mandatory)
+    was_mandatory = previous is not None and previous[1]
+    if previous == current or not (was_mandatory or instance.is_mandatory):
+        return
+    
+    for content_unit_id in {current[0], previous[0] if previous else current[0]}:
+        LessonProgressStore.refresh_unit(content_unit_id)
+
+
+@receiver(post_delete, sender=ContentLesson)
+def refresh_unit_after_lesson_delete(sender, instance, **kwargs):
+    if instance.is_mandatory:
+        LessonProgressStore.refresh_unit(instance.content_unit_id)
+
+
+@receiver(post_save, sender=ContentCategory)
+@receiver(post_delete, sender=ContentCategory)
+def invalidate_category_tree(sender, instance, **kwargs):
+    """El snapshot del árbol se reconstruye en la siguiente lectura"""
+    transaction.on_commit(CategoryTree.invalidate)
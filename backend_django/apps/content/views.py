@@ -4,6 +4,7 @@ Vistas para la app de contenido educativo
 
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
@@ -18,15 +19,53 @@ from .serializers import (
     ContentCategorySerializer, ContentUnitSerializer, ContentLessonSerializer,
     UserContentProgressSerializer, ContentRatingSerializer, ContentBookmarkSerializer
 )
+from .category_tree import CategoryTree
+from .lesson_progress import LessonProgressStore
+from apps.users.ledger import ExperienceLedger
 
 
 class ContentCategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet para categorías de contenido"""
+    """ViewSet para categorías de contenido (renderizado desde el árbol en caché)"""
     serializer_class = ContentCategorySerializer
     lookup_field = 'slug'
     
     def get_queryset(self):
         return ContentCategory.objects.filter(is_active=True)
+    
+    def list(self, request, *args, **kwargs):
+        categories = CategoryTree.categories()
+        page = self.paginate_queryset(categories)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(categories)
+    
+    def retrieve(self, request, *args, **kwargs):
+        category = CategoryTree.find(kwargs[self.lookup_field])
+        if category is None:
+            raise NotFound()
+        return Response(category)
+    
+    @action(detail=False, methods=['get'])
+    def tree(self, request):
+        """Árbol completo anidado"""
+        return Response(CategoryTree.nested())
+    
+    @action(detail=True, methods=['get'])
+    def units(self, request, slug=None):
+        """Unidades activas de la categoría y todas sus subcategorías"""
+        category = CategoryTree.find(slug)
+        if category is None:
+            raise NotFound()
+        
+        queryset = ContentUnit.objects.filter(
+            category__tree_path__startswith=category['tree_path'],
+            is_active=True
+        ).select_related('category').prefetch_related('lessons')
+        page = self.paginate_queryset(queryset)
+        serializer = ContentUnitSerializer(page if page is not None else queryset, many=True)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
 
 
 class ContentUnitViewSet(viewsets.ReadOnlyModelViewSet):
@@ -43,7 +82,11 @@ class ContentUnitViewSet(viewsets.ReadOnlyModelViewSet):
         unit_type = self.request.query_params.get('type', None)
         
         if category:
-            queryset = queryset.filter(category__slug=category)
+            # Incluye las subcategorías: un filtro por prefijo de la ruta materializada
+            node = CategoryTree.find(category)
+            if node is None:
+                return queryset.none()
+            queryset = queryset.filter(category__tree_path__startswith=node['tree_path'])
         if difficulty:
             queryset = queryset.filter(difficulty_level=difficulty)
         if unit_type:
@@ -67,7 +110,9 @@ class UserContentProgressViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return UserContentProgress.objects.filter(user=self.request.user)
+        return UserContentProgress.objects.filter(
+            user=self.request.user
+        ).select_related('content_unit').prefetch_related('lesson_completions')
 
 
 class CategoryDetailView(generics.RetrieveAPIView):
@@ -75,6 +120,12 @@ class CategoryDetailView(generics.RetrieveAPIView):
     queryset = ContentCategory.objects.filter(is_active=True)
     serializer_class = ContentCategorySerializer
     lookup_field = 'slug'
+    
+    def retrieve(self, request, *args, **kwargs):
+        category = CategoryTree.find(kwargs[self.lookup_field])
+        if category is None:
+            raise NotFound()
+        return Response(category)
 
 
 class ContentUnitDetailView(generics.RetrieveAPIView):
@@ -149,21 +200,15 @@ class CompleteLessonView(generics.UpdateAPIView):
             defaults={'status': 'IN_PROGRESS'}
         )
         
-        # Actualizar progreso de la lección
+        # Registrar la lección (fila propia) e incrementar el avance atómicamente
         lesson_data = request.data
-        lesson_id = str(lesson.id)
-        
-        if lesson_id not in progress.lesson_progress:
-            progress.lesson_progress[lesson_id] = {}
-        
-        progress.lesson_progress[lesson_id].update({
-            'completed': True,
-            'completed_at': timezone.now().isoformat(),
-            'score': lesson_data.get('score', 100),
-            'time_seconds': lesson_data.get('time_seconds', 0)
-        })
-        
-        progress.update_progress()
+        with ExperienceLedger.batch():
+            progress = LessonProgressStore.complete_lesson(
+                progress,
+                lesson,
+                score=lesson_data.get('score', 100),
+                time_seconds=lesson_data.get('time_seconds', 0)
+            )
         
         serializer = UserContentProgressSerializer(progress)
         return Response(serializer.data)
@@ -193,20 +238,32 @@ class RecommendedContentView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
+        from apps.learning.collaborative import ItemSimilarityStore
+        
         user = self.request.user
         
-        # Lógica simple de recomendación
-        # TODO: Implementar IA para recomendaciones más sofisticadas
-        completed_units = UserContentProgress.objects.filter(
-            user=user, 
-            is_completed=True
+        # Filtrado colaborativo item-item (job offline build_item_similarities)
+        unit_ids = ItemSimilarityStore.recommend_content(user, limit=10)
+        units_by_id = ContentUnit.objects.in_bulk(unit_ids)
+        recommended = [units_by_id[unit_id] for unit_id in unit_ids if unit_id in units_by_id]
+        
+        if len(recommended) >= 10:
+            return recommended
+        
+        # Completar con contenido popular que el usuario no ha iniciado
+        started_units = UserContentProgress.objects.filter(
+            user=user
         ).values_list('content_unit_id', flat=True)
         
-        return ContentUnit.objects.filter(
+        fallback = ContentUnit.objects.filter(
             is_active=True
         ).exclude(
-            id__in=completed_units
-        ).order_by('?')[:10]  # 10 recomendaciones aleatorias
+            id__in=started_units
+        ).exclude(
+            id__in=unit_ids
+        ).order_by('-total_completions', '-average_rating')[:10 - len(recommended)]
+        
+        return recommended + list(fallback)
 
 
 class RateContentUnitView(generics.CreateAPIView):
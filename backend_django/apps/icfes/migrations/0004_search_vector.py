@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # GIN solo existe en PostgreSQL; en otros motores la columna queda sin índice
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS "preguntas_icfes_search" ON "preguntas_icfes" USING gin ("search_vector")'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute('DROP INDEX IF EXISTS "preguntas_icfes_search"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("icfes", "0003_areaevaluacion_areatematica_competenciaicfes_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="preguntaicfes",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="preguntaicfes",
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="preguntas_icfes_search"
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
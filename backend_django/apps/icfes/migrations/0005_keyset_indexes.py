@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("icfes", "0004_search_vector"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="respuestausuarioicfes",
+            name="respuestas__user_id_b64d6f_idx",
+        ),
+        migrations.AddIndex(
+            model_name="respuestausuarioicfes",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="respuestas_user_keyset"
+            ),
+        ),
+    ]
@@ -7,6 +7,8 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 import uuid
 
 User = get_user_model()
@@ -304,6 +306,9 @@ class PreguntaICFES(models.Model):
     veces_correcta = models.IntegerField(default=0)
     tiempo_promedio_respuesta = models.FloatField(default=0.0)
     
+    # Búsqueda de texto completo (apps.learning.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     # Timestamps
     fecha_aplicacion = models.DateField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -317,6 +322,7 @@ class PreguntaICFES(models.Model):
             models.Index(fields=['competencia']),
             models.Index(fields=['activa', 'verificada']),
             models.Index(fields=['grado_escolar']),
+            GinIndex(fields=['search_vector'], name='preguntas_icfes_search'),
         ]
         verbose_name = 'Pregunta ICFES'
         verbose_name_plural = 'Preguntas ICFES'
@@ -568,7 +574,7 @@ class RespuestaUsuarioICFES(models.Model):
         db_table = 'respuestas_usuarios_icfes'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['user', '-created_at', '-id'], name='respuestas_user_keyset'),
             models.Index(fields=['pregunta']),
             models.Index(fields=['session_id']),
             models.Index(fields=['tipo_evaluacion']),
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     start_quiz_session, get_current_question, 
-    submit_icfes_answer, get_quiz_feedback
+    submit_icfes_answer, get_quiz_feedback, get_answer_history
 )
 
 app_name = 'icfes'
@@ -18,6 +18,7 @@ urlpatterns = [
     path('quiz/session/<uuid:session_id>/submit-answer-simple', submit_icfes_answer, name='submit_answer_simple'),
     path('quiz/session/<uuid:session_id>/submit-icfes-answer', submit_icfes_answer, name='submit_icfes_answer'),
     path('quiz/session/<uuid:session_id>/feedback', get_quiz_feedback, name='get_quiz_feedback'),
+    path('quiz/history', get_answer_history, name='get_answer_history'),
     
     # Router URLs
     # path('', include(router.urls)),  # <--- COMENTADO para evitar conflicto
@@ -19,6 +19,7 @@ import json
 # Importar los modelos correctos que tienen datos
 from .models_nuevo import PreguntaICFES, OpcionRespuesta, AreaTematica, RespuestaUsuarioICFES
 from .models import UserICFESSession, ICFESExam
+from apps.learning.pagination import KeysetPagination
 
 
 @api_view(['POST'])
@@ -529,4 +530,54 @@ def get_quiz_feedback(request, session_id):
         return Response({
             'success': False,
             'message': error_message
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
+
+class AnswerHistoryPagination(KeysetPagination):
+    """Historial de respuestas, de la más reciente a la más antigua"""
+    page_size = 30
+    ordering = ('-created_at', '-id')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_answer_history(request):
+    """
+    Historial de respuestas del usuario con paginación por cursor
+    Filtros opcionales: ?area=<codigo>&tipo_evaluacion=<tipo>
+    """
+    respuestas = RespuestaUsuarioICFES.objects.filter(
+        user=request.user
+    ).select_related('pregunta__area_evaluacion').only(
+        'id', 'created_at', 'opcion_seleccionada', 'es_correcta',
+        'tiempo_respuesta_segundos', 'tipo_evaluacion', 'session_id', 'xp_ganado',
+        'pregunta__id', 'pregunta__uuid', 'pregunta__nivel_dificultad',
+        'pregunta__area_evaluacion__codigo', 'pregunta__area_evaluacion__nombre',
+    )
+
+    area = request.query_params.get('area')
+    if area:
+        respuestas = respuestas.filter(pregunta__area_evaluacion__codigo=area.upper())
+    tipo_evaluacion = request.query_params.get('tipo_evaluacion')
+    if tipo_evaluacion:
+        respuestas = respuestas.filter(tipo_evaluacion=tipo_evaluacion.upper())
+
+    paginator = AnswerHistoryPagination()
+    page = paginator.paginate_queryset(respuestas, request)
+
+    data = [{
+        'id': respuesta.id,
+        'pregunta_id': respuesta.pregunta.id,
+        'pregunta_uuid': str(respuesta.pregunta.uuid),
+        'area': respuesta.pregunta.area_evaluacion.codigo,
+        'area_nombre': respuesta.pregunta.area_evaluacion.nombre,
+        'nivel_dificultad': respuesta.pregunta.nivel_dificultad,
+        'respuesta_usuario': respuesta.opcion_seleccionada,
+        'es_correcta': respuesta.es_correcta,
+        'tiempo_respuesta': respuesta.tiempo_respuesta_segundos,
+        'tipo_evaluacion': respuesta.tipo_evaluacion,
+        'session_id': respuesta.session_id,
+        'xp_ganado': respuesta.xp_ganado,
+        'created_at': respuesta.created_at.isoformat(),
+    } for respuesta in page]
+
+    return paginator.get_paginated_response(data)
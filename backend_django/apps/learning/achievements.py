@@ -0,0 +1,257 @@
+"""
+Motor de logros para Learning Paths
+
+Compila los criterios de PathAchievement en predicados indexados por la
+métrica que puede hacerlos cambiar. En cada save solo se evalúan las reglas
+afectadas por los campos que realmente cambiaron, contra un snapshot en
+memoria de la inscripción.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import CacheTimeouts
+from .dashboard import DashboardSnapshot
+
+
+RULES_CACHE_KEY = "achievement_rules_{path_id}"
+
+# Métricas del snapshot que puede modificar cada campo de la inscripción
+ENROLLMENT_FIELD_TRIGGERS = {
+    'progress_percentage': ('progress_percentage',),
+    'status': ('is_completed',),
+    'total_time_minutes': ('total_time_minutes',),
+    'average_score': ('average_score',),
+    'current_streak_days': ('current_streak_days',),
+}
+
+# Métricas de las que depende cada tipo de logro
+ACHIEVEMENT_TRIGGERS = {
+    'COMPLETION': ('progress_percentage',),
+    'SPEED': ('is_completed', 'total_time_minutes'),
+    'ACCURACY': ('is_completed', 'average_score'),
+    'STREAK': ('current_streak_days',),
+    'PERFECT': ('perfect_lessons',),
+}
+
+ALL_TRIGGERS = frozenset(
+    trigger for triggers in ACHIEVEMENT_TRIGGERS.values() for trigger in triggers
+)
+
+
+def _compile_predicate(achievement_type, criteria):
+    """Convierte los criterios JSON de un logro en un predicado sobre el snapshot"""
+    if achievement_type == 'COMPLETION':
+        threshold = criteria.get('completion_percentage', 100)
+        return lambda m: m['progress_percentage'] >= threshold
+
+    if achievement_type == 'SPEED':
+        max_minutes = criteria.get('max_time_hours', 0) * 60
+        return lambda m: m['is_completed'] and m['total_time_minutes'] <= max_minutes
+
+    if achievement_type == 'ACCURACY':
+        min_accuracy = criteria.get('min_accuracy', 90)
+        return lambda m: m['is_completed'] and m['average_score'] >= min_accuracy
+
+    if achievement_type == 'STREAK':
+        min_streak = criteria.get('min_streak_days', 7)
+        return lambda m: m['current_streak_days'] >= min_streak
+
+    if achievement_type == 'PERFECT':
+        min_perfect = criteria.get('min_perfect_lessons', 5)
+        return lambda m: m['perfect_lessons'] >= min_perfect
+
+    return None
+
+
+class CompiledRule:
+    """Logro compilado: predicado listo para evaluar y métricas que lo disparan"""
+
+    __slots__ = ('achievement_id', 'xp_reward', 'triggers', 'predicate')
+
+    def __init__(self, achievement_id, xp_reward, triggers, predicate):
+        self.achievement_id = achievement_id
+        self.xp_reward = xp_reward
+        self.triggers = triggers
+        self.predicate = predicate
+
+
+class RuleIndex:
+    """Reglas activas de una ruta indexadas por métrica disparadora"""
+
+    def __init__(self, specs):
+        self.by_trigger = {}
+
+        for spec in specs:
+            predicate = _compile_predicate(spec['type'], spec['criteria'])
+            if predicate is None:
+                continue
+
+            triggers = ACHIEVEMENT_TRIGGERS[spec['type']]
+            rule = CompiledRule(spec['id'], spec['xp_reward'], triggers, predicate)
+            for trigger in triggers:
+                self.by_trigger.setdefault(trigger, []).append(rule)
+
+    def rules_for(self, triggers):
+        """Reglas afectadas por las métricas dadas, sin duplicados"""
+        selected = {}
+        for trigger in triggers:
+            for rule in self.by_trigger.get(trigger, ()):
+                selected[rule.achievement_id] = rule
+        return list(selected.values())
+
+    @property
+    def needs_perfect_count(self):
+        return 'perfect_lessons' in self.by_trigger
+
+
+class AchievementEngine:
+    """
+    Evalúa y otorga logros de rutas de aprendizaje
+    """
+
+    @staticmethod
+    def get_rule_index(path_id):
+        """Obtiene el índice de reglas de la ruta (specs cacheadas, predicados en memoria)"""
+        from .models import PathAchievement
+
+        cache_key = RULES_CACHE_KEY.format(path_id=path_id)
+        specs = cache.get(cache_key)
+
+        if specs is None:
+            specs = [
+                {
+                    'id': achievement['id'],
+                    'type': achievement['achievement_type'],
+                    'criteria': achievement['criteria'] or {},
+                    'xp_reward': achievement['xp_reward'],
+                }
+                for achievement in PathAchievement.objects.filter(
+                    learning_path_id=path_id,
+                    is_active=True
+                ).values('id', 'achievement_type', 'criteria', 'xp_reward')
+            ]
+            cache.set(cache_key, specs, CacheTimeouts.DAY)
+
+        return RuleIndex(specs)
+
+    @staticmethod
+    def invalidate_rules(path_id):
+        """Invalida las reglas compiladas de una ruta"""
+        if path_id:
+            cache.delete(RULES_CACHE_KEY.format(path_id=path_id))
+
+    @staticmethod
+    def triggers_for_enrollment(changed_fields):
+        """Métricas afectadas por los campos modificados de una inscripción"""
+        if changed_fields is None:
+            return ALL_TRIGGERS
+
+        triggers = set()
+        for field_name in changed_fields:
+            triggers.update(ENROLLMENT_FIELD_TRIGGERS.get(field_name, ()))
+        return triggers
+
+    @staticmethod
+    def triggers_for_lesson(lesson_progress, changed_fields):
+        """Métricas afectadas por un cambio en el progreso de una lección"""
+        status_changed = changed_fields is None or 'status' in changed_fields
+        if status_changed and lesson_progress.status == 'PERFECT':
+            return {'perfect_lessons'}
+        return set()
+
+    @staticmethod
+    def build_snapshot(enrollment, include_perfect=False):
+        """Snapshot en memoria de las métricas de la inscripción"""
+        from .models import UserLessonProgress
+
+        snapshot = {
+            'progress_percentage': enrollment.progress_percentage,
+            'is_completed': enrollment.is_completed,
+            'total_time_minutes': enrollment.total_time_minutes,
+            'average_score': enrollment.average_score,
+            'current_streak_days': enrollment.current_streak_days,
+            'perfect_lessons': 0,
+        }
+
+        if include_perfect:
+            snapshot['perfect_lessons'] = UserLessonProgress.objects.filter(
+                enrollment=enrollment,
+                status='PERFECT'
+            ).count()
+
+        return snapshot
+
+    @staticmethod
+    def _earned_ids(user_id, rules):
+        from .models import UserPathAchievement
+
+        return set(
+            UserPathAchievement.objects.filter(
+                user_id=user_id,
+                achievement_id__in=[rule.achievement_id for rule in rules]
+            ).values_list('achievement_id', flat=True)
+        )
+
+    @classmethod
+    def evaluate(cls, enrollment, triggers):
+        """
+        Evalúa las reglas afectadas por los triggers y otorga los logros cumplidos.
+        Retorna la lista de UserPathAchievement creados.
+        """
+        from .models import UserPathAchievement, UserPathEnrollment
+
+        if not triggers:
+            return []
+
+        rules = cls.get_rule_index(enrollment.learning_path_id).rules_for(triggers)
+        if not rules:
+            return []
+
+        user_id = enrollment.user_id
+        earned_ids = cls._earned_ids(user_id, rules)
+        pending = [rule for rule in rules if rule.achievement_id not in earned_ids]
+        if not pending:
+            return []
+
+        needs_perfect = any('perfect_lessons' in rule.triggers for rule in pending)
+        snapshot = cls.build_snapshot(enrollment, include_perfect=needs_perfect)
+
+        unlocked = [rule for rule in pending if rule.predicate(snapshot)]
+        if not unlocked:
+            return []
+
+        with transaction.atomic():
+            # Evaluaciones concurrentes de la misma inscripción se serializan en
+            # este lock; lo otorgado mientras tanto no vuelve a sumar XP
+            list(UserPathEnrollment.objects.select_for_update().filter(pk=enrollment.pk).values_list('pk'))
+            earned_ids = cls._earned_ids(user_id, unlocked)
+            unlocked = [rule for rule in unlocked if rule.achievement_id not in earned_ids]
+            if not unlocked:
+                return []
+
+            awarded = UserPathAchievement.objects.bulk_create(
+                [
+                    UserPathAchievement(
+                        user_id=user_id,
+                        achievement_id=rule.achievement_id,
+                        enrollment=enrollment,
+                        progress_when_earned=enrollment.progress_percentage,
+                        xp_earned=rule.xp_reward
+                    )
+                    for rule in unlocked
+                ],
+                ignore_conflicts=True
+            )
+            # bulk_create no dispara post_save
+            DashboardSnapshot.invalidate(user_id, 'achievement')
+
+            # Un solo save del usuario por todos los logros otorgados
+            total_xp = sum(rule.xp_reward for rule in unlocked)
+            if total_xp:
+                enrollment.user.add_experience(
+                    total_xp, learning_path_id=enrollment.learning_path_id,
+                    source='ACHIEVEMENT', reference=f'enrollment:{enrollment.pk}'
+                )
+
+        return awarded
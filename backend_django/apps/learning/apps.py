@@ -12,4 +12,6 @@ class LearningConfig(AppConfig):
     
     def ready(self):
         """Importar signals cuando la app esté lista"""
-        import apps.learning.signals 
\ No newline at end of file
+        import apps.learning.signals
+        from .sampling import connect_signals as connect_sampling_signals
+        connect_sampling_signals() 
\ No newline at end of file
@@ -0,0 +1,539 @@
+"""
+Motor de batallas contra el jefe de una ruta
+
+El estado de cada batalla vive en un hash de Redis (preguntas, respuestas,
+deadline) y la clave de respuestas en un hash aparte, para que leer el
+estado nunca exponga las respuestas correctas. Calificar una respuesta
+cuesta O(1): HMGET del estado, HGET de la clave y un script Lua que graba
+la respuesta con HSETNX (impide responder dos veces) solo si la batalla no
+se está cerrando. Los deadlines están en un sorted
+set que el job expire_boss_battles barre cada minuto. La base de datos solo
+se toca al terminar: resultado y XP en una transacción. Fuera de los tests
+Redis es obligatorio; los tests usan un backend en proceso.
+"""
+
+import json
+import threading
+import time
+import uuid as uuid_lib
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F
+
+from .cache import CacheKeys, CacheTimeouts, require_redis_client
+
+
+QUESTION_COUNT = 10
+MIN_DIFFICULTY = 4
+TIME_LIMIT_MINUTES = 45
+XP_MULTIPLIER = 2           # Las batallas otorgan doble XP
+VICTORY_THRESHOLD = 70.0    # Porcentaje de aciertos para vencer al jefe
+MIN_PROGRESS = 70.0         # Progreso mínimo en la ruta para enfrentarlo
+
+# Tolerancia a la latencia de red al comparar con el deadline
+DEADLINE_GRACE_SECONDS = 5
+
+VALID_CHOICES = ('A', 'B', 'C', 'D')
+
+# Campos del hash de estado que no son respuestas
+ANSWER_PREFIX = 'answer:'
+FINALIZING_FIELD = 'finalizing'
+
+# Un cierre que no terminó en este tiempo (proceso caído) se puede reintentar
+CLAIM_TIMEOUT_SECONDS = 60
+
+# record_answer: la batalla ya se está cerrando (o expiró) y no acepta respuestas
+BATTLE_CLOSED = -1
+
+# "No se está cerrando" + HSETNX + HINCRBY en un solo paso: una respuesta
+# nunca se graba después de que finish() reclamó y leyó el estado
+RECORD_ANSWER_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 or redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then
+    return -1
+end
+if redis.call('HSETNX', KEYS[1], ARGV[2], ARGV[3]) == 0 then
+    return 0
+end
+return redis.call('HINCRBY', KEYS[1], 'answered', 1)
+"""
+
+
+class BattleError(Exception):
+    """
+    Error de una acción de batalla. `code` indica el tipo:
+    no_questions, not_found, finished, expired, invalid, already_answered
+    """
+
+    def __init__(self, code, message, result=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.result = result
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(float(timestamp), tz=dt_timezone.utc)
+
+
+class RedisBattleBackend:
+    """Hashes de estado y clave + sorted set de deadlines en Redis"""
+
+    def __init__(self, client):
+        self.client = client
+        self._record_answer = client.register_script(RECORD_ANSWER_SCRIPT)
+
+    @staticmethod
+    def _decode(value):
+        return value.decode() if isinstance(value, bytes) else value
+
+    def create(self, battle_id, state, answer_key, deadline, ttl):
+        state_key = CacheKeys.BATTLE_STATE.format(battle_id=battle_id)
+        answer_key_key = CacheKeys.BATTLE_ANSWER_KEY.format(battle_id=battle_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(state_key, mapping=state)
+        pipe.expire(state_key, ttl)
+        pipe.hset(answer_key_key, mapping=answer_key)
+        pipe.expire(answer_key_key, ttl)
+        pipe.zadd(CacheKeys.BATTLE_DEADLINES, {battle_id: deadline})
+        pipe.execute()
+
+    def get_fields(self, battle_id, fields):
+        values = self.client.hmget(CacheKeys.BATTLE_STATE.format(battle_id=battle_id), fields)
+        return dict(zip(fields, (self._decode(value) for value in values)))
+
+    def correct_choice(self, battle_id, index):
+        return self._decode(
+            self.client.hget(CacheKeys.BATTLE_ANSWER_KEY.format(battle_id=battle_id), index)
+        )
+
+    def record_answer(self, battle_id, index, payload):
+        """
+        Guarda la respuesta si es la primera y la batalla sigue abierta;
+        retorna el total respondido, None si ya estaba o BATTLE_CLOSED
+        """
+        answered = self._record_answer(
+            keys=[CacheKeys.BATTLE_STATE.format(battle_id=battle_id)],
+            args=[FINALIZING_FIELD, f"{ANSWER_PREFIX}{index}", payload]
+        )
+        if answered == 0:
+            return None
+        return BATTLE_CLOSED if answered == BATTLE_CLOSED else answered
+
+    def claim(self, battle_id, now):
+        """Solo un proceso puede cerrar la batalla (HSETNX con la hora del cierre)"""
+        return bool(self.client.hsetnx(
+            CacheKeys.BATTLE_STATE.format(battle_id=battle_id), FINALIZING_FIELD, now
+        ))
+
+    def release(self, battle_id):
+        self.client.hdel(CacheKeys.BATTLE_STATE.format(battle_id=battle_id), FINALIZING_FIELD)
+
+    def load(self, battle_id):
+        state = self.client.hgetall(CacheKeys.BATTLE_STATE.format(battle_id=battle_id))
+        return {self._decode(field): self._decode(value) for field, value in state.items()}
+
+    def due(self, now, limit):
+        return [
+            self._decode(battle_id)
+            for battle_id in self.client.zrangebyscore(
+                CacheKeys.BATTLE_DEADLINES, '-inf', now, start=0, num=limit
+            )
+        ]
+
+    def discard(self, battle_id):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(
+            CacheKeys.BATTLE_STATE.format(battle_id=battle_id),
+            CacheKeys.BATTLE_ANSWER_KEY.format(battle_id=battle_id)
+        )
+        pipe.zrem(CacheKeys.BATTLE_DEADLINES, battle_id)
+        pipe.execute()
+
+
+class LocalBattleBackend:
+    """
+    Mismo modelo en memoria del proceso (tests). El estado y la clave expiran
+    tras `ttl` como los hashes de Redis; el deadline queda hasta discard().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = {}
+        self._answer_keys = {}
+        self._expires = {}
+        self._deadlines = {}
+
+    def _drop_expired(self, battle_id, now):
+        if self._expires.get(battle_id, now) < now:
+            self._states.pop(battle_id, None)
+            self._answer_keys.pop(battle_id, None)
+            self._expires.pop(battle_id, None)
+
+    def _state(self, battle_id):
+        """Estado vigente de la batalla (requiere el lock)"""
+        self._drop_expired(battle_id, time.time())
+        return self._states.get(battle_id)
+
+    def create(self, battle_id, state, answer_key, deadline, ttl):
+        with self._lock:
+            self._states[battle_id] = {field: str(value) for field, value in state.items()}
+            self._answer_keys[battle_id] = {str(field): value for field, value in answer_key.items()}
+            self._expires[battle_id] = time.time() + ttl
+            self._deadlines[battle_id] = deadline
+
+    def get_fields(self, battle_id, fields):
+        with self._lock:
+            state = self._state(battle_id) or {}
+            return {field: state.get(field) for field in fields}
+
+    def correct_choice(self, battle_id, index):
+        with self._lock:
+            self._state(battle_id)
+            return self._answer_keys.get(battle_id, {}).get(str(index))
+
+    def record_answer(self, battle_id, index, payload):
+        field = f"{ANSWER_PREFIX}{index}"
+        with self._lock:
+            state = self._state(battle_id)
+            if state is None or FINALIZING_FIELD in state:
+                return BATTLE_CLOSED
+            if field in state:
+                return None
+            state[field] = payload
+            state['answered'] = str(int(state.get('answered', 0)) + 1)
+            return int(state['answered'])
+
+    def claim(self, battle_id, now):
+        with self._lock:
+            state = self._state(battle_id)
+            if state is None or FINALIZING_FIELD in state:
+                return False
+            state[FINALIZING_FIELD] = str(now)
+            return True
+
+    def release(self, battle_id):
+        with self._lock:
+            (self._state(battle_id) or {}).pop(FINALIZING_FIELD, None)
+
+    def load(self, battle_id):
+        with self._lock:
+            return dict(self._state(battle_id) or {})
+
+    def due(self, now, limit):
+        with self._lock:
+            current = time.time()
+            for battle_id in list(self._expires):
+                self._drop_expired(battle_id, current)
+            expired = sorted(
+                (deadline, battle_id)
+                for battle_id, deadline in self._deadlines.items() if deadline <= now
+            )
+        return [battle_id for _deadline, battle_id in expired[:limit]]
+
+    def discard(self, battle_id):
+        with self._lock:
+            self._states.pop(battle_id, None)
+            self._answer_keys.pop(battle_id, None)
+            self._expires.pop(battle_id, None)
+            self._deadlines.pop(battle_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+            self._answer_keys.clear()
+            self._expires.clear()
+            self._deadlines.clear()
+
+
+class BattleEngine:
+    """
+    Inicio, calificación, cierre y expiración de batallas contra el jefe
+    """
+
+    _local_backend = LocalBattleBackend()
+    _redis_backend = None
+
+    @classmethod
+    def get_backend(cls):
+        client = require_redis_client("El motor de batallas")
+        if client is None:
+            return cls._local_backend
+
+        if cls._redis_backend is None or cls._redis_backend.client is not client:
+            cls._redis_backend = RedisBattleBackend(client)
+        return cls._redis_backend
+
+    @classmethod
+    def reset_local(cls):
+        """Limpia el backend en proceso (tests)"""
+        cls._local_backend.clear()
+
+    @staticmethod
+    def select_questions(learning_path, count=QUESTION_COUNT):
+        """
+        Preguntas difíciles de las lecciones de la ruta (muestra aleatoria
+        del pool) con sus opciones: dos queries tras el muestreo
+        """
+        from apps.icfes.models_nuevo import PreguntaICFES, OpcionRespuesta
+        from .sampling import RandomSampler
+
+        candidates = PreguntaICFES.objects.filter(
+            learning_path_lessons__path_unit__learning_path=learning_path,
+            learning_path_lessons__is_active=True,
+            nivel_dificultad__gte=MIN_DIFFICULTY,
+            activa=True
+        ).distinct()
+        question_ids = RandomSampler.sample_ids(candidates, count)
+        if not question_ids:
+            return []
+
+        questions = PreguntaICFES.objects.in_bulk(question_ids)
+        options = {}
+        for option in OpcionRespuesta.objects.filter(
+            pregunta_id__in=question_ids, activa=True
+        ).order_by('pregunta_id', 'orden', 'letra_opcion'):
+            options.setdefault(option.pregunta_id, {})[option.letra_opcion] = option.texto_opcion
+
+        return [
+            {
+                'id': question.id,
+                'uuid': str(question.uuid),
+                'text': question.pregunta_texto,
+                'image_url': question.imagen_pregunta_url,
+                'difficulty': question.nivel_dificultad,
+                'options': options.get(question.id, {}),
+                'correct': question.respuesta_correcta,
+                'xp_reward': question.puntos_xp * XP_MULTIPLIER,
+            }
+            for question in (questions[question_id] for question_id in question_ids if question_id in questions)
+        ]
+
+    @classmethod
+    def start(cls, user, enrollment, time_limit_minutes=TIME_LIMIT_MINUTES, now=None):
+        """Crea la batalla en memoria y retorna lo que ve el cliente"""
+        learning_path = enrollment.learning_path
+        questions = cls.select_questions(learning_path)
+        if not questions:
+            raise BattleError('no_questions', "Esta ruta aún no tiene preguntas de jefe")
+
+        now = now if now is not None else time.time()
+        deadline = now + time_limit_minutes * 60
+        battle_id = str(uuid_lib.uuid4())
+
+        public_questions = [
+            {
+                'index': index,
+                'question_uuid': question['uuid'],
+                'question_text': question['text'],
+                'image_url': question['image_url'],
+                'difficulty': question['difficulty'],
+                'options': question['options'],
+                'xp_reward': question['xp_reward'],
+            }
+            for index, question in enumerate(questions)
+        ]
+        state = {
+            'user_id': user.id,
+            'path_id': learning_path.id,
+            'path_slug': learning_path.slug,
+            'enrollment_id': enrollment.id,
+            'started_at': now,
+            'deadline': deadline,
+            'total': len(questions),
+            'answered': 0,
+            'question_ids': json.dumps([question['id'] for question in questions]),
+            'rewards': json.dumps([question['xp_reward'] for question in questions]),
+            'questions': json.dumps(public_questions),
+        }
+        answer_key = {index: question['correct'] for index, question in enumerate(questions)}
+
+        cls.get_backend().create(battle_id, state, answer_key, deadline, CacheTimeouts.BATTLE_SESSION)
+
+        return {
+            'battle_id': battle_id,
+            'learning_path_slug': learning_path.slug,
+            'questions': public_questions,
+            'total_xp_possible': sum(question['xp_reward'] for question in questions),
+            'time_limit_minutes': time_limit_minutes,
+            'started_at': _to_datetime(now).isoformat(),
+            'deadline': _to_datetime(deadline).isoformat(),
+        }
+
+    @classmethod
+    def submit_answer(cls, battle_id, user_id, index, choice, now=None):
+        """
+        Califica una respuesta en O(1) sin tocar la base de datos. La última
+        respuesta cierra la batalla; una respuesta fuera de tiempo la cierra
+        como TIMEOUT y se rechaza.
+        """
+        backend = cls.get_backend()
+        now = now if now is not None else time.time()
+
+        fields = backend.get_fields(battle_id, ['user_id', 'deadline', 'total', 'started_at', FINALIZING_FIELD])
+        if fields['user_id'] is None or int(fields['user_id']) != user_id:
+            raise BattleError('not_found', "Batalla no encontrada")
+        if fields[FINALIZING_FIELD] is not None:
+            raise BattleError('finished', "La batalla ya terminó")
+
+        if now > float(fields['deadline']) + DEADLINE_GRACE_SECONDS:
+            result = cls.finish(battle_id, timed_out=True, now=now)
+            raise BattleError('expired', "Se acabó el tiempo de la batalla", result=result)
+
+        total = int(fields['total'])
+        choice = (choice or '').upper()
+        if not isinstance(index, int) or not 0 <= index < total or choice not in VALID_CHOICES:
+            raise BattleError('invalid', "Pregunta u opción inválida")
+
+        correct_choice = backend.correct_choice(battle_id, index)
+        payload = json.dumps({
+            'choice': choice,
+            'correct': choice == correct_choice,
+            'elapsed_seconds': round(now - float(fields['started_at']), 2),
+        })
+        answered = backend.record_answer(battle_id, index, payload)
+        if answered == BATTLE_CLOSED:
+            raise BattleError('finished', "La batalla ya terminó")
+        if answered is None:
+            raise BattleError('already_answered', "Esta pregunta ya fue respondida")
+
+        response = {
+            'question_index': index,
+            'correct': choice == correct_choice,
+            'correct_choice': correct_choice,
+            'answered': answered,
+            'remaining': total - answered,
+            'result': None,
+        }
+        if answered >= total:
+            response['result'] = cls.finish(battle_id, now=now)
+        return response
+
+    @staticmethod
+    def _summarize(state, timed_out):
+        total = int(state['total'])
+        question_ids = json.loads(state['question_ids'])
+        rewards = json.loads(state['rewards'])
+
+        answers = []
+        xp = 0
+        correct = 0
+        for index in range(total):
+            raw = state.get(f"{ANSWER_PREFIX}{index}")
+            if raw is None:
+                continue
+            answer = json.loads(raw)
+            answers.append({'question_id': question_ids[index], 'index': index, **answer})
+            if answer['correct']:
+                correct += 1
+                xp += rewards[index]
+
+        score = round(correct / total * 100, 2) if total else 0.0
+        if timed_out and len(answers) < total:
+            outcome = 'TIMEOUT'
+        elif score >= VICTORY_THRESHOLD:
+            outcome = 'VICTORY'
+        else:
+            outcome = 'DEFEAT'
+
+        return {
+            'outcome': outcome,
+            'total_questions': total,
+            'answered_questions': len(answers),
+            'correct_answers': correct,
+            'score_percentage': score,
+            'xp_awarded': xp,
+            'answers': answers,
+        }
+
+    @classmethod
+    def finish(cls, battle_id, timed_out=False, now=None):
+        """
+        Cierra la batalla una sola vez: persiste el resultado y otorga el XP
+        en una transacción. Retorna el resumen, o None si otro proceso ya la
+        está cerrando o no existe.
+        """
+        from django.contrib.auth import get_user_model
+        from .models import BossBattleResult, UserPathEnrollment
+
+        backend = cls.get_backend()
+        now = now if now is not None else time.time()
+        if not backend.claim(battle_id, now):
+            return None
+
+        state = backend.load(battle_id)
+        summary = cls._summarize(state, timed_out)
+
+        try:
+            with transaction.atomic():
+                BossBattleResult.objects.create(
+                    uuid=battle_id,
+                    user_id=int(state['user_id']),
+                    learning_path_id=int(state['path_id']),
+                    enrollment_id=int(state['enrollment_id']),
+                    started_at=_to_datetime(state['started_at']),
+                    finished_at=_to_datetime(min(now, float(state['deadline']) + DEADLINE_GRACE_SECONDS)),
+                    **summary
+                )
+                if summary['xp_awarded']:
+                    user = get_user_model().objects.get(pk=int(state['user_id']))
+                    user.add_experience(
+                        summary['xp_awarded'], learning_path_id=int(state['path_id']),
+                        source='BATTLE', reference=f'battle:{battle_id}'
+                    )
+                    UserPathEnrollment.objects.filter(pk=int(state['enrollment_id'])).update(
+                        total_xp_earned=F('total_xp_earned') + summary['xp_awarded']
+                    )
+                transaction.on_commit(lambda: backend.discard(battle_id))
+        except Exception:
+            # Sin resultado persistido: el barrido de expiración lo reintenta
+            backend.release(battle_id)
+            raise
+
+        return {'battle_id': battle_id, **summary}
+
+    @classmethod
+    def state(cls, battle_id, user_id, now=None):
+        """Estado visible para el jugador (sin la clave de respuestas)"""
+        state = cls.get_backend().load(battle_id)
+        if not state or int(state['user_id']) != user_id:
+            raise BattleError('not_found', "Batalla no encontrada")
+
+        now = now if now is not None else time.time()
+        answered = {
+            int(field[len(ANSWER_PREFIX):]): json.loads(value)
+            for field, value in state.items() if field.startswith(ANSWER_PREFIX)
+        }
+        return {
+            'battle_id': battle_id,
+            'learning_path_slug': state['path_slug'],
+            'questions': json.loads(state['questions']),
+            'answers': {index: answer['choice'] for index, answer in sorted(answered.items())},
+            'correct_answers': sum(1 for answer in answered.values() if answer['correct']),
+            'remaining_seconds': max(0, int(float(state['deadline']) - now)),
+            'finished': FINALIZING_FIELD in state,
+        }
+
+    @classmethod
+    def expire_due(cls, now=None, limit=500):
+        """Cierra como TIMEOUT las batallas vencidas; retorna cuántas cerró"""
+        from .models import BossBattleResult
+
+        backend = cls.get_backend()
+        now = now if now is not None else time.time()
+        closed = 0
+        for battle_id in backend.due(now - DEADLINE_GRACE_SECONDS, limit):
+            state = backend.load(battle_id)
+            if not state:
+                backend.discard(battle_id)  # El hash expiró antes que el deadline
+                continue
+            if BossBattleResult.objects.filter(uuid=battle_id).exists():
+                backend.discard(battle_id)  # Ya persistida; faltó limpiar
+                continue
+            if FINALIZING_FIELD in state:
+                if float(state[FINALIZING_FIELD]) > now - CLAIM_TIMEOUT_SECONDS:
+                    continue  # Otro proceso la está cerrando
+                backend.release(battle_id)
+            if cls.finish(battle_id, timed_out=True, now=now) is not None:
+                closed += 1
+        return closed
@@ -0,0 +1,240 @@
+"""
+Generación de simulacros a partir de un blueprint área × dificultad
+
+Un índice precargado agrupa los IDs de las preguntas activas y verificadas
+por (área, nivel de dificultad). Las cuotas del blueprint se reparten con
+el método del mayor residuo para obtener conteos exactos, y cada celda se
+muestrea sin reemplazo: como las celdas son disjuntas, un simulacro nunca
+repite preguntas.
+"""
+
+import numpy as np
+from django.core.cache import cache
+
+from .cache import CacheTimeouts
+from .sampling import RandomSampler
+
+
+INDEX_KEY = "question_blueprint_index_{version}"
+
+# Bandas disjuntas de nivel_dificultad (1-5)
+DIFFICULTY_BANDS = {
+    'easy': (1, 2),
+    'medium': (3,),
+    'hard': (4, 5),
+}
+
+DEFAULT_DIFFICULTY_WEIGHTS = {'easy': 30, 'medium': 50, 'hard': 20}
+
+# Campos de ICFESExam con la cantidad de preguntas de cada área
+EXAM_AREA_FIELDS = {
+    'MATEMATICAS': 'mathematics_questions',
+    'LECTURA_CRITICA': 'reading_questions',
+    'CIENCIAS_NATURALES': 'natural_sciences_questions',
+    'CIENCIAS_SOCIALES': 'social_studies_questions',
+    'INGLES': 'english_questions',
+}
+
+# Pesos por defecto: composición del examen ICFES completo
+DEFAULT_AREA_WEIGHTS = {
+    'MATEMATICAS': 42,
+    'LECTURA_CRITICA': 42,
+    'CIENCIAS_NATURALES': 28,
+    'CIENCIAS_SOCIALES': 30,
+    'INGLES': 16,
+}
+
+MAX_QUESTIONS = 500
+
+
+class BlueprintError(ValueError):
+    """El blueprint es inválido o el banco no tiene preguntas suficientes"""
+
+
+def allocate(total, weights):
+    """
+    Reparte `total` en enteros proporcionales a `weights` (dict) con el
+    método del mayor residuo; la suma es exactamente `total`
+    """
+    positive = {key: float(weight) for key, weight in weights.items() if weight and weight > 0}
+    weight_sum = sum(positive.values())
+    if total <= 0 or weight_sum <= 0:
+        return {key: 0 for key in weights}
+
+    quotas = {key: total * weight / weight_sum for key, weight in positive.items()}
+    counts = {key: int(quota) for key, quota in quotas.items()}
+
+    remaining = total - sum(counts.values())
+    by_remainder = sorted(quotas, key=lambda key: quotas[key] - counts[key], reverse=True)
+    for key in by_remainder[:remaining]:
+        counts[key] += 1
+
+    return {key: counts.get(key, 0) for key in weights}
+
+
+class QuestionIndex:
+    """IDs de preguntas agrupados por (código de área, nivel de dificultad)"""
+
+    def __init__(self, cells):
+        self.cells = cells
+        self.areas = sorted({area for area, _level in cells})
+
+    def band_ids(self, area, band):
+        arrays = [self.cells.get((area, level)) for level in DIFFICULTY_BANDS[band]]
+        arrays = [array for array in arrays if array is not None]
+        if not arrays:
+            return np.array([], dtype=np.int64)
+        return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+    def band_size(self, area, band):
+        return sum(len(self.cells.get((area, level), ())) for level in DIFFICULTY_BANDS[band])
+
+    @classmethod
+    def build(cls):
+        """Una query sobre el banco activo y verificado"""
+        from apps.icfes.models import PreguntaICFES
+
+        grouped = {}
+        for question_id, area, level in PreguntaICFES.objects.filter(
+            activa=True,
+            verificada=True
+        ).values_list('id', 'area_evaluacion__codigo', 'nivel_dificultad').iterator(chunk_size=5000):
+            grouped.setdefault((area.upper(), level), []).append(question_id)
+
+        return cls({
+            cell: np.array(ids, dtype=np.int64)
+            for cell, ids in grouped.items()
+        })
+
+
+class QuestionBlueprint:
+    """
+    Cuotas de un simulacro: preguntas por área y pesos por banda de dificultad
+    """
+
+    def __init__(self, area_counts, difficulty_weights=None):
+        difficulty_weights = difficulty_weights or DEFAULT_DIFFICULTY_WEIGHTS
+
+        unknown = set(difficulty_weights) - set(DIFFICULTY_BANDS)
+        if unknown:
+            raise BlueprintError(f"Bandas de dificultad desconocidas: {', '.join(sorted(unknown))}")
+        if any(not isinstance(weight, (int, float)) or weight < 0 for weight in difficulty_weights.values()):
+            raise BlueprintError("Los pesos de dificultad deben ser números no negativos")
+        if not sum(difficulty_weights.values()):
+            raise BlueprintError("La distribución de dificultad no puede ser vacía")
+
+        self.area_counts = {area.upper(): int(count) for area, count in area_counts.items() if count}
+        self.difficulty_weights = dict(difficulty_weights)
+
+        if not 0 < self.total <= MAX_QUESTIONS:
+            raise BlueprintError(f"El simulacro debe tener entre 1 y {MAX_QUESTIONS} preguntas")
+
+    @property
+    def total(self):
+        return sum(self.area_counts.values())
+
+    @classmethod
+    def from_exam(cls, exam, difficulty_weights=None):
+        """Cantidades por área de un ICFESExam"""
+        return cls(
+            {area: getattr(exam, field_name) for area, field_name in EXAM_AREA_FIELDS.items()},
+            difficulty_weights
+        )
+
+    @classmethod
+    def from_distribution(cls, num_questions, areas_distribution, difficulty_weights=None):
+        """`num_questions` repartidas proporcionalmente a los pesos por área"""
+        try:
+            num_questions = int(num_questions)
+            weights = {str(area).upper(): float(weight) for area, weight in areas_distribution.items()}
+        except (TypeError, ValueError, AttributeError):
+            raise BlueprintError("num_questions y areas_distribution deben ser numéricos")
+
+        return cls(allocate(num_questions, weights), difficulty_weights)
+
+
+class BlueprintSampler:
+    """
+    Resuelve blueprints contra el índice precargado del banco de preguntas
+    """
+
+    _loaded = None
+
+    @classmethod
+    def get_index(cls):
+        """Índice vigente: memoria del proceso, caché o reconstrucción"""
+        from apps.icfes.models import PreguntaICFES
+
+        version = RandomSampler.version(PreguntaICFES)
+        if cls._loaded is not None and cls._loaded[0] == version:
+            return cls._loaded[1]
+
+        key = INDEX_KEY.format(version=version)
+        index = cache.get(key)
+        if index is None:
+            index = QuestionIndex.build()
+            cache.set(key, index, CacheTimeouts.HOUR)
+
+        cls._loaded = (version, index)
+        return index
+
+    @classmethod
+    def default_area_weights(cls):
+        """Composición del examen completo, restringida a las áreas con preguntas"""
+        index = cls.get_index()
+        return {
+            area: weight for area, weight in DEFAULT_AREA_WEIGHTS.items()
+            if area in index.areas
+        }
+
+    @staticmethod
+    def _band_counts(index, area, count, difficulty_weights):
+        """
+        Conteos por banda para un área. Si una banda no alcanza, el faltante
+        se toma de las bandas más cercanas del mismo área.
+        """
+        bands = list(DIFFICULTY_BANDS)
+        quotas = allocate(count, {band: difficulty_weights.get(band, 0) for band in bands})
+        capacity = {band: index.band_size(area, band) for band in bands}
+
+        counts = {band: min(quotas[band], capacity[band]) for band in bands}
+        for position, band in enumerate(bands):
+            missing = quotas[band] - counts[band]
+            neighbours = sorted(
+                (other for other in bands if other != band),
+                key=lambda other: abs(bands.index(other) - position)
+            )
+            for other in neighbours:
+                if missing <= 0:
+                    break
+                extra = min(missing, capacity[other] - counts[other])
+                counts[other] += extra
+                missing -= extra
+
+        if sum(counts.values()) < count:
+            raise BlueprintError(
+                f"El banco solo tiene {sum(capacity.values())} preguntas de {area} "
+                f"y el simulacro requiere {count}"
+            )
+        return counts
+
+    @classmethod
+    def sample(cls, blueprint, rng=None):
+        """
+        IDs del simulacro agrupados por área: [(question_id, área, banda)].
+        Exactamente blueprint.total preguntas, sin duplicados.
+        """
+        rng = rng or np.random.default_rng()
+        index = cls.get_index()
+
+        selected = []
+        for area, count in blueprint.area_counts.items():
+            band_counts = cls._band_counts(index, area, count, blueprint.difficulty_weights)
+            for band, band_count in band_counts.items():
+                if not band_count:
+                    continue
+                ids = index.band_ids(area, band)
+                picked = ids[rng.choice(len(ids), size=band_count, replace=False)]
+                selected.extend((int(question_id), area, band) for question_id in picked)
+
+        return selected
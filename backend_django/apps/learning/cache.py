@@ -4,14 +4,74 @@ Utilidades de caché Redis para Learning Paths
 
 from django.core.cache import cache
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
 from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
+from importlib import import_module
 import hashlib
 import json
+import logging
 import pickle
+import time
 from typing import Any, Optional, Callable
 
 
+logger = logging.getLogger(__name__)
+
+
+_redis_client = None
+
+
+def get_redis_client():
+    """
+    Cliente Redis compartido cuando el backend de caché por defecto es Redis
+    (settings.CACHES apunta a REDIS_URL fuera de los tests). Retorna None con
+    cualquier otro backend (LocMem en tests), para que los servicios usen su
+    implementación en proceso.
+    """
+    global _redis_client
+    
+    cache_config = settings.CACHES.get('default', {})
+    if 'redis' not in cache_config.get('BACKEND', '').lower():
+        return None
+    
+    if _redis_client is None:
+        import redis
+        
+        location = cache_config.get('LOCATION') or settings.REDIS_URL
+        if isinstance(location, (list, tuple)):
+            location = location[0]
+        _redis_client = redis.Redis.from_url(location)
+    
+    return _redis_client
+
+
+
+def cache_is_shared():
+    """
+    True si el caché por defecto es compartido entre procesos; LocMem y
+    Dummy solo existen dentro de cada proceso
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    return not backend.endswith(('LocMemCache', 'DummyCache'))
+
+
+def require_redis_client(service):
+    """
+    Cliente Redis para estado que debe ser compartido entre procesos.
+    Retorna None solo en los tests (backend en proceso); en otro caso sin
+    Redis lanza ImproperlyConfigured.
+    """
+    client = get_redis_client()
+    if client is None and not getattr(settings, 'TESTING', False):
+        raise ImproperlyConfigured(
+            f"{service} requiere Redis compartido: configure REDIS_URL y CACHES"
+        )
+    return client
+
+
 class CacheKeys:
     """Constantes para keys de caché organizadas"""
     
@@ -25,6 +85,11 @@ class CacheKeys:
     USER_ENROLLMENTS = "user_enrollments_{user_id}"
     USER_ACHIEVEMENTS = "user_achievements_{user_id}"
     USER_STATS = "user_stats_{user_id}"
+    RESUME_POINTER = "resume_pointer_{user_id}"
+    USER_AUTH = "user_auth_{user_id}_{version}"
+    USER_AUTH_VERSION = "user_auth_version_{user_id}"
+    DASHBOARD_TAG_VERSION = "dashboard_tag_{user_id}_{tag}"
+    DASHBOARD_SECTION = "dashboard_{user_id}_{section}_{versions}"
     
     # Recommendations
     AI_RECOMMENDATIONS = "ai_recommendations_{user_id}_{date}"
@@ -33,10 +98,29 @@ class CacheKeys:
     
     # Performance
     LEADERBOARD = "leaderboard_{type}_{period}"
+    LEADERBOARD_SET = "leaderboard:{scope}:{period}:{bucket}"
     POPULAR_PATHS = "popular_paths_{timeframe}"
     
+    # Content
+    CONTENT_CATEGORY_TREE = "content_category_tree"
+    
+    # Directorio de colegios y universidades
+    DIRECTORY_AUTOCOMPLETE = "directory_autocomplete_{kind}_{digest}"
+    DIRECTORY_MANIFEST = "directory_manifest"
+    
+    # Disponibilidad de username/email (filtros de Bloom)
+    AVAILABILITY_GENERATION = "availability_generation_{field}"
+    AVAILABILITY_FILTER = "availability_filter_{field}_{generation}"
+    AVAILABILITY_EVENT_SEQ = "availability_event_seq_{field}"
+    AVAILABILITY_EVENT = "availability_event_{field}_{seq}"
+    AVAILABILITY_COUNTER = "availability_counter_{field}_{counter}"
+    AVAILABILITY_BUILD_LOCK = "availability_build_lock_{field}"
+    
     # Battle System
     BATTLE_SESSION = "battle_session_{session_id}"
+    BATTLE_STATE = "battle:{battle_id}"
+    BATTLE_ANSWER_KEY = "battle:{battle_id}:key"
+    BATTLE_DEADLINES = "battle:deadlines"
     BATTLE_COOLDOWN = "battle_cooldown_{user_id}_{path_id}"
 
 
@@ -53,9 +137,14 @@ class CacheTimeouts:
     LEARNING_PATH_LIST = HOUR   # Lista puede cambiar con nuevos paths
     USER_PROGRESS = MINUTE * 5  # Progreso cambia frecuentemente
     USER_STATS = HOUR           # Stats se actualizan menos
+    USER_AUTH = MINUTE * 5      # Usuario autenticado; se invalida al guardarlo
     AI_RECOMMENDATIONS = DAY    # Recomendaciones de IA una vez al día
     LEADERBOARD = HOUR          # Actualizar ranking cada hora
+    LEADERBOARD_TOP = MINUTE    # Top hidratado; los sorted sets son la fuente
     BATTLE_SESSION = HOUR * 6   # Sesiones de batalla duran hasta 6h
+    CONTENT_CATEGORY_TREE = WEEK  # Se invalida al guardar o borrar categorías
+    DIRECTORY_AUTOCOMPLETE = HOUR  # Colegios y universidades cambian con importaciones
+    DIRECTORY_MANIFEST = DAY    # Se reemplaza al regenerar los snapshots
 
 
 def cache_key_from_request(request, prefix: str, extra_keys: list = None) -> str:
@@ -86,28 +175,38 @@ def cache_key_from_request(request, prefix: str, extra_keys: list = None) -> str
 
 
 def cached_response(timeout: int = CacheTimeouts.HOUR, 
-                   key_func: Optional[Callable] = None):
+                   key_func: Optional[Callable] = None,
+                   family: Optional[str] = None):
     """
     Decorator para cachear respuestas de view methods
+    `family` agrupa las métricas de aciertos (por defecto, el nombre del método)
     """
     def decorator(func):
+        metrics_family = family or func.__name__
+        CacheMetrics.track(metrics_family)
+        
         @wraps(func)
         def wrapper(self, request, *args, **kwargs):
             # Generar cache key
             if key_func:
                 cache_key = key_func(request, *args, **kwargs)
             else:
+                # Los kwargs de la URL (slug, uuid) distinguen cada recurso
                 cache_key = cache_key_from_request(
                     request, 
                     f"{func.__name__}", 
-                    [str(arg) for arg in args]
+                    [str(arg) for arg in args] + [
+                        f"{name}_{value}" for name, value in sorted(kwargs.items())
+                    ]
                 )
             
             # Intentar obtener del cache
             cached_result = cache.get(cache_key)
             if cached_result is not None:
+                CacheMetrics.record_hit(metrics_family)
                 return cached_result
             
+            CacheMetrics.record_miss(metrics_family)
             # Ejecutar función y cachear resultado
             result = func(self, request, *args, **kwargs)
             cache.set(cache_key, result, timeout)
@@ -228,10 +327,249 @@ class LearningCacheManager:
         return cache.get(cache_key)
     
     @staticmethod
-    def set_leaderboard(leaderboard_type: str, data: list, period: str = 'weekly'):
+    def set_leaderboard(leaderboard_type: str, data: list, period: str = 'weekly',
+                        timeout: int = CacheTimeouts.LEADERBOARD):
         """Guarda leaderboard en caché"""
         cache_key = CacheKeys.LEADERBOARD.format(type=leaderboard_type, period=period)
-        cache.set(cache_key, data, CacheTimeouts.LEADERBOARD)
+        cache.set(cache_key, data, timeout)
+
+
+class CacheMetrics:
+    """
+    Contadores de aciertos/fallos y tiempos de calentamiento por familia de
+    keys, compartidos entre procesos a través del caché
+    """
+    
+    METRIC_KEY = "cache_metrics:{family}:{field}"
+    TIMEOUT = CacheTimeouts.WEEK
+    COUNTERS = ('hits', 'misses')
+    WARM_FIELDS = ('last_warm_seconds', 'last_warm_keys', 'last_warmed_at')
+    
+    _families = set()
+    
+    @classmethod
+    def track(cls, family: str):
+        """Declara una familia para que aparezca en los reportes"""
+        cls._families.add(family)
+    
+    @classmethod
+    def _incr(cls, family: str, field: str):
+        key = cls.METRIC_KEY.format(family=family, field=field)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Primera vez: add es atómico, si otro proceso ganó solo se incrementa
+            if not cache.add(key, 1, cls.TIMEOUT):
+                cache.incr(key)
+    
+    @classmethod
+    def record_hit(cls, family: str):
+        cls._incr(family, 'hits')
+    
+    @classmethod
+    def record_miss(cls, family: str):
+        cls._incr(family, 'misses')
+    
+    @classmethod
+    def record_warm(cls, family: str, seconds: float, keys: int):
+        cache.set_many({
+            cls.METRIC_KEY.format(family=family, field='last_warm_seconds'): round(seconds, 4),
+            cls.METRIC_KEY.format(family=family, field='last_warm_keys'): keys,
+            cls.METRIC_KEY.format(family=family, field='last_warmed_at'): timezone.now().isoformat(),
+        }, cls.TIMEOUT)
+    
+    @classmethod
+    def snapshot(cls, families: Optional[list] = None) -> dict:
+        """{familia: {hits, misses, hit_ratio, last_warm_*}}"""
+        families = sorted(families or cls._families | set(CacheWarmRegistry.names()))
+        fields = cls.COUNTERS + cls.WARM_FIELDS
+        values = cache.get_many([
+            cls.METRIC_KEY.format(family=family, field=field)
+            for family in families for field in fields
+        ])
+        
+        report = {}
+        for family in families:
+            row = {
+                field: values.get(cls.METRIC_KEY.format(family=family, field=field))
+                for field in fields
+            }
+            row['hits'] = row['hits'] or 0
+            row['misses'] = row['misses'] or 0
+            lookups = row['hits'] + row['misses']
+            row['hit_ratio'] = round(row['hits'] / lookups, 4) if lookups else None
+            report[family] = row
+        return report
+    
+    @classmethod
+    def reset(cls, families: Optional[list] = None):
+        families = families or cls._families | set(CacheWarmRegistry.names())
+        cache.delete_many([
+            cls.METRIC_KEY.format(family=family, field=field)
+            for family in families for field in cls.COUNTERS + cls.WARM_FIELDS
+        ])
+
+
+class WarmFamily:
+    """
+    Familia de keys calentables: cómo enumerar sus argumentos, cómo
+    formar cada key y cómo construir su valor
+    """
+    
+    def __init__(self, name: str, build: Callable, key: Callable, timeout: int,
+                 keys: Optional[Callable] = None):
+        self.name = name
+        self.build = build
+        self.key = key
+        self.timeout = timeout
+        self.keys = keys
+    
+    def args(self) -> list:
+        """Argumentos a calentar; [None] para familias de una sola key"""
+        return list(self.keys()) if self.keys else [None]
+    
+    def cache_key(self, arg=None) -> str:
+        return self.key() if arg is None else self.key(arg)
+    
+    def value(self, arg=None):
+        return self.build() if arg is None else self.build(arg)
+
+
+class CacheWarmRegistry:
+    """
+    Registro de keys calentables. Cada familia se declara junto al código
+    que la lee con @CacheWarmRegistry.register(...), y ese código la lee con
+    fetch() para que aciertos y fallos queden en CacheMetrics.
+    """
+    
+    # Módulos que declaran familias (se importan antes de calentar)
+    WARM_MODULES = (
+        'apps.learning.serializers',
+        'apps.learning.views',
+    )
+    DEFAULT_WORKERS = 8
+    
+    _families = {}
+    _discovered = False
+    
+    @classmethod
+    def register(cls, name: str, key: Callable, timeout: int, keys: Optional[Callable] = None):
+        """Decorator: registra la función como constructor de la familia"""
+        def decorator(build):
+            cls._families[name] = WarmFamily(name, build, key, timeout, keys)
+            CacheMetrics.track(name)
+            return build
+        return decorator
+    
+    @classmethod
+    def discover(cls):
+        if not cls._discovered:
+            for module in cls.WARM_MODULES:
+                import_module(module)
+            cls._discovered = True
+    
+    @classmethod
+    def names(cls) -> list:
+        return sorted(cls._families)
+    
+    @classmethod
+    def get(cls, name: str) -> WarmFamily:
+        cls.discover()
+        return cls._families[name]
+    
+    @classmethod
+    def fetch(cls, name: str, arg=None):
+        """Lectura con relleno: retorna el valor cacheado o lo construye"""
+        family = cls._families[name]
+        key = family.cache_key(arg)
+        
+        value = cache.get(key)
+        if value is not None:
+            CacheMetrics.record_hit(name)
+            return value
+        
+        CacheMetrics.record_miss(name)
+        value = family.value(arg)
+        cache.set(key, value, family.timeout)
+        return value
+    
+    @classmethod
+    def invalidate(cls, name: str, arg=None, rewarm: bool = True):
+        """
+        Borra la key y, al confirmar la transacción, la vuelve a calentar
+        en Celery (en proceso si no hay broker)
+        """
+        cache.delete(cls.get(name).cache_key(arg))
+        if rewarm:
+            transaction.on_commit(lambda: cls._dispatch_warm(name, arg))
+    
+    @classmethod
+    def _dispatch_warm(cls, name: str, arg=None):
+        from .tasks import warm_caches
+        
+        args = None if arg is None else [arg]
+        try:
+            warm_caches.apply_async(kwargs={'families': [name], 'path_ids': args}, retry=False)
+        except Exception as exc:
+            logger.info("Broker no disponible (%s); calentamiento en proceso", exc)
+            cls.warm([name], workers=1, args=args)
+    
+    @staticmethod
+    def _warm_one(family: WarmFamily, arg, key: str, threaded: bool):
+        started = time.perf_counter()
+        try:
+            cache.set(key, family.value(arg), family.timeout)
+            return True, time.perf_counter() - started
+        except Exception:
+            logger.exception("Error calentando %s", key)
+            return False, time.perf_counter() - started
+        finally:
+            if threaded:
+                # Cada hilo abre su propia conexión; no dejarla colgada
+                connection.close()
+    
+    @classmethod
+    def warm(cls, names: Optional[list] = None, workers: int = DEFAULT_WORKERS,
+             force: bool = False, args: Optional[list] = None) -> dict:
+        """
+        Calienta las familias pedidas (por defecto todas) con un pool de
+        `workers` hilos. Sin `force` se omiten las keys que ya están en caché.
+        `args` limita el calentamiento a esos argumentos (tras una invalidación).
+        Retorna {familia: {keys, warmed, skipped, errors, seconds}}.
+        """
+        cls.discover()
+        families = [cls._families[name] for name in (names or cls.names())]
+        
+        jobs = []
+        report = {}
+        for family in families:
+            family_args = args if args is not None else family.args()
+            keys = {family.cache_key(arg): arg for arg in family_args}
+            cached = set() if force else set(cache.get_many(list(keys)))
+            report[family.name] = {
+                'keys': len(keys), 'warmed': 0, 'skipped': len(cached), 'errors': 0, 'seconds': 0.0
+            }
+            jobs.extend((family, arg, key) for key, arg in keys.items() if key not in cached)
+        
+        if workers <= 1:
+            results = [cls._warm_one(family, arg, key, False) for family, arg, key in jobs]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cache-warm') as executor:
+                results = list(executor.map(
+                    lambda job: cls._warm_one(*job, True), jobs
+                ))
+        
+        for (family, _arg, _key), (ok, seconds) in zip(jobs, results):
+            row = report[family.name]
+            row['warmed' if ok else 'errors'] += 1
+            row['seconds'] += seconds
+        
+        for name, row in report.items():
+            row['seconds'] = round(row['seconds'], 4)
+            if row['warmed']:
+                CacheMetrics.record_warm(name, row['seconds'], row['warmed'])
+        
+        return report
 
 
 class CacheWarmer:
@@ -240,8 +578,13 @@ class CacheWarmer:
     """
     
     @staticmethod
-    def warm_popular_paths():
-        """Pre-cachea los paths más populares"""
+    @CacheWarmRegistry.register(
+        'popular_paths',
+        key=lambda: CacheKeys.POPULAR_PATHS.format(timeframe='current'),
+        timeout=CacheTimeouts.DAY
+    )
+    def build_popular_paths():
+        """Los paths más populares, serializados"""
         from .models import LearningPath
         from .serializers import LearningPathListSerializer
         
@@ -249,30 +592,31 @@ class CacheWarmer:
             status='ACTIVE'
         ).order_by('-total_enrollments')[:20]
         
-        serializer = LearningPathListSerializer(popular_paths, many=True)
-        cache.set(
-            CacheKeys.POPULAR_PATHS.format(timeframe='current'),
-            serializer.data,
-            CacheTimeouts.DAY
-        )
+        return LearningPathListSerializer(popular_paths, many=True).data
     
     @staticmethod
-    def warm_trending_paths():
-        """Pre-cachea paths en tendencia"""
+    @CacheWarmRegistry.register(
+        'trending_paths',
+        key=lambda: CacheKeys.TRENDING_PATHS.format(date=timezone.now().date().isoformat()),
+        timeout=CacheTimeouts.HOUR
+    )
+    def build_trending_paths():
+        """Paths en tendencia (uuid, nombre, slug)"""
         from .models import LearningPath
-        from django.utils import timezone
-        from datetime import timedelta
+        from .trending import TrendingService
         
-        # Paths con más inscripciones en los últimos 7 días
-        week_ago = timezone.now() - timedelta(days=7)
-        trending_paths = LearningPath.objects.filter(
-            status='ACTIVE',
-            enrollments__created_at__gte=week_ago
-        ).distinct().order_by('-total_enrollments')[:10]
+        trending_paths = TrendingService.trending(
+            LearningPath.objects.filter(status='ACTIVE')
+        )[:10]
         
-        date_str = timezone.now().date().isoformat()
-        cache.set(
-            CacheKeys.TRENDING_PATHS.format(date=date_str),
-            list(trending_paths.values('uuid', 'name', 'slug')),
-            CacheTimeouts.DAY
-        ) 
\ No newline at end of file
+        return list(trending_paths.values('uuid', 'name', 'slug'))
+    
+    @staticmethod
+    def warm_popular_paths():
+        """Pre-cachea los paths más populares"""
+        CacheWarmRegistry.warm(['popular_paths'], workers=1, force=True)
+    
+    @staticmethod
+    def warm_trending_paths():
+        """Pre-cachea paths en tendencia"""
+        CacheWarmRegistry.warm(['trending_paths'], workers=1, force=True)
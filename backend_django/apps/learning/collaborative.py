@@ -0,0 +1,281 @@
+"""
+Filtrado colaborativo item-item para rutas y unidades de contenido
+
+Job offline: construye una matriz dispersa usuario × ítem a partir de
+inscripciones, lecciones completadas y progreso de contenido, normaliza
+columnas (similitud coseno) y calcula los top-K vecinos de cada ítem con
+productos dispersos por bloques. Los vecinos se guardan como arreglos
+compactos (n_items × K) para puntuar en línea en O(K) por ítem del usuario.
+"""
+
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count
+from scipy import sparse
+
+
+ITEM_KINDS = ('path', 'content')
+
+DEFAULT_TOP_K = 20
+DEFAULT_CHUNK_SIZE = 512
+
+VERSION_KEY = "cf_neighbours_version_{kind}"
+NEIGHBOURS_KEY = "cf_neighbours_{kind}_{version}"
+
+
+class NeighbourTable:
+    """
+    Vecinos item-item en arreglos compactos:
+    item_ids[i] tiene como vecinos item_ids[neighbours[i, :]] con scores[i, :].
+    Las posiciones sin vecino tienen score 0.
+    """
+
+    def __init__(self, item_ids, neighbours, scores, built_at=None):
+        self.item_ids = item_ids
+        self.neighbours = neighbours
+        self.scores = scores
+        self.built_at = built_at or time.time()
+        self.row_index = {int(item_id): i for i, item_id in enumerate(item_ids)}
+
+    def __getstate__(self):
+        # El índice se reconstruye al deserializar
+        return {
+            'item_ids': self.item_ids,
+            'neighbours': self.neighbours,
+            'scores': self.scores,
+            'built_at': self.built_at,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def neighbours_of(self, item_id):
+        """[(item_id, score)] de los vecinos de un ítem"""
+        row = self.row_index.get(item_id)
+        if row is None:
+            return []
+        return [
+            (int(self.item_ids[col]), float(score))
+            for col, score in zip(self.neighbours[row], self.scores[row])
+            if score > 0
+        ]
+
+    def score(self, interactions, exclude=(), limit=10):
+        """
+        Puntúa ítems para un usuario a partir de sus interacciones
+        {item_id: peso}: suma ponderada de similitudes de los vecinos.
+        """
+        totals = {}
+        for item_id, weight in interactions.items():
+            row = self.row_index.get(item_id)
+            if row is None:
+                continue
+            for col, similarity in zip(self.neighbours[row], self.scores[row]):
+                if similarity <= 0:
+                    continue
+                neighbour_id = int(self.item_ids[col])
+                totals[neighbour_id] = totals.get(neighbour_id, 0.0) + weight * float(similarity)
+
+        excluded = set(exclude) | set(interactions)
+        ranked = sorted(
+            ((item_id, score) for item_id, score in totals.items() if item_id not in excluded),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        return ranked[:limit]
+
+
+def build_interaction_matrix(triples):
+    """
+    Matriz dispersa CSR usuario × ítem desde tuplas (user_id, item_id, peso).
+    Retorna (matrix, item_ids).
+    """
+    users, items, weights = [], [], []
+    for user_id, item_id, weight in triples:
+        users.append(user_id)
+        items.append(item_id)
+        weights.append(weight)
+
+    if not items:
+        return sparse.csr_matrix((0, 0), dtype=np.float32), np.array([], dtype=np.int64)
+
+    user_ids, user_rows = np.unique(np.array(users, dtype=np.int64), return_inverse=True)
+    item_ids, item_cols = np.unique(np.array(items, dtype=np.int64), return_inverse=True)
+
+    # coo → csr suma duplicados (varias fuentes para el mismo par)
+    matrix = sparse.coo_matrix(
+        (np.array(weights, dtype=np.float32), (user_rows, item_cols)),
+        shape=(len(user_ids), len(item_ids))
+    ).tocsr()
+
+    return matrix, item_ids
+
+
+def compute_top_k_similarities(matrix, top_k=DEFAULT_TOP_K, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Top-K vecinos coseno de cada columna de `matrix`.
+    Procesa bloques de `chunk_size` ítems para acotar la memoria:
+    cada bloque es un producto disperso (chunk × usuarios) · (usuarios × ítems).
+    """
+    n_items = matrix.shape[1]
+    k = min(top_k, max(n_items - 1, 0))
+
+    neighbours = np.zeros((n_items, k), dtype=np.int32)
+    scores = np.zeros((n_items, k), dtype=np.float32)
+    if k == 0:
+        return neighbours, scores
+
+    # Normalizar columnas: el producto punto pasa a ser similitud coseno
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = matrix @ sparse.diags(1.0 / norms).astype(np.float32)
+
+    item_major = normalized.T.tocsr()
+    normalized = normalized.tocsc()
+
+    for start in range(0, n_items, chunk_size):
+        stop = min(start + chunk_size, n_items)
+        block = (item_major[start:stop] @ normalized).toarray()
+
+        # Un ítem no es vecino de sí mismo
+        block[np.arange(stop - start), np.arange(start, stop)] = 0
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+
+        neighbours[start:stop] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+
+    return neighbours, scores
+
+
+def path_interactions():
+    """
+    (user_id, path_id, peso): inscripción 1, ruta completada +2,
+    y log1p de lecciones completadas
+    """
+    from .models import UserPathEnrollment, UserLessonProgress
+
+    for user_id, path_id, status in UserPathEnrollment.objects.values_list(
+        'user_id', 'learning_path_id', 'status'
+    ).iterator(chunk_size=5000):
+        yield user_id, path_id, 3.0 if status == 'COMPLETED' else 1.0
+
+    for row in UserLessonProgress.objects.filter(
+        status__in=['COMPLETED', 'PERFECT']
+    ).values('user_id', 'enrollment__learning_path_id').annotate(
+        lessons=Count('id')
+    ).iterator(chunk_size=5000):
+        yield row['user_id'], row['enrollment__learning_path_id'], float(np.log1p(row['lessons']))
+
+
+def content_interactions():
+    """(user_id, content_unit_id, peso): progreso 1-2, dominado +1"""
+    from apps.content.models import UserContentProgress
+
+    for user_id, unit_id, progress, is_mastered in UserContentProgress.objects.values_list(
+        'user_id', 'content_unit_id', 'progress_percentage', 'is_mastered'
+    ).iterator(chunk_size=5000):
+        yield user_id, unit_id, 1.0 + (progress or 0) / 100.0 + (1.0 if is_mastered else 0.0)
+
+
+INTERACTION_SOURCES = {
+    'path': path_interactions,
+    'content': content_interactions,
+}
+
+
+class ItemSimilarityStore:
+    """
+    Construcción, persistencia (caché) y lectura de las tablas de vecinos.
+    Cada proceso conserva la última versión cargada en memoria.
+    """
+
+    _loaded = {}
+
+    @classmethod
+    def build(cls, kind, top_k=DEFAULT_TOP_K, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Job offline: recalcula y publica la tabla de vecinos de `kind`"""
+        matrix, item_ids = build_interaction_matrix(INTERACTION_SOURCES[kind]())
+        neighbours, scores = compute_top_k_similarities(matrix, top_k, chunk_size)
+
+        table = NeighbourTable(item_ids, neighbours, scores)
+        cls.publish(kind, table)
+        return table, matrix.shape
+
+    @classmethod
+    def publish(cls, kind, table):
+        version = int(table.built_at * 1000)
+        cache.set(NEIGHBOURS_KEY.format(kind=kind, version=version), table, None)
+
+        previous = cache.get(VERSION_KEY.format(kind=kind))
+        cache.set(VERSION_KEY.format(kind=kind), version, None)
+        if previous and previous != version:
+            cache.delete(NEIGHBOURS_KEY.format(kind=kind, version=previous))
+
+        cls._loaded[kind] = (version, table)
+
+    @classmethod
+    def get(cls, kind):
+        """Tabla de vecinos vigente, o None si el job aún no ha corrido"""
+        version = cache.get(VERSION_KEY.format(kind=kind))
+        if version is None:
+            return None
+
+        loaded = cls._loaded.get(kind)
+        if loaded is not None and loaded[0] == version:
+            return loaded[1]
+
+        table = cache.get(NEIGHBOURS_KEY.format(kind=kind, version=version))
+        if table is not None:
+            cls._loaded[kind] = (version, table)
+        return table
+
+    @classmethod
+    def recommend_paths(cls, user, limit=10):
+        """IDs de rutas recomendadas por usuarios con inscripciones similares"""
+        from .models import LearningPath, UserPathEnrollment
+
+        table = cls.get('path')
+        if table is None:
+            return []
+
+        interactions = {
+            path_id: 3.0 if status == 'COMPLETED' else 1.0
+            for path_id, status in UserPathEnrollment.objects.filter(
+                user=user
+            ).values_list('learning_path_id', 'status')
+        }
+        ranked = table.score(interactions, limit=limit * 2)
+
+        active_ids = set(LearningPath.objects.filter(
+            id__in=[path_id for path_id, _score in ranked],
+            status='ACTIVE'
+        ).values_list('id', flat=True))
+        return [path_id for path_id, _score in ranked if path_id in active_ids][:limit]
+
+    @classmethod
+    def recommend_content(cls, user, limit=10):
+        """IDs de unidades de contenido recomendadas por similitud de progreso"""
+        from apps.content.models import ContentUnit, UserContentProgress
+
+        table = cls.get('content')
+        if table is None:
+            return []
+
+        interactions = {
+            unit_id: 1.0 + (percentage or 0) / 100.0
+            for unit_id, percentage in UserContentProgress.objects.filter(
+                user=user
+            ).values_list('content_unit_id', 'progress_percentage')
+        }
+        ranked = table.score(interactions, limit=limit * 2)
+
+        active_ids = set(ContentUnit.objects.filter(
+            id__in=[unit_id for unit_id, _score in ranked],
+            is_active=True
+        ).values_list('id', flat=True))
+        return [unit_id for unit_id, _score in ranked if unit_id in active_ids][:limit]
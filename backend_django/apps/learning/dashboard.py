@@ -0,0 +1,219 @@
+"""
+Snapshot del dashboard por usuario
+
+Las pantallas de inicio piden estadísticas, perfil, rachas y logros en
+cada carga. DashboardSnapshot arma esas secciones en una pasada
+(select_related y agregados) y guarda cada una en caché bajo una key que
+incluye la versión de los tags de los que depende:
+
+    stats, profile  -> xp, profile
+    streaks         -> streak, enrollment
+    achievements    -> achievement
+
+Invalidar un tag solo incrementa su versión (las keys viejas caducan
+solas), así que un cambio de XP no tira las rachas ni los logros. La
+vitalidad se guarda como (valor, ancla) y se calcula al servir, de modo
+que el snapshot no caduca por el paso del tiempo.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .cache import CacheKeys, CacheTimeouts
+
+
+TAGS = ('xp', 'profile', 'streak', 'enrollment', 'achievement')
+
+SECTIONS = {
+    'stats': ('xp', 'profile'),
+    'profile': ('xp', 'profile'),
+    'streaks': ('streak', 'enrollment'),
+    'achievements': ('achievement',),
+}
+
+# Campos de la inscripción que alteran las rachas
+STREAK_FIELDS = {'current_streak_days', 'max_streak_days', 'last_activity_date'}
+
+
+def _tag_key(user_id, tag):
+    return CacheKeys.DASHBOARD_TAG_VERSION.format(user_id=user_id, tag=tag)
+
+
+class DashboardSnapshot:
+    """
+    Secciones del dashboard cacheadas con invalidación por tags
+    """
+
+    @staticmethod
+    def invalidate(user_id, *tags):
+        """Incrementa la versión de los tags al confirmar la transacción"""
+        def bump():
+            for tag in tags:
+                key = _tag_key(user_id, tag)
+                cache.add(key, 0, None)
+                cache.incr(key)
+
+        transaction.on_commit(bump)
+
+    @staticmethod
+    def _versions(user_id):
+        keys = {tag: _tag_key(user_id, tag) for tag in TAGS}
+        found = cache.get_many(list(keys.values()))
+        return {tag: found.get(key, 0) for tag, key in keys.items()}
+
+    @staticmethod
+    def _section_key(user_id, section, versions):
+        return CacheKeys.DASHBOARD_SECTION.format(
+            user_id=user_id,
+            section=section,
+            versions='.'.join(str(versions[tag]) for tag in SECTIONS[section])
+        )
+
+    @classmethod
+    def get(cls, user, sections=None):
+        """{sección: payload} para las secciones pedidas (por defecto todas)"""
+        sections = list(sections or SECTIONS)
+        versions = cls._versions(user.id)
+        keys = {section: cls._section_key(user.id, section, versions) for section in sections}
+
+        cached = cache.get_many(list(keys.values()))
+        missing = [section for section in sections if keys[section] not in cached]
+        if missing:
+            built = cls.build(user, missing)
+            cache.set_many(
+                {keys[section]: built[section] for section in missing},
+                CacheTimeouts.USER_STATS
+            )
+            cached.update({keys[section]: built[section] for section in missing})
+
+        return {section: cls._finalize(section, cached[keys[section]]) for section in sections}
+
+    @staticmethod
+    def _finalize(section, payload):
+        """Calcula la vitalidad vigente a partir de (valor, ancla)"""
+        from apps.users.vitality import vitality_at
+
+        if section not in ('stats', 'profile'):
+            return payload
+
+        state = payload.get('_vitality')
+        payload = {key: value for key, value in payload.items() if key != '_vitality'}
+        if state is None:
+            return payload
+
+        current = vitality_at(*state)
+        if section == 'stats':
+            payload['game_stats'] = {**payload['game_stats'], 'current_vitality': current}
+        else:
+            payload['profile'] = {**payload['profile'], 'current_vitality': current}
+        return payload
+
+    @classmethod
+    def build(cls, user, sections):
+        from django.contrib.auth import get_user_model
+
+        needs_user = {'stats', 'profile'} & set(sections)
+        if needs_user:
+            user = get_user_model().objects.select_related(
+                'profile', 'school', 'target_university'
+            ).get(pk=user.pk)
+
+        builders = {
+            'stats': cls._build_stats,
+            'profile': cls._build_profile,
+            'streaks': cls._build_streaks,
+            'achievements': cls._build_achievements,
+        }
+        return {section: builders[section](user) for section in sections}
+
+    @staticmethod
+    def _profile(user):
+        from apps.users.models import UserProfile
+
+        try:
+            return user.profile
+        except UserProfile.DoesNotExist:
+            return None
+
+    @classmethod
+    def _build_stats(cls, user):
+        profile = cls._profile(user)
+        stats = {
+            'user_info': {
+                'username': user.username,
+                'hero_class': user.hero_class,
+                'level': user.level,
+                'experience_points': user.experience_points,
+                'avatar_evolution_stage': user.avatar_evolution_stage,
+            },
+            'academic_progress': None,
+            'game_stats': None,
+            'assessments': {
+                'initial_completed': user.initial_assessment_completed,
+                'vocational_completed': user.vocational_test_completed,
+                'assigned_role': user.assigned_role,
+            },
+        }
+        if profile is not None:
+            stats['academic_progress'] = {
+                'questions_answered': profile.total_questions_answered,
+                'correct_answers': profile.total_correct_answers,
+                'accuracy': profile.accuracy,
+                'study_minutes': profile.total_study_minutes,
+                'current_streak': profile.current_streak,
+                'max_streak': profile.max_streak,
+            }
+            stats['game_stats'] = {
+                'current_vitality': profile.current_vitality,
+                'improvement_rate': profile.improvement_rate,
+                'learning_style': profile.learning_style,
+                'difficulty_preference': profile.difficulty_preference,
+            }
+            stats['_vitality'] = (profile.current_vitality, profile.last_vitality_update)
+        return stats
+
+    @classmethod
+    def _build_profile(cls, user):
+        from apps.users.serializers import UserSerializer
+
+        payload = dict(UserSerializer(user).data)
+        profile = cls._profile(user)
+        if profile is not None:
+            payload['_vitality'] = (profile.current_vitality, profile.last_vitality_update)
+        return payload
+
+    @staticmethod
+    def _build_streaks(user):
+        from .models import UserPathEnrollment
+
+        rows = UserPathEnrollment.objects.filter(
+            user_id=user.pk,
+            status='ACTIVE'
+        ).values(
+            'learning_path__name', 'current_streak_days', 'max_streak_days', 'last_activity_date'
+        )
+        return [
+            {
+                'learning_path': row['learning_path__name'],
+                'current_streak': row['current_streak_days'],
+                'max_streak': row['max_streak_days'],
+                'last_activity': row['last_activity_date'],
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _build_achievements(user):
+        from .models import UserPathAchievement
+        from .serializers import UserPathAchievementSerializer
+
+        achievements = UserPathAchievement.objects.filter(
+            user_id=user.pk
+        ).select_related('achievement').order_by('-earned_at', '-id')
+        totals = achievements.aggregate(count=Count('id'), xp=Sum('xp_earned'))
+        return {
+            'count': totals['count'],
+            'total_xp': totals['xp'] or 0,
+            'results': [dict(row) for row in UserPathAchievementSerializer(achievements, many=True).data],
+        }
@@ -0,0 +1,260 @@
+"""
+Distribuciones de resultados por ruta para comparar simulacros
+
+Cada ruta mantiene histogramas de bins fijos (progreso, XP, tiempo y racha)
+de sus inscripciones completadas, sumas exactas para promedios y un top
+corto. Se actualizan al completar o modificar una inscripción, de modo que
+percentiles, promedios y top-N se responden en tiempo constante.
+"""
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache import CacheTimeouts
+
+
+DISTRIBUTION_CACHE_KEY = "path_distribution_{path_id}"
+
+TOP_PERFORMERS_SIZE = 5
+# Se guardan más entradas que las mostradas para tolerar salidas del top
+TOP_PERFORMERS_BUFFER = 10
+
+
+class HistogramSpec:
+    """Bins fijos definidos por sus bordes; el último bin absorbe el desborde"""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.size = len(self.edges) - 1
+
+    def bin_index(self, value):
+        index = int(np.searchsorted(self.edges, value, side='right')) - 1
+        return min(max(index, 0), self.size - 1)
+
+    def fraction_below(self, counts, value):
+        """
+        (cantidad de valores menores que `value`, cantidad mayores),
+        interpolando linealmente dentro del bin del valor
+        """
+        counts = np.asarray(counts, dtype=np.float64)
+        index = self.bin_index(value)
+        low, high = self.edges[index], self.edges[index + 1]
+
+        within = 0.0
+        if high > low:
+            within = min(max((value - low) / (high - low), 0.0), 1.0)
+
+        below = counts[:index].sum() + counts[index] * within
+        above = counts[index + 1:].sum() + counts[index] * (1.0 - within)
+        return below, above
+
+
+METRICS = {
+    # Porcentaje: bins de 1 punto
+    'progress': ('progress_percentage', HistogramSpec(np.arange(0, 101 + 1))),
+    # XP y tiempo: bins geométricos (resolución relativa constante)
+    'xp': ('total_xp_earned', HistogramSpec(np.concatenate([[0], np.geomspace(1, 1e6, 121)]))),
+    'time': ('total_time_minutes', HistogramSpec(np.concatenate([[0], np.geomspace(1, 1e5, 121)]))),
+    # Racha: un bin por día hasta un año
+    'streak': ('current_streak_days', HistogramSpec(np.arange(0, 367 + 1))),
+}
+
+
+def _metric_values(enrollment):
+    return {
+        metric: float(getattr(enrollment, field_name) or 0)
+        for metric, (field_name, _spec) in METRICS.items()
+    }
+
+
+def _performer_entry(enrollment_id, username, values):
+    return {
+        'enrollment_id': enrollment_id,
+        'username': username[:3] + '***',  # Privacidad
+        'progress': values['progress'],
+        'xp': values['xp'],
+        'streak': values['streak'],
+    }
+
+
+def _rank_performers(performers):
+    performers.sort(key=lambda entry: (-entry['progress'], -entry['xp']))
+    return performers[:TOP_PERFORMERS_BUFFER]
+
+
+class PathDistributionService:
+    """
+    Mantiene y consulta las distribuciones de resultados por ruta
+    """
+
+    @staticmethod
+    def _empty_state():
+        return {
+            'total_count': 0,
+            'histograms': {metric: [0] * spec.size for metric, (_f, spec) in METRICS.items()},
+            'sums': {metric: 0.0 for metric in METRICS},
+            'top_performers': [],
+        }
+
+    @classmethod
+    def rebuild(cls, path_id):
+        """Recalcula la distribución de una ruta con una pasada sobre sus completados"""
+        from .models import PathResultDistribution, UserPathEnrollment
+
+        state = cls._empty_state()
+        fields = [field_name for field_name, _spec in METRICS.values()]
+
+        for row in UserPathEnrollment.objects.filter(
+            learning_path_id=path_id,
+            status='COMPLETED'
+        ).values('id', 'user__username', *fields).iterator(chunk_size=2000):
+            values = {metric: float(row[field_name] or 0) for metric, (field_name, _s) in METRICS.items()}
+            cls._apply(state, values, 1)
+            state['top_performers'].append(
+                _performer_entry(row['id'], row['user__username'], values)
+            )
+            if len(state['top_performers']) > 4 * TOP_PERFORMERS_BUFFER:
+                state['top_performers'] = _rank_performers(state['top_performers'])
+
+        state['top_performers'] = _rank_performers(state['top_performers'])
+
+        PathResultDistribution.objects.update_or_create(
+            learning_path_id=path_id,
+            defaults=state
+        )
+        cache.set(DISTRIBUTION_CACHE_KEY.format(path_id=path_id), state, CacheTimeouts.DAY)
+        return state
+
+    @staticmethod
+    def _apply(state, values, sign):
+        state['total_count'] += sign
+        for metric, (_field_name, spec) in METRICS.items():
+            value = values[metric]
+            state['histograms'][metric][spec.bin_index(value)] += sign
+            state['sums'][metric] += sign * value
+
+    @classmethod
+    def record_change(cls, enrollment, original=None):
+        """
+        Aplica a la distribución el cambio de una inscripción: retira los
+        valores de `original` (estado previo, si ya contaba) y agrega los
+        actuales (si está completada).
+        """
+        from .models import PathResultDistribution
+
+        was_completed = original is not None and original.status == 'COMPLETED'
+        old_values = _metric_values(original) if original is not None else None
+        is_completed = enrollment.status == 'COMPLETED'
+        if not was_completed and not is_completed:
+            return
+
+        path_id = enrollment.learning_path_id
+        new_values = _metric_values(enrollment)
+        if was_completed and is_completed and old_values == new_values:
+            return
+
+        if not PathResultDistribution.objects.filter(learning_path_id=path_id).exists():
+            # Primera vez: la reconstrucción ya incluye el estado actual
+            cls.rebuild(path_id)
+            return
+
+        with transaction.atomic():
+            distribution = PathResultDistribution.objects.select_for_update().get(
+                learning_path_id=path_id
+            )
+
+            state = {
+                'total_count': distribution.total_count,
+                'histograms': distribution.histograms,
+                'sums': distribution.sums,
+                'top_performers': [
+                    entry for entry in distribution.top_performers
+                    if entry['enrollment_id'] != enrollment.id
+                ],
+            }
+
+            if was_completed:
+                cls._apply(state, old_values, -1)
+            if is_completed:
+                cls._apply(state, new_values, 1)
+                state['top_performers'].append(
+                    _performer_entry(enrollment.id, enrollment.user.username, new_values)
+                )
+            state['top_performers'] = _rank_performers(state['top_performers'])
+
+            needs_refill = (
+                len(state['top_performers']) < TOP_PERFORMERS_SIZE and
+                state['total_count'] > len(state['top_performers'])
+            )
+
+            for field_name, value in state.items():
+                setattr(distribution, field_name, value)
+            distribution.save()
+
+        if needs_refill:
+            cls.rebuild(path_id)
+        else:
+            cache.set(DISTRIBUTION_CACHE_KEY.format(path_id=path_id), state, CacheTimeouts.DAY)
+
+    @classmethod
+    def get_state(cls, path_id):
+        """Distribución de la ruta: caché, fila persistida o reconstrucción"""
+        from .models import PathResultDistribution
+
+        cache_key = DISTRIBUTION_CACHE_KEY.format(path_id=path_id)
+        state = cache.get(cache_key)
+        if state is not None:
+            return state
+
+        distribution = PathResultDistribution.objects.filter(learning_path_id=path_id).first()
+        if distribution is None:
+            return cls.rebuild(path_id)
+
+        state = {
+            'total_count': distribution.total_count,
+            'histograms': distribution.histograms,
+            'sums': distribution.sums,
+            'top_performers': distribution.top_performers,
+        }
+        cache.set(cache_key, state, CacheTimeouts.DAY)
+        return state
+
+    @classmethod
+    def compare(cls, enrollment):
+        """
+        Comparación de una inscripción completada contra el resto de la ruta
+        (la propia inscripción se descuenta de la distribución)
+        """
+        state = cls.get_state(enrollment.learning_path_id)
+        values = _metric_values(enrollment)
+
+        total = state['total_count'] - 1
+        if total <= 0:
+            return None
+
+        position = {}
+        for metric, (_field_name, spec) in METRICS.items():
+            counts = list(state['histograms'][metric])
+            counts[spec.bin_index(values[metric])] -= 1
+            position[metric] = spec.fraction_below(counts, values[metric])
+
+        averages = {
+            metric: (state['sums'][metric] - values[metric]) / total
+            for metric in METRICS
+        }
+
+        better_progress = position['progress'][0]
+
+        return {
+            'total_users': total,
+            'values': values,
+            'below': {metric: below for metric, (below, _above) in position.items()},
+            'above': {metric: above for metric, (_below, above) in position.items()},
+            'averages': averages,
+            'better_progress': int(round(better_progress)),
+            'top_performers': [
+                entry for entry in state['top_performers']
+                if entry['enrollment_id'] != enrollment.id
+            ][:TOP_PERFORMERS_SIZE],
+        }
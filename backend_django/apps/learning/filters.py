@@ -4,7 +4,7 @@ Filtros avanzados para Learning Paths con django-filter
 
 import django_filters
 from django_filters import rest_framework as filters
-from django.db.models import Q, Count, Avg, Sum
+from django.db.models import Q, Count, Avg, Sum, Case, When, IntegerField
 from django.utils import timezone
 from datetime import timedelta, date
 
@@ -13,6 +13,13 @@ from .models import (
     UserPathEnrollment, UserLessonProgress, PathAchievement,
     UserPathAchievement, LearningPathReview
 )
+from .recommender import PathRecommender
+from .tagging import PathTagIndex, KIND_AREA
+from .trending import TrendingService
+
+
+# Rutas recomendadas que considera el filtro recommended_for_user
+RECOMMENDED_FILTER_LIMIT = 50
 
 
 class LearningPathFilter(filters.FilterSet):
@@ -109,6 +116,7 @@ class LearningPathFilter(filters.FilterSet):
             ('created_at', 'created'),
             ('updated_at', 'updated'),
             ('estimated_duration_hours', 'duration'),
+            ('trending_score', 'trending'),
         )
     )
     
@@ -125,67 +133,43 @@ class LearningPathFilter(filters.FilterSet):
         }
     
     def filter_by_tags(self, queryset, name, value):
-        """Filtrar por tags separados por comas"""
+        """Filtrar por tags separados por comas (cualquiera de ellos)"""
         if not value:
             return queryset
         
-        tags = [tag.strip() for tag in value.split(',')]
-        query = Q()
-        for tag in tags:
-            query |= Q(tags__icontains=tag)
-        
-        return queryset.filter(query).distinct()
+        tags = [tag.strip() for tag in value.split(',') if tag.strip()]
+        return queryset.filter(id__in=PathTagIndex.path_ids(tags))
     
     def filter_by_category(self, queryset, name, value):
-        """Filtrar por categoría usando slug o nombre"""
+        """Filtrar por categoría: slug exacto de un área ICFES de la ruta"""
         if not value:
             return queryset
         
-        return queryset.filter(
-            Q(category__slug__icontains=value) |
-            Q(category__name__icontains=value)
-        )
+        return queryset.filter(id__in=PathTagIndex.path_ids([value], kind=KIND_AREA))
     
     def filter_trending(self, queryset, name, value):
-        """Filtrar paths en tendencia (más inscripciones recientes)"""
+        """Filtrar paths en tendencia (actividad reciente con decaimiento)"""
         if not value:
             return queryset
         
-        # Paths con más inscripciones en los últimos 7 días
-        week_ago = timezone.now() - timedelta(days=7)
-        trending_paths = queryset.filter(
-            enrollments__created_at__gte=week_ago
-        ).annotate(
-            recent_enrollments=Count('enrollments', filter=Q(enrollments__created_at__gte=week_ago))
-        ).filter(recent_enrollments__gte=5).order_by('-recent_enrollments')
-        
-        return trending_paths
+        return TrendingService.trending(queryset)
     
     def filter_recommended(self, queryset, name, value):
         """Filtrar paths recomendados para el usuario actual"""
         if not value or not self.request.user.is_authenticated:
             return queryset
         
-        user = self.request.user
+        # Mismo motor que el endpoint de recomendaciones, en orden de puntaje
+        path_ids = PathRecommender.recommend_ids(self.request.user, limit=RECOMMENDED_FILTER_LIMIT)
+        if not path_ids:
+            return queryset.none()
         
-        # Lógica de recomendación básica
-        # 1. Paths del mismo nivel o ligeramente superior
-        user_level = getattr(user, 'level', 1)
-        level_range = queryset.filter(
-            minimum_level__lte=user_level + 2,
-            minimum_level__gte=max(1, user_level - 1)
+        return queryset.filter(id__in=path_ids).order_by(
+            Case(
+                *[When(id=path_id, then=position) for position, path_id in enumerate(path_ids)],
+                output_field=IntegerField()
+            )
         )
-        
-        # 2. Excluir paths ya completados
-        completed_paths = UserPathEnrollment.objects.filter(
-            user=user,
-            status='COMPLETED'
-        ).values_list('learning_path_id', flat=True)
-        
-        level_range = level_range.exclude(id__in=completed_paths)
-        
-        # 3. Priorizar por rating y popularidad
-        return level_range.order_by('-average_rating', '-total_enrollments')
     
     def filter_user_can_enroll(self, queryset, name, value):
         """Filtrar paths en los que el usuario puede inscribirse"""
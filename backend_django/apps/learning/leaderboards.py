@@ -0,0 +1,360 @@
+"""
+Leaderboards de XP sobre sorted sets
+
+Un sorted set por scope (global, ruta, colegio, academia) y periodo
+(daily, weekly, season). Cada otorgamiento de XP incrementa los sets del
+usuario con ZINCRBY; el ranking propio y el vecindario se resuelven con
+ZREVRANK/ZREVRANGE en O(log n). Sin Redis (tests) se usa un backend en
+proceso con listas ordenadas y búsqueda binaria.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, time as dt_time, timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .cache import CacheKeys, CacheTimeouts, get_redis_client
+
+
+PERIODS = ('daily', 'weekly', 'season')
+SCOPES = ('global', 'path', 'school', 'academy')
+
+# Los buckets viven un periodo extra para poder consultar el anterior
+PERIOD_TTLS = {
+    'daily': CacheTimeouts.DAY * 2,
+    'weekly': CacheTimeouts.WEEK * 2,
+    'season': CacheTimeouts.DAY * 62,
+}
+
+REBUILD_CHUNK_SIZE = 1000
+
+
+def period_bucket(period, when=None):
+    """Identificador del bucket del periodo que contiene `when`"""
+    day = timezone.localtime(when or timezone.now()).date()
+
+    if period == 'daily':
+        return day.isoformat()
+    if period == 'weekly':
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == 'season':
+        # Una temporada por mes calendario
+        return f"{day.year}-{day.month:02d}"
+
+    raise ValueError(f"Periodo de leaderboard inválido: {period}")
+
+
+def period_start(period, when=None):
+    """Inicio (datetime aware) del bucket del periodo que contiene `when`"""
+    day = timezone.localtime(when or timezone.now()).date()
+
+    if period == 'daily':
+        start = day
+    elif period == 'weekly':
+        start = day - timedelta(days=day.weekday())
+    elif period == 'season':
+        start = day.replace(day=1)
+    else:
+        raise ValueError(f"Periodo de leaderboard inválido: {period}")
+
+    return timezone.make_aware(datetime.combine(start, dt_time.min))
+
+
+def scope_name(scope, scope_id=None):
+    """Nombre del scope dentro de la key ('global', 'path:5', ...)"""
+    if scope not in SCOPES:
+        raise ValueError(f"Scope de leaderboard inválido: {scope}")
+    if scope == 'global':
+        return 'global'
+    if scope_id is None:
+        raise ValueError(f"El scope {scope} requiere un id")
+    return f"{scope}:{scope_id}"
+
+
+def leaderboard_key(scope, scope_id=None, period='weekly', when=None):
+    return CacheKeys.LEADERBOARD_SET.format(
+        scope=scope_name(scope, scope_id),
+        period=period,
+        bucket=period_bucket(period, when)
+    )
+
+
+class RedisLeaderboardBackend:
+    """Sorted sets de Redis"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def increment(self, keys, member, amount):
+        pipe = self.client.pipeline(transaction=False)
+        for key, ttl in keys:
+            pipe.zincrby(key, amount, member)
+            pipe.expire(key, ttl)
+        pipe.execute()
+
+    def rank(self, key, member):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrank(key, member)
+        pipe.zscore(key, member)
+        rank, score = pipe.execute()
+        if rank is None:
+            return None
+        return rank, score
+
+    def range(self, key, start, stop):
+        return [
+            (int(member), score)
+            for member, score in self.client.zrevrange(key, start, stop, withscores=True)
+        ]
+
+    def size(self, key):
+        return self.client.zcard(key)
+
+    def replace(self, key, scores, ttl):
+        """Reemplaza el set completo de forma atómica (escritura en key temporal + RENAME)"""
+        if not scores:
+            self.client.delete(key)
+            return
+
+        tmp_key = f"{key}:rebuild"
+        items = list(scores.items())
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(tmp_key)
+        for offset in range(0, len(items), REBUILD_CHUNK_SIZE):
+            pipe.zadd(tmp_key, dict(items[offset:offset + REBUILD_CHUNK_SIZE]))
+        pipe.rename(tmp_key, key)
+        pipe.expire(key, ttl)
+        pipe.execute()
+
+
+class LocalSortedSet:
+    """
+    Sorted set en proceso: puntajes por miembro y una lista ordenada por
+    (-puntaje, miembro) que se mantiene con bisect, de modo que el ranking
+    se resuelve por búsqueda binaria en lugar de reordenar en cada consulta
+    """
+
+    __slots__ = ('scores', 'order')
+
+    def __init__(self, scores=None):
+        self.scores = dict(scores or {})
+        self.order = sorted((-score, member) for member, score in self.scores.items())
+
+    def increment(self, member, amount):
+        previous = self.scores.get(member)
+        if previous is not None:
+            del self.order[bisect_left(self.order, (-previous, member))]
+        score = (previous or 0) + amount
+        self.scores[member] = score
+        insort(self.order, (-score, member))
+
+    def rank(self, member):
+        score = self.scores.get(member)
+        if score is None:
+            return None
+        return bisect_left(self.order, (-score, member)), score
+
+    def range(self, start, stop):
+        end = None if stop == -1 else stop + 1
+        return [(member, -negative) for negative, member in self.order[start:end]]
+
+    def __len__(self):
+        return len(self.scores)
+
+
+class LocalLeaderboardBackend:
+    """Sorted sets en memoria del proceso (tests)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sets = {}
+
+    def increment(self, keys, member, amount):
+        with self._lock:
+            for key, _ttl in keys:
+                self._sets.setdefault(key, LocalSortedSet()).increment(member, amount)
+
+    def rank(self, key, member):
+        with self._lock:
+            board = self._sets.get(key)
+            return board.rank(member) if board is not None else None
+
+    def range(self, key, start, stop):
+        with self._lock:
+            board = self._sets.get(key)
+            return board.range(start, stop) if board is not None else []
+
+    def size(self, key):
+        with self._lock:
+            board = self._sets.get(key)
+            return len(board) if board is not None else 0
+
+    def replace(self, key, scores, ttl):
+        with self._lock:
+            if scores:
+                self._sets[key] = LocalSortedSet(scores)
+            else:
+                self._sets.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._sets.clear()
+
+
+class LeaderboardService:
+    """
+    Operaciones de leaderboard: registrar XP, top, ranking propio,
+    vecindario y reconstrucción desde la base de datos
+    """
+
+    _local_backend = LocalLeaderboardBackend()
+    _redis_backend = None
+
+    @classmethod
+    def get_backend(cls):
+        client = get_redis_client()
+        if client is None:
+            return cls._local_backend
+
+        if cls._redis_backend is None or cls._redis_backend.client is not client:
+            cls._redis_backend = RedisLeaderboardBackend(client)
+        return cls._redis_backend
+
+    @classmethod
+    def reset_local(cls):
+        """Limpia el backend en proceso (tests)"""
+        cls._local_backend.clear()
+
+    @staticmethod
+    def user_scopes(user, learning_path_id=None):
+        """Scopes en los que puntúa el XP de un usuario"""
+        from apps.gamification.models import AcademyMembership
+
+        scopes = [('global', None)]
+        if learning_path_id:
+            scopes.append(('path', learning_path_id))
+        if user.school_id:
+            scopes.append(('school', user.school_id))
+
+        academy_ids = AcademyMembership.objects.filter(
+            user_id=user.pk,
+            is_active=True
+        ).values_list('academy_id', flat=True)
+        scopes.extend(('academy', academy_id) for academy_id in academy_ids)
+
+        return scopes
+
+    @classmethod
+    def record_xp(cls, user, amount, learning_path_id=None, when=None):
+        """Suma XP del usuario en todos sus scopes y periodos vigentes"""
+        if amount <= 0:
+            return
+
+        keys = [
+            (leaderboard_key(scope, scope_id, period, when), PERIOD_TTLS[period])
+            for scope, scope_id in cls.user_scopes(user, learning_path_id)
+            for period in PERIODS
+        ]
+        cls.get_backend().increment(keys, user.pk, amount)
+
+    @classmethod
+    def top(cls, scope='global', scope_id=None, period='weekly', limit=10, offset=0):
+        """Primeros `limit` usuarios del leaderboard"""
+        key = leaderboard_key(scope, scope_id, period)
+        entries = cls.get_backend().range(key, offset, offset + limit - 1)
+        return [
+            {'rank': offset + position + 1, 'user_id': user_id, 'score': int(score)}
+            for position, (user_id, score) in enumerate(entries)
+        ]
+
+    @classmethod
+    def rank(cls, user_id, scope='global', scope_id=None, period='weekly'):
+        """Posición (1-based) y puntaje del usuario, o None si no figura"""
+        key = leaderboard_key(scope, scope_id, period)
+        result = cls.get_backend().rank(key, user_id)
+        if result is None:
+            return None
+
+        rank, score = result
+        return {'rank': rank + 1, 'user_id': user_id, 'score': int(score)}
+
+    @classmethod
+    def neighbourhood(cls, user_id, scope='global', scope_id=None, period='weekly', radius=5):
+        """Usuarios alrededor de la posición del usuario (radius arriba y abajo)"""
+        own = cls.rank(user_id, scope, scope_id, period)
+        if own is None:
+            return []
+
+        start = max(0, own['rank'] - 1 - radius)
+        return cls.top(scope, scope_id, period, limit=2 * radius + 1, offset=start)
+
+    @classmethod
+    def size(cls, scope='global', scope_id=None, period='weekly'):
+        return cls.get_backend().size(leaderboard_key(scope, scope_id, period))
+
+    @staticmethod
+    def _xp_events_since(start):
+        """
+        XP otorgado desde `start`, agregado por (usuario, ruta) desde el ledger:
+        cubre todas las fuentes que alimentan record_xp (lecciones, logros,
+        batallas, recompensas, evaluaciones...)
+        """
+        from apps.users.models import ExperienceLedgerEntry
+
+        rows = ExperienceLedgerEntry.objects.filter(
+            created_at__gte=start
+        ).values('user_id', 'learning_path_id').annotate(xp=Sum('amount')).filter(xp__gt=0)
+
+        for row in rows.iterator():
+            yield row['user_id'], row['learning_path_id'], row['xp']
+
+    @classmethod
+    def rebuild(cls, periods=PERIODS, when=None):
+        """
+        Repuebla en bloque los buckets vigentes de cada periodo desde la base
+        de datos. Retorna el número de sets escritos.
+        """
+        from apps.gamification.models import AcademyMembership
+        from apps.users.models import User
+
+        backend = cls.get_backend()
+        written = 0
+
+        for period in periods:
+            events = list(cls._xp_events_since(period_start(period, when)))
+            user_ids = {user_id for user_id, _path_id, _xp in events}
+
+            schools = dict(
+                User.objects.filter(
+                    pk__in=user_ids, school__isnull=False
+                ).values_list('pk', 'school_id')
+            )
+            academies = {}
+            for user_id, academy_id in AcademyMembership.objects.filter(
+                user_id__in=user_ids, is_active=True
+            ).values_list('user_id', 'academy_id'):
+                academies.setdefault(user_id, []).append(academy_id)
+
+            sets = {}
+            for user_id, path_id, xp in events:
+                scopes = [('global', None)]
+                if path_id:
+                    scopes.append(('path', path_id))
+                if user_id in schools:
+                    scopes.append(('school', schools[user_id]))
+                scopes.extend(('academy', academy_id) for academy_id in academies.get(user_id, ()))
+
+                for scope, scope_id in scopes:
+                    scores = sets.setdefault(leaderboard_key(scope, scope_id, period, when), {})
+                    scores[user_id] = scores.get(user_id, 0) + xp
+
+            # El global se reemplaza siempre, aunque quede vacío
+            sets.setdefault(leaderboard_key('global', None, period, when), {})
+            for key, scores in sets.items():
+                backend.replace(key, scores, PERIOD_TTLS[period])
+                written += 1
+
+        return written
@@ -0,0 +1,106 @@
+"""
+Comando Django para comparar ORDER BY RANDOM() contra el muestreo por pools
+Crea una tabla temporal sintética y mide cada estrategia
+"""
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.learning.sampling import draw, tablesample_ids
+
+
+TABLE = "sampling_benchmark"
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de muestreo aleatorio sobre una tabla sintética'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000000,
+            help='Filas de la tabla sintética'
+        )
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=45,
+            help='Tamaño de cada muestra'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Muestras por estrategia'
+        )
+
+    def handle(self, *args, **options):
+        rows, k, repeat = options['rows'], options['sample'], options['repeat']
+        postgres = connection.vendor == 'postgresql'
+
+        with connection.cursor() as cursor:
+            started = time.monotonic()
+            self._create_table(cursor, rows, postgres)
+            self.stdout.write(f'Tabla sintética de {rows} filas en {time.monotonic() - started:.1f}s')
+
+            # Filtro típico: ~25% de las filas (status = 1)
+            results = {}
+
+            started = time.monotonic()
+            for _ in range(repeat):
+                cursor.execute(f"SELECT id FROM {TABLE} WHERE status = 1 ORDER BY RANDOM() LIMIT %s", [k])
+                cursor.fetchall()
+            results['ORDER BY RANDOM()'] = (time.monotonic() - started) / repeat
+
+            started = time.monotonic()
+            cursor.execute(f"SELECT id FROM {TABLE} WHERE status = 1")
+            pool = np.fromiter((row[0] for row in cursor.fetchall()), dtype=np.int64)
+            results['carga del pool (una vez)'] = time.monotonic() - started
+
+            rng = np.random.default_rng()
+            exclude = set(int(pk) for pk in pool[:50])
+            started = time.monotonic()
+            for _ in range(repeat):
+                draw(pool, k, exclude, rng)
+            results['pool en memoria'] = (time.monotonic() - started) / repeat
+
+            if postgres:
+                cursor.execute(f"ANALYZE {TABLE}")
+                started = time.monotonic()
+                for _ in range(repeat):
+                    candidates = tablesample_ids(TABLE, 'id', k, rows)
+                    cursor.execute(
+                        f"SELECT id FROM {TABLE} WHERE status = 1 AND id = ANY(%s) LIMIT %s",
+                        [candidates, k]
+                    )
+                    cursor.fetchall()
+                results['TABLESAMPLE SYSTEM'] = (time.monotonic() - started) / repeat
+
+            cursor.execute(f"DROP TABLE {TABLE}")
+
+        for name, seconds in results.items():
+            self.stdout.write(f'  {name:<28} {seconds * 1000:10.2f} ms')
+
+        speedup = results['ORDER BY RANDOM()'] / max(results['pool en memoria'], 1e-9)
+        self.stdout.write(self.style.SUCCESS(f'✅ Pool en memoria {speedup:.0f}x más rápido que ORDER BY RANDOM()'))
+
+    @staticmethod
+    def _create_table(cursor, rows, postgres):
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        if postgres:
+            cursor.execute(f"CREATE TEMP TABLE {TABLE} (id bigint PRIMARY KEY, status smallint NOT NULL)")
+            cursor.execute(
+                f"INSERT INTO {TABLE} SELECT g, (random() * 4)::int %% 4 FROM generate_series(1, %s) g",
+                [rows]
+            )
+        else:
+            cursor.execute(f"CREATE TEMP TABLE {TABLE} (id integer PRIMARY KEY, status integer NOT NULL)")
+            cursor.execute(
+                f"WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s) "
+                f"INSERT INTO {TABLE} SELECT n, abs(random()) %% 4 FROM seq",
+                [rows]
+            )
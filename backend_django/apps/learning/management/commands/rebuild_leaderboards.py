@@ -0,0 +1,31 @@
+"""
+Comando Django para reconstruir los leaderboards desde la base de datos
+Repuebla en bloque los sorted sets de los periodos vigentes
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.learning.leaderboards import LeaderboardService, PERIODS
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los leaderboards de XP (global, ruta, colegio, academia)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period',
+            action='append',
+            choices=PERIODS,
+            help='Periodo a reconstruir (repetible). Por defecto todos'
+        )
+
+    def handle(self, *args, **options):
+        periods = options['period'] or PERIODS
+
+        written = LeaderboardService.rebuild(periods=periods)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ {written} leaderboards reconstruidos ({", ".join(periods)})'
+            )
+        )
@@ -0,0 +1,34 @@
+"""
+Comando Django para reconstruir las distribuciones de resultados por ruta
+Usado en el backfill inicial y como corrección periódica
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.learning.models import LearningPath
+from apps.learning.distributions import PathDistributionService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los histogramas de resultados usados por compare_results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            action='append',
+            help='Slug de la ruta a reconstruir (repetible). Por defecto todas'
+        )
+
+    def handle(self, *args, **options):
+        paths = LearningPath.objects.all()
+        if options['path']:
+            paths = paths.filter(slug__in=options['path'])
+
+        rebuilt = 0
+        for path_id in paths.values_list('id', flat=True).iterator():
+            PathDistributionService.rebuild(path_id)
+            rebuilt += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ {rebuilt} distribuciones reconstruidas')
+        )
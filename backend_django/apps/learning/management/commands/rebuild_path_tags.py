@@ -0,0 +1,19 @@
+"""
+Comando Django para reconstruir el índice normalizado de tags de rutas
+Corrige el índice si los campos JSON se modificaron sin pasar por save()
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.learning.tagging import PathTagIndex
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye LearningPathTag desde los tags y áreas ICFES de las rutas'
+
+    def handle(self, *args, **options):
+        rows = PathTagIndex.rebuild()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Índice de tags reconstruido: {rows} filas')
+        )
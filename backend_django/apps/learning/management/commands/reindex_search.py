@@ -0,0 +1,42 @@
+"""
+Comando Django para recalcular los vectores de búsqueda de texto completo
+Usado en el backfill inicial y tras cambiar pesos o configuración
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.learning.search import DOMAINS, SearchService, full_text_enabled
+
+
+class Command(BaseCommand):
+    help = 'Recalcula search_vector de preguntas ICFES, rutas y contenido (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--domain',
+            action='append',
+            choices=list(DOMAINS),
+            help='Dominio a reindexar (repetible). Por defecto todos'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Filas por UPDATE'
+        )
+
+    def handle(self, *args, **options):
+        if not full_text_enabled():
+            self.stdout.write(
+                self.style.WARNING('La búsqueda de texto completo requiere PostgreSQL; nada que reindexar')
+            )
+            return
+
+        for domain in options['domain'] or DOMAINS:
+            started = time.monotonic()
+            rows = SearchService.reindex(domain, batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ {domain}: {rows} filas en {time.monotonic() - started:.1f}s')
+            )
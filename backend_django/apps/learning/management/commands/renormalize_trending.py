@@ -0,0 +1,38 @@
+"""
+Comando Django para mantener los puntajes de tendencia de las rutas
+Renormaliza a la época actual o reconstruye desde la actividad reciente
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.learning.trending import TrendingService
+
+
+class Command(BaseCommand):
+    help = 'Renormaliza (o reconstruye con --rebuild) los puntajes de tendencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recalcular desde inscripciones y lecciones completadas recientes'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=14,
+            help='Días de actividad considerados por --rebuild'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            paths = TrendingService.rebuild(days=options['days'])
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ Puntajes reconstruidos: {paths} rutas con actividad')
+            )
+            return
+
+        rescaled = TrendingService.renormalize()
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ {rescaled} rutas renormalizadas a la época actual')
+        )
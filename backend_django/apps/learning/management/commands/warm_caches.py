@@ -0,0 +1,68 @@
+"""
+Comando Django para calentar las familias de keys registradas
+Pensado para correr tras cada despliegue; --stats muestra el hit ratio
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.learning.cache import CacheWarmRegistry, CacheMetrics
+
+
+class Command(BaseCommand):
+    help = 'Calienta en paralelo las keys registradas en CacheWarmRegistry'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--family',
+            action='append',
+            dest='families',
+            help='Familia a calentar (repetible); por defecto todas'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=CacheWarmRegistry.DEFAULT_WORKERS,
+            help='Hilos del pool de calentamiento'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recalcular también las keys que ya están en caché'
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Solo mostrar métricas de aciertos y calentamiento'
+        )
+
+    def handle(self, *args, **options):
+        CacheWarmRegistry.discover()
+
+        unknown = set(options['families'] or []) - set(CacheWarmRegistry.names())
+        if unknown:
+            raise CommandError(f"Familias desconocidas: {', '.join(sorted(unknown))}")
+
+        if options['stats']:
+            for family, row in CacheMetrics.snapshot().items():
+                ratio = '-' if row['hit_ratio'] is None else f"{row['hit_ratio']:.1%}"
+                self.stdout.write(
+                    f"{family:<20} hits={row['hits']:<8} misses={row['misses']:<8} "
+                    f"ratio={ratio:<7} último={row['last_warmed_at'] or '-'} "
+                    f"({row['last_warm_keys'] or 0} keys, {row['last_warm_seconds'] or 0}s)"
+                )
+            return
+
+        report = CacheWarmRegistry.warm(
+            options['families'],
+            workers=options['workers'],
+            force=options['force']
+        )
+        for family, row in report.items():
+            self.stdout.write(
+                f"{family:<20} {row['warmed']}/{row['keys']} calentadas, "
+                f"{row['skipped']} ya en caché, {row['errors']} errores ({row['seconds']}s)"
+            )
+
+        errors = sum(row['errors'] for row in report.values())
+        style = self.style.WARNING if errors else self.style.SUCCESS
+        self.stdout.write(style(f"✅ {sum(row['warmed'] for row in report.values())} keys calentadas"))
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="pathachievement",
+            name="rarity",
+            field=models.CharField(
+                choices=[
+                    ("COMMON", "Común"),
+                    ("RARE", "Raro"),
+                    ("EPIC", "Épico"),
+                    ("LEGENDARY", "Legendario"),
+                ],
+                default="COMMON",
+                max_length=20,
+            ),
+        ),
+        migrations.CreateModel(
+            name="PathResultDistribution",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("total_count", models.IntegerField(default=0)),
+                ("histograms", models.JSONField(default=dict)),
+                ("sums", models.JSONField(default=dict)),
+                ("top_performers", models.JSONField(default=list)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "learning_path",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="result_distribution",
+                        to="learning.learningpath",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Distribución de Resultados de Ruta",
+                "verbose_name_plural": "Distribuciones de Resultados de Rutas",
+                "db_table": "learning_path_result_distributions",
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:40
+
+import uuid
+
+from django.db import migrations, models
+
+
+def populate_enrollment_uuids(apps, schema_editor):
+    UserPathEnrollment = apps.get_model("learning", "UserPathEnrollment")
+    for enrollment in UserPathEnrollment.objects.filter(uuid__isnull=True).only("id"):
+        enrollment.uuid = uuid.uuid4()
+        enrollment.save(update_fields=["uuid"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning", "0002_path_result_distribution"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userpathenrollment",
+            name="uuid",
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_enrollment_uuids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:40
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning", "0003_userpathenrollment_uuid"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userpathenrollment",
+            name="uuid",
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:35
+
+from django.db import migrations, models
+from django.utils.text import slugify
+import django.db.models.deletion
+
+
+def populate_path_tags(apps, schema_editor):
+    LearningPath = apps.get_model("learning", "LearningPath")
+    LearningPathTag = apps.get_model("learning", "LearningPathTag")
+
+    rows = []
+    for path in LearningPath.objects.only("id", "tags", "target_icfes_areas"):
+        seen = set()
+        for kind, values in (("TAG", path.tags), ("AREA", path.target_icfes_areas)):
+            for value in values or []:
+                slug = slugify(str(value or "").replace("_", "-"))[:100]
+                if slug and (kind, slug) not in seen:
+                    seen.add((kind, slug))
+                    rows.append(
+                        LearningPathTag(
+                            learning_path_id=path.id,
+                            kind=kind,
+                            slug=slug,
+                            name=str(value).strip()[:100],
+                        )
+                    )
+    LearningPathTag.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning", "0004_alter_userpathenrollment_uuid"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LearningPathTag",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("TAG", "Tag"), ("AREA", "Área ICFES")],
+                        default="TAG",
+                        max_length=10,
+                    ),
+                ),
+                ("slug", models.SlugField(max_length=100)),
+                ("name", models.CharField(max_length=100)),
+                (
+                    "learning_path",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tag_index",
+                        to="learning.learningpath",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tag de Ruta",
+                "verbose_name_plural": "Tags de Rutas",
+                "db_table": "learning_path_tags",
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "slug", "learning_path"],
+                        name="learning_path_tag_lookup",
+                    )
+                ],
+                "unique_together": {("learning_path", "kind", "slug")},
+            },
+        ),
+        migrations.RunPython(populate_path_tags, migrations.RunPython.noop),
+    ]
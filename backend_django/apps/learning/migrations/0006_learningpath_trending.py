@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning", "0005_learningpathtag"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="learningpath",
+            name="trending_epoch",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="learningpath",
+            name="trending_score",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name="learningpath",
+            index=models.Index(
+                fields=["status", "-trending_score"], name="learning_path_trending"
+            ),
+        ),
+    ]
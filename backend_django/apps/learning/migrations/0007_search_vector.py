@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_CONFIG_SQL = """
+CREATE EXTENSION IF NOT EXISTS unaccent;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'spanish_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION spanish_unaccent (COPY = spanish);
+        ALTER TEXT SEARCH CONFIGURATION spanish_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END
+$$;
+"""
+
+
+def create_search_config(apps, schema_editor):
+    # Configuración de texto en español sin acentos (solo PostgreSQL)
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(SEARCH_CONFIG_SQL)
+
+
+def create_search_index(apps, schema_editor):
+    # GIN solo existe en PostgreSQL; en otros motores la columna queda sin índice
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS "learning_path_search" ON "learning_paths" USING gin ("search_vector")'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute('DROP INDEX IF EXISTS "learning_path_search"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("learning", "0006_learningpath_trending"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="learningpath",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_config, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="learningpath",
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=["search_vector"], name="learning_path_search"
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("learning", "0007_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BossBattleResult",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("uuid", models.UUIDField(editable=False, unique=True)),
+                (
+                    "outcome",
+                    models.CharField(
+                        choices=[
+                            ("VICTORY", "Victoria"),
+                            ("DEFEAT", "Derrota"),
+                            ("TIMEOUT", "Tiempo agotado"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("total_questions", models.IntegerField()),
+                ("answered_questions", models.IntegerField(default=0)),
+                ("correct_answers", models.IntegerField(default=0)),
+                ("score_percentage", models.FloatField(default=0.0)),
+                ("xp_awarded", models.IntegerField(default=0)),
+                ("answers", models.JSONField(default=list)),
+                ("started_at", models.DateTimeField()),
+                ("finished_at", models.DateTimeField()),
+                (
+                    "enrollment",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="boss_battles",
+                        to="learning.userpathenrollment",
+                    ),
+                ),
+                (
+                    "learning_path",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="boss_battles",
+                        to="learning.learningpath",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="boss_battles",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Batalla contra Jefe",
+                "verbose_name_plural": "Batallas contra Jefes",
+                "db_table": "learning_boss_battles",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-finished_at"], name="boss_battle_user_recent"
+                    ),
+                    models.Index(
+                        fields=["learning_path", "outcome"],
+                        name="learning_bo_learnin_3ed81d_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -6,6 +6,8 @@ Sistema de rutas de aprendizaje tipo Duolingo
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.urls import reverse
 from django.utils.text import slugify
 from django.utils import timezone
@@ -107,6 +109,10 @@ class LearningPath(models.Model):
     average_completion_time_hours = models.FloatField(default=0.0)
     average_rating = models.FloatField(default=0.0)
     
+    # Tendencia: actividad con decaimiento exponencial (apps.learning.trending)
+    trending_score = models.FloatField(default=0.0)
+    trending_epoch = models.IntegerField(default=0)
+    
     # Configuración de IA
     ai_recommendations_enabled = models.BooleanField(default=True)
     adaptive_sequencing_enabled = models.BooleanField(default=True)
@@ -117,6 +123,9 @@ class LearningPath(models.Model):
     tags = models.JSONField(default=list)
     metadata = models.JSONField(default=dict)
     
+    # Búsqueda de texto completo (apps.learning.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     # Auditoría
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -131,6 +140,8 @@ class LearningPath(models.Model):
             models.Index(fields=['difficulty_level', 'is_featured']),
             models.Index(fields=['status', 'published_at']),
             models.Index(fields=['is_premium', 'is_featured']),
+            models.Index(fields=['status', '-trending_score'], name='learning_path_trending'),
+            GinIndex(fields=['search_vector'], name='learning_path_search'),
         ]
         verbose_name = 'Ruta de Aprendizaje'
         verbose_name_plural = 'Rutas de Aprendizaje'
@@ -352,6 +363,7 @@ class UserPathEnrollment(models.Model):
     ]
     
     id = models.AutoField(primary_key=True)
+    uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='path_enrollments')
     learning_path = models.ForeignKey(LearningPath, on_delete=models.CASCADE, related_name='enrollments')
     
@@ -656,4 +668,119 @@ class LearningPathReview(models.Model):
         verbose_name_plural = 'Reseñas de Rutas de Aprendizaje'
     
     def __str__(self):
-        return f"{self.user.username} - {self.learning_path.name}: {self.rating}/5" 
\ No newline at end of file
+        return f"{self.user.username} - {self.learning_path.name}: {self.rating}/5" 
+
+class PathResultDistribution(models.Model):
+    """
+    Distribución de resultados de las inscripciones completadas de una ruta.
+    Histogramas de bins fijos por métrica, sumas exactas y un top corto;
+    lo mantiene apps.learning.distributions.
+    """
+    
+    id = models.AutoField(primary_key=True)
+    learning_path = models.OneToOneField(
+        LearningPath,
+        on_delete=models.CASCADE,
+        related_name='result_distribution'
+    )
+    
+    total_count = models.IntegerField(default=0)
+    histograms = models.JSONField(default=dict)   # {metric: [count_bin_0, ...]}
+    sums = models.JSONField(default=dict)         # {metric: suma}
+    top_performers = models.JSONField(default=list)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'learning_path_result_distributions'
+        verbose_name = 'Distribución de Resultados de Ruta'
+        verbose_name_plural = 'Distribuciones de Resultados de Rutas'
+    
+    def __str__(self):
+        return f"Distribución {self.learning_path.name} ({self.total_count})"
+
+
+class LearningPathTag(models.Model):
+    """
+    Índice normalizado de tags y áreas ICFES de las rutas (una fila por
+    ruta y slug); lo sincroniza apps.learning.tagging desde los campos JSON
+    """
+    
+    TAG_KINDS = [
+        ('TAG', 'Tag'),
+        ('AREA', 'Área ICFES'),
+    ]
+    
+    id = models.AutoField(primary_key=True)
+    learning_path = models.ForeignKey(
+        LearningPath,
+        on_delete=models.CASCADE,
+        related_name='tag_index'
+    )
+    kind = models.CharField(max_length=10, choices=TAG_KINDS, default='TAG')
+    slug = models.SlugField(max_length=100)
+    name = models.CharField(max_length=100)
+    
+    class Meta:
+        db_table = 'learning_path_tags'
+        unique_together = ['learning_path', 'kind', 'slug']
+        indexes = [
+            # Índice invertido: (tipo, slug) → rutas
+            models.Index(fields=['kind', 'slug', 'learning_path'], name='learning_path_tag_lookup'),
+        ]
+        verbose_name = 'Tag de Ruta'
+        verbose_name_plural = 'Tags de Rutas'
+    
+    def __str__(self):
+        return f"{self.learning_path.name} - {self.name}"
+
+
+class BossBattleResult(models.Model):
+    """
+    Resultado de una batalla contra el jefe de una ruta. Mientras dura, la
+    batalla vive en memoria (apps.learning.battles); esta fila se escribe
+    una sola vez al terminar, junto con el XP otorgado.
+    """
+    
+    OUTCOMES = [
+        ('VICTORY', 'Victoria'),
+        ('DEFEAT', 'Derrota'),
+        ('TIMEOUT', 'Tiempo agotado'),
+    ]
+    
+    id = models.AutoField(primary_key=True)
+    uuid = models.UUIDField(unique=True, editable=False)  # battle_id
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='boss_battles')
+    learning_path = models.ForeignKey(
+        LearningPath,
+        on_delete=models.CASCADE,
+        related_name='boss_battles'
+    )
+    enrollment = models.ForeignKey(
+        UserPathEnrollment,
+        on_delete=models.CASCADE,
+        related_name='boss_battles'
+    )
+    
+    outcome = models.CharField(max_length=10, choices=OUTCOMES)
+    total_questions = models.IntegerField()
+    answered_questions = models.IntegerField(default=0)
+    correct_answers = models.IntegerField(default=0)
+    score_percentage = models.FloatField(default=0.0)
+    xp_awarded = models.IntegerField(default=0)
+    answers = models.JSONField(default=list)  # [{question_id, choice, correct, elapsed_seconds}]
+    
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'learning_boss_battles'
+        indexes = [
+            models.Index(fields=['user', '-finished_at'], name='boss_battle_user_recent'),
+            models.Index(fields=['learning_path', 'outcome']),
+        ]
+        verbose_name = 'Batalla contra Jefe'
+        verbose_name_plural = 'Batallas contra Jefes'
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.learning_path.name} ({self.get_outcome_display()})"
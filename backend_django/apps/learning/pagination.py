@@ -2,9 +2,219 @@
 Paginación optimizada para Learning Paths
 """
 
-from rest_framework.pagination import PageNumberPagination, CursorPagination
-from rest_framework.response import Response
+import base64
+import json
 from collections import OrderedDict
+from datetime import date, datetime
+from functools import reduce
+from operator import or_
+from uuid import UUID
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# Por debajo de este estimado se cuenta exacto (COUNT(*) es barato)
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimated_count(queryset):
+    """
+    Total aproximado de filas del queryset según el planificador de
+    PostgreSQL (EXPLAIN, sin ejecutar la consulta). En otros motores
+    se usa COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator de Django (admin) que usa el estimado del planificador en
+    tablas grandes y el conteo exacto en las pequeñas
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate < EXACT_COUNT_THRESHOLD:
+            return self.object_list.count()
+        return estimate
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por llave compuesta (keyset / seek method).
+
+    Ordena por una llave estable y única, por defecto (created_at, id), y
+    cada página filtra con (created_at, id) < (último visto) en lugar de
+    OFFSET, de modo que la página 1000 cuesta lo mismo que la primera si hay
+    un índice que cubra el orden. El cursor es opaco (base64 de los valores
+    de la llave y la dirección). Con ?include_total=1 se agrega un total
+    aproximado tomado de las estadísticas del planificador.
+    """
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    include_total_query_param = 'include_total'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # Cursor
+
+    def decode_cursor(self, request, model):
+        """
+        Valores de la llave y dirección del cursor, convertidos con el
+        to_python de cada campo; un cursor alterado es 404
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values, reverse = payload['v'], bool(payload.get('r', False))
+        except (ValueError, KeyError, TypeError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        converted = []
+        for field_name, value in zip(self.ordering, values):
+            field = model._meta.get_field(field_name.lstrip('-'))
+            try:
+                value = field.to_python(value)
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            converted.append(value)
+        return converted, reverse
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def _serialize_value(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, UUID):
+            return str(value)
+        return value
+
+    def get_key(self, instance):
+        return [
+            self._serialize_value(getattr(instance, field.lstrip('-')))
+            for field in self.ordering
+        ]
+
+    # Consulta
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return list(self.ordering)
+        return [field[1:] if field.startswith('-') else f"-{field}" for field in self.ordering]
+
+    def keyset_filter(self, values, reverse):
+        """
+        Condición "después de `values`" en el orden pedido:
+        (a < va) OR (a = va AND b < vb) OR ... según la dirección de cada campo
+        """
+        conditions = []
+        for position, field in enumerate(self.get_ordering(reverse)):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): values[index]
+                for index, previous in enumerate(self.ordering[:position])
+            }
+            conditions.append(Q(**equal, **{f"{name}__{lookup}": values[position]}))
+        return reduce(or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size_value = self.get_page_size(request)
+        values, reverse = self.decode_cursor(request, queryset.model)
+        self.has_cursor = values is not None
+        self.reverse = reverse
+
+        self.total = None
+        if request.query_params.get(self.include_total_query_param) in ('1', 'true'):
+            self.total = estimated_count(queryset)
+
+        queryset = queryset.order_by(*self.get_ordering(reverse))
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(values, reverse))
+
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        return rows
+
+    # Respuesta
+
+    def get_next_link(self):
+        # Hacia atrás siempre hay siguiente (venimos de ahí)
+        if not self.page or not (self.reverse or self.has_more):
+            return None
+        return self.encode_cursor(self.get_key(self.page[-1]), False)
+
+    def get_previous_link(self):
+        # Hacia atrás solo hay anterior si quedaron filas sin traer
+        if not self.page or not (self.has_more if self.reverse else self.has_cursor):
+            return None
+        return self.encode_cursor(self.get_key(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.total is not None:
+            response_data['count_estimate'] = self.total
+        response_data['results'] = data
+        return Response(response_data)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count_estimate': {'type': 'integer'},
+                'results': schema,
+            },
+        }
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -45,23 +255,13 @@ class SmallResultsSetPagination(PageNumberPagination):
     max_page_size = 25
 
 
-class OptimizedCursorPagination(CursorPagination):
+class OptimizedCursorPagination(KeysetPagination):
     """
     Paginación con cursor para performance en listas grandes
     Ideal para feeds de actividad, notificaciones, etc.
     """
     page_size = 25
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-    ordering = '-created_at'  # Campo requerido para cursor
-    cursor_query_param = 'cursor'
-    
-    def get_paginated_response(self, data):
-        return Response(OrderedDict([
-            ('next', self.get_next_link()),
-            ('previous', self.get_previous_link()),
-            ('results', data)
-        ]))
+    ordering = ('-created_at', '-id')
 
 
 class LearningPathPagination(PageNumberPagination):
@@ -135,7 +335,6 @@ class TimelinePagination(OptimizedCursorPagination):
     Paginación para timeline/feed con timestamps
     """
     page_size = 20
-    ordering = '-created_at'
     
     def get_paginated_response(self, data):
         response = super().get_paginated_response(data)
@@ -74,17 +74,10 @@ class CanStartBattle(permissions.BasePermission):
         if not enrollment:
             return False
             
-        # Verificar que no tenga una batalla activa
-        if hasattr(enrollment, 'active_battle_session'):
-            return False
-            
-        # Verificar cooldown de batallas (6 horas)
-        if enrollment.last_battle_at:
-            cooldown = timezone.now() - enrollment.last_battle_at
-            if cooldown < timedelta(hours=6):
-                return False
-                
-        return True
+        # Cooldown de batallas (6 horas desde el inicio de la última);
+        # cubre también la batalla en curso
+        from .cache import LearningCacheManager
+        return not LearningCacheManager.get_battle_cooldown(request.user.id, obj.id)
 
 
 class CanClaimRewards(permissions.BasePermission):
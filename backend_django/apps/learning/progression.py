@@ -0,0 +1,176 @@
+"""
+Resolución de la siguiente lección de un usuario
+
+Una sola query con ranking por ventana (unidad, lección) encuentra la
+primera lección no completada de cada inscripción activa. El resultado se
+guarda como "resume pointer" por usuario, que StartLessonView y
+CompleteLessonView actualizan en el momento en que cambia.
+"""
+
+from django.core.cache import cache
+from django.db.models import Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
+
+from .cache import CacheKeys, CacheTimeouts
+
+
+DONE_STATUSES = ('COMPLETED', 'PERFECT')
+
+LESSON_FIELDS = ('id', 'uuid', 'title', 'lesson_type', 'order', 'xp_reward', 'estimated_duration_minutes')
+
+
+def _pointer_entry(row):
+    """Forma compacta y serializable de una fila del resolver"""
+    return {
+        'lesson': {
+            'id': row['id'],
+            'uuid': str(row['uuid']),
+            'title': row['title'],
+            'lesson_type': row['lesson_type'],
+            'order': row['order'],
+            'xp_reward': row['xp_reward'],
+            'estimated_duration_minutes': row['estimated_duration_minutes'],
+            'unit_title': row['unit_title'],
+            'unit_order': row['unit_order'],
+        },
+        'enrollment': {
+            'id': row['enrollment_id'],
+            'learning_path_slug': row['path_slug'],
+            'learning_path_name': row['path_name'],
+            'progress_percentage': row['progress'],
+        },
+    }
+
+
+class NextLessonResolver:
+    """
+    Siguiente lección pendiente por inscripción activa y resume pointer
+    """
+
+    @staticmethod
+    def _pending_lessons(user, enrollment_id=None):
+        """
+        Lecciones activas no completadas de las inscripciones activas del
+        usuario, con la posición de cada una dentro de su inscripción
+        """
+        from .models import LearningPathLesson, UserLessonProgress
+
+        enrollment_filter = {
+            'path_unit__learning_path__enrollments__user': user,
+            'path_unit__learning_path__enrollments__status': 'ACTIVE',
+        }
+        if enrollment_id is not None:
+            enrollment_filter['path_unit__learning_path__enrollments__id'] = enrollment_id
+
+        completed = UserLessonProgress.objects.filter(
+            user=user,
+            path_lesson=OuterRef('pk'),
+            status__in=DONE_STATUSES
+        )
+
+        return LearningPathLesson.objects.filter(
+            is_active=True,
+            path_unit__is_active=True,
+            **enrollment_filter
+        ).exclude(
+            Exists(completed)
+        ).values(
+            *LESSON_FIELDS,
+            unit_title=F('path_unit__title'),
+            unit_order=F('path_unit__order'),
+            path_slug=F('path_unit__learning_path__slug'),
+            path_name=F('path_unit__learning_path__name'),
+            enrollment_id=F('path_unit__learning_path__enrollments__id'),
+            progress=F('path_unit__learning_path__enrollments__progress_percentage'),
+            last_activity=F('path_unit__learning_path__enrollments__last_activity_date'),
+        ).annotate(
+            position=Window(
+                expression=RowNumber(),
+                partition_by=[F('enrollment_id')],
+                order_by=[F('unit_order').asc(), F('order').asc()]
+            )
+        ).filter(position=1)
+
+    @classmethod
+    def resolve_all(cls, user):
+        """
+        Siguiente lección de cada inscripción activa (una query),
+        de la inscripción con actividad más reciente a la más antigua
+        """
+        rows = cls._pending_lessons(user).order_by(
+            F('last_activity').desc(nulls_last=True), 'enrollment_id'
+        )
+        return [_pointer_entry(row) for row in rows]
+
+    @classmethod
+    def resolve_for_enrollment(cls, user, enrollment_id):
+        """Siguiente lección de una inscripción, o None si no quedan pendientes"""
+        row = cls._pending_lessons(user, enrollment_id).first()
+        return _pointer_entry(row) if row else None
+
+    @staticmethod
+    def get_pointer(user_id):
+        """Resume pointer cacheado; None si no hay, {'lesson': None} si no quedan pendientes"""
+        return cache.get(CacheKeys.RESUME_POINTER.format(user_id=user_id))
+
+    @staticmethod
+    def set_pointer(user_id, entry):
+        cache.set(
+            CacheKeys.RESUME_POINTER.format(user_id=user_id),
+            entry or {'lesson': None, 'enrollment': None},
+            CacheTimeouts.DAY
+        )
+
+    @staticmethod
+    def invalidate_pointer(user_id):
+        cache.delete(CacheKeys.RESUME_POINTER.format(user_id=user_id))
+
+    @classmethod
+    def next_for_user(cls, user):
+        """Siguiente lección del usuario: resume pointer o resolución en una query"""
+        pointer = cls.get_pointer(user.id)
+        if pointer is None:
+            entries = cls.resolve_all(user)
+            pointer = entries[0] if entries else {'lesson': None, 'enrollment': None}
+            cls.set_pointer(user.id, pointer)
+        return pointer
+
+    @classmethod
+    def lesson_started(cls, user, lesson, enrollment):
+        """El usuario retoma desde la lección que acaba de iniciar"""
+        cls.set_pointer(user.id, {
+            'lesson': {
+                'id': lesson.id,
+                'uuid': str(lesson.uuid),
+                'title': lesson.title,
+                'lesson_type': lesson.lesson_type,
+                'order': lesson.order,
+                'xp_reward': lesson.xp_reward,
+                'estimated_duration_minutes': lesson.estimated_duration_minutes,
+                'unit_title': lesson.path_unit.title,
+                'unit_order': lesson.path_unit.order,
+            },
+            'enrollment': {
+                'id': enrollment.id,
+                'learning_path_slug': enrollment.learning_path.slug,
+                'learning_path_name': enrollment.learning_path.name,
+                'progress_percentage': enrollment.progress_percentage,
+            },
+        })
+
+    @classmethod
+    def lesson_finished(cls, user, lesson_progress):
+        """
+        Avanza el pointer tras un intento: si la lección quedó completada pasa
+        a la siguiente de la misma ruta (o de otra inscripción activa);
+        si necesita repaso, el pointer se queda en ella.
+        """
+        if lesson_progress.status not in DONE_STATUSES:
+            cls.lesson_started(user, lesson_progress.path_lesson, lesson_progress.enrollment)
+            return
+
+        entry = cls.resolve_for_enrollment(user, lesson_progress.enrollment_id)
+        if entry is None:
+            entries = cls.resolve_all(user)
+            entry = entries[0] if entries else None
+        cls.set_pointer(user.id, entry)
@@ -0,0 +1,197 @@
+"""
+Motor de rate limiting compartido para los throttles de Learning Paths
+
+Ventana deslizante (sliding-window log) evaluada en una sola operación
+atómica: un script Lua en Redis, o un backend en proceso con lock cuando el
+caché no es Redis (desarrollo y tests).
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+
+from .cache import get_redis_client
+
+
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local member = ARGV[4]
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+local allowed = 0
+
+if count < limit then
+    redis.call('ZADD', key, now, member)
+    redis.call('PEXPIRE', key, window)
+    count = count + 1
+    allowed = 1
+end
+
+local reset = window
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+if oldest[2] then
+    reset = tonumber(oldest[2]) + window - now
+end
+
+return {allowed, limit - count, reset}
+"""
+
+
+class RateLimitResult:
+    """Resultado de consumir una unidad de cuota"""
+
+    __slots__ = ('allowed', 'limit', 'remaining', 'reset_seconds')
+
+    def __init__(self, allowed, limit, remaining, reset_seconds):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = max(0, remaining)
+        self.reset_seconds = max(0, reset_seconds)
+
+    @property
+    def retry_after(self):
+        """Segundos hasta que se libere cuota (solo si fue rechazado)"""
+        return 0 if self.allowed else self.reset_seconds
+
+
+class RedisSlidingWindowBackend:
+    """Ventana deslizante sobre un sorted set, atómica vía script Lua"""
+
+    def __init__(self, client):
+        self.client = client
+        self.script = client.register_script(SLIDING_WINDOW_LUA)
+
+    def hit(self, key, limit, window, now=None):
+        now_ms = int((now if now is not None else time.time()) * 1000)
+        member = f"{now_ms}-{uuid.uuid4().hex[:8]}"
+
+        allowed, remaining, reset_ms = self.script(
+            keys=[key],
+            args=[now_ms, window * 1000, limit, member]
+        )
+        return RateLimitResult(bool(allowed), limit, int(remaining), int(reset_ms) / 1000.0)
+
+
+class LocalSlidingWindowBackend:
+    """
+    Ventana deslizante en memoria del proceso, atómica vía lock.
+    Las keys sin entradas vigentes se eliminan (como el PEXPIRE de Redis):
+    al quedar vacías tras podarlas y en un barrido periódico de las que no
+    se vuelven a consultar.
+    """
+
+    SWEEP_INTERVAL = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logs = {}
+        self._last_sweep = 0.0
+
+    @staticmethod
+    def _prune(log, window, now):
+        while log and log[0] <= now - window:
+            log.popleft()
+
+    def _sweep(self, now):
+        """Elimina las keys cuyo log quedó vacío (llamar con el lock tomado)"""
+        for key, (log, window) in list(self._logs.items()):
+            self._prune(log, window, now)
+            if not log:
+                del self._logs[key]
+        self._last_sweep = now
+
+    def hit(self, key, limit, window, now=None):
+        now = now if now is not None else time.time()
+
+        with self._lock:
+            if now - self._last_sweep >= self.SWEEP_INTERVAL:
+                self._sweep(now)
+
+            log, _window = self._logs.get(key) or (deque(), window)
+            self._prune(log, window, now)
+
+            allowed = len(log) < limit
+            if allowed:
+                log.append(now)
+
+            if log:
+                self._logs[key] = (log, window)
+            else:
+                self._logs.pop(key, None)
+
+            reset = (log[0] + window - now) if log else window
+            return RateLimitResult(allowed, limit, limit - len(log), reset)
+
+    def __len__(self):
+        return len(self._logs)
+
+    def clear(self):
+        with self._lock:
+            self._logs.clear()
+
+
+class RateLimiter:
+    """
+    Punto de entrada único para consumir cuota: elige Redis si está
+    configurado como caché y, si no, el backend en proceso.
+    """
+
+    KEY_PREFIX = "ratelimit"
+
+    _local_backend = LocalSlidingWindowBackend()
+    _redis_backend = None
+
+    @classmethod
+    def get_backend(cls):
+        client = get_redis_client()
+        if client is None:
+            return cls._local_backend
+
+        if cls._redis_backend is None or cls._redis_backend.client is not client:
+            cls._redis_backend = RedisSlidingWindowBackend(client)
+        return cls._redis_backend
+
+    @classmethod
+    def hit(cls, key, limit, window, now=None):
+        """Consume una unidad de cuota para la key en la ventana dada"""
+        return cls.get_backend().hit(f"{cls.KEY_PREFIX}:{key}", limit, window, now=now)
+
+    @classmethod
+    def reset_local(cls):
+        """Limpia el backend en proceso (tests)"""
+        cls._local_backend.clear()
+
+
+def attach_rate_limit_headers(request, result):
+    """
+    Registra el resultado en el HttpRequest subyacente para que
+    RateLimitHeadersMiddleware exponga la cuota más restrictiva
+    """
+    http_request = getattr(request, '_request', request)
+    current = getattr(http_request, 'rate_limit', None)
+
+    if current is None or result.remaining < current.remaining:
+        http_request.rate_limit = result
+
+
+class RateLimitHeadersMiddleware:
+    """Expone X-RateLimit-Limit/Remaining/Reset en las respuestas limitadas"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        result = getattr(request, 'rate_limit', None)
+        if result is not None:
+            response['X-RateLimit-Limit'] = str(result.limit)
+            response['X-RateLimit-Remaining'] = str(result.remaining)
+            response['X-RateLimit-Reset'] = str(int(round(result.reset_seconds)))
+
+        return response
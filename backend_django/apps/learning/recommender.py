@@ -0,0 +1,326 @@
+"""
+Recomendador vectorizado de Learning Paths
+
+Mantiene en memoria una matriz de features (NumPy) con todas las rutas
+activas: nivel requerido, dificultad, rating promedio, popularidad y áreas
+ICFES objetivo. Cada cambio en LearningPath se anota en el caché como una
+marca numerada (una key por número de secuencia) y cada proceso recarga de
+forma incremental las rutas de las marcas que aún no aplicó; el puntaje de
+todos los candidatos de un usuario se calcula en una sola pasada
+vectorizada.
+"""
+
+import threading
+import time
+
+import numpy as np
+from django.core.cache import cache
+
+from .cache import CacheTimeouts
+
+
+DIFFICULTY_RANKS = {
+    'BEGINNER': 1,
+    'INTERMEDIATE': 2,
+    'ADVANCED': 3,
+    'EXPERT': 4,
+    'ADAPTIVE': 2,
+}
+
+ADVANCED_HERO_CLASSES = ('A', 'S', 'S+')
+BEGINNER_HERO_CLASSES = ('F', 'E', 'D')
+
+# Columnas numéricas fijas; las áreas ICFES se agregan como one-hot al final
+COL_LEVEL = 0
+COL_DIFFICULTY = 1
+COL_RATING = 2
+COL_POPULARITY = 3
+NUMERIC_COLUMNS = 4
+
+# Marcas de rutas modificadas compartidas entre procesos: la secuencia se
+# incrementa atómicamente y cada marca vive en su propia key
+CHANGE_SEQ_KEY = "recommender_change_seq"
+DIRTY_PATH_KEY = "recommender_dirty_path_{seq}"
+DIRTY_PATH_TIMEOUT = CacheTimeouts.DAY
+MAX_DIRTY_PATHS = 500
+
+# Reconstrucción completa periódica aunque no haya marcas
+FULL_REBUILD_SECONDS = CacheTimeouts.HOUR
+
+
+class PathFeatureMatrix:
+    """Matriz de features de las rutas activas y sus índices"""
+
+    def __init__(self, rows, areas):
+        self.areas = sorted(areas)
+        self.area_index = {area: i for i, area in enumerate(self.areas)}
+
+        self.path_ids = np.array([row['id'] for row in rows], dtype=np.int64)
+        self.row_index = {int(path_id): i for i, path_id in enumerate(self.path_ids)}
+
+        self.features = np.zeros(
+            (len(rows), NUMERIC_COLUMNS + len(self.areas)), dtype=np.float32
+        )
+        for i, row in enumerate(rows):
+            self._fill_row(i, row)
+
+    def _fill_row(self, i, row):
+        self.features[i, :] = 0
+        self.features[i, COL_LEVEL] = row['required_level'] or 1
+        self.features[i, COL_DIFFICULTY] = DIFFICULTY_RANKS.get(row['difficulty_level'], 2)
+        self.features[i, COL_RATING] = row['average_rating'] or 0
+        self.features[i, COL_POPULARITY] = row['total_enrollments'] or 0
+
+        for area in row['target_icfes_areas'] or ():
+            column = self.area_index.get(area)
+            if column is not None:
+                self.features[i, NUMERIC_COLUMNS + column] = 1
+
+    def can_patch(self, rows):
+        """Las filas nuevas caben sin agregar columnas de área"""
+        return all(
+            area in self.area_index
+            for row in rows
+            for area in (row['target_icfes_areas'] or ())
+        )
+
+    def patch(self, rows, removed_ids):
+        """Actualiza, agrega y elimina filas sin reconstruir la matriz"""
+        keep = np.ones(len(self.path_ids), dtype=bool)
+        for path_id in removed_ids:
+            i = self.row_index.get(path_id)
+            if i is not None:
+                keep[i] = False
+
+        new_rows = []
+        for row in rows:
+            i = self.row_index.get(row['id'])
+            if i is None:
+                new_rows.append(row)
+            else:
+                keep[i] = True
+                self._fill_row(i, row)
+
+        self.path_ids = self.path_ids[keep]
+        self.features = self.features[keep]
+
+        if new_rows:
+            start = len(self.path_ids)
+            self.path_ids = np.concatenate([
+                self.path_ids,
+                np.array([row['id'] for row in new_rows], dtype=np.int64)
+            ])
+            self.features = np.vstack([
+                self.features,
+                np.zeros((len(new_rows), self.features.shape[1]), dtype=np.float32)
+            ])
+            for offset, row in enumerate(new_rows):
+                self._fill_row(start + offset, row)
+
+        self.row_index = {int(path_id): i for i, path_id in enumerate(self.path_ids)}
+
+    def area_vector(self, areas):
+        vector = np.zeros(len(self.areas), dtype=np.float32)
+        for area in areas:
+            column = self.area_index.get(area)
+            if column is not None:
+                vector[column] = 1
+        return vector
+
+
+class PathRecommender:
+    """
+    Motor de recomendación compartido por el endpoint `recommended`,
+    RecommendedPathsView y el filtro `recommended_for_user`
+    """
+
+    _lock = threading.Lock()
+    _matrix = None
+    _built_at = 0.0
+    _applied_seq = 0
+
+    FEATURE_FIELDS = (
+        'id', 'required_level', 'difficulty_level', 'average_rating',
+        'total_enrollments', 'target_icfes_areas'
+    )
+
+    @staticmethod
+    def _active_rows(path_ids=None):
+        from .models import LearningPath
+
+        queryset = LearningPath.objects.filter(status='ACTIVE')
+        if path_ids is not None:
+            queryset = queryset.filter(id__in=path_ids)
+        return list(queryset.values(*PathRecommender.FEATURE_FIELDS))
+
+    @classmethod
+    def mark_dirty(cls, path_id):
+        """Marca una ruta para recarga incremental en todos los procesos"""
+        cache.add(CHANGE_SEQ_KEY, 0, None)
+        seq = cache.incr(CHANGE_SEQ_KEY)
+        cache.set(DIRTY_PATH_KEY.format(seq=seq), path_id, DIRTY_PATH_TIMEOUT)
+
+    @classmethod
+    def _rebuild(cls):
+        # La secuencia se lee antes que las filas: una marca posterior se vuelve a aplicar
+        applied_seq = cache.get(CHANGE_SEQ_KEY) or 0
+        rows = cls._active_rows()
+        areas = {area for row in rows for area in (row['target_icfes_areas'] or ())}
+
+        cls._matrix = PathFeatureMatrix(rows, areas)
+        cls._built_at = time.monotonic()
+        cls._applied_seq = applied_seq
+
+    @classmethod
+    def _pending(cls, seq):
+        """Rutas de las marcas (aplicada, seq]; None si falta alguna"""
+        keys = [DIRTY_PATH_KEY.format(seq=number) for number in range(cls._applied_seq + 1, seq + 1)]
+        marks = cache.get_many(keys)
+        if len(marks) < len(keys):
+            # Marca expirada o aún no escrita
+            return None
+        return list(set(marks.values()))
+
+    @classmethod
+    def get_matrix(cls):
+        """Matriz vigente: reconstruye o aplica las filas sucias pendientes"""
+        with cls._lock:
+            expired = time.monotonic() - cls._built_at > FULL_REBUILD_SECONDS
+            if cls._matrix is None or expired:
+                cls._rebuild()
+                return cls._matrix
+
+            seq = cache.get(CHANGE_SEQ_KEY) or 0
+            if seq <= cls._applied_seq:
+                return cls._matrix
+
+            # Demasiados cambios o marcas perdidas: reconstrucción completa
+            pending = cls._pending(seq) if seq - cls._applied_seq <= MAX_DIRTY_PATHS else None
+            if pending is None:
+                cls._rebuild()
+                return cls._matrix
+
+            rows = cls._active_rows(pending)
+            if cls._matrix.can_patch(rows):
+                active_ids = {row['id'] for row in rows}
+                cls._matrix.patch(rows, [p for p in pending if p not in active_ids])
+                cls._applied_seq = seq
+            else:
+                cls._rebuild()
+
+            return cls._matrix
+
+    @classmethod
+    def reset(cls):
+        """Descarta la matriz en memoria (tests)"""
+        with cls._lock:
+            cls._matrix = None
+            cls._built_at = 0.0
+
+    @staticmethod
+    def _user_context(user):
+        from .models import UserPathEnrollment
+
+        enrollments = list(
+            UserPathEnrollment.objects.filter(user=user).values_list(
+                'learning_path_id', 'learning_path__target_icfes_areas'
+            )
+        )
+        enrolled_ids = [path_id for path_id, _areas in enrollments]
+        areas = {area for _path_id, path_areas in enrollments for area in (path_areas or ())}
+        return enrolled_ids, areas
+
+    @classmethod
+    def score(cls, user):
+        """
+        Puntajes de todas las rutas para el usuario.
+        Retorna (matrix, scores, level_diff, hero_bonus, candidate_mask).
+        """
+        matrix = cls.get_matrix()
+        features = matrix.features
+
+        user_level = getattr(user, 'level', 1)
+        hero_class = getattr(user, 'hero_class', 'F')
+        enrolled_ids, user_areas = cls._user_context(user)
+
+        level = features[:, COL_LEVEL]
+        difficulty = features[:, COL_DIFFICULTY]
+
+        candidates = (level <= user_level + 2) & ~np.isin(matrix.path_ids, enrolled_ids)
+
+        # Factor 1: Nivel apropiado (40 puntos)
+        level_diff = np.abs(level - user_level)
+        scores = np.where(level_diff <= 1, 40.0, np.where(level_diff <= 2, 30.0, 10.0))
+
+        # Factor 2: Rating de la ruta (30 puntos)
+        scores += features[:, COL_RATING] / 5.0 * 30
+
+        # Factor 3: Popularidad (20 puntos)
+        scores += np.minimum(features[:, COL_POPULARITY] / 100.0, 1.0) * 20
+
+        # Factor 4: Dificultad según hero class (10 puntos)
+        if hero_class in ADVANCED_HERO_CLASSES:
+            hero_bonus = difficulty >= DIFFICULTY_RANKS['ADVANCED']
+        elif hero_class in BEGINNER_HERO_CLASSES:
+            hero_bonus = difficulty <= DIFFICULTY_RANKS['INTERMEDIATE']
+        else:
+            hero_bonus = np.zeros(len(scores), dtype=bool)
+        scores += hero_bonus * 10.0
+
+        # Factor 5: Afinidad con las áreas de las rutas del usuario (10 puntos)
+        user_vector = matrix.area_vector(user_areas)
+        if user_vector.any():
+            area_features = features[:, NUMERIC_COLUMNS:]
+            path_area_counts = np.maximum(area_features.sum(axis=1), 1)
+            scores += (area_features @ user_vector) / path_area_counts * 10
+
+        return matrix, scores, level_diff, hero_bonus, candidates
+
+    @classmethod
+    def recommend_ids(cls, user, limit=10):
+        """IDs de las `limit` mejores rutas candidatas, en orden de puntaje"""
+        return [item['path_id'] for item in cls.recommend(user, limit=limit)]
+
+    @classmethod
+    def recommend(cls, user, limit=10):
+        """
+        Top `limit` rutas para el usuario: [{'path_id', 'score', 'reason'}]
+        """
+        matrix, scores, level_diff, hero_bonus, candidates = cls.score(user)
+
+        candidate_rows = np.flatnonzero(candidates)
+        if not len(candidate_rows) or limit <= 0:
+            return []
+
+        candidate_scores = scores[candidate_rows]
+        if len(candidate_rows) > limit:
+            top = np.argpartition(-candidate_scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(candidate_rows))
+        top = top[np.argsort(-candidate_scores[top], kind='stable')]
+
+        hero_class = getattr(user, 'hero_class', 'F')
+        recommendations = []
+        for position in top:
+            row = candidate_rows[position]
+
+            if level_diff[row] <= 1:
+                reason = "Perfecto para tu nivel actual"
+            elif level_diff[row] <= 2:
+                reason = "Ligeramente desafiante para tu nivel"
+            else:
+                reason = "Desafío avanzado"
+
+            if hero_bonus[row]:
+                if hero_class in ADVANCED_HERO_CLASSES:
+                    reason += " (recomendado para heroes avanzados)"
+                else:
+                    reason += " (ideal para principiantes)"
+
+            recommendations.append({
+                'path_id': int(matrix.path_ids[row]),
+                'score': round(float(scores[row]), 2),
+                'reason': reason
+            })
+
+        return recommendations
@@ -0,0 +1,280 @@
+"""
+Cola de renderizado de reportes PDF de simulacros
+
+Los reportes se renderizan fuera del request (Celery, o un thread pool en
+proceso cuando no hay broker) y se guardan en MEDIA_ROOT con nombre
+{uuid de la inscripción}/{versión de progreso}.pdf. Mientras el progreso no
+cambie, el mismo archivo se sirve como estático sin volver a renderizar.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.db.models import Count, Max, Q
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from .cache import CacheTimeouts
+
+
+logger = logging.getLogger(__name__)
+
+REPORTS_DIR = "reports/simulacros"
+REPORT_JOB_KEY = "report_job_{enrollment_uuid}_{version}"
+
+STATUS_PENDING = 'PENDING'
+STATUS_READY = 'READY'
+STATUS_FAILED = 'FAILED'
+STATUS_MISSING = 'MISSING'
+
+# Un job pendiente que no termina en este tiempo se puede reencolar
+JOB_TIMEOUT = CacheTimeouts.MINUTE * 10
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='report-render')
+    return _executor
+
+
+def report_version(enrollment):
+    """
+    Versión del progreso reflejado en el reporte: cambia cuando cambia
+    la inscripción o cualquiera de sus lecciones
+    """
+    from .models import UserLessonProgress
+
+    lessons = UserLessonProgress.objects.filter(enrollment=enrollment).aggregate(
+        count=Count('id'),
+        last_update=Max('updated_at')
+    )
+
+    fingerprint = "|".join(str(part) for part in (
+        enrollment.status,
+        enrollment.progress_percentage,
+        enrollment.total_xp_earned,
+        enrollment.total_time_minutes,
+        enrollment.current_streak_days,
+        enrollment.completed_at,
+        lessons['count'],
+        lessons['last_update'],
+    ))
+    return hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
+
+
+def report_relative_path(enrollment_uuid, version):
+    return f"{REPORTS_DIR}/{enrollment_uuid}/{version}.pdf"
+
+
+def report_absolute_path(enrollment_uuid, version):
+    return os.path.join(settings.MEDIA_ROOT, report_relative_path(enrollment_uuid, version))
+
+
+def report_url(enrollment_uuid, version):
+    return f"{settings.MEDIA_URL}{report_relative_path(enrollment_uuid, version)}"
+
+
+def _unit_progress(enrollment):
+    """Progreso por unidad en una sola query agregada"""
+    from .models import LearningPathUnit
+
+    units = LearningPathUnit.objects.filter(
+        learning_path_id=enrollment.learning_path_id
+    ).order_by('order').annotate(
+        total_lessons=Count('lessons', distinct=True),
+        completed_lessons=Count(
+            'lessons__userlessonprogress',
+            filter=Q(
+                lessons__userlessonprogress__enrollment=enrollment,
+                lessons__userlessonprogress__status__in=['COMPLETED', 'PERFECT']
+            ),
+            distinct=True
+        )
+    ).values('title', 'total_lessons', 'completed_lessons')
+
+    return [
+        {
+            'unit_title': unit['title'],
+            'progress_percentage': (
+                unit['completed_lessons'] / unit['total_lessons'] * 100
+                if unit['total_lessons'] else 0
+            )
+        }
+        for unit in units
+    ]
+
+
+def render_report_pdf(enrollment):
+    """Renderiza el reporte detallado de un simulacro y retorna los bytes del PDF"""
+    buffer = BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    # Título del reporte
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(100, height - 100, "Reporte de Simulacro ICFES")
+    p.drawString(100, height - 120, f"Usuario: {enrollment.user.get_full_name() or enrollment.user.username}")
+    p.drawString(100, height - 140, f"Path: {enrollment.learning_path.name}")
+
+    # Estadísticas generales
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(100, height - 180, "Estadísticas Generales")
+
+    p.setFont("Helvetica", 12)
+    y_position = height - 200
+
+    stats = [
+        f"Progreso: {enrollment.progress_percentage:.1f}%",
+        f"XP Ganado: {enrollment.total_xp_earned}",
+        f"Tiempo Total: {enrollment.total_time_minutes / 60:.1f} horas",
+        f"Racha Actual: {enrollment.current_streak_days} días",
+        f"Iniciado: {enrollment.enrolled_at.strftime('%d/%m/%Y')}",
+    ]
+
+    if enrollment.completed_at:
+        stats.append(f"Completado: {enrollment.completed_at.strftime('%d/%m/%Y')}")
+
+    for stat in stats:
+        p.drawString(120, y_position, stat)
+        y_position -= 20
+
+    # Progreso por unidades
+    p.setFont("Helvetica-Bold", 14)
+    p.drawString(100, y_position - 20, "Progreso por Unidades")
+    y_position -= 50
+
+    p.setFont("Helvetica", 10)
+    for unit_data in _unit_progress(enrollment):
+        unit_text = f"• {unit_data['unit_title']}: {unit_data['progress_percentage']:.1f}%"
+        p.drawString(120, y_position, unit_text)
+        y_position -= 15
+
+        if y_position < 100:  # Nueva página si es necesario
+            p.showPage()
+            p.setFont("Helvetica", 10)
+            y_position = height - 100
+
+    # Finalizar PDF
+    p.showPage()
+    p.save()
+
+    return buffer.getvalue()
+
+
+def render_report_to_disk(enrollment_id, version):
+    """
+    Renderiza y guarda el PDF de la versión dada. Escribe en un archivo
+    temporal y lo renombra para que nunca se sirva un PDF a medio escribir.
+    Elimina las versiones anteriores del mismo reporte.
+    """
+    from .models import UserPathEnrollment
+
+    enrollment = UserPathEnrollment.objects.select_related(
+        'user', 'learning_path'
+    ).get(pk=enrollment_id)
+    job_key = REPORT_JOB_KEY.format(enrollment_uuid=enrollment.uuid, version=version)
+
+    try:
+        pdf = render_report_pdf(enrollment)
+
+        target = report_absolute_path(enrollment.uuid, version)
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(pdf)
+        os.replace(tmp_path, target)
+
+        for name in os.listdir(directory):
+            if name.endswith('.pdf') and name != os.path.basename(target):
+                os.remove(os.path.join(directory, name))
+    except Exception:
+        logger.exception("Error renderizando reporte de la inscripción %s", enrollment_id)
+        cache.set(job_key, STATUS_FAILED, JOB_TIMEOUT)
+        raise
+
+    cache.set(job_key, STATUS_READY, JOB_TIMEOUT)
+    return target
+
+
+def _render_in_thread(enrollment_id, version):
+    close_old_connections()
+    try:
+        render_report_to_disk(enrollment_id, version)
+    except Exception:
+        pass  # Ya registrado; el estado FAILED permite reintentar
+    finally:
+        # Los threads del pool no pasan por request_finished
+        connection.close()
+
+
+class ReportQueue:
+    """
+    Encola y consulta reportes PDF de simulacros
+    """
+
+    @staticmethod
+    def status(enrollment, version=None):
+        """
+        Estado del reporte para la versión actual del progreso:
+        {'status', 'version', 'url'}
+        """
+        version = version or report_version(enrollment)
+        if os.path.exists(report_absolute_path(enrollment.uuid, version)):
+            return {
+                'status': STATUS_READY,
+                'version': version,
+                'url': report_url(enrollment.uuid, version)
+            }
+
+        job_status = cache.get(
+            REPORT_JOB_KEY.format(enrollment_uuid=enrollment.uuid, version=version)
+        )
+        if job_status not in (STATUS_PENDING, STATUS_FAILED):
+            # READY sin archivo (p. ej. MEDIA_ROOT limpiado) equivale a no encolado
+            job_status = STATUS_MISSING
+
+        return {'status': job_status, 'version': version, 'url': None}
+
+    @classmethod
+    def enqueue(cls, enrollment):
+        """
+        Encola el render de la versión actual si no existe ni está en curso.
+        Retorna el estado del reporte.
+        """
+        version = report_version(enrollment)
+        current = cls.status(enrollment, version)
+        if current['status'] in (STATUS_READY, STATUS_PENDING):
+            return current
+
+        job_key = REPORT_JOB_KEY.format(enrollment_uuid=enrollment.uuid, version=version)
+        if current['status'] == STATUS_FAILED:
+            cache.delete(job_key)
+
+        # cache.add es atómico: solo un request encola cada versión
+        if cache.add(job_key, STATUS_PENDING, JOB_TIMEOUT):
+            cls._dispatch(enrollment.pk, version)
+
+        return {'status': STATUS_PENDING, 'version': version, 'url': None}
+
+    @staticmethod
+    def _dispatch(enrollment_id, version):
+        """Envía el job a Celery; sin broker disponible usa el thread pool"""
+        from .tasks import render_simulacro_report
+
+        try:
+            render_simulacro_report.apply_async(args=[enrollment_id, version], retry=False)
+        except Exception as exc:
+            logger.info("Broker no disponible (%s); render en proceso", exc)
+            _get_executor().submit(_render_in_thread, enrollment_id, version)
@@ -0,0 +1,254 @@
+"""
+Muestreo aleatorio uniforme sin ORDER BY RANDOM()
+
+Para cada filtro (queryset) se mantiene un pool de IDs cacheado y
+versionado: cualquier save/delete del modelo incrementa la versión y los
+pools se recargan en la siguiente lectura. Las señales de los modelos en
+SAMPLED_MODELS se conectan al arrancar cada proceso (LearningConfig.ready),
+así que el admin o Celery también invalidan aunque nunca muestreen; además
+la copia en memoria expira junto con la del caché. Las muestras se toman
+del pool en memoria con exclusiones; en tablas demasiado grandes para un
+pool se usa TABLESAMPLE (PostgreSQL) o sondeo por rangos de PK.
+"""
+
+import hashlib
+import threading
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+
+from .cache import CacheTimeouts
+
+
+POOL_VERSION_KEY = "sample_pool_version_{model}"
+POOL_KEY = "sample_pool_{model}_{filter_key}_{version}"
+POOL_TIMEOUT = CacheTimeouts.HOUR
+
+# Modelos muestreados: sus señales de invalidación se conectan al arrancar
+SAMPLED_MODELS = ('icfes.PreguntaICFES',)
+
+# Sobre este tamaño no se materializa el pool completo
+MAX_POOL_SIZE = 500000
+
+# Rondas de TABLESAMPLE/sondeo antes de rendirse con una muestra parcial
+MAX_SAMPLE_ROUNDS = 5
+
+
+def _model_label(model):
+    return model._meta.label_lower
+
+
+def _pool_version(label):
+    """
+    Versión vigente de los pools del modelo. Se inicializa con un timestamp
+    para que un caché vaciado nunca reutilice pools en memoria obsoletos.
+    """
+    return cache.get_or_set(POOL_VERSION_KEY.format(model=label), int(time.time() * 1000), None)
+
+
+def _bump_pool_version(sender, **kwargs):
+    """Invalida todos los pools del modelo (nueva versión)"""
+    label = _model_label(sender)
+    _pool_version(label)
+    cache.incr(POOL_VERSION_KEY.format(model=label))
+
+
+def draw(pool, k, exclude=None, rng=None):
+    """
+    Muestra uniforme sin reemplazo de `k` IDs del arreglo `pool`,
+    omitiendo los IDs en `exclude`
+    """
+    rng = rng or np.random.default_rng()
+    if k <= 0 or not len(pool):
+        return []
+
+    if exclude:
+        excluded = np.fromiter(exclude, dtype=np.int64, count=len(exclude))
+        if len(excluded) * 4 < len(pool):
+            # Pocas exclusiones: rechazo sobre una muestra algo mayor
+            size = min(len(pool), k + len(excluded))
+            picked = pool[rng.choice(len(pool), size=size, replace=False)]
+            picked = picked[~np.isin(picked, excluded)]
+            return [int(pk) for pk in picked[:k]]
+        pool = pool[~np.isin(pool, excluded)]
+
+    size = min(k, len(pool))
+    return [int(pk) for pk in pool[rng.choice(len(pool), size=size, replace=False)]]
+
+
+def estimated_row_count(table):
+    """Filas estimadas por el planner (PostgreSQL) o None"""
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] > 0 else None
+
+
+def tablesample_ids(table, pk_column, k, estimated_rows, oversample=3.0):
+    """
+    IDs candidatos con TABLESAMPLE SYSTEM: lee bloques al azar en lugar de
+    ordenar la tabla. Se sobre-muestrea para compensar filtros y exclusiones.
+    """
+    percentage = min(100.0, max(0.0001, 100.0 * k * oversample / max(estimated_rows, 1)))
+    quoted_table = connection.ops.quote_name(table)
+    quoted_pk = connection.ops.quote_name(pk_column)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {quoted_pk} FROM {quoted_table} TABLESAMPLE SYSTEM (%s)",
+            [percentage]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def pk_probe_ids(queryset, k, rng, oversample=3.0):
+    """IDs candidatos sondeando PKs al azar entre el mínimo y el máximo"""
+    from django.db.models import Max, Min
+
+    bounds = queryset.model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+
+    size = int(k * oversample) + 1
+    return [int(pk) for pk in rng.integers(bounds['low'], bounds['high'] + 1, size=size)]
+
+
+class RandomSampler:
+    """
+    Pools de IDs versionados por (modelo, filtro) y muestreo uniforme
+    """
+
+    _lock = threading.Lock()
+    _pools = {}
+    _registered = set()
+
+    @classmethod
+    def register(cls, model):
+        """Conecta la invalidación de los pools del modelo (una vez por proceso)"""
+        label = _model_label(model)
+        if label in cls._registered:
+            return
+
+        post_save.connect(_bump_pool_version, sender=model, dispatch_uid=f"sample_pool_{label}_save")
+        post_delete.connect(_bump_pool_version, sender=model, dispatch_uid=f"sample_pool_{label}_delete")
+        cls._registered.add(label)
+
+    @classmethod
+    def version(cls, model):
+        """Versión vigente de los pools del modelo (cambia con cada save/delete)"""
+        # Respaldo para modelos fuera de SAMPLED_MODELS
+        cls.register(model)
+        return _pool_version(_model_label(model))
+
+    @staticmethod
+    def filter_key(queryset):
+        """Key estable del filtro a partir del SQL del queryset"""
+        sql, params = queryset.values('pk').query.sql_with_params()
+        return hashlib.md5(f"{sql}|{params}".encode()).hexdigest()[:16]
+
+    @classmethod
+    def get_pool(cls, queryset, filter_key=None):
+        """
+        Pool de IDs del queryset (arreglo NumPy), o None si el filtro supera
+        MAX_POOL_SIZE. Se conserva en memoria por versión y en el caché compartido.
+        """
+        model = queryset.model
+        label = _model_label(model)
+        filter_key = filter_key or cls.filter_key(queryset)
+        version = cls.version(model)
+        pool_key = POOL_KEY.format(model=label, filter_key=filter_key, version=version)
+        now = time.time()
+
+        with cls._lock:
+            entry = cls._pools.get(pool_key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        entry = cache.get(pool_key)
+        if entry is None:
+            ids = list(queryset.values_list('pk', flat=True)[:MAX_POOL_SIZE + 1])
+            pool = np.array(ids, dtype=np.int64) if len(ids) <= MAX_POOL_SIZE else False
+            # La copia en memoria vence junto con la del caché
+            entry = (now + POOL_TIMEOUT, pool)
+            cache.set(pool_key, entry, POOL_TIMEOUT)
+
+        expires_at, pool = entry
+        if pool is False:
+            return None
+
+        with cls._lock:
+            # Solo la versión vigente de cada filtro queda en memoria
+            prefix = POOL_KEY.format(model=label, filter_key=filter_key, version='')
+            for key in [key for key in cls._pools if key.startswith(prefix)]:
+                del cls._pools[key]
+            cls._pools[pool_key] = (expires_at, pool)
+
+        return pool
+
+    @classmethod
+    def sample_ids(cls, queryset, k, exclude=None, filter_key=None, rng=None):
+        """
+        `k` IDs uniformes del queryset que no estén en `exclude` (set de IDs).
+        Con pool en memoria la muestra no toca la base de datos.
+        """
+        rng = rng or np.random.default_rng()
+        exclude = set(exclude or ())
+
+        pool = cls.get_pool(queryset, filter_key)
+        if pool is not None:
+            return draw(pool, k, exclude, rng)
+
+        return cls._sample_large(queryset, k, exclude, rng)
+
+    @classmethod
+    def sample(cls, queryset, k, exclude=None, filter_key=None, rng=None):
+        """Objetos muestreados, en el orden aleatorio de la muestra"""
+        ids = cls.sample_ids(queryset, k, exclude, filter_key, rng)
+        objects = queryset.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
+
+    @staticmethod
+    def _sample_large(queryset, k, exclude, rng):
+        """Tablas grandes: candidatos por TABLESAMPLE o sondeo de PK, luego filtro"""
+        model = queryset.model
+        table = model._meta.db_table
+        estimated_rows = estimated_row_count(table)
+
+        selected = []
+        seen = set(exclude)
+        oversample = 3.0
+
+        for _round in range(MAX_SAMPLE_ROUNDS):
+            if estimated_rows:
+                candidates = tablesample_ids(table, model._meta.pk.column, k, estimated_rows, oversample)
+            else:
+                candidates = pk_probe_ids(queryset, k, rng, oversample)
+
+            candidates = [pk for pk in candidates if pk not in seen]
+            valid = list(queryset.filter(pk__in=candidates).values_list('pk', flat=True))
+            rng.shuffle(valid)
+
+            for pk in valid:
+                if pk not in seen:
+                    seen.add(pk)
+                    selected.append(pk)
+            if len(selected) >= k:
+                break
+
+            oversample *= 4
+
+        return selected[:k]
+
+
+def connect_signals():
+    """Invalidación de los pools de SAMPLED_MODELS en todos los procesos"""
+    from django.apps import apps
+
+    for label in SAMPLED_MODELS:
+        RandomSampler.register(apps.get_model(label))
@@ -0,0 +1,211 @@
+"""
+Búsqueda de texto completo en español sobre preguntas, rutas y contenido
+
+En PostgreSQL cada modelo tiene una columna tsvector (search_vector) con
+índice GIN, construida con la configuración spanish_unaccent (stemming en
+español sin acentos) y pesos por campo. Los vectores se actualizan al
+guardar y con el comando reindex_search. Las búsquedas se ordenan por
+ts_rank y devuelven fragmentos resaltados con ts_headline.
+
+En otros motores (SQLite en desarrollo y tests) se usa icontains como
+respaldo, sin ranking.
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.apps import apps
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVector
+)
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.signals import post_save
+
+
+SEARCH_CONFIG = 'spanish_unaccent'
+
+MAX_RESULTS_PER_DOMAIN = 50
+SNIPPET_LENGTH = 200
+
+# Anotaciones de cada fila (con prefijo para no chocar con campos del modelo)
+RESULT_ANNOTATIONS = ('search_title', 'search_snippet', 'search_rank')
+
+HEADLINE_OPTIONS = {
+    'start_sel': '<mark>',
+    'stop_sel': '</mark>',
+    'max_words': 35,
+    'min_words': 15,
+    'max_fragments': 2,
+}
+
+
+class SearchDomain:
+    """
+    Un modelo buscable: campos con su peso, filtro de visibilidad y los
+    campos que se devuelven en cada resultado
+    """
+
+    def __init__(self, name, model_label, weighted_fields, visible, title_field, snippet_field, result_fields):
+        self.name = name
+        self.model_label = model_label
+        self.weighted_fields = weighted_fields
+        self.visible = visible
+        self.title_field = title_field
+        self.snippet_field = snippet_field
+        self.result_fields = result_fields
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def text_fields(self):
+        return {field_name for field_name, _weight in self.weighted_fields}
+
+    def vector(self):
+        """Expresión tsvector ponderada del dominio"""
+        return reduce(lambda left, right: left + right, [
+            SearchVector(field_name, weight=weight, config=SEARCH_CONFIG)
+            for field_name, weight in self.weighted_fields
+        ])
+
+    def queryset(self):
+        return self.model.objects.filter(self.visible)
+
+
+DOMAINS = {
+    'questions': SearchDomain(
+        name='questions',
+        model_label='icfes.PreguntaICFES',
+        weighted_fields=[('pregunta_texto', 'A'), ('afirmacion', 'B'), ('evidencia', 'C')],
+        visible=Q(activa=True),
+        title_field='pregunta_texto',
+        snippet_field='pregunta_texto',
+        result_fields=['id', 'uuid', 'nivel_dificultad', 'area_evaluacion__nombre'],
+    ),
+    'paths': SearchDomain(
+        name='paths',
+        model_label='learning.LearningPath',
+        weighted_fields=[('name', 'A'), ('short_description', 'B'), ('description', 'C')],
+        visible=Q(status__in=['ACTIVE', 'FEATURED']),
+        title_field='name',
+        snippet_field='description',
+        result_fields=['id', 'uuid', 'slug', 'path_type', 'difficulty_level'],
+    ),
+    'content': SearchDomain(
+        name='content',
+        model_label='content.ContentUnit',
+        weighted_fields=[('title', 'A'), ('description', 'B')],
+        visible=Q(is_active=True),
+        title_field='title',
+        snippet_field='description',
+        result_fields=['id', 'uuid', 'slug', 'unit_type', 'difficulty_level'],
+    ),
+}
+
+
+def full_text_enabled():
+    return connection.vendor == 'postgresql'
+
+
+def _update_search_vector(sender, instance, update_fields=None, **kwargs):
+    """post_save: recalcula el vector si cambió algún campo de texto"""
+    domain = next(domain for domain in DOMAINS.values() if domain.model is sender)
+    if update_fields is not None and not domain.text_fields & set(update_fields):
+        return
+    if not full_text_enabled():
+        return
+
+    sender.objects.filter(pk=instance.pk).update(search_vector=domain.vector())
+
+
+def connect_signals():
+    for domain in DOMAINS.values():
+        post_save.connect(
+            _update_search_vector,
+            sender=domain.model,
+            dispatch_uid=f"search_vector_{domain.name}"
+        )
+
+
+class SearchService:
+    """
+    Búsqueda unificada y mantenimiento de los vectores
+    """
+
+    @staticmethod
+    def reindex(domain_name, batch_size=5000):
+        """Recalcula los vectores de un dominio por lotes de PK; retorna filas"""
+        domain = DOMAINS[domain_name]
+        if not full_text_enabled():
+            return 0
+
+        model = domain.model
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                return updated
+            updated += model.objects.filter(pk__in=batch).update(search_vector=domain.vector())
+            last_pk = batch[-1]
+
+    @staticmethod
+    def _serialize(domain, row):
+        result = {field_name.split('__')[0]: row[field_name] for field_name in domain.result_fields}
+        if 'uuid' in result:
+            result['uuid'] = str(result['uuid'])
+        result.update({
+            'domain': domain.name,
+            'title': row['search_title'][:SNIPPET_LENGTH],
+            'snippet': row['search_snippet'],
+            'rank': row['search_rank'],
+        })
+        return result
+
+    @classmethod
+    def search_domain(cls, domain_name, text, limit=10):
+        """Resultados de un dominio ordenados por relevancia"""
+        domain = DOMAINS[domain_name]
+        limit = min(limit, MAX_RESULTS_PER_DOMAIN)
+        queryset = domain.queryset()
+
+        if full_text_enabled():
+            query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+            rows = queryset.filter(search_vector=query).annotate(
+                search_rank=SearchRank(F('search_vector'), query),
+                search_title=F(domain.title_field),
+                search_snippet=SearchHeadline(
+                    domain.snippet_field, query, config=SEARCH_CONFIG, **HEADLINE_OPTIONS
+                ),
+            ).order_by('-search_rank', 'pk').values(*domain.result_fields, *RESULT_ANNOTATIONS)[:limit]
+        else:
+            # Respaldo sin índice: cada término en cualquiera de los campos
+            terms = text.split()
+            conditions = [
+                reduce(or_, [Q(**{f"{field_name}__icontains": term}) for field_name in domain.text_fields])
+                for term in terms
+            ]
+            rows = queryset.filter(*conditions).annotate(
+                search_rank=Value(0.0),
+                search_title=F(domain.title_field),
+                search_snippet=F(domain.snippet_field),
+            ).order_by('pk').values(*domain.result_fields, *RESULT_ANNOTATIONS)[:limit]
+
+        results = []
+        for row in rows:
+            if not full_text_enabled():
+                row['search_snippet'] = (row['search_snippet'] or '')[:SNIPPET_LENGTH]
+            results.append(cls._serialize(domain, row))
+        return results
+
+    @classmethod
+    def search(cls, text, domains=None, limit=10):
+        """{dominio: [resultados]} para los dominios pedidos (por defecto todos)"""
+        return {
+            domain_name: cls.search_domain(domain_name, text, limit)
+            for domain_name in (domains or DOMAINS)
+        }
@@ -14,7 +14,100 @@ from .models import (
     UserPathEnrollment, UserLessonProgress, PathAchievement,
     UserPathAchievement, LearningPathReview
 )
-from .cache import LearningCacheManager
+from .cache import LearningCacheManager, CacheWarmRegistry, CacheKeys, CacheTimeouts
+
+
+# Rutas calentadas por familia (las de más inscripciones)
+WARM_PATH_LIMIT = 100
+
+
+def hot_path_ids(limit=WARM_PATH_LIMIT):
+    """Rutas publicadas con más inscripciones: las que se calientan"""
+    return list(
+        LearningPath.objects.filter(
+            status__in=['ACTIVE', 'FEATURED']
+        ).order_by('-total_enrollments', 'id').values_list('id', flat=True)[:limit]
+    )
+
+
+@CacheWarmRegistry.register(
+    'unit_navigation',
+    key=lambda path_id: CacheKeys.LEARNING_PATH_UNITS.format(path_id=path_id),
+    timeout=CacheTimeouts.DAY,
+    keys=hot_path_ids
+)
+def build_unit_navigation(path_id):
+    """Unidades activas de la ruta en orden, con su número de lecciones"""
+    units = LearningPathUnit.objects.filter(
+        learning_path_id=path_id,
+        is_active=True
+    ).order_by('order', 'id').annotate(
+        lessons_total=Count('lessons')
+    ).values('id', 'uuid', 'title', 'order', 'lessons_total')
+    
+    return [
+        {
+            'id': unit['id'],
+            'uuid': str(unit['uuid']),
+            'title': unit['title'],
+            'order': unit['order'],
+            'lessons_count': unit['lessons_total'],
+        }
+        for unit in units
+    ]
+
+
+@CacheWarmRegistry.register(
+    'path_stats',
+    key=lambda path_id: f"path_stats_{path_id}",
+    timeout=CacheTimeouts.HOUR * 2,
+    keys=hot_path_ids
+)
+def build_path_stats(path_id):
+    """Estadísticas agregadas de la ruta"""
+    return {
+        'total_lessons': LearningPathLesson.objects.filter(
+            path_unit__learning_path_id=path_id
+        ).count(),
+        'avg_user_score': UserLessonProgress.objects.filter(
+            path_lesson__path_unit__learning_path_id=path_id,
+            status__in=['COMPLETED', 'PERFECT']
+        ).aggregate(avg_score=Avg('best_score'))['avg_score'] or 0,
+        'completion_trend': 'stable',  # Simplificado, se puede hacer más complejo
+        'difficulty_distribution': {
+            'easy': 30,
+            'medium': 50,
+            'hard': 20
+        }  # Simplificado
+    }
+
+
+def _path_navigation(context, path_id):
+    """
+    Navegación cacheada de la ruta y la posición de cada unidad. Se lee una
+    vez por ruta y serialización: el contexto es compartido por todas las
+    unidades de la lista.
+    """
+    memo = context.setdefault('unit_navigation', {})
+    if path_id not in memo:
+        navigation = CacheWarmRegistry.fetch('unit_navigation', path_id)
+        memo[path_id] = (navigation, {entry['id']: index for index, entry in enumerate(navigation)})
+    return memo[path_id]
+
+
+def _unit_neighbour(unit, step, context=None):
+    """Unidad vecina (step=1 siguiente, -1 anterior) según la navegación cacheada"""
+    navigation, positions = _path_navigation({} if context is None else context, unit.learning_path_id)
+    index = positions.get(unit.id)
+    if index is None or not 0 <= index + step < len(navigation):
+        return None
+    
+    neighbour = navigation[index + step]
+    return {
+        'uuid': neighbour['uuid'],
+        'title': neighbour['title'],
+        'order_index': neighbour['order']
+    }
 
 
 class OptimizedLearningPathUnitSerializer(serializers.ModelSerializer):
@@ -43,15 +136,13 @@ class OptimizedLearningPathUnitSerializer(serializers.ModelSerializer):
     
     @extend_schema_field(OpenApiTypes.INT)
     def get_lessons_count(self, obj):
-        """Obtiene el número de lecciones (con caché)"""
-        cache_key = f"unit_lessons_count_{obj.id}"
-        count = cache.get(cache_key)
+        """Obtiene el número de lecciones (de la navegación cacheada)"""
+        navigation, positions = _path_navigation(self.context, obj.learning_path_id)
+        index = positions.get(obj.id)
+        if index is not None:
+            return navigation[index]['lessons_count']
         
-        if count is None:
-            count = obj.lessons.count()
-            cache.set(cache_key, count, 3600)  # 1 hora
-        
-        return count
+        return obj.lessons.count()
     
     @extend_schema_field(OpenApiTypes.FLOAT)
     def get_completion_rate(self, obj):
@@ -127,34 +218,12 @@ class OptimizedLearningPathUnitSerializer(serializers.ModelSerializer):
     @extend_schema_field(OpenApiTypes.OBJECT)
     def get_next_unit(self, obj):
         """Unidad siguiente en la secuencia"""
-        next_unit = LearningPathUnit.objects.filter(
-            learning_path=obj.learning_path,
-            order_index__gt=obj.order_index
-        ).order_by('order_index').first()
-        
-        if next_unit:
-            return {
-                'uuid': next_unit.uuid,
-                'title': next_unit.title,
-                'order_index': next_unit.order_index
-            }
-        return None
+        return _unit_neighbour(obj, 1, self.context)
     
     @extend_schema_field(OpenApiTypes.OBJECT)
     def get_previous_unit(self, obj):
         """Unidad anterior en la secuencia"""
-        prev_unit = LearningPathUnit.objects.filter(
-            learning_path=obj.learning_path,
-            order_index__lt=obj.order_index
-        ).order_by('-order_index').first()
-        
-        if prev_unit:
-            return {
-                'uuid': prev_unit.uuid,
-                'title': prev_unit.title,
-                'order_index': prev_unit.order_index
-            }
-        return None
+        return _unit_neighbour(obj, -1, self.context)
 
 
 class OptimizedLearningPathLessonSerializer(serializers.ModelSerializer):
@@ -375,28 +444,7 @@ class OptimizedLearningPathSerializer(serializers.ModelSerializer):
     @extend_schema_field(OpenApiTypes.OBJECT)
     def get_stats(self, obj):
         """Estadísticas agregadas del path"""
-        cache_key = f"path_stats_{obj.id}"
-        stats = cache.get(cache_key)
-        
-        if stats is None:
-            stats = {
-                'total_lessons': obj.units.aggregate(
-                    total=Sum('lessons__count', default=0)
-                )['total'] or 0,
-                'avg_user_score': UserLessonProgress.objects.filter(
-                    path_lesson__path_unit__learning_path=obj,
-                    status='COMPLETED'
-                ).aggregate(avg_score=Avg('final_score'))['avg_score'] or 0,
-                'completion_trend': 'stable',  # Simplificado, se puede hacer más complejo
-                'difficulty_distribution': {
-                    'easy': 30,
-                    'medium': 50,
-                    'hard': 20
-                }  # Simplificado
-            }
-            cache.set(cache_key, stats, 7200)  # 2 horas
-        
-        return stats
+        return CacheWarmRegistry.fetch('path_stats', obj.id)
     
     @extend_schema_field(OpenApiTypes.OBJECT)
     def get_recent_reviews(self, obj):
@@ -646,9 +694,9 @@ class UserPathAchievementSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserPathAchievement
         fields = [
-            'id', 'achievement', 'progress_percentage', 'is_completed',
-            'completed_at', 'xp_earned'
-        ] 
+            'id', 'achievement', 'enrollment', 'progress_when_earned',
+            'xp_earned', 'earned_at'
+        ]
 
 
 class LearningPathReviewSerializer(serializers.ModelSerializer):
@@ -2,6 +2,7 @@
 Signals para la app de Learning Paths
 """
 
+from django.contrib.auth import get_user_model
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from django.db.models import Avg, Count, Sum
@@ -9,8 +10,19 @@ from django.utils import timezone
 
 from .models import (
     UserPathEnrollment, UserLessonProgress, LearningPath,
-    LearningPathReview, UserPathAchievement, PathAchievement
+    LearningPathReview, UserPathAchievement, PathAchievement,
+    LearningPathUnit, LearningPathLesson
 )
+from .cache import CacheWarmRegistry
+from .achievements import AchievementEngine
+from .recommender import PathRecommender
+from .distributions import PathDistributionService
+from .progression import NextLessonResolver
+from .tagging import PathTagIndex
+from .trending import TrendingService
+from .search import connect_signals as connect_search_signals
+from .dashboard import DashboardSnapshot, STREAK_FIELDS
+from apps.users.models import UserProfile
 
 
 @receiver(post_save, sender=UserPathEnrollment)
@@ -20,6 +32,7 @@ def update_learning_path_metrics(sender, instance, created, **kwargs):
     
     if created:
         learning_path.total_enrollments += 1
+        TrendingService.record_enrollment(learning_path.id)
     
     # Actualizar contador de completados
     if instance.is_completed and 'status' in getattr(instance, '_dirty_fields', {}):
@@ -99,11 +112,18 @@ def award_xp_for_lesson_completion(sender, instance, created, **kwargs):
         total_xp = base_xp + perfect_bonus
         
         # Otorgar XP al usuario
-        instance.user.add_experience(total_xp)
+        instance.user.add_experience(
+            total_xp,
+            learning_path_id=instance.enrollment.learning_path_id,
+            source='LESSON',
+            reference=f'lesson_progress:{instance.pk}'
+        )
+        TrendingService.record_lesson_completion(instance.enrollment.learning_path_id)
         
-        # Actualizar XP en el progreso de la lección
+        # Actualizar XP en el progreso de la lección sin re-disparar signals
+        # (un save anidado sobrescribiría los _dirty_fields del save en curso)
         instance.xp_earned = total_xp
-        instance.save(update_fields=['xp_earned'])
+        UserLessonProgress.objects.filter(pk=instance.pk).update(xp_earned=total_xp)
         
         # Actualizar XP total en la inscripción
         enrollment = instance.enrollment
@@ -119,77 +139,168 @@ def award_completion_bonuses(sender, instance, created, **kwargs):
         
         # Bonus por completitud
         completion_bonus = learning_path.completion_xp_bonus
-        instance.user.add_experience(completion_bonus)
+        instance.user.add_experience(
+            completion_bonus, learning_path_id=learning_path.id,
+            source='PATH_COMPLETION', reference=f'enrollment:{instance.pk}'
+        )
         
         # Verificar si merece bonus de maestría (basado en puntuación promedio)
         if instance.average_score >= 95.0:
             mastery_bonus = learning_path.mastery_xp_bonus
-            instance.user.add_experience(mastery_bonus)
+            instance.user.add_experience(
+                mastery_bonus, learning_path_id=learning_path.id,
+                source='PATH_MASTERY', reference=f'enrollment:{instance.pk}'
+            )
 
 
 @receiver(post_save, sender=UserPathEnrollment)
 @receiver(post_save, sender=UserLessonProgress)
-def check_path_achievements(sender, instance, **kwargs):
-    """Verifica y otorga logros de rutas de aprendizaje"""
+def check_path_achievements(sender, instance, created, update_fields=None, **kwargs):
+    """Verifica y otorga logros afectados por los campos que cambiaron"""
+    changed_fields = _changed_fields(instance, created, update_fields)
+    
     if sender == UserPathEnrollment:
-        user = instance.user
         enrollment = instance
+        triggers = AchievementEngine.triggers_for_enrollment(changed_fields)
     else:  # UserLessonProgress
-        user = instance.user
         enrollment = instance.enrollment
+        triggers = AchievementEngine.triggers_for_lesson(instance, changed_fields)
     
-    # Obtener logros disponibles para la ruta
-    achievements = PathAchievement.objects.filter(
-        learning_path=enrollment.learning_path,
-        is_active=True
-    ).exclude(
-        id__in=user.path_achievements.values_list('achievement_id', flat=True)
+    AchievementEngine.evaluate(enrollment, triggers)
+
+
+@receiver(post_save, sender=PathAchievement)
+@receiver(post_delete, sender=PathAchievement)
+def invalidate_achievement_rules(sender, instance, **kwargs):
+    """Invalida las reglas compiladas de la ruta cuando cambia un logro"""
+    AchievementEngine.invalidate_rules(instance.learning_path_id)
+
+
+@receiver(post_save, sender=UserPathEnrollment)
+def update_result_distribution(sender, instance, created, **kwargs):
+    """Actualiza la distribución de resultados de la ruta (compare_results)"""
+    PathDistributionService.record_change(
+        instance,
+        original=None if created else getattr(instance, '_original_state', None)
     )
-    
-    for achievement in achievements:
-        if _check_achievement_criteria(user, enrollment, achievement):
-            # Otorgar logro
-            UserPathAchievement.objects.create(
-                user=user,
-                achievement=achievement,
-                enrollment=enrollment,
-                progress_when_earned=enrollment.progress_percentage,
-                xp_earned=achievement.xp_reward
-            )
-            
-            # Otorgar XP del logro
-            user.add_experience(achievement.xp_reward)
 
 
-def _check_achievement_criteria(user, enrollment, achievement):
-    """Verifica si el usuario cumple los criterios para un logro"""
-    criteria = achievement.criteria
-    
-    if achievement.achievement_type == 'COMPLETION':
-        return enrollment.progress_percentage >= criteria.get('completion_percentage', 100)
-    
-    elif achievement.achievement_type == 'SPEED':
-        max_time_hours = criteria.get('max_time_hours', 0)
-        actual_time_hours = enrollment.total_time_minutes / 60.0
-        return actual_time_hours <= max_time_hours and enrollment.is_completed
+@receiver(post_save, sender=UserPathEnrollment)
+def invalidate_resume_pointer(sender, instance, created, **kwargs):
+    """Las inscripciones nuevas o que cambian de estado alteran la siguiente lección"""
+    if created or 'status' in (getattr(instance, '_dirty_fields', None) or ()):
+        NextLessonResolver.invalidate_pointer(instance.user_id)
+
+
+@receiver(post_delete, sender=UserPathEnrollment)
+def invalidate_resume_pointer_on_delete(sender, instance, **kwargs):
+    NextLessonResolver.invalidate_pointer(instance.user_id)
+
+
+@receiver(post_delete, sender=UserPathEnrollment)
+def remove_from_result_distribution(sender, instance, **kwargs):
+    """Retira una inscripción completada eliminada de la distribución"""
+    if instance.status == 'COMPLETED':
+        PathDistributionService.rebuild(instance.learning_path_id)
+
+
+@receiver(post_save, sender=LearningPath)
+@receiver(post_delete, sender=LearningPath)
+def mark_path_features_dirty(sender, instance, **kwargs):
+    """Marca la ruta para recarga incremental en la matriz del recomendador"""
+    PathRecommender.mark_dirty(instance.id)
+
+
+@receiver(post_save, sender=LearningPathUnit)
+@receiver(post_delete, sender=LearningPathUnit)
+@receiver(post_save, sender=LearningPathLesson)
+@receiver(post_delete, sender=LearningPathLesson)
+def invalidate_unit_navigation(sender, instance, **kwargs):
+    """La navegación de unidades cambia con el temario; se recalienta al confirmar"""
+    if sender is LearningPathUnit:
+        path_id = instance.learning_path_id
+    else:
+        path_id = LearningPathUnit.objects.filter(
+            pk=instance.path_unit_id
+        ).values_list('learning_path_id', flat=True).first()
     
-    elif achievement.achievement_type == 'ACCURACY':
-        min_accuracy = criteria.get('min_accuracy', 90)
-        return enrollment.average_score >= min_accuracy and enrollment.is_completed
+    if path_id is not None:
+        CacheWarmRegistry.invalidate('unit_navigation', path_id)
+
+
+TAG_INDEX_FIELDS = {'tags', 'target_icfes_areas', 'status'}
+
+
+@receiver(post_save, sender=LearningPath)
+def sync_path_tag_index(sender, instance, update_fields=None, **kwargs):
+    """Sincroniza el índice de tags; los saves de métricas no lo tocan"""
+    if update_fields is not None and not TAG_INDEX_FIELDS & set(update_fields):
+        return
     
-    elif achievement.achievement_type == 'STREAK':
-        min_streak = criteria.get('min_streak_days', 7)
-        return enrollment.current_streak_days >= min_streak
+    PathTagIndex.sync(instance)
+    PathTagIndex.invalidate_facets()  # El estado también cambia los conteos
+
+
+@receiver(post_delete, sender=LearningPath)
+def invalidate_path_tag_facets(sender, instance, **kwargs):
+    """Las filas del índice se borran en cascada; solo caducan los conteos"""
+    PathTagIndex.invalidate_facets()
+
+
+@receiver(post_save, sender=UserPathEnrollment)
+def invalidate_dashboard_enrollment(sender, instance, created, update_fields=None, **kwargs):
+    """Rachas del dashboard: inscripciones nuevas, cambios de estado o de racha"""
+    changed_fields = _changed_fields(instance, created, update_fields)
+    if changed_fields is None:
+        DashboardSnapshot.invalidate(instance.user_id, 'enrollment', 'streak')
+        return
+
+    tags = []
+    if 'status' in changed_fields:
+        tags.append('enrollment')
+    if STREAK_FIELDS & changed_fields:
+        tags.append('streak')
+    if tags:
+        DashboardSnapshot.invalidate(instance.user_id, *tags)
+
+
+@receiver(post_delete, sender=UserPathEnrollment)
+def invalidate_dashboard_enrollment_on_delete(sender, instance, **kwargs):
+    DashboardSnapshot.invalidate(instance.user_id, 'enrollment')
+
+
+@receiver(post_save, sender=UserPathAchievement)
+@receiver(post_delete, sender=UserPathAchievement)
+def invalidate_dashboard_achievements(sender, instance, **kwargs):
+    DashboardSnapshot.invalidate(instance.user_id, 'achievement')
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_dashboard_user(sender, instance, **kwargs):
+    """Datos del usuario; el XP invalida 'xp' desde el ledger"""
+    DashboardSnapshot.invalidate(instance.pk, 'profile')
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_dashboard_profile(sender, instance, **kwargs):
+    DashboardSnapshot.invalidate(instance.user_id, 'profile')
+
+
+def _changed_fields(instance, created, update_fields):
+    """
+    Campos modificados en el save actual, o None si deben considerarse todos
+    (creación o cambios no rastreados)
+    """
+    if created:
+        return None
     
-    elif achievement.achievement_type == 'PERFECT':
-        perfect_lessons = UserLessonProgress.objects.filter(
-            enrollment=enrollment,
-            status='PERFECT'
-        ).count()
-        min_perfect = criteria.get('min_perfect_lessons', 5)
-        return perfect_lessons >= min_perfect
+    dirty_fields = getattr(instance, '_dirty_fields', None)
+    if dirty_fields is None:
+        return None
     
-    return False
+    if update_fields is not None:
+        return set(dirty_fields) & set(update_fields)
+    return set(dirty_fields)
 
 
 @receiver(pre_save, sender=UserPathEnrollment)
@@ -207,5 +318,10 @@ def track_dirty_fields(sender, instance, **kwargs):
                     dirty_fields.append(field_name)
             
             instance._dirty_fields = dirty_fields
+            instance._original_state = original
         except sender.DoesNotExist:
-            instance._dirty_fields = [] 
\ No newline at end of file
+            instance._dirty_fields = [] 
+
+
+# Vectores de búsqueda de preguntas, rutas y contenido (solo PostgreSQL)
+connect_search_signals()
@@ -0,0 +1,134 @@
+"""
+Índice normalizado de tags de rutas de aprendizaje
+
+Los tags (LearningPath.tags) y las áreas ICFES (target_icfes_areas) se
+copian a LearningPathTag como slugs, con un índice (tipo, slug, ruta).
+Los filtros resuelven tags con un subquery indexado en lugar de buscar
+texto en el JSON, y los conteos por tag se sirven desde caché versionado.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils.text import slugify
+
+from .cache import CacheTimeouts
+
+
+TAG_FACETS_VERSION_KEY = "path_tag_facets_version"
+TAG_FACETS_KEY = "path_tag_facets_{kind}_{version}"
+
+KIND_TAG = 'TAG'
+KIND_AREA = 'AREA'
+
+# Estados de ruta visibles en el catálogo
+CATALOG_STATUSES = ('ACTIVE', 'FEATURED')
+
+
+def normalize_tag(value):
+    """Slug del tag: sin acentos, minúsculas y guiones"""
+    return slugify(str(value or '').replace('_', '-'))[:100]
+
+
+def path_tag_entries(path):
+    """{(tipo, slug): nombre} que la ruta debe tener en el índice"""
+    entries = {}
+    for kind, values in ((KIND_TAG, path.tags), (KIND_AREA, path.target_icfes_areas)):
+        for value in values or []:
+            slug = normalize_tag(value)
+            if slug:
+                entries.setdefault((kind, slug), str(value).strip()[:100])
+    return entries
+
+
+class PathTagIndex:
+    """
+    Sincronización y consultas del índice de tags de rutas
+    """
+
+    @staticmethod
+    def invalidate_facets():
+        cache.add(TAG_FACETS_VERSION_KEY, 0, None)
+        cache.incr(TAG_FACETS_VERSION_KEY)
+
+    @staticmethod
+    def sync(path):
+        """
+        Ajusta las filas de la ruta al contenido actual de sus campos JSON.
+        No invalida los conteos: lo hace quien sincroniza.
+        """
+        from .models import LearningPathTag
+
+        wanted = path_tag_entries(path)
+        existing = {
+            (kind, slug): pk
+            for pk, kind, slug in LearningPathTag.objects.filter(
+                learning_path=path
+            ).values_list('id', 'kind', 'slug')
+        }
+
+        stale = [pk for key, pk in existing.items() if key not in wanted]
+        missing = [
+            LearningPathTag(learning_path=path, kind=kind, slug=slug, name=wanted[(kind, slug)])
+            for kind, slug in wanted
+            if (kind, slug) not in existing
+        ]
+
+        if stale or missing:
+            with transaction.atomic():
+                if stale:
+                    LearningPathTag.objects.filter(id__in=stale).delete()
+                if missing:
+                    LearningPathTag.objects.bulk_create(missing, ignore_conflicts=True)
+
+    @classmethod
+    def rebuild(cls):
+        """Reconstruye el índice completo (backfill)"""
+        from .models import LearningPath, LearningPathTag
+
+        rows = []
+        for path in LearningPath.objects.only('id', 'tags', 'target_icfes_areas').iterator(chunk_size=2000):
+            rows.extend(
+                LearningPathTag(learning_path_id=path.id, kind=kind, slug=slug, name=name)
+                for (kind, slug), name in path_tag_entries(path).items()
+            )
+
+        with transaction.atomic():
+            LearningPathTag.objects.all().delete()
+            LearningPathTag.objects.bulk_create(rows, batch_size=2000)
+        cls.invalidate_facets()
+        return len(rows)
+
+    @staticmethod
+    def path_ids(values, kind=KIND_TAG):
+        """Subquery de IDs de rutas con cualquiera de los tags dados"""
+        from .models import LearningPathTag
+
+        slugs = {normalize_tag(value) for value in values} - {''}
+        return LearningPathTag.objects.filter(
+            kind=kind,
+            slug__in=slugs
+        ).values('learning_path_id')
+
+    @staticmethod
+    def facets(kind=KIND_TAG):
+        """[{slug, name, count}] de las rutas del catálogo, del tag más usado al menos"""
+        from .models import LearningPathTag
+
+        version = cache.get_or_set(TAG_FACETS_VERSION_KEY, 0, None)
+        cache_key = TAG_FACETS_KEY.format(kind=kind.lower(), version=version)
+
+        facets = cache.get(cache_key)
+        if facets is None:
+            facets = list(
+                LearningPathTag.objects.filter(
+                    kind=kind,
+                    learning_path__status__in=CATALOG_STATUSES
+                ).values('slug').annotate(
+                    name=Min('name'),
+                    count=Count('learning_path_id')
+                ).order_by('-count', 'slug')
+            )
+            cache.set(cache_key, facets, CacheTimeouts.HOUR)
+
+        return facets
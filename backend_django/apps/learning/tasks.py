@@ -0,0 +1,46 @@
+"""
+Tareas Celery de Learning Paths
+"""
+
+from celery import shared_task
+
+from .collaborative import ItemSimilarityStore, ITEM_KINDS
+
+
+@shared_task
+def build_item_similarities():
+    """Recalcula las tablas de vecinos item-item (job nocturno)"""
+    for kind in ITEM_KINDS:
+        ItemSimilarityStore.build(kind)
+
+
+@shared_task
+def render_simulacro_report(enrollment_id, version):
+    """Renderiza el reporte PDF de un simulacro en MEDIA_ROOT"""
+    from .reports import render_report_to_disk
+
+    render_report_to_disk(enrollment_id, version)
+
+
+@shared_task
+def renormalize_trending_scores():
+    """Lleva los puntajes de tendencia a la época del día"""
+    from .trending import TrendingService
+
+    TrendingService.renormalize()
+
+
+@shared_task
+def warm_caches(families=None, force=False, path_ids=None):
+    """Calienta familias registradas; path_ids limita a esas rutas (tras invalidar)"""
+    from .cache import CacheWarmRegistry
+
+    CacheWarmRegistry.warm(families, force=force, args=path_ids)
+
+
+@shared_task
+def expire_boss_battles():
+    """Cierra como TIMEOUT las batallas cuyo deadline ya pasó"""
+    from .battles import BattleEngine
+
+    BattleEngine.expire_due()
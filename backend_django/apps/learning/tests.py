@@ -617,4 +617,2135 @@ class FilterTests(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
-        self.assertEqual(response.data['results'][0]['name'], 'Easy Math') 
\ No newline at end of file
+        self.assertEqual(response.data['results'][0]['name'], 'Easy Math') 
+
+class AchievementEngineTests(TestCase):
+    """Tests para el motor de logros indexado por disparadores"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='achiever',
+            email='achiever@example.com',
+            password='testpass123'
+        )
+        
+        self.learning_path = LearningPath.objects.create(
+            name='Geometría',
+            slug='geometria',
+            description='Path de geometría',
+            path_type='SUBJECT_MASTERY',
+            difficulty_level='BEGINNER',
+            status='ACTIVE'
+        )
+        
+        self.unit = LearningPathUnit.objects.create(
+            learning_path=self.learning_path,
+            title='Triángulos',
+            description='Unidad de prueba',
+            unit_type='CORE',
+            order=1
+        )
+        
+        self.lessons = [
+            LearningPathLesson.objects.create(
+                path_unit=self.unit,
+                title=f'Lección {i}',
+                lesson_type='PRACTICE',
+                order=i
+            )
+            for i in range(1, 4)
+        ]
+        
+        self.streak_achievement = PathAchievement.objects.create(
+            name='Constante',
+            description='Racha de 3 días',
+            achievement_type='STREAK',
+            criteria={'min_streak_days': 3},
+            learning_path=self.learning_path,
+            xp_reward=30
+        )
+        
+        self.perfect_achievement = PathAchievement.objects.create(
+            name='Perfeccionista',
+            description='2 lecciones perfectas',
+            achievement_type='PERFECT',
+            criteria={'min_perfect_lessons': 2},
+            learning_path=self.learning_path,
+            xp_reward=40
+        )
+        
+        self.enrollment = UserPathEnrollment.objects.create(
+            user=self.user,
+            learning_path=self.learning_path
+        )
+    
+    def _earned_ids(self):
+        from .models import UserPathAchievement
+        return set(
+            UserPathAchievement.objects.filter(user=self.user).values_list('achievement_id', flat=True)
+        )
+    
+    def test_rule_index_groups_rules_by_trigger(self):
+        """Las reglas se indexan por la métrica que las dispara"""
+        from .achievements import AchievementEngine
+        
+        index = AchievementEngine.get_rule_index(self.learning_path.id)
+        
+        streak_rules = index.rules_for({'current_streak_days'})
+        self.assertEqual([r.achievement_id for r in streak_rules], [self.streak_achievement.id])
+        self.assertEqual(index.rules_for({'average_score'}), [])
+        self.assertTrue(index.needs_perfect_count)
+    
+    def test_unrelated_field_change_skips_evaluation(self):
+        """Cambios en campos sin reglas asociadas no evalúan ningún logro"""
+        self.enrollment.current_streak_days = 5
+        UserPathEnrollment.objects.filter(pk=self.enrollment.pk).update(current_streak_days=5)
+        
+        self.enrollment.daily_goal_minutes = 45
+        self.enrollment.save()
+        
+        self.assertEqual(self._earned_ids(), set())
+    
+    def test_streak_change_awards_achievement_and_xp(self):
+        """Un cambio de racha otorga el logro y su XP una sola vez"""
+        xp_before = self.user.experience_points
+        
+        self.enrollment.current_streak_days = 3
+        self.enrollment.save()
+        self.enrollment.save()
+        
+        self.assertEqual(self._earned_ids(), {self.streak_achievement.id})
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.experience_points, xp_before + 30)
+
+    def test_award_from_concurrent_evaluation_is_not_paid_twice(self):
+        """Un logro otorgado por otra petición tras la lectura inicial no suma XP"""
+        from unittest.mock import patch
+        from .achievements import AchievementEngine
+        from .models import UserPathAchievement
+
+        xp_before = self.user.experience_points
+        UserPathAchievement.objects.create(
+            user=self.user, achievement=self.streak_achievement,
+            enrollment=self.enrollment, xp_earned=30
+        )
+        self.enrollment.current_streak_days = 3
+
+        # La primera lectura no ve el logro; la relectura bajo el lock sí
+        with patch.object(
+            AchievementEngine, '_earned_ids', side_effect=[set(), {self.streak_achievement.id}]
+        ):
+            awarded = AchievementEngine.evaluate(self.enrollment, {'current_streak_days'})
+
+        self.assertEqual(awarded, [])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.experience_points, xp_before)
+
+    def test_perfect_lessons_trigger(self):
+        """Las lecciones perfectas disparan solo las reglas PERFECT"""
+        for lesson in self.lessons[:2]:
+            progress = UserLessonProgress.objects.create(
+                user=self.user,
+                path_lesson=lesson,
+                enrollment=self.enrollment,
+                status='IN_PROGRESS'
+            )
+            progress.status = 'PERFECT'
+            progress.best_score = 100.0
+            progress.save()
+        
+        self.assertIn(self.perfect_achievement.id, self._earned_ids())
+        self.assertNotIn(self.streak_achievement.id, self._earned_ids())
+    
+    def test_rules_invalidated_when_achievement_changes(self):
+        """Editar un logro invalida las reglas compiladas de la ruta"""
+        from .achievements import AchievementEngine
+        
+        AchievementEngine.get_rule_index(self.learning_path.id)
+        self.streak_achievement.criteria = {'min_streak_days': 1}
+        self.streak_achievement.save()
+        
+        self.enrollment.current_streak_days = 1
+        self.enrollment.save()
+        
+        self.assertIn(self.streak_achievement.id, self._earned_ids())
+
+
+class RateLimiterTests(TestCase):
+    """Tests para el motor de rate limiting de ventana deslizante"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        from .ratelimit import RateLimiter
+        
+        RateLimiter.reset_local()
+        self.user = User.objects.create_user(
+            username='limited',
+            email='limited@example.com',
+            password='testpass123'
+        )
+    
+    def test_sliding_window_counts_and_remaining(self):
+        """El límite se aplica dentro de la ventana y reporta cuota restante"""
+        from .ratelimit import RateLimiter
+        
+        first = RateLimiter.hit('test_key', limit=2, window=60, now=1000.0)
+        second = RateLimiter.hit('test_key', limit=2, window=60, now=1010.0)
+        third = RateLimiter.hit('test_key', limit=2, window=60, now=1020.0)
+        
+        self.assertTrue(first.allowed)
+        self.assertEqual(first.remaining, 1)
+        self.assertTrue(second.allowed)
+        self.assertEqual(second.remaining, 0)
+        self.assertFalse(third.allowed)
+        self.assertEqual(third.retry_after, 40.0)
+    
+    def test_window_slides_instead_of_resetting_on_write(self):
+        """Las peticiones expiran individualmente; escribir no renueva la ventana"""
+        from .ratelimit import RateLimiter
+        
+        RateLimiter.hit('slide_key', limit=2, window=60, now=1000.0)
+        RateLimiter.hit('slide_key', limit=2, window=60, now=1050.0)
+        
+        self.assertFalse(RateLimiter.hit('slide_key', limit=2, window=60, now=1059.0).allowed)
+        # La primera petición sale de la ventana a los 60s, no a los 60s de la última
+        self.assertTrue(RateLimiter.hit('slide_key', limit=2, window=60, now=1061.0).allowed)
+    
+    def test_local_backend_drops_expired_keys(self):
+        """Las keys sin peticiones vigentes no quedan en memoria del proceso"""
+        from .ratelimit import LocalSlidingWindowBackend
+        
+        backend = LocalSlidingWindowBackend()
+        backend.hit('daily:1', limit=5, window=30, now=1000.0)
+        backend.hit('user:2', limit=5, window=600, now=1000.0)
+        self.assertEqual(len(backend), 2)
+        
+        # El barrido periódico poda las keys que nadie vuelve a consultar
+        backend.hit('user:3', limit=5, window=600, now=1000.0 + backend.SWEEP_INTERVAL)
+        self.assertEqual(len(backend), 2)
+        
+        self.assertFalse(backend.hit('blocked', limit=0, window=60, now=1100.0).allowed)
+        self.assertEqual(len(backend), 2)
+    
+    def test_throttle_sets_quota_headers(self):
+        """Los throttles registran la cuota y el middleware la expone en headers"""
+        from django.http import HttpResponse
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from rest_framework.request import Request
+        from .ratelimit import RateLimitHeadersMiddleware
+        from .throttles import AIRecommendationThrottle
+        
+        http_request = APIRequestFactory().get('/')
+        force_authenticate(http_request, user=self.user)
+        request = Request(http_request)
+        request.user  # Forzar autenticación
+        
+        throttle = AIRecommendationThrottle()
+        for _ in range(3):
+            self.assertTrue(throttle.allow_request(request, view=None))
+        self.assertFalse(throttle.allow_request(request, view=None))
+        self.assertGreater(throttle.wait(), 0)
+        
+        response = RateLimitHeadersMiddleware(lambda r: HttpResponse())(http_request)
+        self.assertEqual(response['X-RateLimit-Limit'], '3')
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+
+
+class LeaderboardTests(TestCase):
+    """Tests para los leaderboards sobre sorted sets"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        from .leaderboards import LeaderboardService
+        
+        LeaderboardService.reset_local()
+        self.users = [
+            User.objects.create_user(
+                username=f'player{i}',
+                email=f'player{i}@example.com',
+                password='testpass123'
+            )
+            for i in range(5)
+        ]
+        self.learning_path = LearningPath.objects.create(
+            name='Ruta Ranking',
+            slug='ruta-ranking',
+            description='Ruta para leaderboards',
+            path_type='SUBJECT_MASTERY',
+            difficulty_level='BEGINNER',
+            status='ACTIVE'
+        )
+    
+    def test_add_experience_increments_global_and_path_sets(self):
+        """El XP otorgado suma en el global y en la ruta que lo originó"""
+        from .leaderboards import LeaderboardService
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[0].add_experience(50, learning_path_id=self.learning_path.id)
+            self.users[1].add_experience(80)
+            self.users[0].add_experience(40, learning_path_id=self.learning_path.id)
+        
+        top = LeaderboardService.top('global', period='weekly')
+        self.assertEqual([entry['user_id'] for entry in top], [self.users[0].id, self.users[1].id])
+        self.assertEqual(top[0]['score'], 90)
+        
+        path_top = LeaderboardService.top('path', self.learning_path.id, period='daily')
+        self.assertEqual(len(path_top), 1)
+        self.assertEqual(path_top[0]['score'], 90)
+    
+    def test_rank_and_neighbourhood(self):
+        """Ranking propio y vecindario alrededor del usuario"""
+        from .leaderboards import LeaderboardService
+        
+        for points, user in zip([10, 20, 30, 40, 50], self.users):
+            LeaderboardService.record_xp(user, points)
+        
+        own = LeaderboardService.rank(self.users[2].id)
+        self.assertEqual(own['rank'], 3)
+        self.assertEqual(own['score'], 30)
+        
+        neighbours = LeaderboardService.neighbourhood(self.users[2].id, radius=1)
+        self.assertEqual(
+            [entry['user_id'] for entry in neighbours],
+            [self.users[3].id, self.users[2].id, self.users[1].id]
+        )
+        self.assertIsNone(LeaderboardService.rank(9999))
+    
+    def test_local_sorted_set_keeps_order_on_increment(self):
+        """El backend en proceso mantiene el orden sin reordenar en cada consulta"""
+        from .leaderboards import LocalSortedSet
+        
+        board = LocalSortedSet({1: 50, 2: 80, 3: 50})
+        self.assertEqual(board.range(0, -1), [(2, 80), (1, 50), (3, 50)])
+        
+        board.increment(3, 40)
+        board.increment(4, 10)
+        self.assertEqual(board.rank(3), (0, 90))
+        self.assertEqual(board.rank(1), (2, 50))
+        self.assertEqual(board.range(1, 2), [(2, 80), (1, 50)])
+        self.assertIsNone(board.rank(99))
+        self.assertEqual(len(board), 4)
+    
+    def test_rebuild_repopulates_from_database(self):
+        """La reconstrucción repuebla los sets desde el ledger, con todas sus fuentes"""
+        from apps.users.ledger import ExperienceLedger
+        from .leaderboards import LeaderboardService
+        
+        ExperienceLedger.award(self.users[3], 75, source='LESSON', learning_path_id=self.learning_path.id)
+        ExperienceLedger.award(self.users[3], 30, source='BATTLE')
+        ExperienceLedger.award(self.users[4], 20, source='REWARD')
+        
+        LeaderboardService.reset_local()
+        LeaderboardService.rebuild(periods=['weekly'])
+        
+        own = LeaderboardService.rank(self.users[3].id, 'path', self.learning_path.id, 'weekly')
+        self.assertEqual(own['rank'], 1)
+        self.assertEqual(own['score'], 75)
+        self.assertEqual(
+            [(entry['user_id'], entry['score']) for entry in LeaderboardService.top('global', period='weekly')],
+            [(self.users[3].id, 105), (self.users[4].id, 20)]
+        )
+    
+    def test_rolled_back_experience_is_not_ranked(self):
+        """Los sorted sets se incrementan solo si el XP se confirma"""
+        from django.db import transaction
+        from .leaderboards import LeaderboardService
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.users[0].add_experience(50)
+                raise RuntimeError
+        self.assertIsNone(LeaderboardService.rank(self.users[0].id))
+
+
+class PathRecommenderTests(TestCase):
+    """Tests para el recomendador vectorizado"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        from .recommender import PathRecommender
+        
+        cache.clear()
+        PathRecommender.reset()
+        self.user = User.objects.create_user(
+            username='recommended',
+            email='recommended@example.com',
+            password='testpass123'
+        )
+        self.paths = [
+            LearningPath.objects.create(
+                name=f'Ruta {i}',
+                slug=f'ruta-recomendada-{i}',
+                description='Ruta candidata',
+                path_type='SUBJECT_MASTERY',
+                difficulty_level='BEGINNER',
+                status='ACTIVE',
+                average_rating=float(i % 5),
+                total_enrollments=i,
+                target_icfes_areas=['MATHEMATICS'] if i % 2 else ['READING']
+            )
+            for i in range(25)
+        ]
+    
+    def test_scores_every_candidate_not_only_first_twenty(self):
+        """Las mejores rutas se encuentran aunque estén fuera de las primeras 20"""
+        from .recommender import PathRecommender
+        
+        best = self.paths[24]
+        LearningPath.objects.filter(pk=best.pk).update(average_rating=5.0, total_enrollments=500)
+        PathRecommender.mark_dirty(best.pk)
+        
+        recommendations = PathRecommender.recommend(self.user, limit=10)
+        
+        self.assertEqual(len(recommendations), 10)
+        self.assertEqual(recommendations[0]['path_id'], best.pk)
+        scores = [r['score'] for r in recommendations]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+    
+    def test_incremental_refresh_and_enrollment_exclusion(self):
+        """Las rutas modificadas se recargan y las inscritas se excluyen"""
+        from .recommender import PathRecommender
+        
+        PathRecommender.get_matrix()
+        archived = self.paths[3]
+        archived.status = 'ARCHIVED'
+        archived.save()
+        UserPathEnrollment.objects.create(user=self.user, learning_path=self.paths[5])
+        
+        recommended_ids = PathRecommender.recommend_ids(self.user, limit=25)
+        
+        self.assertNotIn(archived.pk, recommended_ids)
+        self.assertNotIn(self.paths[5].pk, recommended_ids)
+        self.assertEqual(len(recommended_ids), 23)
+
+    def test_dirty_marks_use_one_key_per_sequence(self):
+        """Cada marca tiene su propia key y una marca perdida fuerza la reconstrucción"""
+        from .recommender import PathRecommender, DIRTY_PATH_KEY
+
+        matrix = PathRecommender.get_matrix()
+        first, second = self.paths[1], self.paths[2]
+        LearningPath.objects.filter(pk__in=[first.pk, second.pk]).update(required_level=7)
+        PathRecommender.mark_dirty(first.pk)
+        PathRecommender.mark_dirty(second.pk)
+
+        self.assertEqual(cache.get(DIRTY_PATH_KEY.format(seq=PathRecommender._applied_seq + 1)), first.pk)
+        patched = PathRecommender.get_matrix()
+        self.assertIs(patched, matrix)
+        for path in (first, second):
+            self.assertEqual(patched.features[patched.row_index[path.pk], 0], 7)
+
+        LearningPath.objects.filter(pk=first.pk).update(required_level=9)
+        PathRecommender.mark_dirty(first.pk)
+        cache.delete(DIRTY_PATH_KEY.format(seq=PathRecommender._applied_seq + 1))
+
+        rebuilt = PathRecommender.get_matrix()
+        self.assertIsNot(rebuilt, matrix)
+        self.assertEqual(rebuilt.features[rebuilt.row_index[first.pk], 0], 9)
+
+
+class CollaborativeFilteringTests(TestCase):
+    """Tests para el filtrado colaborativo item-item"""
+    
+    def test_top_k_similarities_by_chunks(self):
+        """Los vecinos coinciden con la similitud coseno, en cualquier tamaño de bloque"""
+        from .collaborative import build_interaction_matrix, compute_top_k_similarities
+        
+        # Ítems 10 y 20 siempre juntos; 30 solo con un usuario de 10
+        matrix, item_ids = build_interaction_matrix([
+            (1, 10, 1.0), (1, 20, 1.0),
+            (2, 10, 1.0), (2, 20, 1.0),
+            (3, 10, 1.0), (3, 30, 1.0),
+        ])
+        self.assertEqual(list(item_ids), [10, 20, 30])
+        
+        for chunk_size in (1, 2, 512):
+            neighbours, scores = compute_top_k_similarities(matrix, top_k=2, chunk_size=chunk_size)
+            self.assertEqual(item_ids[neighbours[1, 0]], 10)
+            self.assertAlmostEqual(float(scores[1, 0]), 2 / (3 ** 0.5 * 2 ** 0.5), places=5)
+            self.assertEqual(float(scores[1, 1]), 0.0)
+    
+    def test_published_table_scores_unseen_items(self):
+        """La tabla publicada puntúa ítems no vistos a partir de los vecinos"""
+        from .collaborative import ItemSimilarityStore, NeighbourTable
+        import numpy as np
+        
+        table = NeighbourTable(
+            np.array([10, 20, 30], dtype=np.int64),
+            np.array([[1, 2], [0, 2], [0, 1]], dtype=np.int32),
+            np.array([[0.9, 0.1], [0.9, 0.0], [0.1, 0.0]], dtype=np.float32)
+        )
+        ItemSimilarityStore.publish('path', table)
+        
+        loaded = ItemSimilarityStore.get('path')
+        ranked = loaded.score({10: 1.0}, limit=5)
+        
+        self.assertEqual([item_id for item_id, _score in ranked], [20, 30])
+        self.assertEqual([item_id for item_id, _score in loaded.neighbours_of(20)], [10])
+
+
+class PathDistributionTests(TestCase):
+    """Tests para las distribuciones de resultados por ruta"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        cache.clear()
+        self.learning_path = LearningPath.objects.create(
+            name='Simulacro',
+            slug='simulacro-distribucion',
+            description='Ruta de simulacro',
+            path_type='ICFES_PREP',
+            difficulty_level='INTERMEDIATE',
+            status='ACTIVE'
+        )
+        self.enrollments = []
+        for i, progress in enumerate([20, 40, 60, 80, 100]):
+            user = User.objects.create_user(
+                username=f'sim{i}',
+                email=f'sim{i}@example.com',
+                password='testpass123'
+            )
+            enrollment = UserPathEnrollment.objects.create(
+                user=user,
+                learning_path=self.learning_path
+            )
+            enrollment.progress_percentage = progress
+            enrollment.total_xp_earned = progress * 10
+            enrollment.total_time_minutes = 600 - progress
+            enrollment.status = 'COMPLETED'
+            enrollment.save()
+            self.enrollments.append(enrollment)
+    
+    def test_completions_update_distribution(self):
+        """Cada inscripción completada actualiza histogramas, sumas y top"""
+        from .distributions import PathDistributionService
+        
+        state = PathDistributionService.get_state(self.learning_path.id)
+        
+        self.assertEqual(state['total_count'], 5)
+        self.assertEqual(state['sums']['progress'], 300)
+        self.assertEqual(state['top_performers'][0]['progress'], 100)
+    
+    def test_compare_matches_exact_counts(self):
+        """Percentiles y promedios coinciden con el cálculo exacto"""
+        from .distributions import PathDistributionService
+        
+        comparison = PathDistributionService.compare(self.enrollments[2])
+        
+        self.assertEqual(comparison['total_users'], 4)
+        self.assertEqual(comparison['better_progress'], 2)
+        self.assertAlmostEqual(comparison['averages']['progress'], 60.0)
+        self.assertNotIn(
+            self.enrollments[2].id,
+            [entry['enrollment_id'] for entry in comparison['top_performers']]
+        )
+    
+    def test_changes_replace_previous_values(self):
+        """Modificar o descompletar una inscripción retira sus valores anteriores"""
+        from .distributions import PathDistributionService
+        
+        enrollment = self.enrollments[0]
+        enrollment.progress_percentage = 90
+        enrollment.save()
+        
+        dropped = self.enrollments[4]
+        dropped.status = 'ACTIVE'
+        dropped.save()
+        
+        state = PathDistributionService.get_state(self.learning_path.id)
+        self.assertEqual(state['total_count'], 4)
+        self.assertEqual(state['sums']['progress'], 90 + 40 + 60 + 80)
+        self.assertEqual(state['top_performers'][0]['progress'], 90)
+
+
+class ReportQueueTests(TestCase):
+    """Tests para la cola de reportes PDF de simulacros"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        import tempfile
+        from django.test import override_settings
+        
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        
+        self.user = User.objects.create_user(
+            username='reporter',
+            email='reporter@example.com',
+            password='testpass123'
+        )
+        learning_path = LearningPath.objects.create(
+            name='Simulacro Reporte',
+            slug='simulacro-reporte',
+            description='Ruta de simulacro',
+            path_type='ICFES_PREP',
+            difficulty_level='INTERMEDIATE',
+            status='ACTIVE'
+        )
+        self.enrollment = UserPathEnrollment.objects.create(
+            user=self.user,
+            learning_path=learning_path,
+            status='COMPLETED',
+            progress_percentage=100
+        )
+    
+    def tearDown(self):
+        import shutil
+        
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def test_rendered_report_is_served_until_progress_changes(self):
+        """El PDF de una versión se reutiliza y una nueva versión reemplaza la anterior"""
+        import os
+        from .reports import ReportQueue, render_report_to_disk, report_version
+        
+        version = report_version(self.enrollment)
+        self.assertEqual(ReportQueue.status(self.enrollment)['status'], 'MISSING')
+        
+        path = render_report_to_disk(self.enrollment.pk, version)
+        with open(path, 'rb') as pdf:
+            self.assertTrue(pdf.read().startswith(b'%PDF'))
+        
+        report = ReportQueue.enqueue(self.enrollment)
+        self.assertEqual(report['status'], 'READY')
+        self.assertIn(str(self.enrollment.uuid), report['url'])
+        
+        self.enrollment.total_xp_earned = 500
+        self.enrollment.save()
+        new_version = report_version(self.enrollment)
+        self.assertNotEqual(new_version, version)
+        
+        render_report_to_disk(self.enrollment.pk, new_version)
+        self.assertFalse(os.path.exists(path))
+
+
+class NextLessonResolverTests(TestCase):
+    """Tests para el resolver de la siguiente lección"""
+    
+    def setUp(self):
+        """Configuración inicial"""
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='resumer',
+            email='resumer@example.com',
+            password='testpass123'
+        )
+        self.lessons = {}
+        self.enrollments = {}
+        for slug in ('ruta-a', 'ruta-b'):
+            learning_path = LearningPath.objects.create(
+                name=slug,
+                slug=slug,
+                description='Ruta',
+                path_type='SUBJECT_MASTERY',
+                difficulty_level='BEGINNER',
+                status='ACTIVE'
+            )
+            lessons = []
+            for unit_order in (2, 1):
+                unit = LearningPathUnit.objects.create(
+                    learning_path=learning_path,
+                    title=f'{slug} unidad {unit_order}',
+                    description='Unidad',
+                    unit_type='CORE',
+                    order=unit_order
+                )
+                for lesson_order in (1, 2):
+                    lessons.append(LearningPathLesson.objects.create(
+                        path_unit=unit,
+                        title=f'{slug} u{unit_order} l{lesson_order}',
+                        lesson_type='PRACTICE',
+                        order=lesson_order
+                    ))
+            self.lessons[slug] = sorted(
+                lessons, key=lambda lesson: (lesson.path_unit.order, lesson.order)
+            )
+            self.enrollments[slug] = UserPathEnrollment.objects.create(
+                user=self.user,
+                learning_path=learning_path
+            )
+        
+        UserPathEnrollment.objects.filter(pk=self.enrollments['ruta-b'].pk).update(
+            last_activity_date=timezone.now().date()
+        )
+    
+    def test_resolves_first_pending_lesson_per_enrollment_in_one_query(self):
+        """Una query devuelve la primera lección pendiente de cada inscripción"""
+        from .progression import NextLessonResolver
+        
+        UserLessonProgress.objects.create(
+            user=self.user,
+            enrollment=self.enrollments['ruta-b'],
+            path_lesson=self.lessons['ruta-b'][0],
+            status='COMPLETED'
+        )
+        
+        with self.assertNumQueries(1):
+            entries = NextLessonResolver.resolve_all(self.user)
+        
+        self.assertEqual(
+            [entry['lesson']['id'] for entry in entries],
+            [self.lessons['ruta-b'][1].id, self.lessons['ruta-a'][0].id]
+        )
+    
+    def test_pointer_follows_started_and_completed_lessons(self):
+        """El pointer se fija al iniciar y avanza al completar"""
+        from .progression import NextLessonResolver
+        
+        lesson = self.lessons['ruta-a'][2]
+        enrollment = self.enrollments['ruta-a']
+        NextLessonResolver.lesson_started(self.user, lesson, enrollment)
+        
+        with self.assertNumQueries(0):
+            pointer = NextLessonResolver.next_for_user(self.user)
+        self.assertEqual(pointer['lesson']['id'], lesson.id)
+        
+        progress = UserLessonProgress.objects.create(
+            user=self.user,
+            enrollment=enrollment,
+            path_lesson=self.lessons['ruta-a'][0],
+            status='COMPLETED'
+        )
+        NextLessonResolver.lesson_finished(self.user, progress)
+        
+        pointer = NextLessonResolver.next_for_user(self.user)
+        self.assertEqual(pointer['lesson']['id'], self.lessons['ruta-a'][1].id)
+
+
+class RandomSamplerTests(TestCase):
+    """Tests del muestreo aleatorio por pools de IDs"""
+    
+    def setUp(self):
+        cache.clear()
+        self.paths = [
+            LearningPath.objects.create(
+                name=f'Ruta {i}',
+                slug=f'ruta-muestreo-{i}',
+                description='Ruta para muestreo',
+                path_type='SUBJECT_MASTERY',
+                difficulty_level='BEGINNER',
+                status='ACTIVE'
+            )
+            for i in range(20)
+        ]
+    
+    def test_sample_respects_exclusions_without_duplicates(self):
+        """Las muestras son únicas, del filtro y sin los IDs excluidos"""
+        from .sampling import RandomSampler
+        
+        queryset = LearningPath.objects.filter(status='ACTIVE')
+        excluded = {path.id for path in self.paths[:15]}
+        
+        RandomSampler.get_pool(queryset)
+        with self.assertNumQueries(0):
+            ids = RandomSampler.sample_ids(queryset, 10, exclude=excluded)
+        
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+        self.assertEqual(set(ids), {path.id for path in self.paths[15:]})
+    
+    def test_pool_is_invalidated_on_save(self):
+        """Guardar una instancia publica una nueva versión del pool"""
+        from .sampling import RandomSampler
+        
+        queryset = LearningPath.objects.filter(status='ACTIVE')
+        self.assertEqual(len(RandomSampler.get_pool(queryset)), 20)
+        
+        self.paths[0].status = 'DRAFT'
+        self.paths[0].save()
+        
+        pool = RandomSampler.get_pool(queryset)
+        self.assertEqual(len(pool), 19)
+        self.assertNotIn(self.paths[0].id, pool)
+
+    def test_sampled_models_registered_at_startup_and_memory_pools_expire(self):
+        """Las preguntas invalidan desde el arranque y el pool en memoria vence"""
+        import time
+        from unittest.mock import patch
+        from .sampling import RandomSampler, POOL_TIMEOUT
+
+        self.assertIn('icfes.preguntaicfes', RandomSampler._registered)
+
+        queryset = LearningPath.objects.filter(status='ACTIVE')
+        self.assertEqual(len(RandomSampler.get_pool(queryset)), 20)
+        # Cambio sin señales: solo el vencimiento lo hace visible
+        LearningPath.objects.filter(pk=self.paths[0].pk).update(status='DRAFT')
+        self.assertEqual(len(RandomSampler.get_pool(queryset)), 20)
+
+        with patch('time.time', return_value=time.time() + POOL_TIMEOUT + 1):
+            self.assertEqual(len(RandomSampler.get_pool(queryset)), 19)
+
+    def test_large_table_fallback_filters_candidates(self):
+        """Sin pool (tabla grande) el sondeo de PK solo devuelve filas del filtro"""
+        from unittest.mock import patch
+        from .sampling import RandomSampler
+        
+        active_ids = {path.id for path in self.paths[:10]}
+        LearningPath.objects.exclude(id__in=active_ids).update(status='DRAFT')
+        
+        with patch('apps.learning.sampling.MAX_POOL_SIZE', 5):
+            ids = RandomSampler.sample_ids(LearningPath.objects.filter(status='ACTIVE'), 4)
+        
+        self.assertLessEqual(len(ids), 4)
+        self.assertTrue(set(ids) <= active_ids)
+
+
+class BlueprintSamplerTests(TestCase):
+    """Tests del generador de simulacros por blueprint área × dificultad"""
+    
+    def setUp(self):
+        import numpy as np
+        from .blueprints import QuestionIndex
+        
+        # 60 preguntas por (área, nivel) salvo hard en inglés (solo 2)
+        cells = {}
+        next_id = 1
+        for area in ('MATEMATICAS', 'LECTURA_CRITICA', 'CIENCIAS_NATURALES', 'CIENCIAS_SOCIALES', 'INGLES'):
+            for level in range(1, 6):
+                size = 1 if area == 'INGLES' and level >= 4 else 60
+                cells[(area, level)] = np.arange(next_id, next_id + size, dtype=np.int64)
+                next_id += size
+        self.index = QuestionIndex(cells)
+    
+    def test_allocate_returns_exact_totals(self):
+        """El mayor residuo reparte exactamente el total"""
+        from .blueprints import allocate
+        
+        counts = allocate(45, {'easy': 30, 'medium': 50, 'hard': 20})
+        self.assertEqual(counts, {'easy': 14, 'medium': 22, 'hard': 9})
+        self.assertEqual(sum(allocate(7, {'a': 1, 'b': 1, 'c': 1}).values()), 7)
+    
+    def test_full_exam_has_exact_counts_without_duplicates(self):
+        """Un examen completo de 158 preguntas respeta las cuotas por área"""
+        from unittest.mock import patch
+        from apps.icfes.models import ICFESExam
+        from .blueprints import BlueprintSampler, QuestionBlueprint, DIFFICULTY_BANDS
+        
+        blueprint = QuestionBlueprint.from_exam(ICFESExam())
+        with patch.object(BlueprintSampler, 'get_index', return_value=self.index):
+            selection = BlueprintSampler.sample(blueprint)
+        
+        ids = [question_id for question_id, _area, _band in selection]
+        self.assertEqual(len(ids), 158)
+        self.assertEqual(len(set(ids)), 158)
+        
+        per_area = {}
+        for question_id, area, band in selection:
+            per_area[area] = per_area.get(area, 0) + 1
+            levels = [
+                level for (cell_area, level), cell_ids in self.index.cells.items()
+                if cell_area == area and question_id in cell_ids
+            ]
+            self.assertIn(levels[0], DIFFICULTY_BANDS[band])
+        self.assertEqual(per_area['MATEMATICAS'], 42)
+        self.assertEqual(per_area['INGLES'], 16)
+    
+    def test_short_band_borrows_from_neighbour_band(self):
+        """Si una banda no alcanza, el faltante sale de la banda vecina del área"""
+        from unittest.mock import patch
+        from .blueprints import BlueprintSampler, QuestionBlueprint
+        
+        blueprint = QuestionBlueprint({'INGLES': 20}, {'easy': 0, 'medium': 0, 'hard': 100})
+        with patch.object(BlueprintSampler, 'get_index', return_value=self.index):
+            selection = BlueprintSampler.sample(blueprint)
+        
+        bands = [band for _id, _area, band in selection]
+        self.assertEqual(len(selection), 20)
+        self.assertEqual(bands.count('hard'), 2)
+        self.assertEqual(bands.count('medium'), 18)
+    
+    def test_insufficient_bank_raises(self):
+        """Pedir más preguntas de las disponibles es un error del blueprint"""
+        from unittest.mock import patch
+        from .blueprints import BlueprintSampler, QuestionBlueprint, BlueprintError
+        
+        blueprint = QuestionBlueprint({'INGLES': 200})
+        with patch.object(BlueprintSampler, 'get_index', return_value=self.index):
+            with self.assertRaises(BlueprintError):
+                BlueprintSampler.sample(blueprint)
+
+
+class PathTagIndexTests(TestCase):
+    """Tests del índice normalizado de tags y sus facetas"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='taguser',
+            email='tags@test.com',
+            password='testpass123'
+        )
+        
+        self.algebra = LearningPath.objects.create(
+            name='Álgebra',
+            slug='algebra-tags',
+            description='Ruta de álgebra',
+            path_type='SUBJECT_MASTERY',
+            difficulty_level='BEGINNER',
+            status='ACTIVE',
+            tags=['Álgebra', 'Funciones'],
+            target_icfes_areas=['MATHEMATICS']
+        )
+        self.lectura = LearningPath.objects.create(
+            name='Lectura',
+            slug='lectura-tags',
+            description='Ruta de lectura',
+            path_type='SUBJECT_MASTERY',
+            difficulty_level='BEGINNER',
+            status='ACTIVE',
+            tags=['Lectura crítica', 'funciones'],
+            target_icfes_areas=['READING']
+        )
+    
+    def test_index_follows_json_fields(self):
+        """Guardar la ruta sincroniza sus filas del índice"""
+        from .models import LearningPathTag
+        
+        self.assertEqual(
+            set(LearningPathTag.objects.filter(learning_path=self.algebra).values_list('kind', 'slug')),
+            {('TAG', 'algebra'), ('TAG', 'funciones'), ('AREA', 'mathematics')}
+        )
+        
+        self.algebra.tags = ['Geometría']
+        self.algebra.save()
+        self.assertEqual(
+            list(LearningPathTag.objects.filter(learning_path=self.algebra, kind='TAG').values_list('slug', flat=True)),
+            ['geometria']
+        )
+    
+    def test_tag_and_category_filters_use_index(self):
+        """Los filtros resuelven slugs normalizados exactos"""
+        from .filters import LearningPathFilter
+        
+        queryset = LearningPath.objects.all()
+        by_tags = LearningPathFilter({'tags': 'FUNCIONES, algebra'}, queryset=queryset).qs
+        self.assertEqual(set(by_tags), {self.algebra, self.lectura})
+        
+        by_tag = LearningPathFilter({'tags': 'lectura crítica'}, queryset=queryset).qs
+        self.assertEqual(list(by_tag), [self.lectura])
+        
+        by_category = LearningPathFilter({'category': 'reading'}, queryset=queryset).qs
+        self.assertEqual(list(by_category), [self.lectura])
+        
+        # Sin coincidencias parciales
+        self.assertFalse(LearningPathFilter({'category': 'read'}, queryset=queryset).qs.exists())
+    
+    def test_facets_are_cached_and_invalidated(self):
+        """Las facetas se sirven de caché hasta que cambia una ruta"""
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from .views import LearningPathViewSet
+        
+        view = LearningPathViewSet.as_view({'get': 'tag_facets'})
+        
+        def get_facets():
+            request = APIRequestFactory().get('/api/paths/tags/')
+            force_authenticate(request, user=self.user)
+            return view(request)
+        
+        response = get_facets()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0], {'slug': 'funciones', 'name': 'Funciones', 'count': 2})
+        
+        with self.assertNumQueries(0):
+            from .tagging import PathTagIndex
+            PathTagIndex.facets()
+        
+        self.lectura.status = 'ARCHIVED'
+        self.lectura.save()
+        
+        response = get_facets()
+        counts = {facet['slug']: facet['count'] for facet in response.data['results']}
+        self.assertEqual(counts, {'algebra': 1, 'funciones': 1})
+
+
+class TrendingServiceTests(TestCase):
+    """Tests del puntaje de tendencia con decaimiento"""
+    
+    def setUp(self):
+        cache.clear()
+        self.old, self.new = [
+            LearningPath.objects.create(
+                name=f'Tendencia {name}',
+                slug=f'tendencia-{name}',
+                description='Ruta en tendencia',
+                path_type='SUBJECT_MASTERY',
+                difficulty_level='BEGINNER',
+                status='ACTIVE'
+            )
+            for name in ('old', 'new')
+        ]
+    
+    def test_recent_activity_outranks_older_activity(self):
+        """Tres eventos de hace 6 días pesan menos que dos de hoy"""
+        from .trending import TrendingService, EPOCH_SECONDS
+        
+        today = 1000 * EPOCH_SECONDS + 3600
+        for _ in range(3):
+            TrendingService.record(self.old.id, 1.0, now=today - 6 * EPOCH_SECONDS)
+        for _ in range(2):
+            TrendingService.record(self.new.id, 1.0, now=today)
+        TrendingService.renormalize(now=today)
+        
+        ranked = list(LearningPath.objects.order_by('-trending_score').values_list('id', flat=True))
+        self.assertEqual(ranked, [self.new.id, self.old.id])
+        
+        # Tras la renormalización ambas filas comparten la época actual
+        self.assertEqual(
+            set(LearningPath.objects.values_list('trending_epoch', flat=True)),
+            {1000}
+        )
+        self.old.refresh_from_db()
+        # Seis días son dos vidas medias; la hora pasada de la época suma 2^(1/72)
+        self.assertAlmostEqual(self.old.trending_score, 3 * 0.25 * 2 ** (1 / 72), places=6)
+    
+    def test_enrollment_bumps_score_and_filter_orders_by_it(self):
+        """Inscribirse suma al puntaje y el filtro trending ordena por él"""
+        from .filters import LearningPathFilter
+        
+        user = User.objects.create_user(username='trend', email='trend@test.com', password='testpass123')
+        UserPathEnrollment.objects.create(user=user, learning_path=self.new)
+        
+        self.new.refresh_from_db()
+        self.assertGreater(self.new.trending_score, 0)
+        
+        trending = LearningPathFilter({'trending': True}, queryset=LearningPath.objects.all()).qs
+        self.assertEqual(list(trending), [self.new])
+
+
+class SearchServiceTests(TestCase):
+    """Tests de la búsqueda unificada (respaldo sin PostgreSQL)"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='searcher',
+            email='search@test.com',
+            password='testpass123'
+        )
+        self.path = LearningPath.objects.create(
+            name='Funciones cuadráticas',
+            slug='funciones-cuadraticas',
+            short_description='Parábolas y vértices',
+            description='Aprende a graficar funciones cuadráticas',
+            path_type='SUBJECT_MASTERY',
+            difficulty_level='BEGINNER',
+            status='ACTIVE'
+        )
+        LearningPath.objects.create(
+            name='Funciones en borrador',
+            slug='funciones-borrador',
+            description='Aún no publicada',
+            path_type='SUBJECT_MASTERY',
+            difficulty_level='BEGINNER',
+            status='DRAFT'
+        )
+    
+    def test_search_matches_all_terms_in_visible_rows(self):
+        """Cada término debe aparecer en algún campo y solo se ven rutas publicadas"""
+        from .search import SearchService
+        
+        results = SearchService.search('funciones parábolas', domains=['paths'])
+        self.assertEqual([result['slug'] for result in results['paths']], ['funciones-cuadraticas'])
+        self.assertEqual(results['paths'][0]['domain'], 'paths')
+        self.assertEqual(results['paths'][0]['title'], 'Funciones cuadráticas')
+        
+        self.assertEqual(SearchService.search('funciones', domains=['paths'])['paths'][0]['slug'], self.path.slug)
+    
+    def test_search_view_validates_domains(self):
+        """Dominios desconocidos y búsquedas vacías se rechazan"""
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from .views import SearchView
+        
+        def search(params):
+            request = APIRequestFactory().get('/api/search/', params)
+            force_authenticate(request, user=self.user)
+            return SearchView.as_view()(request)
+        
+        self.assertEqual(search({'q': 'funciones', 'domain': 'users'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(search({'q': ' '}).status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = search({'q': 'funciones', 'domain': 'paths,content'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results']), {'paths', 'content'})
+        self.assertEqual(response.data['total'], 1)
+
+
+class KeysetPaginationTests(TestCase):
+    """Tests de la paginación por llave compuesta (created_at, id)"""
+    
+    def setUp(self):
+        same_instant = timezone.now() - timedelta(days=1)
+        for index in range(7):
+            path = LearningPath.objects.create(
+                name=f'Ruta {index}',
+                slug=f'ruta-keyset-{index}',
+                description='Ruta para paginar',
+                path_type='SUBJECT_MASTERY',
+                difficulty_level='BEGINNER',
+                status='ACTIVE'
+            )
+            # Varias filas con el mismo created_at: el id desempata
+            if index < 4:
+                LearningPath.objects.filter(pk=path.pk).update(created_at=same_instant)
+        self.expected = list(
+            LearningPath.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+    
+    def _page(self, url):
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from .pagination import KeysetPagination
+        
+        paginator = KeysetPagination()
+        paginator.page_size = 3
+        rows = paginator.paginate_queryset(LearningPath.objects.all(), Request(APIRequestFactory().get(url)))
+        return [row.id for row in rows], paginator.get_paginated_response([]).data
+    
+    def test_walk_forward_and_back(self):
+        """Las páginas cubren todo sin repetir y el enlace anterior regresa a la misma página"""
+        seen = []
+        pages = []
+        url = '/paths/'
+        while url:
+            ids, data = self._page(url)
+            seen.extend(ids)
+            pages.append((ids, data))
+            url = data['next']
+        
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0][1]['previous'])
+        
+        ids, data = self._page(pages[2][1]['previous'])
+        self.assertEqual(ids, pages[1][0])
+        ids, data = self._page(data['previous'])
+        self.assertEqual(ids, pages[0][0])
+        self.assertIsNone(data['previous'])
+        self.assertIsNotNone(data['next'])
+    
+    def test_estimated_total_and_invalid_cursor(self):
+        """include_total agrega el estimado y un cursor corrupto es 404"""
+        from rest_framework.exceptions import NotFound
+        
+        _ids, data = self._page('/paths/?include_total=1')
+        self.assertEqual(data['count_estimate'], 7)
+        self.assertNotIn('count_estimate', self._page('/paths/')[1])
+        
+        with self.assertRaises(NotFound):
+            self._page('/paths/?cursor=no-es-un-cursor')
+
+    def test_tampered_cursor_values_are_not_found(self):
+        """Un cursor decodificable con valores que no son de la llave es 404, no 500"""
+        import base64
+        from rest_framework.exceptions import NotFound
+
+        for values in (["abc", "x"], [None, 1], [{"a": 1}, 1], ["2026-01-01T00:00:00", "x"]):
+            cursor = base64.urlsafe_b64encode(json.dumps({'v': values}).encode()).decode()
+            with self.assertRaises(NotFound):
+                self._page(f'/paths/?cursor={cursor}')
+
+
+class CacheWarmRegistryTests(TestCase):
+    """Tests del registro de keys calentables y sus métricas"""
+    
+    def setUp(self):
+        cache.clear()
+        self.path = LearningPath.objects.create(
+            name='Ruta caliente',
+            slug='ruta-caliente',
+            description='Ruta',
+            path_type='SUBJECT_MASTERY',
+            difficulty_level='BEGINNER',
+            status='ACTIVE'
+        )
+        self.units = []
+        for unit_order in (2, 1, 3):
+            unit = LearningPathUnit.objects.create(
+                learning_path=self.path,
+                title=f'Unidad {unit_order}',
+                description='Unidad',
+                unit_type='CORE',
+                order=unit_order
+            )
+            for lesson_order in range(unit_order):
+                LearningPathLesson.objects.create(
+                    path_unit=unit,
+                    title=f'u{unit_order} l{lesson_order}',
+                    lesson_type='PRACTICE',
+                    order=lesson_order
+                )
+            self.units.append(unit)
+        self.units.sort(key=lambda unit: unit.order)
+        cache.clear()
+    
+    def test_warm_fills_missing_keys_once(self):
+        """warm construye las keys faltantes y omite las que ya están"""
+        from .cache import CacheWarmRegistry, CacheKeys, CacheMetrics
+        
+        report = CacheWarmRegistry.warm(['unit_navigation', 'path_stats'], workers=1)
+        self.assertEqual(report['unit_navigation']['warmed'], 1)
+        self.assertEqual(report['path_stats']['warmed'], 1)
+        
+        navigation = cache.get(CacheKeys.LEARNING_PATH_UNITS.format(path_id=self.path.id))
+        self.assertEqual([entry['order'] for entry in navigation], [1, 2, 3])
+        self.assertEqual([entry['lessons_count'] for entry in navigation], [1, 2, 3])
+        self.assertEqual(cache.get(f'path_stats_{self.path.id}')['total_lessons'], 6)
+        
+        again = CacheWarmRegistry.warm(['unit_navigation'], workers=1)
+        self.assertEqual((again['unit_navigation']['warmed'], again['unit_navigation']['skipped']), (0, 1))
+        self.assertEqual(CacheMetrics.snapshot(['unit_navigation'])['unit_navigation']['last_warm_keys'], 1)
+    
+    def test_fetch_records_hit_ratio_and_neighbours(self):
+        """La navegación cacheada resuelve vecinos y cuenta aciertos y fallos"""
+        from .cache import CacheMetrics
+        from .serializers import _unit_neighbour
+        
+        middle = self.units[1]
+        self.assertEqual(_unit_neighbour(middle, 1)['uuid'], str(self.units[2].uuid))
+        self.assertEqual(_unit_neighbour(middle, -1)['order_index'], 1)
+        self.assertIsNone(_unit_neighbour(self.units[0], -1))
+        
+        metrics = CacheMetrics.snapshot(['unit_navigation'])['unit_navigation']
+        self.assertEqual((metrics['hits'], metrics['misses']), (2, 1))
+        self.assertAlmostEqual(metrics['hit_ratio'], 2 / 3, places=3)
+
+    def test_unit_list_reads_navigation_once_per_path(self):
+        """Serializar todas las unidades de la ruta lee la navegación una sola vez"""
+        from .cache import CacheMetrics
+        from .serializers import OptimizedLearningPathUnitSerializer
+        
+        # Los SerializerMethodField de cada unidad con el contexto de la lista
+        serializer = OptimizedLearningPathUnitSerializer(context={})
+        data = [
+            {
+                'lessons_count': serializer.get_lessons_count(unit),
+                'next_unit': serializer.get_next_unit(unit),
+                'previous_unit': serializer.get_previous_unit(unit),
+            }
+            for unit in self.units
+        ]
+        
+        self.assertEqual([unit['lessons_count'] for unit in data], [1, 2, 3])
+        self.assertIsNone(data[0]['previous_unit'])
+        self.assertEqual(data[1]['next_unit']['uuid'], str(self.units[2].uuid))
+        metrics = CacheMetrics.snapshot(['unit_navigation'])['unit_navigation']
+        self.assertEqual((metrics['hits'], metrics['misses']), (0, 1))
+    
+    def test_unit_changes_invalidate_navigation(self):
+        """Editar el temario borra la navegación de la ruta"""
+        from .cache import CacheWarmRegistry, CacheKeys
+        
+        CacheWarmRegistry.fetch('unit_navigation', self.path.id)
+        key = CacheKeys.LEARNING_PATH_UNITS.format(path_id=self.path.id)
+        self.assertIsNotNone(cache.get(key))
+        
+        LearningPathLesson.objects.create(
+            path_unit=self.units[0], title='nueva', lesson_type='PRACTICE', order=9
+        )
+        self.assertIsNone(cache.get(key))
+    
+    def test_cached_response_key_includes_url_kwargs(self):
+        """Cada slug tiene su propia entrada en caché"""
+        from rest_framework.request import Request
+        from rest_framework.test import APIRequestFactory
+        from .cache import cached_response
+        
+        class DetailView:
+            @cached_response(family='test_detail')
+            def retrieve(self, request, slug=None):
+                return slug
+        
+        request = Request(APIRequestFactory().get('/paths/'))
+        self.assertEqual(DetailView().retrieve(request, slug='a'), 'a')
+        self.assertEqual(DetailView().retrieve(request, slug='b'), 'b')
+        self.assertEqual(DetailView().retrieve(request, slug='a'), 'a')
+
+
+class BattleEngineTests(TestCase):
+    """Tests del motor de batallas contra el jefe (backend en proceso)"""
+    
+    def setUp(self):
+        from .battles import BattleEngine
+        
+        cache.clear()
+        BattleEngine.reset_local()
+        self.user = User.objects.create_user(
+            username='boss_fighter',
+            email='boss@test.com',
+            password='testpass123'
+        )
+        self.path = LearningPath.objects.create(
+            name='Ruta del jefe',
+            slug='ruta-del-jefe',
+            description='Ruta',
+            path_type='SUBJECT_MASTERY',
+            difficulty_level='BEGINNER',
+            status='ACTIVE'
+        )
+        self.enrollment = UserPathEnrollment.objects.create(
+            user=self.user,
+            learning_path=self.path
+        )
+        self.questions = [
+            {
+                'id': 100 + index,
+                'uuid': f'00000000-0000-0000-0000-00000000000{index}',
+                'text': f'Pregunta {index}',
+                'image_url': None,
+                'difficulty': 4,
+                'options': {'A': 'a', 'B': 'b', 'C': 'c', 'D': 'd'},
+                'correct': 'B',
+                'xp_reward': 40,
+            }
+            for index in range(3)
+        ]
+    
+    def _start(self, now=1000.0):
+        from unittest.mock import patch
+        from .battles import BattleEngine
+        
+        with patch.object(BattleEngine, 'select_questions', return_value=self.questions):
+            return BattleEngine.start(self.user, self.enrollment, time_limit_minutes=10, now=now)
+    
+    def test_answers_are_graded_once_and_result_persisted_at_the_end(self):
+        """Cada pregunta se califica una vez y el cierre persiste resultado y XP"""
+        from .battles import BattleEngine, BattleError
+        from .models import BossBattleResult
+        
+        battle = self._start()
+        self.assertNotIn('correct', battle['questions'][0])
+        battle_id = battle['battle_id']
+        xp_before = self.user.experience_points
+        
+        with self.assertNumQueries(0):
+            first = BattleEngine.submit_answer(battle_id, self.user.id, 0, 'b', now=1010.0)
+        self.assertTrue(first['correct'])
+        self.assertEqual(first['remaining'], 2)
+        
+        with self.assertRaises(BattleError) as raised:
+            BattleEngine.submit_answer(battle_id, self.user.id, 0, 'C', now=1011.0)
+        self.assertEqual(raised.exception.code, 'already_answered')
+        
+        with self.assertRaises(BattleError) as raised:
+            BattleEngine.submit_answer(battle_id, self.user.id + 1, 1, 'B', now=1011.0)
+        self.assertEqual(raised.exception.code, 'not_found')
+        
+        BattleEngine.submit_answer(battle_id, self.user.id, 1, 'A', now=1020.0)
+        last = BattleEngine.submit_answer(battle_id, self.user.id, 2, 'B', now=1030.0)
+        
+        result = last['result']
+        self.assertEqual(result['outcome'], 'DEFEAT')
+        self.assertEqual(result['correct_answers'], 2)
+        self.assertEqual(result['xp_awarded'], 80)
+        
+        record = BossBattleResult.objects.get(uuid=battle_id)
+        self.assertEqual(record.answered_questions, 3)
+        self.assertEqual([answer['question_id'] for answer in record.answers], [100, 101, 102])
+        self.user.refresh_from_db()
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.user.experience_points, xp_before + 80)
+        self.assertEqual(self.enrollment.total_xp_earned, 80)
+        
+        with self.assertRaises(BattleError) as raised:
+            BattleEngine.submit_answer(battle_id, self.user.id, 0, 'B', now=1031.0)
+        self.assertEqual(raised.exception.code, 'finished')
+    
+    def test_expired_battles_are_closed_by_the_sweeper(self):
+        """El barrido cierra como TIMEOUT solo lo vencido y otorga el XP parcial"""
+        from .battles import BattleEngine, BattleError
+        from .models import BossBattleResult
+        
+        battle = self._start(now=1000.0)
+        BattleEngine.submit_answer(battle['battle_id'], self.user.id, 0, 'B', now=1100.0)
+        
+        self.assertEqual(BattleEngine.expire_due(now=1500.0), 0)
+        self.assertEqual(BattleEngine.expire_due(now=1000.0 + 600 + 10), 1)
+        
+        record = BossBattleResult.objects.get(uuid=battle['battle_id'])
+        self.assertEqual(record.outcome, 'TIMEOUT')
+        self.assertEqual(record.xp_awarded, 40)
+        self.assertEqual(BattleEngine.expire_due(now=2000.0), 0)
+        
+        late = self._start(now=5000.0)
+        with self.assertRaises(BattleError) as raised:
+            BattleEngine.submit_answer(late['battle_id'], self.user.id, 0, 'B', now=5000.0 + 700)
+        self.assertEqual(raised.exception.code, 'expired')
+        self.assertEqual(raised.exception.result['outcome'], 'TIMEOUT')
+
+    def test_answer_racing_with_finish_is_rejected(self):
+        """Una respuesta que llega después de que finish() reclamó la batalla no se graba"""
+        from unittest.mock import patch
+        from .battles import BattleEngine, BattleError
+
+        battle = self._start(now=1000.0)
+        battle_id = battle['battle_id']
+        backend = BattleEngine.get_backend()
+        correct_choice = backend.correct_choice
+
+        def claim_first(*args):
+            # Otro proceso reclama el cierre entre la lectura y la escritura
+            backend.claim(battle_id, 1001.0)
+            return correct_choice(*args)
+
+        with patch.object(backend, 'correct_choice', side_effect=claim_first):
+            with self.assertRaises(BattleError) as raised:
+                BattleEngine.submit_answer(battle_id, self.user.id, 0, 'B', now=1001.0)
+
+        self.assertEqual(raised.exception.code, 'finished')
+        state = backend.load(battle_id)
+        self.assertNotIn('answer:0', state)
+        self.assertEqual(int(state.get('answered', 0)), 0)
+
+    def test_local_backend_expires_state_after_ttl(self):
+        """El estado en proceso expira con el ttl y el barrido descarta el deadline"""
+        from .battles import LocalBattleBackend
+
+        backend = LocalBattleBackend()
+        backend.create('vencida', {'user_id': 1}, {0: 'B'}, deadline=10.0, ttl=-1)
+        backend.create('vigente', {'user_id': 2}, {0: 'C'}, deadline=20.0, ttl=60)
+
+        self.assertEqual(backend.get_fields('vencida', ['user_id']), {'user_id': None})
+        self.assertIsNone(backend.correct_choice('vencida', 0))
+        self.assertEqual(backend.get_fields('vigente', ['user_id']), {'user_id': '2'})
+
+        self.assertEqual(backend.due(now=30.0, limit=10), ['vencida', 'vigente'])
+        self.assertEqual(backend.load('vencida'), {})
+        backend.discard('vencida')
+        self.assertEqual(backend.due(now=30.0, limit=10), ['vigente'])
+
+    def test_requires_redis_outside_tests(self):
+        """Sin Redis compartido el motor no cae al backend en proceso"""
+        from django.core.exceptions import ImproperlyConfigured
+        from django.test import override_settings
+        from .battles import BattleEngine
+
+        with override_settings(TESTING=False), self.assertRaises(ImproperlyConfigured):
+            BattleEngine.get_backend()
+
+
+class ContentAggregatesTests(TestCase):
+    """Tests de las métricas incrementales de contenido"""
+    
+    def setUp(self):
+        from apps.content.models import ContentUnit
+        from apps.users.models import UserProfile
+        
+        self.category = ContentCategory.objects.create(
+            name='Álgebra',
+            slug='algebra-agregados',
+            category_type='ACADEMIC'
+        )
+        self.unit = ContentUnit.objects.create(
+            title='Ecuaciones lineales',
+            description='Despejar la incógnita',
+            unit_type='LESSON',
+            category=self.category,
+            difficulty_level='BASIC'
+        )
+        self.users = [
+            User.objects.create_user(username=f'agg{index}', email=f'agg{index}@test.com', password='testpass123')
+            for index in range(2)
+        ]
+        for user in self.users:
+            UserProfile.objects.create(user=user)
+    
+    def _progress(self, user, **fields):
+        from apps.content.models import UserContentProgress
+        return UserContentProgress.objects.create(user=user, content_unit=self.unit, **fields)
+    
+    def test_progress_deltas_match_full_recompute(self):
+        """Los deltas aplicados con F() coinciden con re-agregar desde cero"""
+        from apps.content.aggregates import ContentAggregates
+        
+        first = self._progress(self.users[0], total_time_seconds=300)
+        second = self._progress(self.users[1], total_time_seconds=60)
+        
+        first.is_completed = True
+        first.completion_time_seconds = 600
+        first.total_time_seconds = 900
+        first.save()
+        second.is_completed = True
+        second.completion_time_seconds = 1200
+        second.save()
+        
+        self.unit.refresh_from_db()
+        self.assertEqual(self.unit.total_attempts, 2)
+        self.assertEqual(self.unit.total_completions, 2)
+        self.assertEqual(self.unit.completion_time_count, 2)
+        self.assertAlmostEqual(self.unit.average_completion_time, 15.0)
+        
+        profile = self.users[0].profile
+        profile.refresh_from_db()
+        self.assertEqual(profile.content_study_seconds, 900)
+        self.assertEqual(profile.total_study_minutes, 15)
+        
+        second.delete()
+        self.unit.refresh_from_db()
+        self.assertEqual(self.unit.total_completions, 1)
+        self.assertAlmostEqual(self.unit.average_completion_time, 10.0)
+        
+        snapshot = (self.unit.total_completions, self.unit.completion_time_sum, self.unit.average_completion_time)
+        ContentAggregates.rebuild()
+        self.unit.refresh_from_db()
+        self.assertEqual(
+            (self.unit.total_completions, self.unit.completion_time_sum, self.unit.average_completion_time),
+            snapshot
+        )
+
+    def test_progress_save_and_delta_share_one_transaction(self):
+        """El UPDATE del progreso y su delta se confirman o revierten juntos"""
+        from unittest.mock import patch
+        from apps.content.aggregates import ContentAggregates
+        from apps.content.models import UserContentProgress
+
+        progress = self._progress(self.users[0], total_time_seconds=300)
+        progress.total_time_seconds = 900
+        with patch.object(ContentAggregates, 'apply_progress_delta', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                progress.save()
+
+        self.assertEqual(UserContentProgress.objects.get(pk=progress.pk).total_time_seconds, 300)
+
+    def test_rating_changes_adjust_running_average(self):
+        """Crear, editar y borrar calificaciones mantiene suma, conteo y promedio"""
+        from apps.content.models import ContentRating
+        
+        rating = ContentRating.objects.create(user=self.users[0], content_unit=self.unit, rating=5)
+        ContentRating.objects.create(user=self.users[1], content_unit=self.unit, rating=2)
+        self.unit.refresh_from_db()
+        self.assertAlmostEqual(self.unit.average_rating, 3.5)
+        
+        rating.rating = 3
+        rating.save()
+        self.unit.refresh_from_db()
+        self.assertEqual((self.unit.rating_sum, self.unit.rating_count), (5, 2))
+        self.assertAlmostEqual(self.unit.average_rating, 2.5)
+        
+        ContentRating.objects.all().delete()
+        self.unit.refresh_from_db()
+        self.assertEqual((self.unit.rating_sum, self.unit.rating_count), (0, 0))
+        self.assertEqual(self.unit.average_rating, 0.0)
+
+
+class LessonProgressStoreTests(TestCase):
+    """Tests del progreso por lección normalizado"""
+    
+    def setUp(self):
+        from apps.content.models import ContentUnit, ContentLesson
+        
+        self.user = User.objects.create_user(
+            username='lessons',
+            email='lessons@test.com',
+            password='testpass123'
+        )
+        category = ContentCategory.objects.create(
+            name='Geometría',
+            slug='geometria-lecciones',
+            category_type='ACADEMIC'
+        )
+        self.unit = ContentUnit.objects.create(
+            title='Triángulos',
+            description='Ángulos y lados',
+            unit_type='LESSON',
+            category=category,
+            difficulty_level='BASIC',
+            xp_reward=30
+        )
+        self.lessons = [
+            ContentLesson.objects.create(
+                content_unit=self.unit,
+                title=f'Lección {order}',
+                lesson_type='THEORY',
+                content_format='TEXT',
+                order=order,
+                is_mandatory=order < 2
+            )
+            for order in range(3)
+        ]
+    
+    def _complete(self, lesson, **data):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from apps.content.views import CompleteLessonView
+        
+        request = APIRequestFactory().patch('/', data, format='json')
+        force_authenticate(request, user=self.user)
+        response = CompleteLessonView.as_view()(request, uuid=lesson.uuid)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+    
+    def test_mandatory_count_is_cached_on_the_unit(self):
+        self.unit.refresh_from_db()
+        self.assertEqual(self.unit.mandatory_lessons_count, 2)
+        
+        self.lessons[2].is_mandatory = True
+        self.lessons[2].save()
+        self.unit.refresh_from_db()
+        self.assertEqual(self.unit.mandatory_lessons_count, 3)
+    
+    def test_completing_lessons_increments_counter_once(self):
+        """Repetir una lección actualiza el puntaje sin volver a contarla"""
+        data = self._complete(self.lessons[0], score=80)
+        self.assertEqual(data['mandatory_lessons_completed'], 1)
+        self.assertEqual(data['progress_percentage'], 50.0)
+        
+        data = self._complete(self.lessons[0], score=95)
+        self.assertEqual(data['mandatory_lessons_completed'], 1)
+        self.assertEqual(data['lesson_progress'][str(self.lessons[0].id)]['score'], 95)
+        
+        data = self._complete(self.lessons[2])
+        self.assertEqual(data['progress_percentage'], 50.0)
+        self.assertFalse(data['is_completed'])
+        
+        data = self._complete(self.lessons[1])
+        self.assertEqual(data['progress_percentage'], 100.0)
+        self.assertTrue(data['is_completed'])
+        self.assertEqual(data['xp_earned'], 30)
+        self.assertEqual(len(data['lesson_progress']), 3)
+    
+    def test_mandatory_changes_recompute_progress(self):
+        """Volver obligatoria una lección ya completada reajusta contador y porcentaje"""
+        from apps.content.models import UserContentProgress
+        
+        self._complete(self.lessons[0])
+        self._complete(self.lessons[2])
+        
+        self.lessons[2].is_mandatory = True
+        self.lessons[2].save()
+        
+        progress = UserContentProgress.objects.get(user=self.user, content_unit=self.unit)
+        self.assertEqual(progress.mandatory_lessons_completed, 2)
+        self.assertAlmostEqual(progress.progress_percentage, 200 / 3)
+
+
+class CategoryTreeTests(TestCase):
+    """Tests de la ruta materializada y el snapshot del árbol de categorías"""
+    
+    def setUp(self):
+        cache.clear()
+        self.math = ContentCategory.objects.create(name='Matemáticas', slug='mat', category_type='ACADEMIC')
+        self.algebra = ContentCategory.objects.create(
+            name='Álgebra', slug='algebra-arbol', category_type='ACADEMIC', parent_category=self.math
+        )
+        self.equations = ContentCategory.objects.create(
+            name='Ecuaciones', slug='ecuaciones', category_type='TOPIC', parent_category=self.algebra
+        )
+        self.science = ContentCategory.objects.create(name='Ciencias', slug='ciencias', category_type='ACADEMIC')
+    
+    def test_paths_are_maintained_on_create_and_move(self):
+        from apps.content.category_tree import CategoryTree
+        
+        self.equations.refresh_from_db()
+        self.assertEqual(self.equations.tree_path, f'{self.math.id}/{self.algebra.id}/{self.equations.id}/')
+        self.assertEqual(self.equations.depth, 2)
+        self.assertEqual(self.equations.full_path, 'Matemáticas > Álgebra > Ecuaciones')
+        
+        self.algebra.parent_category = self.science
+        self.algebra.save()
+        self.equations.refresh_from_db()
+        self.assertEqual(self.equations.tree_path, f'{self.science.id}/{self.algebra.id}/{self.equations.id}/')
+        self.assertEqual(
+            set(CategoryTree.subtree(self.math).values_list('slug', flat=True)), {'mat'}
+        )
+        self.assertEqual(
+            set(CategoryTree.subtree(self.science, include_self=False).values_list('slug', flat=True)),
+            {'algebra-arbol', 'ecuaciones'}
+        )
+    
+    def test_parent_cannot_be_a_descendant(self):
+        from django.core.exceptions import ValidationError
+        
+        self.math.parent_category = self.equations
+        with self.assertRaises(ValidationError):
+            self.math.save()
+    
+    def test_units_under_a_category_include_subcategories(self):
+        from apps.content.category_tree import CategoryTree
+        from apps.content.models import ContentUnit
+        
+        for slug, category in (('suma', self.math), ('lineales', self.equations), ('celulas', self.science)):
+            ContentUnit.objects.create(
+                title=slug, slug=slug, description='-', unit_type='LESSON',
+                category=category, difficulty_level='BASIC'
+            )
+        self.assertEqual(
+            set(CategoryTree.units_under(self.math).values_list('slug', flat=True)), {'suma', 'lineales'}
+        )
+    
+    def test_endpoints_render_from_cached_snapshot(self):
+        """Tras construir el snapshot los endpoints no consultan la base y se invalida al guardar"""
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from apps.content.views import ContentCategoryViewSet
+        
+        user = User.objects.create_user(username='arbol', email='arbol@test.com', password='testpass123')
+        
+        def get(action, **kwargs):
+            request = APIRequestFactory().get('/')
+            force_authenticate(request, user=user)
+            return ContentCategoryViewSet.as_view({'get': action})(request, **kwargs).data
+        
+        get('tree')
+        with self.assertNumQueries(0):
+            roots = get('tree')
+            detail = get('retrieve', slug='ecuaciones')
+        self.assertEqual([root['slug'] for root in roots], ['ciencias', 'mat'])
+        self.assertEqual(roots[1]['children'][0]['children'][0]['slug'], 'ecuaciones')
+        self.assertEqual(detail['full_path'], 'Matemáticas > Álgebra > Ecuaciones')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.algebra.name = 'Álgebra lineal'
+            self.algebra.save()
+        detail = get('retrieve', slug='ecuaciones')
+        self.assertEqual(detail['full_path'], 'Matemáticas > Álgebra lineal > Ecuaciones')
+    
+    def test_admin_bulk_actions_invalidate_snapshot(self):
+        """Las acciones masivas del admin usan update() y aun así invalidan el snapshot"""
+        from unittest.mock import patch
+        from django.contrib.admin.sites import AdminSite
+        from apps.content.admin import ContentCategoryAdmin
+        from apps.content.category_tree import CategoryTree
+        
+        admin = ContentCategoryAdmin(ContentCategory, AdminSite())
+        queryset = ContentCategory.objects.filter(pk=self.science.pk)
+        CategoryTree.snapshot()
+        with patch.object(admin, 'message_user'), self.captureOnCommitCallbacks(execute=True):
+            admin.deactivate_categories(None, queryset)
+        self.assertNotIn('ciencias', [node['slug'] for node in CategoryTree.categories()])
+        
+        with patch.object(admin, 'message_user'), self.captureOnCommitCallbacks(execute=True):
+            admin.feature_categories(None, queryset)
+        self.assertTrue(CategoryTree.find('ciencias', active_only=False)['is_featured'])
+
+
+class ExperienceLedgerTests(TestCase):
+    """Tests del ledger de XP y del nivel/clase en forma cerrada"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ledger',
+            email='ledger@test.com',
+            password='testpass123'
+        )
+    
+    @staticmethod
+    def _legacy_progression(experience_points):
+        """Bucle original de add_experience partiendo de F nivel 1"""
+        from django.conf import settings
+        
+        required = settings.GAME_SETTINGS['LEVELS_REQUIRED_FOR_PROMOTION']
+        classes = ['F', 'E', 'D', 'C', 'B', 'A', 'S', 'S+']
+        hero_class, level = 'F', 1
+        while experience_points >= required.get(hero_class, 100) * level:
+            level += 1
+            if level >= 10 and classes.index(hero_class) < len(classes) - 1:
+                hero_class = classes[classes.index(hero_class) + 1]
+                level = 1
+        return hero_class, level
+    
+    def test_closed_form_matches_legacy_loop(self):
+        from apps.users.ledger import progression_for
+        
+        for experience_points in range(0, 3000, 7):
+            self.assertEqual(
+                progression_for(experience_points),
+                self._legacy_progression(experience_points),
+                experience_points
+            )
+    
+    def test_sql_update_matches_closed_form(self):
+        """El CASE del UPDATE coincide con la función pura y no pisa otros campos"""
+        from apps.users.ledger import ExperienceLedger, progression_for
+        
+        stale = User.objects.get(pk=self.user.pk)
+        for amount in (5, 90, 47, 400, 1):
+            ExperienceLedger.apply_to_user(self.user.pk, amount)
+            self.user.refresh_from_db()
+            self.assertEqual(
+                (self.user.hero_class, self.user.level),
+                progression_for(self.user.experience_points)
+            )
+        self.assertEqual(self.user.experience_points, 543)
+        
+        # Un otorgamiento desde una instancia desactualizada suma sobre el valor real
+        stale.add_experience(7)
+        self.assertEqual(stale.experience_points, 550)
+    
+    def test_batch_applies_one_update_per_user_and_keeps_entries(self):
+        from apps.users.ledger import ExperienceLedger
+        from apps.users.models import ExperienceLedgerEntry
+        
+        with ExperienceLedger.batch():
+            self.user.add_experience(30, source='LESSON', reference='lesson_progress:1')
+            self.user.add_experience(50, source='PATH_COMPLETION')
+            self.user.add_experience(0)
+            self.assertEqual(User.objects.get(pk=self.user.pk).experience_points, 0)
+        
+        self.assertEqual(self.user.experience_points, 80)
+        self.assertEqual(
+            list(ExperienceLedgerEntry.objects.filter(user=self.user).order_by('id').values_list('source', 'amount')),
+            [('LESSON', 30), ('PATH_COMPLETION', 50)]
+        )
+        
+        with self.assertRaises(RuntimeError):
+            with ExperienceLedger.batch():
+                self.user.add_experience(100)
+                raise RuntimeError
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.experience_points, 80)
+
+
+class VitalityServiceTests(TestCase):
+    """Tests de la vitalidad calculada al leer y el gasto condicionado"""
+    
+    def setUp(self):
+        from apps.users.models import UserProfile
+        
+        self.anchor = timezone.now() - timedelta(minutes=30)
+        self.users = [
+            User.objects.create_user(username=f'vital{index}', email=f'vital{index}@test.com', password='testpass123')
+            for index in range(2)
+        ]
+        self.profiles = [
+            UserProfile.objects.create(user=user, current_vitality=50, last_vitality_update=self.anchor)
+            for user in self.users
+        ]
+    
+    def test_regeneration_is_pure_and_keeps_partial_minutes(self):
+        from apps.users.vitality import regenerate
+        
+        now = self.anchor + timedelta(minutes=10, seconds=30)
+        self.assertEqual(regenerate(50, self.anchor, now), (60, self.anchor + timedelta(minutes=10)))
+        self.assertEqual(regenerate(95, self.anchor, now), (100, now))
+        self.assertEqual(regenerate(100, self.anchor, now), (100, now))
+    
+    def test_reads_do_not_write_and_unrelated_saves_keep_anchor(self):
+        profile = self.profiles[0]
+        self.assertEqual(profile.vitality_now(), 80)
+        
+        profile.learning_style = 'Visual'
+        profile.save()
+        profile.refresh_from_db()
+        self.assertEqual((profile.current_vitality, profile.last_vitality_update), (50, self.anchor))
+        self.assertEqual(profile.vitality_now(), 80)
+    
+    def test_spend_uses_compare_and_swap(self):
+        from apps.users.vitality import VitalityService, VitalityError
+        
+        now = self.anchor + timedelta(minutes=10)
+        self.assertEqual(VitalityService.spend(self.users[0].id, 25, now=now), 35)
+        
+        with self.assertRaises(VitalityError) as raised:
+            VitalityService.spend(self.users[0].id, 40, now=now)
+        self.assertEqual(raised.exception.available, 35)
+        
+        # Un estado leído antes del gasto ya no coincide: el UPDATE no afecta filas
+        self.assertEqual(VitalityService._swap(self.users[0].id, 50, self.anchor, 10, now), 0)
+        
+        spent, rejected = VitalityService.spend_many([user.id for user in self.users], 40, now=now)
+        self.assertEqual(spent, {self.users[1].id: 20})
+        self.assertEqual(rejected, [self.users[0].id])
+
+
+class DashboardSnapshotTests(TestCase):
+    """Tests del snapshot del dashboard con invalidación por tags"""
+    
+    def setUp(self):
+        from apps.users.models import UserProfile
+        
+        cache.clear()
+        self.anchor = timezone.now() - timedelta(minutes=30)
+        self.user = User.objects.create_user(
+            username='dashboard', email='dashboard@test.com', password='testpass123'
+        )
+        UserProfile.objects.create(user=self.user, current_vitality=50, last_vitality_update=self.anchor)
+    
+    def test_cached_sections_are_served_without_queries(self):
+        from .dashboard import DashboardSnapshot
+        
+        first = DashboardSnapshot.get(self.user)
+        self.assertEqual(set(first), {'stats', 'profile', 'streaks', 'achievements'})
+        self.assertEqual(first['stats']['user_info']['username'], 'dashboard')
+        self.assertNotIn('_vitality', first['stats'])
+        
+        with self.assertNumQueries(0):
+            second = DashboardSnapshot.get(self.user)
+        self.assertEqual(second['achievements'], first['achievements'])
+    
+    def test_invalidation_only_rebuilds_dependent_sections(self):
+        from .dashboard import DashboardSnapshot
+        
+        DashboardSnapshot.get(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.add_experience(40, source='LESSON')
+        
+        with self.assertNumQueries(0):
+            DashboardSnapshot.get(self.user, ['streaks', 'achievements'])
+        
+        stats = DashboardSnapshot.get(self.user, ['stats'])['stats']
+        self.assertEqual(stats['user_info']['experience_points'], 40)
+    
+    def test_vitality_is_computed_when_served(self):
+        from unittest import mock
+        from .dashboard import DashboardSnapshot
+        
+        sections = DashboardSnapshot.get(self.user, ['stats', 'profile'])
+        self.assertEqual(sections['stats']['game_stats']['current_vitality'], 80)
+        
+        later = self.anchor + timedelta(minutes=40)
+        with mock.patch('apps.users.vitality.timezone.now', return_value=later), self.assertNumQueries(0):
+            sections = DashboardSnapshot.get(self.user, ['stats', 'profile'])
+        self.assertEqual(sections['stats']['game_stats']['current_vitality'], 90)
+        self.assertEqual(sections['profile']['profile']['current_vitality'], 90)
+
+
+class DirectoryTests(TestCase):
+    """Tests del autocompletado y los snapshots del directorio de colegios"""
+    
+    def setUp(self):
+        from apps.users.models import School
+        
+        cache.clear()
+        rows = [
+            ('S1', 'Colegio San José', 'Medellín', 'Antioquia'),
+            ('S2', 'Instituto San Josemaría', 'Bello', 'Antioquia'),
+            ('S3', 'San Bartolomé', 'Bogotá', 'Cundinamarca'),
+            ('S4', 'Liceo Santander', 'Bucaramanga', 'Santander'),
+        ]
+        for code, name, city, department in rows:
+            School.objects.create(code=code, name=name, city=city, department=department, school_type='PUBLIC')
+    
+    def test_normalize_strips_accents_and_spacing(self):
+        from apps.users.directory import normalize
+        
+        self.assertEqual(normalize('  Bogotá   D.C. '), 'bogota d.c.')
+        self.assertEqual(normalize(None), '')
+    
+    def test_autocomplete_ranks_prefix_matches_first(self):
+        from apps.users.directory import DirectorySearch
+        
+        self.assertEqual(DirectorySearch.autocomplete('schools', 'S'), [])
+        
+        names = [row['name'] for row in DirectorySearch.autocomplete('schools', 'san')]
+        self.assertEqual(names[:1], ['San Bartolomé'])
+        self.assertEqual(set(names), {'San Bartolomé', 'Colegio San José', 'Instituto San Josemaría', 'Liceo Santander'})
+        
+        limited = DirectorySearch.autocomplete('schools', 'san', limit=2, department='ANTIOQUIA')
+        self.assertEqual([row['code'] for row in limited], ['S1', 'S2'])
+    
+    def test_snapshots_are_gzipped_per_department_and_pruned(self):
+        import gzip
+        import os
+        import tempfile
+        from django.test import override_settings
+        from apps.users.directory import DirectorySnapshot, snapshot_root
+        from apps.users.models import School
+        
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            manifest = DirectorySnapshot.build()
+            self.assertEqual(set(manifest['schools']), {'Antioquia', 'Cundinamarca', 'Santander'})
+            
+            antioquia = manifest['schools']['Antioquia']
+            with open(os.path.join(snapshot_root(), antioquia['path']), 'rb') as source:
+                rows = json.loads(gzip.decompress(source.read()))
+            self.assertEqual([row['code'] for row in rows], ['S1', 'S2'])
+            self.assertEqual(antioquia['count'], 2)
+            
+            School.objects.filter(code='S2').delete()
+            cache.clear()
+            rebuilt = DirectorySnapshot.build()
+            self.assertNotEqual(rebuilt['schools']['Antioquia']['version'], antioquia['version'])
+            self.assertEqual(rebuilt['schools']['Santander'], manifest['schools']['Santander'])
+            self.assertFalse(os.path.exists(os.path.join(snapshot_root(), antioquia['path'])))
+            self.assertEqual(DirectorySnapshot.manifest(), rebuilt)
+
+
+class AvailabilityIndexTests(TestCase):
+    """Tests del filtro de Bloom de usernames y emails"""
+    
+    def setUp(self):
+        cache.clear()
+        for index in range(3):
+            User.objects.create_user(
+                username=f'Estudiante{index}', email=f'estudiante{index}@Test.com', password='testpass123'
+            )
+    
+    def test_bloom_filter_has_no_false_negatives(self):
+        from apps.users.availability import BloomFilter
+        
+        bloom = BloomFilter(1000, error_rate=0.01)
+        values = [f'user{index}' for index in range(1000)]
+        for value in values:
+            bloom.add(value)
+        
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(f'other{index}' in bloom for index in range(2000))
+        self.assertLess(false_positives / 2000, 0.03)
+        self.assertAlmostEqual(bloom.estimated_false_positive_rate(), 0.01, delta=0.005)
+        
+        restored = BloomFilter.from_state(bloom.to_state())
+        self.assertIn('user7', restored)
+    
+    def test_free_values_skip_the_database(self):
+        from apps.users.availability import AvailabilityIndex
+        
+        self.assertFalse(AvailabilityIndex.is_available('username', 'Estudiante1'))
+        self.assertFalse(AvailabilityIndex.is_available('email', 'estudiante2@test.com'))
+        
+        with self.assertNumQueries(0):
+            self.assertTrue(AvailabilityIndex.is_available('username', 'nuevo_usuario'))
+        
+        # El filtro normaliza, pero la respuesta final usa la búsqueda exacta de siempre
+        self.assertTrue(AvailabilityIndex.is_available('username', 'ESTUDIANTE1'))
+        
+        stats = AvailabilityIndex.stats('username')
+        self.assertEqual(stats['values'], 3)
+        self.assertEqual(stats['taken'], 1)
+        self.assertGreater(stats['memory_bytes'], 0)
+    
+    def test_new_users_reach_other_processes_through_the_event_log(self):
+        from apps.users.availability import AvailabilityIndex
+        
+        self.assertTrue(AvailabilityIndex.is_available('username', 'recien_llegado'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(username='recien_llegado', email='nuevo@test.com', password='testpass123')
+        
+        # Otro proceso: solo conoce el filtro publicado y el log compartido
+        generation = AvailabilityIndex._local['username']['generation']
+        AvailabilityIndex._local.clear()
+        self.assertTrue(AvailabilityIndex.might_exist('username', 'recien_llegado'))
+        self.assertEqual(AvailabilityIndex._local['username']['generation'], generation)
+        self.assertFalse(AvailabilityIndex.is_available('username', 'recien_llegado'))
+        self.assertFalse(AvailabilityIndex.is_available('email', 'nuevo@test.com'))
+
+    def test_process_local_cache_always_queries_the_database(self):
+        from django.test import override_settings
+        from apps.users.availability import AvailabilityIndex
+
+        with override_settings(TESTING=False):
+            self.assertFalse(AvailabilityIndex.enabled())
+            with self.assertNumQueries(1):
+                self.assertTrue(AvailabilityIndex.is_available('username', 'nuevo_usuario'))
+
+    def test_only_changed_identity_fields_are_recorded(self):
+        from unittest.mock import call, patch
+        from apps.users.availability import AvailabilityIndex
+
+        user = User.objects.get(username='Estudiante0')
+        with patch.object(AvailabilityIndex, 'record') as record:
+            with self.captureOnCommitCallbacks(execute=True):
+                user.first_name = 'Ana'
+                user.save()
+            record.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                user.username = 'Renombrado'
+                user.save()
+            self.assertEqual(record.call_args_list, [call('username', 'Renombrado')])
+
+    def test_missing_filter_is_built_by_a_single_process(self):
+        from apps.learning.cache import CacheKeys
+        from apps.users.availability import AvailabilityIndex
+
+        AvailabilityIndex._local.clear()
+        lock_key = CacheKeys.AVAILABILITY_BUILD_LOCK.format(field='username')
+        cache.add(lock_key, 1)
+        # Otro proceso está construyendo: se responde desde la base sin escanear la tabla
+        with self.assertNumQueries(1):
+            self.assertTrue(AvailabilityIndex.is_available('username', 'nuevo_usuario'))
+        self.assertIsNone(cache.get(CacheKeys.AVAILABILITY_GENERATION.format(field='username')))
+
+        cache.delete(lock_key)
+        self.assertTrue(AvailabilityIndex.is_available('username', 'nuevo_usuario'))
+        self.assertIsNotNone(cache.get(CacheKeys.AVAILABILITY_GENERATION.format(field='username')))
+        self.assertIsNone(cache.get(lock_key))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """Tests de la resolución cacheada del usuario en peticiones con JWT"""
+    
+    def setUp(self):
+        from apps.users.authentication import CachedJWTAuthentication
+        
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='jwtuser', email='jwt@test.com', password='testpass123'
+        )
+        self.authentication = CachedJWTAuthentication()
+    
+    def _authenticate(self):
+        from rest_framework.test import APIRequestFactory
+        from rest_framework_simplejwt.tokens import AccessToken
+        
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+        user, _token = self.authentication.authenticate(request)
+        return user
+    
+    def test_user_is_served_from_cache_with_slim_projection(self):
+        with self.assertNumQueries(1):
+            first = self._authenticate()
+        self.assertIn('avatar_config', first.get_deferred_fields())
+        self.assertNotIn('level', first.get_deferred_fields())
+        
+        with self.assertNumQueries(0):
+            cached = self._authenticate()
+        self.assertEqual((cached.pk, cached.username, cached.level), (self.user.pk, 'jwtuser', 1))
+    
+    def test_saves_and_ledger_updates_invalidate(self):
+        from rest_framework_simplejwt.exceptions import AuthenticationFailed
+        
+        self._authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Nuevo'
+            self.user.set_password('otraclave456')
+            self.user.save()
+        self.assertEqual(self._authenticate().first_name, 'Nuevo')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.add_experience(250, source='LESSON')
+        self.assertEqual(self._authenticate().experience_points, 250)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save(update_fields=['is_active'])
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate()
+
+    def test_process_local_cache_loads_the_full_user(self):
+        from django.test import override_settings
+
+        with override_settings(TESTING=False):
+            with self.assertNumQueries(1):
+                user = self._authenticate()
+            with self.assertNumQueries(1):
+                self._authenticate()
+        self.assertEqual(user.get_deferred_fields(), set())
+
+    def test_password_change_keeps_ledger_progression(self):
+        from apps.users.serializers import PasswordChangeSerializer
+        from rest_framework.test import APIRequestFactory
+
+        request = APIRequestFactory().post('/')
+        request.user = User.objects.get(pk=self.user.pk)
+        # Otra petición aplica XP mientras esta tiene la instancia en memoria
+        self.user.add_experience(250, source='LESSON')
+
+        serializer = PasswordChangeSerializer(
+            data={
+                'old_password': 'testpass123',
+                'new_password': 'Otr4ClaveSegura!',
+                'new_password_confirm': 'Otr4ClaveSegura!',
+            },
+            context={'request': request}
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.experience_points, 250)
+        self.assertTrue(self.user.check_password('Otr4ClaveSegura!'))
@@ -0,0 +1,175 @@
+"""
+Puntaje de tendencia con decaimiento exponencial
+
+Cada inscripción o lección completada suma a LearningPath.trending_score un
+peso escalado por exp(λ·(t - T_e)), donde T_e es el inicio de la época
+(día) de la fila. Como todas las filas comparten la misma referencia, el
+orden por trending_score es el orden por actividad decaída sin recalcular
+nada: el factor global exp(-λ·(t - T_e)) se cancela al comparar. Al cambiar
+de época se reescalan los puntajes a la nueva referencia (renormalización)
+para que los valores no crezcan sin límite.
+"""
+
+import math
+import time
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .cache import CacheTimeouts
+
+
+# Vida media del puntaje: la actividad de hace 3 días pesa la mitad
+HALF_LIFE_SECONDS = 3 * CacheTimeouts.DAY
+DECAY_RATE = math.log(2) / HALF_LIFE_SECONDS
+
+# Longitud de una época de referencia
+EPOCH_SECONDS = CacheTimeouts.DAY
+
+ENROLLMENT_WEIGHT = 1.0
+LESSON_COMPLETION_WEIGHT = 0.25
+
+# Por debajo de este puntaje (en la época actual) una ruta deja de ser tendencia
+MIN_TRENDING_SCORE = 0.05
+
+NORMALIZED_EPOCH_KEY = "trending_normalized_epoch"
+
+
+def current_epoch(now=None):
+    return int((now if now is not None else time.time()) // EPOCH_SECONDS)
+
+
+def epoch_scale(epoch, now=None):
+    """Escala de un evento en `now` relativa al inicio de `epoch`"""
+    now = now if now is not None else time.time()
+    return math.exp(DECAY_RATE * (now - epoch * EPOCH_SECONDS))
+
+
+class TrendingService:
+    """
+    Incrementos atómicos y renormalización de trending_score
+    """
+
+    @classmethod
+    def record(cls, path_id, weight, now=None):
+        """
+        Suma un evento al puntaje de la ruta con un UPDATE atómico.
+        Si la fila está en una época anterior se reescala primero.
+        """
+        from .models import LearningPath
+
+        epoch = current_epoch(now)
+        increment = weight * epoch_scale(epoch, now)
+
+        updated = LearningPath.objects.filter(pk=path_id, trending_epoch=epoch).update(
+            trending_score=F('trending_score') + increment
+        )
+        if updated:
+            return
+
+        row = LearningPath.objects.filter(pk=path_id).values_list('trending_epoch', flat=True).first()
+        if row is None:
+            return
+        if row < epoch:
+            cls._rescale(LearningPath.objects.filter(pk=path_id, trending_epoch=row), row, epoch)
+
+        LearningPath.objects.filter(pk=path_id, trending_epoch=epoch).update(
+            trending_score=F('trending_score') + increment
+        )
+
+    @classmethod
+    def record_enrollment(cls, path_id):
+        cls.record(path_id, ENROLLMENT_WEIGHT)
+
+    @classmethod
+    def record_lesson_completion(cls, path_id):
+        cls.record(path_id, LESSON_COMPLETION_WEIGHT)
+
+    @staticmethod
+    def _rescale(queryset, from_epoch, to_epoch):
+        factor = math.exp(-DECAY_RATE * (to_epoch - from_epoch) * EPOCH_SECONDS)
+        return queryset.update(
+            trending_score=F('trending_score') * factor,
+            trending_epoch=to_epoch
+        )
+
+    @classmethod
+    def renormalize(cls, now=None):
+        """
+        Lleva todas las filas a la época actual: un UPDATE por época antigua.
+        Los puntajes despreciables se llevan a cero.
+        """
+        from .models import LearningPath
+
+        epoch = current_epoch(now)
+        rescaled = 0
+
+        old_epochs = LearningPath.objects.filter(
+            trending_epoch__lt=epoch
+        ).values_list('trending_epoch', flat=True).distinct()
+
+        for old_epoch in list(old_epochs):
+            rescaled += cls._rescale(
+                LearningPath.objects.filter(trending_epoch=old_epoch),
+                old_epoch,
+                epoch
+            )
+
+        LearningPath.objects.filter(
+            trending_epoch=epoch,
+            trending_score__gt=0,
+            trending_score__lt=1e-6
+        ).update(trending_score=0.0)
+
+        cache.set(NORMALIZED_EPOCH_KEY, epoch, EPOCH_SECONDS * 2)
+        return rescaled
+
+    @classmethod
+    def rebuild(cls, days=14, now=None):
+        """
+        Recalcula los puntajes desde las inscripciones y lecciones completadas
+        de los últimos `days` días (backfill o corrección)
+        """
+        from datetime import datetime, timedelta, timezone as dt_timezone
+        from .models import LearningPath, UserPathEnrollment, UserLessonProgress
+
+        now = now if now is not None else time.time()
+        epoch = current_epoch(now)
+        since = datetime.fromtimestamp(now, tz=dt_timezone.utc) - timedelta(days=days)
+
+        scores = {}
+        events = (
+            (ENROLLMENT_WEIGHT, UserPathEnrollment.objects.filter(
+                enrolled_at__gte=since
+            ).values_list('learning_path_id', 'enrolled_at')),
+            (LESSON_COMPLETION_WEIGHT, UserLessonProgress.objects.filter(
+                completed_at__gte=since,
+                status__in=['COMPLETED', 'PERFECT']
+            ).values_list('enrollment__learning_path_id', 'completed_at')),
+        )
+        for weight, rows in events:
+            for path_id, happened_at in rows.iterator(chunk_size=5000):
+                scores[path_id] = scores.get(path_id, 0.0) + weight * epoch_scale(epoch, happened_at.timestamp())
+
+        LearningPath.objects.update(trending_score=0.0, trending_epoch=epoch)
+        paths = [
+            LearningPath(id=path_id, trending_score=score, trending_epoch=epoch)
+            for path_id, score in scores.items()
+        ]
+        LearningPath.objects.bulk_update(paths, ['trending_score', 'trending_epoch'], batch_size=1000)
+
+        cache.set(NORMALIZED_EPOCH_KEY, epoch, EPOCH_SECONDS * 2)
+        return len(paths)
+
+    @classmethod
+    def ensure_normalized(cls):
+        """Renormaliza si nadie lo hizo en la época actual (normalmente lo hace el beat)"""
+        if cache.get(NORMALIZED_EPOCH_KEY) != current_epoch():
+            cls.renormalize()
+
+    @classmethod
+    def trending(cls, queryset):
+        """Rutas en tendencia del queryset, ordenadas por el índice de trending_score"""
+        cls.ensure_normalized()
+        threshold = MIN_TRENDING_SCORE * epoch_scale(current_epoch())
+        return queryset.filter(trending_score__gte=threshold).order_by('-trending_score')
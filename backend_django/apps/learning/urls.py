@@ -42,12 +42,24 @@ urlpatterns = [
     path('api/my-paths/', views.MyLearningPathsView.as_view(), name='my-paths'),
     path('api/my-achievements/', views.MyAchievementsView.as_view(), name='my-achievements'),
     path('api/my-streaks/', views.MyStreaksView.as_view(), name='my-streaks'),
+    path('api/dashboard/', views.DashboardView.as_view(), name='dashboard'),
     path('api/leaderboard/', views.LeaderboardView.as_view(), name='leaderboard'),
+    path('api/leaderboard/me/', views.MyLeaderboardRankView.as_view(), name='leaderboard-me'),
     
     # URLs de recomendaciones
     path('api/recommended-paths/', views.RecommendedPathsView.as_view(), name='recommended-paths'),
     path('api/next-lesson/', views.NextLessonView.as_view(), name='next-lesson'),
     
+    # Batallas contra el jefe
+    path('api/battles/<uuid:battle_id>/', views.BattleDetailView.as_view(), name='battle-detail'),
+    path('api/battles/<uuid:battle_id>/answer/', views.BattleAnswerView.as_view(), name='battle-answer'),
+    
+    # Búsqueda de texto completo
+    path('api/search/', views.SearchView.as_view(), name='search'),
+    
+    # Métricas de caché (staff)
+    path('api/cache/metrics/', views.CacheMetricsView.as_view(), name='cache-metrics'),
+    
     # URLs de reseñas y rating
     path('api/paths/<slug:slug>/review/', views.ReviewPathView.as_view(), name='path-review'),
     path('api/reviews/<int:review_id>/helpful/', views.MarkReviewHelpfulView.as_view(), name='review-helpful'),
@@ -5,22 +5,17 @@ Vistas optimizadas para Learning Paths con funcionalidad avanzada
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
 from django.db.models import Q, Avg, Count, Sum, Prefetch, F
 from django.utils import timezone
 from django.core.cache import cache
-from django.http import HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 import random
 from datetime import timedelta, date
-import uuid as uuid_lib
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from io import BytesIO
 
 from .models import (
     LearningPath, LearningPathUnit, LearningPathLesson,
@@ -39,7 +34,8 @@ from .permissions import (
 )
 from .throttles import (
     LearningPathThrottle, BattleActionThrottle, DailyChallengeThrottle,
-    RewardClaimThrottle, AIRecommendationThrottle, HeavyComputationThrottle
+    RewardClaimThrottle, AIRecommendationThrottle, HeavyComputationThrottle,
+    LeaderboardThrottle, ReportRequestThrottle, SearchThrottle
 )
 from .filters import (
     LearningPathFilter, UserPathEnrollmentFilter, UserLessonProgressFilter
@@ -48,7 +44,25 @@ from .pagination import (
     LearningPathPagination, StandardResultsSetPagination, 
     ProgressPagination, LargeResultsSetPagination
 )
-from .cache import LearningCacheManager, cached_response, CacheTimeouts
+from .cache import (
+    LearningCacheManager, cached_response, CacheTimeouts, CacheKeys,
+    CacheWarmRegistry, CacheMetrics
+)
+from .recommender import PathRecommender
+from .collaborative import ItemSimilarityStore
+from .distributions import PathDistributionService
+from .reports import ReportQueue
+from .progression import NextLessonResolver
+from .tagging import PathTagIndex, KIND_TAG, KIND_AREA
+from .search import SearchService, DOMAINS as SEARCH_DOMAINS
+from .blueprints import BlueprintSampler, QuestionBlueprint, BlueprintError
+from .battles import BattleEngine, BattleError, MIN_PROGRESS as BATTLE_MIN_PROGRESS
+from .dashboard import DashboardSnapshot, SECTIONS as DASHBOARD_SECTIONS
+from apps.users.ledger import ExperienceLedger
+from apps.users.vitality import VitalityService
+from .leaderboards import (
+    LeaderboardService, PERIODS as LEADERBOARD_PERIODS, SCOPES as LEADERBOARD_SCOPES
+)
 
 
 @extend_schema_view(
@@ -116,12 +130,12 @@ class LearningPathViewSet(viewsets.ReadOnlyModelViewSet):
             completion_rate=Count('enrollments', filter=Q(enrollments__status='COMPLETED')) * 100.0 / Count('enrollments')
         )
     
-    @cached_response(timeout=CacheTimeouts.LEARNING_PATH_LIST)
+    @cached_response(timeout=CacheTimeouts.LEARNING_PATH_LIST, family='path_list')
     def list(self, request, *args, **kwargs):
         """Lista optimizada con caché"""
         return super().list(request, *args, **kwargs)
     
-    @cached_response(timeout=CacheTimeouts.LEARNING_PATH_DETAIL)
+    @cached_response(timeout=CacheTimeouts.LEARNING_PATH_DETAIL, family='path_detail')
     def retrieve(self, request, *args, **kwargs):
         """Detalle optimizado con caché"""
         return super().retrieve(request, *args, **kwargs)
@@ -160,53 +174,27 @@ class LearningPathViewSet(viewsets.ReadOnlyModelViewSet):
         )
         
         # Verificar que tenga progreso suficiente (al menos 70%)
-        if enrollment.overall_progress_percentage < 70:
+        if enrollment.progress_percentage < BATTLE_MIN_PROGRESS:
             return Response(
                 {"error": "Necesitas al menos 70% de progreso para enfrentar al jefe"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Generar batalla (seleccionar preguntas más difíciles)
-        difficult_lessons = LearningPathLesson.objects.filter(
-            path_unit__learning_path=learning_path
-        ).select_related('icfes_question').filter(
-            icfes_question__nivel_dificultad__gte=4
-        )[:10]
-        
-        battle_data = {
-            'battle_id': str(uuid_lib.uuid4()),
-            'learning_path_slug': learning_path.slug,
-            'questions': [
-                {
-                    'lesson_uuid': str(lesson.uuid),
-                    'question_text': lesson.icfes_question.pregunta_texto if lesson.icfes_question else lesson.title,
-                    'difficulty': lesson.icfes_question.nivel_dificultad if lesson.icfes_question else 4,
-                    'xp_reward': lesson.xp_reward * 2  # Doble XP en batallas
-                }
-                for lesson in difficult_lessons
-            ],
-            'total_xp_possible': sum(lesson.xp_reward * 2 for lesson in difficult_lessons),
-            'time_limit_minutes': 45,
-            'started_at': timezone.now().isoformat()
-        }
-        
-        # Guardar sesión de batalla en caché
-        cache_key = f"battle_session_{battle_data['battle_id']}"
-        cache.set(cache_key, battle_data, CacheTimeouts.BATTLE_SESSION)
+        # El estado vive en memoria hasta que la batalla termina
+        try:
+            battle_data = BattleEngine.start(user, enrollment)
+        except BattleError as error:
+            return Response({"error": error.message}, status=status.HTTP_400_BAD_REQUEST)
         
         # Establecer cooldown
         LearningCacheManager.set_battle_cooldown(user.id, learning_path.id)
         
-        # Actualizar último intento de batalla
-        enrollment.last_battle_at = timezone.now()
-        enrollment.save(update_fields=['last_battle_at'])
-        
         return Response({
             "message": "¡Batalla iniciada! ¡Prepárate para enfrentar al jefe!",
             "battle_data": battle_data,
             "tips": [
                 "Las batallas otorgan doble XP",
-                "Tienes 45 minutos para completarla",
+                f"Tienes {battle_data['time_limit_minutes']} minutos para completarla",
                 "Solo puedes hacer una batalla cada 6 horas"
             ]
         })
@@ -303,9 +291,13 @@ class LearningPathViewSet(viewsets.ReadOnlyModelViewSet):
                 'type': 'consumable'
             })
         
-        # Actualizar usuario
-        user.experience_points = F('experience_points') + rewards['xp_gained']
-        user.save(update_fields=['experience_points'])
+        # Actualizar usuario (UPDATE atómico de XP, nivel y clase)
+        user.add_experience(
+            rewards['xp_gained'], learning_path_id=learning_path.id,
+            source='REWARD', reference=f'enrollment:{enrollment.pk}'
+        )
+        if rewards['vitality_restored'] and hasattr(user, 'profile'):
+            VitalityService.restore(user.id, rewards['vitality_restored'])
         
         # Limpiar recompensas reclamadas
         enrollment.unclaimed_rewards = 0
@@ -336,6 +328,38 @@ class LearningPathViewSet(viewsets.ReadOnlyModelViewSet):
             return avg_score >= achievement.required_score
         return False
     
+    @extend_schema(
+        summary="Conteo de Rutas por Tag",
+        description="Facetas de tags (o de áreas ICFES con kind=area) con la cantidad de rutas del catálogo",
+        parameters=[
+            OpenApiParameter('kind', OpenApiTypes.STR, enum=['tag', 'area'], description='Tipo de faceta')
+        ],
+        responses={200: "Lista de tags con conteos"}
+    )
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='tags',
+        pagination_class=None
+    )
+    def tag_facets(self, request):
+        """
+        Endpoint especial: Tags del catálogo con su cantidad de rutas
+        """
+        kind = request.query_params.get('kind', 'tag').upper()
+        if kind not in (KIND_TAG, KIND_AREA):
+            return Response(
+                {"error": "kind debe ser 'tag' o 'area'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        facets = PathTagIndex.facets(kind)
+        return Response({
+            "kind": kind.lower(),
+            "count": len(facets),
+            "results": facets
+        })
+    
     @extend_schema(
         summary="Paths Recomendados por IA",
         description="Obtiene paths recomendados personalizados usando IA",
@@ -362,114 +386,39 @@ class LearningPathViewSet(viewsets.ReadOnlyModelViewSet):
             recommendations = self._generate_ai_recommendations(user)
             LearningCacheManager.set_ai_recommendations(user.id, recommendations)
         
-        # Obtener los paths recomendados
-        recommended_paths = LearningPath.objects.filter(
-            id__in=[r['path_id'] for r in recommendations]
-        ).select_related('category')
-        
-        # Ordenar según el score de recomendación
-        path_scores = {r['path_id']: r['score'] for r in recommendations}
-        recommended_paths = sorted(
-            recommended_paths, 
-            key=lambda p: path_scores.get(p.id, 0), 
-            reverse=True
-        )
+        # Obtener los paths recomendados en el orden del puntaje
+        paths_by_id = LearningPath.objects.in_bulk([r['path_id'] for r in recommendations])
+        ranked = [
+            (paths_by_id[r['path_id']], r)
+            for r in recommendations
+            if r['path_id'] in paths_by_id
+        ]
         
         serializer = LearningPathListSerializer(
-            recommended_paths,
+            [path for path, _r in ranked],
             many=True,
             context={'request': request}
         )
         
         return Response({
             "message": "Recomendaciones personalizadas generadas",
-            "algorithm_version": "1.2",
+            "algorithm_version": "2.0",
             "recommendations": [
                 {
                     **path_data,
-                    "recommendation_score": path_scores.get(path_data['uuid'], 0),
-                    "reason": next(
-                        (r['reason'] for r in recommendations if r['path_id'] == path_data['uuid']), 
-                        "Basado en tu perfil de aprendizaje"
-                    )
+                    "recommendation_score": r['score'],
+                    "reason": r['reason'] or "Basado en tu perfil de aprendizaje"
                 }
-                for path_data in serializer.data
+                for path_data, (_path, r) in zip(serializer.data, ranked)
             ]
         })
     
     def _generate_ai_recommendations(self, user):
         """
-        Algoritmo básico de recomendación por IA
-        En producción sería más sofisticado con ML
+        Puntúa todas las rutas activas contra el perfil del usuario
+        en una pasada vectorizada (ver recommender.PathRecommender)
         """
-        user_level = getattr(user, 'level', 1)
-        user_hero_class = getattr(user, 'hero_class', 'F')
-        
-        # Obtener historial del usuario
-        completed_paths = UserPathEnrollment.objects.filter(
-            user=user,
-            status='COMPLETED'
-        ).values_list('learning_path_id', flat=True)
-        
-        enrolled_paths = UserPathEnrollment.objects.filter(
-            user=user
-        ).values_list('learning_path_id', flat=True)
-        
-        # Paths candidatos
-        candidate_paths = LearningPath.objects.filter(
-            status='ACTIVE',
-            minimum_level__lte=user_level + 2
-        ).exclude(
-            id__in=enrolled_paths
-        ).annotate(
-            avg_rating=Avg('reviews__overall_rating'),
-            popularity_score=Count('enrollments')
-        )
-        
-        recommendations = []
-        
-        for path in candidate_paths[:20]:  # Limitar para performance
-            score = 0
-            reason = ""
-            
-            # Factor 1: Nivel apropiado (40% del score)
-            level_diff = abs(path.minimum_level - user_level)
-            if level_diff <= 1:
-                score += 40
-                reason = "Perfecto para tu nivel actual"
-            elif level_diff <= 2:
-                score += 30
-                reason = "Ligeramente desafiante para tu nivel"
-            else:
-                score += 10
-                reason = "Desafío avanzado"
-            
-            # Factor 2: Rating del path (30% del score)
-            if path.avg_rating:
-                score += (path.avg_rating / 5.0) * 30
-            
-            # Factor 3: Popularidad (20% del score)
-            if path.popularity_score > 0:
-                popularity_factor = min(path.popularity_score / 100.0, 1.0)
-                score += popularity_factor * 20
-            
-            # Factor 4: Tipo de path según hero class (10% del score)
-            if user_hero_class in ['A', 'S', 'S+'] and path.difficulty_level >= 4:
-                score += 10
-                reason += " (recomendado para heroes avanzados)"
-            elif user_hero_class in ['F', 'E', 'D'] and path.difficulty_level <= 2:
-                score += 10
-                reason += " (ideal para principiantes)"
-            
-            recommendations.append({
-                'path_id': path.id,
-                'score': round(score, 2),
-                'reason': reason
-            })
-        
-        # Ordenar por score y tomar top 10
-        recommendations.sort(key=lambda x: x['score'], reverse=True)
-        return recommendations[:10]
+        return PathRecommender.recommend(user, limit=10)
     
     @extend_schema(
         summary="Reto Diario",
@@ -489,13 +438,8 @@ class LearningPathViewSet(viewsets.ReadOnlyModelViewSet):
         user = request.user
         today = timezone.now().date()
         
-        # Intentar obtener challenge del caché
-        challenge_data = LearningCacheManager.get_daily_challenge(today.isoformat())
-        
-        if challenge_data is None:
-            # Generar nuevo challenge diario
-            challenge_data = self._generate_daily_challenge(user, today)
-            LearningCacheManager.set_daily_challenge(challenge_data, today.isoformat())
+        # Challenge compartido del día (se calienta con warm_caches)
+        challenge_data = CacheWarmRegistry.fetch('daily_challenge')
         
         # Verificar si el usuario ya completó el challenge
         cache_key = f"daily_challenge_completed_{user.id}_{today}"
@@ -586,6 +530,16 @@ class LearningPathViewSet(viewsets.ReadOnlyModelViewSet):
             }
 
 
+@CacheWarmRegistry.register(
+    'daily_challenge',
+    key=lambda: CacheKeys.DAILY_CHALLENGE.format(date=timezone.now().date().isoformat()),
+    timeout=CacheTimeouts.DAY
+)
+def build_daily_challenge():
+    """Reto del día con recompensas de nivel base (es el mismo para todos)"""
+    return LearningPathViewSet()._generate_daily_challenge(None, timezone.now().date())
+
+
 class LearningPathUnitViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para unidades de rutas de aprendizaje"""
     serializer_class = OptimizedLearningPathUnitSerializer
@@ -736,6 +690,8 @@ class StartLessonView(generics.CreateAPIView):
             lesson_progress.first_attempt_at = timezone.now()
             lesson_progress.save()
         
+        NextLessonResolver.lesson_started(request.user, lesson, enrollment)
+        
         serializer = UserLessonProgressSerializer(lesson_progress)
         return Response(serializer.data)
 
@@ -775,10 +731,14 @@ class CompleteLessonView(generics.UpdateAPIView):
         else:
             lesson_progress.status = 'NEEDS_REVIEW'
         
-        lesson_progress.save()
+        # XP de lección, bonus de ruta y logros: un solo UPDATE del usuario
+        with ExperienceLedger.batch():
+            lesson_progress.save()
+            
+            # Actualizar racha del usuario
+            lesson_progress.enrollment.update_streak()
         
-        # Actualizar racha del usuario
-        lesson_progress.enrollment.update_streak()
+        NextLessonResolver.lesson_finished(request.user, lesson_progress)
         
         serializer = UserLessonProgressSerializer(lesson_progress)
         return Response(serializer.data)
@@ -802,6 +762,14 @@ class MyAchievementsView(generics.ListAPIView):
     
     def get_queryset(self):
         return UserPathAchievement.objects.filter(user=self.request.user)
+    
+    def list(self, request, *args, **kwargs):
+        # Los logros ya serializados vienen del snapshot del dashboard
+        results = DashboardSnapshot.get(request.user, ['achievements'])['achievements']['results']
+        page = self.paginate_queryset(results)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(results)
 
 
 class MyStreaksView(generics.RetrieveAPIView):
@@ -809,35 +777,148 @@ class MyStreaksView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        enrollments = UserPathEnrollment.objects.filter(
-            user=request.user,
-            status='ACTIVE'
-        )
+        streaks = DashboardSnapshot.get(request.user, ['streaks'])['streaks']
+        return Response({'streaks': streaks})
+
+
+class DashboardView(generics.RetrieveAPIView):
+    """
+    Dashboard del usuario en una sola respuesta: estadísticas, perfil,
+    rachas y logros. ?sections=stats,streaks limita las secciones.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    @extend_schema(
+        summary="Dashboard del usuario",
+        parameters=[
+            OpenApiParameter('sections', OpenApiTypes.STR, description='Secciones separadas por coma')
+        ]
+    )
+    def get(self, request):
+        sections = [
+            section for section in request.query_params.get('sections', '').split(',')
+            if section
+        ]
+        unknown = set(sections) - set(DASHBOARD_SECTIONS)
+        if unknown:
+            return Response(
+                {'error': f"Secciones inválidas: {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(DashboardSnapshot.get(request.user, sections or None))
+
+
+class LeaderboardView(generics.ListAPIView):
+    """
+    Vista del tablero de líderes
+    Parámetros: scope (global|path|school|academy), scope_id, period (daily|weekly|season), limit
+    """
+    throttle_classes = [LeaderboardThrottle]
+    
+    def get_leaderboard_params(self, request):
+        scope = request.query_params.get('scope', 'global')
+        period = request.query_params.get('period', 'weekly')
+        scope_id = request.query_params.get('scope_id')
+        
+        if scope_id is None and request.user.is_authenticated:
+            # Por defecto, el colegio del usuario
+            if scope == 'school':
+                scope_id = request.user.school_id
+        
+        if period not in LEADERBOARD_PERIODS or scope not in LEADERBOARD_SCOPES:
+            return None
+        if scope != 'global' and not scope_id:
+            return None
+        
+        return scope, scope_id, period
+    
+    def get(self, request):
+        params = self.get_leaderboard_params(request)
+        if params is None:
+            return Response(
+                {'error': 'Parámetros de leaderboard inválidos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        scope, scope_id, period = params
         
-        streaks_data = []
-        for enrollment in enrollments:
-            streaks_data.append({
-                'learning_path': enrollment.learning_path.name,
-                'current_streak': enrollment.current_streak_days,
-                'max_streak': enrollment.max_streak_days,
-                'last_activity': enrollment.last_activity_date
-            })
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 100)
+        except ValueError:
+            limit = 10
+        
+        leaderboard_type = f"{scope}_{scope_id}_{limit}" if scope_id else f"{scope}_{limit}"
+        top_users = LearningCacheManager.get_leaderboard(leaderboard_type, period)
+        if top_users is None:
+            top_users = _hydrate_leaderboard(
+                LeaderboardService.top(scope, scope_id, period, limit=limit)
+            )
+            LearningCacheManager.set_leaderboard(
+                leaderboard_type, top_users, period, timeout=CacheTimeouts.LEADERBOARD_TOP
+            )
+        
+        my_rank = None
+        if request.user.is_authenticated:
+            my_rank = LeaderboardService.rank(request.user.id, scope, scope_id, period)
         
-        return Response({'streaks': streaks_data})
+        return Response({
+            'scope': scope,
+            'scope_id': scope_id,
+            'period': period,
+            'leaderboard': top_users,
+            'my_rank': my_rank
+        })
 
 
-class LeaderboardView(generics.ListAPIView):
-    """Vista del tablero de líderes"""
+class MyLeaderboardRankView(LeaderboardView):
+    """Posición del usuario y su vecindario en el tablero de líderes"""
+    permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        # Top usuarios por XP total en rutas
-        top_users = UserPathEnrollment.objects.values(
-            'user__username'
-        ).annotate(
-            total_xp=Count('total_xp_earned')
-        ).order_by('-total_xp')[:10]
-        
-        return Response({'leaderboard': top_users})
+        params = self.get_leaderboard_params(request)
+        if params is None:
+            return Response(
+                {'error': 'Parámetros de leaderboard inválidos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        scope, scope_id, period = params
+        
+        try:
+            radius = min(int(request.query_params.get('radius', 5)), 25)
+        except ValueError:
+            radius = 5
+        
+        return Response({
+            'scope': scope,
+            'scope_id': scope_id,
+            'period': period,
+            'my_rank': LeaderboardService.rank(request.user.id, scope, scope_id, period),
+            'neighbourhood': _hydrate_leaderboard(
+                LeaderboardService.neighbourhood(request.user.id, scope, scope_id, period, radius=radius)
+            ),
+            'total_players': LeaderboardService.size(scope, scope_id, period)
+        })
+
+
+def _hydrate_leaderboard(entries):
+    """Agrega username y clase de héroe a las entradas del leaderboard (una query)"""
+    from django.contrib.auth import get_user_model
+    
+    users = get_user_model().objects.filter(
+        pk__in=[entry['user_id'] for entry in entries]
+    ).only('id', 'username', 'hero_class', 'level').in_bulk()
+    
+    hydrated = []
+    for entry in entries:
+        user = users.get(entry['user_id'])
+        if user is None:
+            continue
+        hydrated.append({
+            **entry,
+            'username': user.username,
+            'hero_class': user.hero_class,
+            'level': user.level
+        })
+    return hydrated
 
 
 class RecommendedPathsView(generics.ListAPIView):
@@ -848,18 +929,16 @@ class RecommendedPathsView(generics.ListAPIView):
     def get_queryset(self):
         user = self.request.user
         
-        # Rutas no inscritas que el usuario puede acceder
-        enrolled_paths = UserPathEnrollment.objects.filter(
-            user=user
-        ).values_list('learning_path_id', flat=True)
+        # Filtrado colaborativo primero; el recomendador por features completa
+        path_ids = ItemSimilarityStore.recommend_paths(user, limit=5)
+        if len(path_ids) < 5:
+            path_ids += [
+                path_id for path_id in PathRecommender.recommend_ids(user, limit=5)
+                if path_id not in path_ids
+            ][:5 - len(path_ids)]
         
-        return LearningPath.objects.filter(
-            status='ACTIVE'
-        ).exclude(
-            id__in=enrolled_paths
-        ).filter(
-            required_level__lte=user.level
-        ).order_by('?')[:5]  # 5 recomendaciones aleatorias
+        paths_by_id = LearningPath.objects.in_bulk(path_ids)
+        return [paths_by_id[path_id] for path_id in path_ids if path_id in paths_by_id]
 
 
 class NextLessonView(generics.RetrieveAPIView):
@@ -867,28 +946,138 @@ class NextLessonView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        # Buscar la siguiente lección no completada
-        active_enrollments = UserPathEnrollment.objects.filter(
-            user=request.user,
-            status='ACTIVE'
-        )
+        # Resume pointer cacheado o resolución en una sola query
+        pointer = NextLessonResolver.next_for_user(request.user)
         
-        for enrollment in active_enrollments:
-            # Buscar lecciones incompletas
-            incomplete_lessons = UserLessonProgress.objects.filter(
-                enrollment=enrollment,
-                status__in=['NOT_STARTED', 'IN_PROGRESS', 'NEEDS_REVIEW']
-            ).order_by('path_lesson__path_unit__order', 'path_lesson__order')
-            
-            if incomplete_lessons.exists():
-                next_lesson = incomplete_lessons.first().path_lesson
-                serializer = LearningPathLessonSerializer(next_lesson)
-                return Response({
-                    'next_lesson': serializer.data,
-                    'enrollment': UserPathEnrollmentDetailSerializer(enrollment).data
-                })
+        if pointer['lesson'] is None:
+            return Response({'message': 'No hay lecciones pendientes'})
         
-        return Response({'message': 'No hay lecciones pendientes'})
+        return Response({
+            'next_lesson': pointer['lesson'],
+            'enrollment': pointer['enrollment']
+        })
+
+
+class SearchView(generics.GenericAPIView):
+    """
+    Búsqueda de texto completo en preguntas ICFES, rutas y contenido
+    Parámetros: q, domain (questions|paths|content, repetible o separado por comas), limit
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [SearchThrottle]
+    
+    @extend_schema(
+        summary="Búsqueda Unificada",
+        description="Resultados ordenados por relevancia con fragmentos resaltados",
+        parameters=[
+            OpenApiParameter('q', OpenApiTypes.STR, required=True, description='Texto a buscar'),
+            OpenApiParameter('domain', OpenApiTypes.STR, description='questions, paths o content'),
+            OpenApiParameter('limit', OpenApiTypes.INT, description='Resultados por dominio (máx. 50)'),
+        ],
+        responses={200: "Resultados por dominio"}
+    )
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if len(text) < 2:
+            return Response(
+                {"error": "La búsqueda debe tener al menos 2 caracteres"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        domains = [
+            domain.strip()
+            for value in request.query_params.getlist('domain')
+            for domain in value.split(',') if domain.strip()
+        ]
+        unknown = set(domains) - set(SEARCH_DOMAINS)
+        if unknown:
+            return Response(
+                {"error": f"Dominios desconocidos: {', '.join(sorted(unknown))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limit = max(1, int(request.query_params.get('limit', 10)))
+        except ValueError:
+            limit = 10
+        
+        results = SearchService.search(text, domains or None, limit)
+        return Response({
+            'query': text,
+            'results': results,
+            'total': sum(len(domain_results) for domain_results in results.values())
+        })
+
+
+BATTLE_ERROR_STATUS = {
+    'not_found': status.HTTP_404_NOT_FOUND,
+    'finished': status.HTTP_409_CONFLICT,
+    'expired': status.HTTP_409_CONFLICT,
+    'already_answered': status.HTTP_409_CONFLICT,
+    'invalid': status.HTTP_400_BAD_REQUEST,
+}
+
+
+class BattleDetailView(generics.GenericAPIView):
+    """Estado de una batalla en curso (para reanudarla)"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, battle_id):
+        try:
+            battle = BattleEngine.state(str(battle_id), request.user.id)
+        except BattleError as error:
+            return Response({"error": error.message}, status=BATTLE_ERROR_STATUS[error.code])
+        return Response(battle)
+
+
+class BattleAnswerView(generics.GenericAPIView):
+    """
+    Responder una pregunta de la batalla: {"question_index": 0, "choice": "B"}
+    Se califica en el servidor; la última respuesta cierra la batalla
+    """
+    permission_classes = [IsAuthenticated]
+    
+    @extend_schema(
+        summary="Responder Pregunta de Batalla",
+        description="Califica la respuesta contra la clave en memoria y cierra la batalla al final",
+        responses={200: "Respuesta calificada", 409: "Batalla terminada o pregunta ya respondida"}
+    )
+    def post(self, request, battle_id):
+        index = request.data.get('question_index')
+        try:
+            index = int(index)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "question_index es requerido"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            answer = BattleEngine.submit_answer(
+                str(battle_id), request.user.id, index, request.data.get('choice')
+            )
+        except BattleError as error:
+            return Response(
+                {"error": error.message, "result": error.result},
+                status=BATTLE_ERROR_STATUS[error.code]
+            )
+        return Response(answer)
+
+
+class CacheMetricsView(generics.GenericAPIView):
+    """
+    Aciertos, fallos y último calentamiento por familia de keys (staff)
+    """
+    permission_classes = [IsAdminUser]
+    
+    @extend_schema(
+        summary="Métricas de Caché",
+        description="Hit ratio y tiempos de calentamiento por familia de keys",
+        responses={200: "Métricas por familia"}
+    )
+    def get(self, request):
+        CacheWarmRegistry.discover()
+        return Response({'families': CacheMetrics.snapshot()})
 
 
 class ReviewPathView(generics.CreateAPIView):
@@ -969,49 +1158,51 @@ class SimulacroViewSet(viewsets.ModelViewSet):
             'medium': 50,  # 50% medias
             'hard': 20     # 20% difíciles
         })
+        icfes_exam_id = request.data.get('icfes_exam_id')
         
-        areas_distribution = request.data.get('areas_distribution', {
-            'matematicas': 42,
-            'lectura_critica': 35,
-            'ciencias_naturales': 30,
-            'ciencias_sociales': 30,
-            'ingles': 25
-        })
-        
-        # Generar preguntas basadas en distribución
-        generated_questions = []
+        # Blueprint: cuotas por área (examen ICFES o distribución) × dificultad
+        try:
+            if icfes_exam_id:
+                from apps.icfes.models import ICFESExam
+                exam = get_object_or_404(ICFESExam, pk=icfes_exam_id, is_active=True)
+                blueprint = QuestionBlueprint.from_exam(exam, difficulty_distribution)
+            else:
+                areas_distribution = (
+                    request.data.get('areas_distribution') or
+                    BlueprintSampler.default_area_weights()
+                )
+                blueprint = QuestionBlueprint.from_distribution(
+                    num_questions, areas_distribution, difficulty_distribution
+                )
+            selection = BlueprintSampler.sample(blueprint)
+        except BlueprintError as exc:
+            return Response(
+                {"error": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Obtener pool de preguntas disponibles
         from apps.icfes.models import PreguntaICFES
-        available_questions = PreguntaICFES.objects.filter(
-            activa=True,
-            verificada=True
-        ).select_related('area_evaluacion', 'competencia')
-        
-        # Generar por dificultad
-        for difficulty, percentage in difficulty_distribution.items():
-            count_needed = int(num_questions * percentage / 100)
-            
-            if difficulty == 'easy':
-                questions = available_questions.filter(nivel_dificultad__lte=2)
-            elif difficulty == 'medium':
-                questions = available_questions.filter(nivel_dificultad__in=[3, 4])
-            else:  # hard
-                questions = available_questions.filter(nivel_dificultad__gte=4)
-            
-            # Selección aleatoria
-            selected = questions.order_by('?')[:count_needed]
-            
-            for question in selected:
-                generated_questions.append({
-                    'question_id': question.id,
-                    'question_text': question.pregunta_texto[:200] + '...',
-                    'area': question.area_evaluacion.nombre if question.area_evaluacion else 'General',
-                    'difficulty': question.nivel_dificultad,
-                    'estimated_time': question.tiempo_estimado_segundos,
-                    'xp_reward': question.puntos_xp,
-                    'competencia': question.competencia.nombre if question.competencia else 'General'
-                })
+        questions = PreguntaICFES.objects.select_related(
+            'area_evaluacion', 'competencia'
+        ).only(
+            'id', 'pregunta_texto', 'nivel_dificultad', 'tiempo_estimado_segundos', 'puntos_xp',
+            'area_evaluacion__nombre', 'competencia__nombre'
+        ).in_bulk([question_id for question_id, _area, _band in selection])
+        
+        generated_questions = []
+        for question_id, _area, _band in selection:
+            question = questions.get(question_id)
+            if question is None:
+                continue  # Eliminada después de construir el índice
+            generated_questions.append({
+                'question_id': question.id,
+                'question_text': question.pregunta_texto[:200] + '...',
+                'area': question.area_evaluacion.nombre if question.area_evaluacion else 'General',
+                'difficulty': question.nivel_dificultad,
+                'estimated_time': question.tiempo_estimado_segundos,
+                'xp_reward': question.puntos_xp,
+                'competencia': question.competencia.nombre if question.competencia else 'General'
+            })
         
         # Guardar configuración del simulacro en caché
         simulacro_config = {
@@ -1031,6 +1222,7 @@ class SimulacroViewSet(viewsets.ModelViewSet):
             "message": "Preguntas generadas exitosamente",
             "simulacro_config": simulacro_config,
             "difficulty_distribution": difficulty_distribution,
+            "areas_distribution": blueprint.area_counts,
             "instructions": [
                 "Tienes 6 horas para completar el simulacro",
                 "Las preguntas están balanceadas por dificultad",
@@ -1040,18 +1232,22 @@ class SimulacroViewSet(viewsets.ModelViewSet):
     
     @extend_schema(
         summary="Reporte Detallado PDF",
-        description="Genera un reporte detallado en PDF del simulacro",
-        responses={200: "PDF generado exitosamente"}
+        description=(
+            "Encola el reporte PDF del simulacro y retorna su estado. "
+            "Cuando está listo incluye la URL del archivo; mientras tanto "
+            "el cliente vuelve a consultar este mismo endpoint."
+        ),
+        responses={200: "PDF listo", 202: "Reporte en preparación"}
     )
     @action(
         detail=True,
         methods=['get'],
         permission_classes=[IsAuthenticated, IsOwnerOrReadOnly],
-        throttle_classes=[HeavyComputationThrottle]
+        throttle_classes=[ReportRequestThrottle]
     )
     def detailed_report(self, request, uuid=None):
         """
-        Endpoint especial: Generar reporte detallado en PDF
+        Endpoint especial: Reporte detallado en PDF (render en segundo plano)
         """
         simulacro = self.get_object()
         
@@ -1061,68 +1257,21 @@ class SimulacroViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Crear PDF en memoria
-        buffer = BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-        
-        # Título del reporte
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(100, height - 100, f"Reporte de Simulacro ICFES")
-        p.drawString(100, height - 120, f"Usuario: {simulacro.user.get_full_name() or simulacro.user.username}")
-        p.drawString(100, height - 140, f"Path: {simulacro.learning_path.name}")
-        
-        # Estadísticas generales
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(100, height - 180, "Estadísticas Generales")
-        
-        p.setFont("Helvetica", 12)
-        y_position = height - 200
-        
-        stats = [
-            f"Progreso: {simulacro.overall_progress_percentage}%",
-            f"XP Ganado: {simulacro.total_xp_earned}",
-            f"Tiempo Total: {simulacro.total_time_spent_hours:.1f} horas",
-            f"Racha Actual: {simulacro.current_streak_days} días",
-            f"Iniciado: {simulacro.created_at.strftime('%d/%m/%Y')}",
-        ]
-        
-        if simulacro.completed_at:
-            stats.append(f"Completado: {simulacro.completed_at.strftime('%d/%m/%Y')}")
-        
-        for stat in stats:
-            p.drawString(120, y_position, stat)
-            y_position -= 20
-        
-        # Progreso por unidades
-        p.setFont("Helvetica-Bold", 14)
-        p.drawString(100, y_position - 20, "Progreso por Unidades")
-        y_position -= 50
+        report = ReportQueue.enqueue(simulacro)
         
-        # Obtener progreso detallado
-        serializer = self.get_serializer(simulacro)
-        detailed_progress = serializer.get_detailed_progress(simulacro)
-        
-        p.setFont("Helvetica", 10)
-        for unit_data in detailed_progress['units'][:5]:  # Limitar por espacio
-            unit_text = f"• {unit_data['unit_title']}: {unit_data['progress_percentage']:.1f}%"
-            p.drawString(120, y_position, unit_text)
-            y_position -= 15
-            
-            if y_position < 100:  # Nueva página si es necesario
-                p.showPage()
-                y_position = height - 100
-        
-        # Finalizar PDF
-        p.showPage()
-        p.save()
-        
-        # Preparar respuesta
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="reporte_simulacro_{simulacro.uuid}.pdf"'
+        if report['status'] == 'READY':
+            return Response({
+                "status": report['status'],
+                "version": report['version'],
+                "download_url": request.build_absolute_uri(report['url'])
+            })
         
-        return response
+        return Response({
+            "status": report['status'],
+            "version": report['version'],
+            "poll_url": request.build_absolute_uri(),
+            "retry_after_seconds": 5
+        }, status=status.HTTP_202_ACCEPTED)
     
     @extend_schema(
         summary="Comparar Resultados",
@@ -1146,67 +1295,36 @@ class SimulacroViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Obtener simulacros similares para comparación
-        similar_simulacros = UserPathEnrollment.objects.filter(
-            learning_path=user_simulacro.learning_path,
-            status='COMPLETED'
-        ).exclude(
-            user=user_simulacro.user
-        ).select_related('user')
-        
-        # Estadísticas de comparación
-        total_users = similar_simulacros.count()
+        # Distribución precalculada de la ruta (tiempo constante)
+        distribution = PathDistributionService.compare(user_simulacro)
         
-        if total_users == 0:
+        if distribution is None:
             return Response({
                 "message": "No hay otros usuarios para comparar aún",
                 "comparison": None
             })
         
-        # Calcular percentiles
-        better_progress = similar_simulacros.filter(
-            overall_progress_percentage__lt=user_simulacro.overall_progress_percentage
-        ).count()
-        
-        better_xp = similar_simulacros.filter(
-            total_xp_earned__lt=user_simulacro.total_xp_earned
-        ).count()
-        
-        better_time = similar_simulacros.filter(
-            total_time_spent_hours__gt=user_simulacro.total_time_spent_hours
-        ).count()
-        
-        # Promedios generales
-        averages = similar_simulacros.aggregate(
-            avg_progress=Avg('overall_progress_percentage'),
-            avg_xp=Avg('total_xp_earned'),
-            avg_time=Avg('total_time_spent_hours'),
-            avg_streak=Avg('current_streak_days')
-        )
-        
-        # Top performers
-        top_performers = similar_simulacros.order_by(
-            '-overall_progress_percentage',
-            '-total_xp_earned'
-        )[:5]
+        total_users = distribution['total_users']
+        better_progress = distribution['better_progress']
+        averages = distribution['averages']
         
         comparison_data = {
             'user_stats': {
-                'progress': user_simulacro.overall_progress_percentage,
+                'progress': user_simulacro.progress_percentage,
                 'xp_earned': user_simulacro.total_xp_earned,
-                'time_spent': user_simulacro.total_time_spent_hours,
+                'time_spent': round(user_simulacro.total_time_minutes / 60, 1),
                 'streak': user_simulacro.current_streak_days
             },
             'percentiles': {
-                'progress': round((better_progress / total_users) * 100, 1),
-                'xp': round((better_xp / total_users) * 100, 1),
-                'time_efficiency': round((better_time / total_users) * 100, 1)
+                'progress': round((distribution['below']['progress'] / total_users) * 100, 1),
+                'xp': round((distribution['below']['xp'] / total_users) * 100, 1),
+                'time_efficiency': round((distribution['above']['time'] / total_users) * 100, 1)
             },
             'averages': {
-                'progress': round(averages['avg_progress'] or 0, 1),
-                'xp': round(averages['avg_xp'] or 0, 1),
-                'time': round(averages['avg_time'] or 0, 1),
-                'streak': round(averages['avg_streak'] or 0, 1)
+                'progress': round(averages['progress'], 1),
+                'xp': round(averages['xp'], 1),
+                'time': round(averages['time'] / 60, 1),
+                'streak': round(averages['streak'], 1)
             },
             'ranking': {
                 'total_users': total_users,
@@ -1215,12 +1333,12 @@ class SimulacroViewSet(viewsets.ModelViewSet):
             },
             'top_performers': [
                 {
-                    'username': perf.user.username[:3] + '***',  # Privacidad
-                    'progress': perf.overall_progress_percentage,
-                    'xp': perf.total_xp_earned,
-                    'streak': perf.current_streak_days
+                    'username': performer['username'],
+                    'progress': performer['progress'],
+                    'xp': performer['xp'],
+                    'streak': performer['streak']
                 }
-                for perf in top_performers
+                for performer in distribution['top_performers']
             ]
         }
         
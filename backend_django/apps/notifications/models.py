@@ -166,6 +166,7 @@ class Notification(models.Model):
         db_table = 'notifications'
         indexes = [
             models.Index(fields=['recipient', 'status']),
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notifications_keyset'),
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['notification_type', 'priority']),
             models.Index(fields=['expires_at']),
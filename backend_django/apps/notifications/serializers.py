@@ -0,0 +1,14 @@
+from rest_framework import serializers
+from .models import Notification
+
+
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = [
+            'id', 'uuid', 'title', 'message', 'notification_type',
+            'icon_url', 'image_url', 'color_theme',
+            'action_button_text', 'action_url', 'action_data',
+            'status', 'priority', 'created_at', 'read_at', 'expires_at'
+        ]
+        read_only_fields = fields
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import views
 
 app_name = 'notifications'
 
@@ -7,6 +8,7 @@ router = DefaultRouter()
 # Aquí se registrarán los ViewSets cuando se implementen
 
 urlpatterns = [
+    path('', views.NotificationListView.as_view(), name='notification-list'),
     path('', include(router.urls)),
     # URLs adicionales se añadirán cuando se implementen las vistas
 ] 
\ No newline at end of file
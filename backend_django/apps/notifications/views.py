@@ -0,0 +1,27 @@
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from apps.learning.pagination import TimelinePagination
+from .models import Notification
+from .serializers import NotificationSerializer
+
+
+class NotificationListView(generics.ListAPIView):
+    """
+    Notificaciones del usuario, de la más reciente a la más antigua,
+    con paginación por cursor (created_at, id)
+    Filtros opcionales: ?status=<estado>&unread=1
+    """
+    serializer_class = NotificationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = TimelinePagination
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(recipient=self.request.user)
+
+        status = self.request.query_params.get('status')
+        if status:
+            queryset = queryset.filter(status=status.upper())
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(read_at__isnull=True)
+
+        return queryset
@@ -6,6 +6,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.db import models
 from django.forms import TextInput, Textarea
+from apps.learning.pagination import EstimatedCountPaginator
 from .models import (
     Subject, Topic, ICFESCuadernillo, Question, QuestionOption, 
     QuestionExplanation, QuestionSet, QuestionSetItem, 
@@ -92,6 +93,9 @@ class QuestionMultimediaInline(admin.TabularInline):
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
+    # Tablas grandes: conteo estimado en lugar de COUNT(*) por página
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = [
         'id', 'question_preview', 'subject', 'topic', 'difficulty', 
         'content_type', 'cuadernillo', 'question_number', 'success_rate_display',
@@ -236,6 +240,9 @@ class QuestionSetAdmin(admin.ModelAdmin):
 
 @admin.register(UserQuestionResponse)
 class UserQuestionResponseAdmin(admin.ModelAdmin):
+    # Tablas grandes: conteo estimado en lugar de COUNT(*) por página
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = [
         'user', 'question_id', 'is_correct', 'response_time_seconds', 
         'confidence_level', 'quiz_type', 'xp_gained', 'created_at'
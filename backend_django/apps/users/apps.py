@@ -4,4 +4,12 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.users'
-    verbose_name = 'Usuarios' 
\ No newline at end of file
+    verbose_name = 'Usuarios'
+    
+    def ready(self):
+        """Conectar el registro de usernames/emails ocupados y la caché de autenticación"""
+        from . import authentication, availability
+        
+        availability.connect_signals()
+        authentication.connect_signals()
+ 
\ No newline at end of file
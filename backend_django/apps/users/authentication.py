@@ -0,0 +1,120 @@
+"""
+Autenticación JWT con el usuario en caché
+
+JWTAuthentication carga la fila completa de users (incluidos los JSON de
+avatar, notificaciones y horario) en cada petición. CachedJWTAuthentication
+guarda por poco tiempo una instancia con solo los campos que usan los
+permisos y la mayoría de las vistas, bajo una key con la versión de
+autenticación del usuario. Guardar o borrar el usuario (incluido un cambio
+de contraseña) o aplicarle XP con el ledger incrementa la versión, así que
+la siguiente petición vuelve a leer la base de datos.
+
+Los campos fuera de la proyección siguen disponibles: Django los carga
+bajo demanda al accederlos.
+
+La versión solo invalida a todos los procesos si el caché es compartido;
+con LocMem o Dummy (fuera de los tests) se usa JWTAuthentication sin caché.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.learning.cache import CacheKeys, CacheTimeouts, cache_is_shared
+
+
+# Proyección del usuario autenticado: sin JSON ni contraseña
+AUTH_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser', 'last_login',
+    'hero_class', 'level', 'experience_points', 'avatar_evolution_stage',
+    'grade', 'school', 'target_university', 'assigned_role',
+    'initial_assessment_completed', 'vocational_test_completed',
+)
+
+
+def _version_key(user_id):
+    return CacheKeys.USER_AUTH_VERSION.format(user_id=user_id)
+
+
+class AuthUserCache:
+    """
+    Usuarios autenticados cacheados por id y versión
+    """
+
+    @staticmethod
+    def enabled():
+        """La versión llega a todos los procesos solo con un caché compartido"""
+        return cache_is_shared() or getattr(settings, 'TESTING', False)
+
+    @staticmethod
+    def key(user_id, version):
+        return CacheKeys.USER_AUTH.format(user_id=user_id, version=version)
+
+    @staticmethod
+    def version(user_id):
+        return cache.get(_version_key(user_id), 0)
+
+    @staticmethod
+    def bump(user_id):
+        key = _version_key(user_id)
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+    @classmethod
+    def invalidate(cls, user_id):
+        """Descarta el usuario cacheado al confirmar la transacción"""
+        transaction.on_commit(lambda: cls.bump(user_id))
+
+    @classmethod
+    def get(cls, user_id, load):
+        """Usuario cacheado o load() (que puede lanzar DoesNotExist)"""
+        key = cls.key(user_id, cls.version(user_id))
+        user = cache.get(key)
+        if user is None:
+            user = load()
+            cache.set(key, user, CacheTimeouts.USER_AUTH)
+        return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication que resuelve el usuario desde AuthUserCache"""
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN or not AuthUserCache.enabled():
+            # La revocación compara el hash de la contraseña, que no se cachea;
+            # sin caché compartido otro proceso no vería la invalidación
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = AuthUserCache.get(user_id, lambda: self.user_model.objects.only(*AUTH_USER_FIELDS).get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ))
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
+
+
+def _invalidate_user(sender, instance, **kwargs):
+    AuthUserCache.invalidate(instance.pk)
+
+
+def connect_signals():
+    from .models import User
+
+    post_save.connect(_invalidate_user, sender=User, dispatch_uid='auth_user_cache_invalidate')
+    post_delete.connect(_invalidate_user, sender=User, dispatch_uid='auth_user_cache_invalidate_delete')
@@ -0,0 +1,353 @@
+"""
+Pre-chequeo de disponibilidad de username y email con filtros de Bloom
+
+Los formularios de registro consultan la disponibilidad en cada tecla. Un
+filtro de Bloom con los valores normalizados (username en casefold, email
+en minúsculas) responde "seguro libre" sin tocar la base de datos; solo
+cuando el filtro dice "quizás ocupado" se consulta la tabla de usuarios con
+la misma búsqueda exacta de siempre. El filtro nunca da falsos negativos,
+así que la respuesta final es idéntica a la de consultar siempre.
+
+El filtro se construye desde la base de datos y se publica en el caché con
+un token de generación; cada proceso lo carga en memoria la primera vez que
+lo necesita y lo recarga cuando el token cambia (tarea periódica o comando
+rebuild_availability_filters). Si no hay filtro publicado, un solo proceso lo
+construye bajo un lock en el caché; los demás consultan la base de datos
+mientras tanto. Los usuarios creados o renombrados después
+se anotan en un log de eventos numerados en el caché que cada proceso
+reproduce sobre su copia local antes de responder. Ese log solo llega a
+todos los procesos con un caché compartido: con LocMem o Dummy (fuera de los
+tests) el filtro se omite y siempre se consulta la base de datos.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+
+from apps.learning.cache import CacheKeys, CacheTimeouts, cache_is_shared
+
+
+logger = logging.getLogger(__name__)
+
+TARGET_FALSE_POSITIVE_RATE = 0.001
+MIN_CAPACITY = 10000
+# Holgura para las altas que llegan entre reconstrucciones
+CAPACITY_HEADROOM = 1.5
+
+# Un filtro local más viejo que esto se reconstruye si el log tiene huecos
+REFRESH_INTERVAL = CacheTimeouts.HOUR
+BUILD_BATCH_SIZE = 5000
+# Lo que puede tardar una reconstrucción en línea antes de liberar el lock
+BUILD_LOCK_TIMEOUT = CacheTimeouts.MINUTE * 5
+
+COUNTERS = ('skipped', 'queried', 'taken')
+
+
+def normalize_username(value):
+    return (value or '').strip().casefold()
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+NORMALIZERS = {
+    'username': normalize_username,
+    'email': normalize_email,
+}
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom sobre un bytearray con doble hashing (Kirsch-Mitzenmacher)
+    """
+
+    def __init__(self, capacity, error_rate=TARGET_FALSE_POSITIVE_RATE, size=None, hashes=None, bits=None, count=0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = size or max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    @property
+    def memory_bytes(self):
+        return len(self.bits)
+
+    def estimated_false_positive_rate(self):
+        """(1 - e^(-k·n/m))^k con los elementos insertados hasta ahora"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def to_state(self):
+        return {
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'size': self.size,
+            'hashes': self.hashes,
+            'bits': bytes(self.bits),
+            'count': self.count,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(**state)
+
+
+def _key(template, field, **kwargs):
+    return template.format(field=field, **kwargs)
+
+
+class AvailabilityIndex:
+    """
+    Filtros por campo: publicación en caché, copia local por proceso y
+    consulta con respaldo en la base de datos
+    """
+
+    _local = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _values(field):
+        from .models import User
+
+        return User.objects.values_list(field, flat=True).order_by().iterator(chunk_size=BUILD_BATCH_SIZE)
+
+    @classmethod
+    def publish(cls, field):
+        """Construye el filtro desde la base de datos y lo publica con un token nuevo"""
+        started = time.monotonic()
+        # Los eventos hasta este número ya están confirmados en la base de datos
+        seq = cache.get(_key(CacheKeys.AVAILABILITY_EVENT_SEQ, field), 0)
+
+        normalize = NORMALIZERS[field]
+        values = {normalize(value) for value in cls._values(field)}
+        values.discard('')
+
+        bloom = BloomFilter(max(MIN_CAPACITY, int(len(values) * CAPACITY_HEADROOM)))
+        for value in values:
+            bloom.add(value)
+
+        generation = uuid.uuid4().hex
+        state = {'generation': generation, 'seq': seq, 'built_at': time.time(), 'filter': bloom.to_state()}
+        cache.set(_key(CacheKeys.AVAILABILITY_FILTER, field, generation=generation), state, CacheTimeouts.DAY)
+        cache.set(_key(CacheKeys.AVAILABILITY_GENERATION, field), generation, None)
+
+        logger.info(
+            "Filtro de disponibilidad %s: %s valores, %s KB, FPR estimado %.5f (%.2fs)",
+            field, bloom.count, round(bloom.memory_bytes / 1024, 1),
+            bloom.estimated_false_positive_rate(), time.monotonic() - started
+        )
+        return cls._install(field, state)
+
+    @classmethod
+    def _publish_locked(cls, field):
+        """publish() en línea por un solo proceso a la vez; None si otro lo está construyendo"""
+        lock_key = _key(CacheKeys.AVAILABILITY_BUILD_LOCK, field)
+        if not cache.add(lock_key, 1, BUILD_LOCK_TIMEOUT):
+            return None
+        try:
+            return cls.publish(field)
+        finally:
+            cache.delete(lock_key)
+
+    @classmethod
+    def publish_all(cls):
+        return {field: cls.publish(field) for field in NORMALIZERS}
+
+    @classmethod
+    def _install(cls, field, state):
+        local = {
+            'generation': state['generation'],
+            'seq': state['seq'],
+            'built_at': state['built_at'],
+            'filter': BloomFilter.from_state(state['filter']),
+        }
+        with cls._lock:
+            cls._local[field] = local
+        return local
+
+    @classmethod
+    def _sync(cls, field):
+        """
+        Copia local al día con la generación publicada y el log de eventos.
+        complete=False indica que el filtro no sirve para descartar valores.
+        """
+        generation_key = _key(CacheKeys.AVAILABILITY_GENERATION, field)
+        seq_key = _key(CacheKeys.AVAILABILITY_EVENT_SEQ, field)
+        shared = cache.get_many([generation_key, seq_key])
+        generation = shared.get(generation_key)
+        seq = shared.get(seq_key, 0)
+
+        local = cls._local.get(field)
+        if local is None or generation is None or local['generation'] != generation:
+            state = generation and cache.get(
+                _key(CacheKeys.AVAILABILITY_FILTER, field, generation=generation)
+            )
+            if state:
+                local = cls._install(field, state)
+            else:
+                # Sin filtro publicado (caché vaciado o tarea aún no corrió)
+                built = cls._publish_locked(field)
+                if built is None:
+                    return local, False
+                local = built
+
+        complete = True
+        if local['seq'] < seq:
+            complete = cls._replay(field, local, seq)
+            if not complete and time.time() - local['built_at'] > REFRESH_INTERVAL:
+                rebuilt = cls._publish_locked(field)
+                if rebuilt is not None:
+                    local, complete = rebuilt, True
+        return local, complete
+
+    @classmethod
+    def _replay(cls, field, local, seq):
+        """Agrega los eventos (seq_local, seq]; False si alguno no está en caché"""
+        keys = [
+            _key(CacheKeys.AVAILABILITY_EVENT, field, seq=number)
+            for number in range(local['seq'] + 1, seq + 1)
+        ]
+        events = cache.get_many(keys)
+        with cls._lock:
+            for value in events.values():
+                local['filter'].add(value)
+            if len(events) < len(keys):
+                # Evento aún no escrito o expirado: no se avanza, se reintenta
+                return False
+            local['seq'] = seq
+        return True
+
+    @classmethod
+    def record(cls, field, value):
+        """Anota un valor ocupado en el log compartido y en la copia local"""
+        normalized = NORMALIZERS[field](value)
+        if not normalized:
+            return
+
+        seq_key = _key(CacheKeys.AVAILABILITY_EVENT_SEQ, field)
+        cache.add(seq_key, 0, None)
+        seq = cache.incr(seq_key)
+        cache.set(_key(CacheKeys.AVAILABILITY_EVENT, field, seq=seq), normalized, CacheTimeouts.DAY)
+
+        local = cls._local.get(field)
+        if local is not None:
+            with cls._lock:
+                local['filter'].add(normalized)
+
+    @staticmethod
+    def enabled():
+        """El filtro es fiable solo si el log de eventos es compartido entre procesos"""
+        return cache_is_shared() or getattr(settings, 'TESTING', False)
+
+    @classmethod
+    def might_exist(cls, field, value):
+        """False solo si el valor seguro no está registrado"""
+        local, complete = cls._sync(field)
+        return not complete or NORMALIZERS[field](value) in local['filter']
+
+    @classmethod
+    def is_available(cls, field, value):
+        """Disponibilidad exacta; la base de datos solo se consulta si el filtro no descarta"""
+        from .models import User
+
+        if cls.enabled() and not cls.might_exist(field, value):
+            cls._count(field, 'skipped')
+            return True
+
+        cls._count(field, 'queried')
+        taken = User.objects.filter(**{field: value}).exists()
+        if taken:
+            cls._count(field, 'taken')
+        return not taken
+
+    @staticmethod
+    def _count(field, counter):
+        key = _key(CacheKeys.AVAILABILITY_COUNTER, field, counter=counter)
+        cache.add(key, 0, CacheTimeouts.WEEK)
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+    @classmethod
+    def stats(cls, field):
+        """Memoria y tasa de falsos positivos (estimada y observada) del filtro"""
+        local, _complete = cls._sync(field)
+        if local is None:
+            local = cls.publish(field)
+        bloom = local['filter']
+        counters = cache.get_many([
+            _key(CacheKeys.AVAILABILITY_COUNTER, field, counter=counter) for counter in COUNTERS
+        ])
+        skipped, queried, taken = (
+            counters.get(_key(CacheKeys.AVAILABILITY_COUNTER, field, counter=counter), 0)
+            for counter in COUNTERS
+        )
+        free_checks = skipped + queried - taken
+        return {
+            'values': bloom.count,
+            'capacity': bloom.capacity,
+            'bits': bloom.size,
+            'hashes': bloom.hashes,
+            'memory_bytes': bloom.memory_bytes,
+            'target_false_positive_rate': bloom.error_rate,
+            'estimated_false_positive_rate': bloom.estimated_false_positive_rate(),
+            'checks': skipped + queried,
+            'database_queries': queried,
+            'taken': taken,
+            'observed_false_positive_rate': (queried - taken) / free_checks if free_checks else None,
+            'generation': local['generation'],
+        }
+
+
+def _track_user_identity(sender, instance, update_fields=None, **kwargs):
+    """pre_save de User: username/email guardados, para anotar solo los que cambian"""
+    instance._previous_identity = None
+    if instance.pk and (update_fields is None or set(NORMALIZERS) & set(update_fields)):
+        instance._previous_identity = sender.objects.filter(
+            pk=instance.pk
+        ).values(*NORMALIZERS).first()
+
+
+def _record_user(sender, instance, created, update_fields=None, **kwargs):
+    """post_save de User: anota username/email nuevos o modificados"""
+    fields = set(NORMALIZERS)
+    if not created and update_fields is not None:
+        fields &= set(update_fields)
+    previous = None if created else getattr(instance, '_previous_identity', None)
+    for field in fields:
+        value = getattr(instance, field)
+        normalize = NORMALIZERS[field]
+        if previous is not None and normalize(previous[field]) == normalize(value):
+            continue
+        transaction.on_commit(lambda field=field, value=value: AvailabilityIndex.record(field, value))
+
+
+def connect_signals():
+    from .models import User
+
+    pre_save.connect(_track_user_identity, sender=User, dispatch_uid='availability_track_user')
+    post_save.connect(_record_user, sender=User, dispatch_uid='availability_record_user')
@@ -0,0 +1,240 @@
+"""
+Directorio de colegios y universidades para el formulario de registro
+
+Autocompletado: en PostgreSQL el nombre se compara normalizado (minúsculas
+y sin acentos, con immutable_unaccent) contra índices GIN gin_trgm_ops, de
+modo que tanto el prefijo (LIKE 'term%') como la similitud por palabra
+(<%) usan índice en lugar de recorrer los ~20k colegios. Los resultados se
+ordenan primero por coincidencia de prefijo y luego por similitud, y se
+devuelven pocos por página. En otros motores se usa icontains como respaldo.
+
+Snapshots: el comando build_directory_snapshots escribe en MEDIA_ROOT un
+JSON comprimido con gzip por departamento (y uno con las universidades),
+con la versión en el nombre del archivo para que los clientes lo cacheen
+indefinidamente, más un manifiesto con las URLs vigentes.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, CharField, F, Func, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+from django.utils.text import slugify
+
+from apps.learning.cache import CacheKeys, CacheTimeouts
+
+
+MIN_TERM_LENGTH = 2
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+SNAPSHOTS_DIR = "directory"
+MANIFEST_NAME = "manifest.json"
+
+# Campos que se devuelven en autocompletado y snapshots
+SCHOOL_FIELDS = ['id', 'code', 'name', 'city', 'department', 'school_type']
+UNIVERSITY_FIELDS = ['id', 'code', 'name', 'city', 'min_icfes_score']
+
+
+def normalized(expression):
+    """
+    immutable_unaccent(lower(expr)): la expresión de los índices trigram.
+    Es un Func genérico para que la migración 0005 pueda declarar el mismo
+    índice sin importar este módulo.
+    """
+    return Func(Lower(expression), function='immutable_unaccent', output_field=CharField())
+
+
+def normalize(text):
+    """Equivalente en Python de normalized() para el término buscado"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.lower().split())
+
+
+def trigram_enabled():
+    return connection.vendor == 'postgresql'
+
+
+class DirectorySearch:
+    """
+    Autocompletado de colegios y universidades
+    """
+
+    @staticmethod
+    def _kinds():
+        from .models import School, University
+
+        return {
+            'schools': (School, SCHOOL_FIELDS, ('city', 'department')),
+            'universities': (University, UNIVERSITY_FIELDS, ('city',)),
+        }
+
+    @staticmethod
+    def clamp_limit(value):
+        try:
+            return max(1, min(int(value), MAX_LIMIT))
+        except (TypeError, ValueError):
+            return DEFAULT_LIMIT
+
+    @classmethod
+    def autocomplete(cls, kind, term, limit=DEFAULT_LIMIT, **filters):
+        """
+        Hasta `limit` filas ({campo: valor}) que empiezan por o se parecen a
+        term; filters acepta city/department (sin acentos ni mayúsculas)
+        """
+        model, fields, filter_fields = cls._kinds()[kind]
+        term = normalize(term)
+        if len(term) < MIN_TERM_LENGTH:
+            return []
+
+        filters = {
+            field: normalize(value)
+            for field, value in filters.items()
+            if field in filter_fields and value
+        }
+        cache_key = CacheKeys.DIRECTORY_AUTOCOMPLETE.format(
+            kind=kind,
+            digest=hashlib.md5(
+                json.dumps([term, limit, sorted(filters.items())]).encode()
+            ).hexdigest()
+        )
+        results = cache.get(cache_key)
+        if results is None:
+            if trigram_enabled():
+                queryset = cls._ranked(model, term, filters)
+            else:
+                queryset = cls._fallback(model, term, filters)
+            results = list(queryset.values(*fields)[:limit])
+            cache.set(cache_key, results, CacheTimeouts.DIRECTORY_AUTOCOMPLETE)
+        return results
+
+    @staticmethod
+    def _ranked(model, term, filters):
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        queryset = model.objects.annotate(search_name=normalized('name'))
+        for field, value in filters.items():
+            queryset = queryset.annotate(**{f'search_{field}': normalized(field)}).filter(
+                **{f'search_{field}': value}
+            )
+        return queryset.filter(
+            # name %> term: similitud por palabra sobre el índice gin_trgm_ops
+            Q(search_name__startswith=term) | Q(TrigramWordSimilar(F('search_name'), Value(term)))
+        ).annotate(
+            is_prefix=Case(
+                When(search_name__startswith=term, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField()
+            ),
+            similarity=TrigramWordSimilarity(term, 'search_name')
+        ).order_by('-is_prefix', '-similarity', 'name')
+
+    @staticmethod
+    def _fallback(model, term, filters):
+        queryset = model.objects.filter(name__icontains=term)
+        for field, value in filters.items():
+            queryset = queryset.filter(**{f'{field}__iexact': value})
+        return queryset.annotate(
+            is_prefix=Case(
+                When(name__istartswith=term, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField()
+            )
+        ).order_by('-is_prefix', 'name')
+
+
+def snapshot_root():
+    return os.path.join(settings.MEDIA_ROOT, SNAPSHOTS_DIR)
+
+
+def snapshot_url(relative_path):
+    return f"{settings.MEDIA_URL}{SNAPSHOTS_DIR}/{relative_path}"
+
+
+class DirectorySnapshot:
+    """
+    JSON comprimidos por departamento y su manifiesto
+    """
+
+    @staticmethod
+    def _write(relative_dir, name, rows):
+        """Escribe rows como {name}.{versión}.json.gz; retorna la entrada del manifiesto"""
+        payload = json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode()
+        version = hashlib.sha1(payload).hexdigest()[:12]
+        relative_path = f"{relative_dir}/{name}.{version}.json.gz"
+
+        absolute_path = os.path.join(snapshot_root(), relative_path)
+        os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+        if not os.path.exists(absolute_path):
+            # mtime=0: el mismo contenido produce exactamente los mismos bytes
+            with open(absolute_path, 'wb') as output:
+                output.write(gzip.compress(payload, mtime=0))
+
+        return {
+            'count': len(rows),
+            'version': version,
+            'path': relative_path,
+            'url': snapshot_url(relative_path),
+        }
+
+    @classmethod
+    def build(cls):
+        """Regenera los snapshots y el manifiesto; retorna el manifiesto"""
+        from .models import School, University
+
+        by_department = {}
+        for row in School.objects.order_by('department', 'name').values(*SCHOOL_FIELDS):
+            by_department.setdefault(row['department'], []).append(row)
+
+        manifest = {'schools': {}, 'universities': None}
+        for department, rows in by_department.items():
+            entry = cls._write('schools', slugify(department) or 'sin-departamento', rows)
+            manifest['schools'][department] = entry
+        manifest['universities'] = cls._write(
+            'universities', 'all', list(University.objects.order_by('name').values(*UNIVERSITY_FIELDS))
+        )
+
+        with open(os.path.join(snapshot_root(), MANIFEST_NAME), 'w', encoding='utf-8') as output:
+            json.dump(manifest, output, ensure_ascii=False)
+        cache.set(CacheKeys.DIRECTORY_MANIFEST, manifest, CacheTimeouts.DIRECTORY_MANIFEST)
+
+        cls._prune(manifest)
+        return manifest
+
+    @staticmethod
+    def _prune(manifest):
+        """Borra versiones que ya no figuran en el manifiesto"""
+        current = {entry['path'] for entry in manifest['schools'].values()}
+        current.add(manifest['universities']['path'])
+
+        root = snapshot_root()
+        for folder in ('schools', 'universities'):
+            directory = os.path.join(root, folder)
+            if not os.path.isdir(directory):
+                continue
+            for filename in os.listdir(directory):
+                if f"{folder}/{filename}" not in current:
+                    os.remove(os.path.join(directory, filename))
+
+    @staticmethod
+    def manifest():
+        """Manifiesto vigente (caché, luego disco); None si nunca se generó"""
+        manifest = cache.get(CacheKeys.DIRECTORY_MANIFEST)
+        if manifest is not None:
+            return manifest
+
+        try:
+            with open(os.path.join(snapshot_root(), MANIFEST_NAME), encoding='utf-8') as source:
+                manifest = json.load(source)
+        except FileNotFoundError:
+            return None
+        cache.set(CacheKeys.DIRECTORY_MANIFEST, manifest, CacheTimeouts.DIRECTORY_MANIFEST)
+        return manifest
@@ -0,0 +1,178 @@
+"""
+Ledger de experiencia (XP)
+
+Cada otorgamiento de XP se anota como ExperienceLedgerEntry y se aplica al
+usuario con un único UPDATE atómico:
+
+    UPDATE users SET experience_points = experience_points + X,
+                     level = CASE ..., hero_class = CASE ...
+
+Nivel y clase se derivan en forma cerrada del XP acumulado y de
+GAME_SETTINGS['LEVELS_REQUIRED_FOR_PROMOTION'] (r por clase): dentro de una
+clase el nivel es XP // r + 1 y al llegar al nivel 10 (XP >= 9·r) se
+asciende a la siguiente; la última clase solo sube de nivel. Así dos
+otorgamientos concurrentes no se pisan y nunca se guarda la fila completa.
+
+Dentro de ExperienceLedger.batch() los otorgamientos se acumulan y al
+salir se aplica un UPDATE por usuario (p. ej. lección + bonus de ruta +
+logros de una misma petición). Los leaderboards se incrementan al
+confirmar la transacción.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, CharField, F, IntegerField, Value, When
+from django.db.models.lookups import LessThan
+
+
+# Al alcanzar este nivel se asciende de clase
+PROMOTION_LEVEL = 10
+
+DEFAULT_XP_PER_LEVEL = 100
+
+PROGRESSION_FIELDS = ['experience_points', 'level', 'hero_class']
+
+_pending = ContextVar('xp_ledger_pending', default=None)
+
+
+def class_thresholds():
+    """[(clase, XP por nivel)] en orden de ascenso"""
+    from .models import User
+
+    required = settings.GAME_SETTINGS['LEVELS_REQUIRED_FOR_PROMOTION']
+    return [(code, required.get(code, DEFAULT_XP_PER_LEVEL)) for code, _label in User.HERO_CLASSES]
+
+
+def progression_for(experience_points):
+    """(hero_class, level) que corresponde a un XP acumulado"""
+    thresholds = class_thresholds()
+    for code, per_level in thresholds[:-1]:
+        if experience_points < per_level * (PROMOTION_LEVEL - 1):
+            return code, experience_points // per_level + 1
+    code, per_level = thresholds[-1]
+    return code, experience_points // per_level + 1
+
+
+def progression_expressions(experience_points):
+    """
+    Expresiones SQL de level y hero_class para una expresión de XP.
+    El CASE evalúa en orden: llegar a la rama de una clase implica haber
+    superado el umbral de ascenso de todas las anteriores.
+    """
+    thresholds = class_thresholds()
+    promotions = [
+        (code, per_level, LessThan(experience_points, Value(per_level * (PROMOTION_LEVEL - 1))))
+        for code, per_level in thresholds[:-1]
+    ]
+    last_code, last_per_level = thresholds[-1]
+    return {
+        'level': Case(
+            *[When(condition, then=experience_points / Value(per_level) + 1) for _code, per_level, condition in promotions],
+            default=experience_points / Value(last_per_level) + 1,
+            output_field=IntegerField()
+        ),
+        'hero_class': Case(
+            *[When(condition, then=Value(code)) for code, _per_level, condition in promotions],
+            default=Value(last_code),
+            output_field=CharField()
+        ),
+    }
+
+
+class ExperienceLedger:
+    """
+    Anotación y aplicación atómica de XP
+    """
+
+    @classmethod
+    def award(cls, user, amount, source='GENERAL', learning_path_id=None, reference=''):
+        """Otorga XP; dentro de batch() se difiere hasta el final del lote"""
+        from .models import ExperienceLedgerEntry
+
+        if not amount:
+            return
+        entry = ExperienceLedgerEntry(
+            user_id=user.pk,
+            amount=amount,
+            source=source,
+            reference=reference,
+            learning_path_id=learning_path_id
+        )
+        pending = _pending.get()
+        if pending is not None:
+            pending.append((user, entry))
+        else:
+            cls._apply([(user, entry)])
+
+    @classmethod
+    @contextmanager
+    def batch(cls):
+        """Acumula los otorgamientos del bloque y los aplica juntos al salir"""
+        if _pending.get() is not None:
+            # Lote anidado: lo aplica el lote externo
+            yield
+            return
+
+        token = _pending.set([])
+        try:
+            yield
+            pending = _pending.get()
+        finally:
+            _pending.reset(token)
+        cls._apply(pending)
+
+    @staticmethod
+    def apply_to_user(user_id, amount):
+        """UPDATE atómico de XP, nivel y clase de un usuario"""
+        from .models import User
+
+        experience_points = F('experience_points') + Value(amount)
+        return User.objects.filter(pk=user_id).update(
+            experience_points=experience_points,
+            **progression_expressions(experience_points)
+        )
+
+    @classmethod
+    def _apply(cls, pending):
+        from apps.learning.dashboard import DashboardSnapshot
+        from apps.learning.leaderboards import LeaderboardService
+        from .authentication import AuthUserCache
+        from .models import ExperienceLedgerEntry
+
+        if not pending:
+            return
+
+        totals = defaultdict(int)
+        path_totals = defaultdict(int)
+        users = {}
+        for user, entry in pending:
+            totals[entry.user_id] += entry.amount
+            path_totals[(entry.user_id, entry.learning_path_id)] += entry.amount
+            users.setdefault(id(user), user)
+
+        with transaction.atomic():
+            ExperienceLedgerEntry.objects.bulk_create([entry for _user, entry in pending])
+            for user_id, amount in totals.items():
+                if amount:
+                    cls.apply_to_user(user_id, amount)
+                    DashboardSnapshot.invalidate(user_id, 'xp')
+                    # El UPDATE no dispara post_save
+                    AuthUserCache.invalidate(user_id)
+
+        # Las instancias en memoria reflejan el resultado del UPDATE
+        for user in users.values():
+            user.refresh_from_db(fields=PROGRESSION_FIELDS)
+
+        by_id = {user.pk: user for user in users.values()}
+
+        def record_leaderboards():
+            for (user_id, learning_path_id), amount in path_totals.items():
+                LeaderboardService.record_xp(by_id[user_id], amount, learning_path_id=learning_path_id)
+
+        # Los sorted sets no participan de la transacción: solo se incrementan
+        # si el XP se confirma, y la reconstrucción lee el mismo ledger
+        transaction.on_commit(record_leaderboards)
@@ -0,0 +1,23 @@
+"""
+Comando Django para generar los snapshots comprimidos del directorio
+Ejecutar después de importar o actualizar colegios y universidades
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.users.directory import DirectorySnapshot
+
+
+class Command(BaseCommand):
+    help = 'Genera un JSON comprimido por departamento con los colegios y uno con las universidades'
+
+    def handle(self, *args, **options):
+        manifest = DirectorySnapshot.build()
+        schools = sum(entry['count'] for entry in manifest['schools'].values())
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Snapshots generados: {schools} colegios en {len(manifest['schools'])} departamentos, "
+                f"{manifest['universities']['count']} universidades"
+            )
+        )
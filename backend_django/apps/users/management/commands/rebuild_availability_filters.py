@@ -0,0 +1,36 @@
+"""
+Comando Django para publicar los filtros de disponibilidad de username/email
+Pensado para correr tras cada despliegue; --stats solo muestra memoria y falsos positivos
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.users.availability import AvailabilityIndex, NORMALIZERS
+
+
+class Command(BaseCommand):
+    help = 'Construye los filtros de Bloom de usernames y emails y los publica en caché'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Solo mostrar memoria y tasa de falsos positivos de los filtros vigentes'
+        )
+
+    def handle(self, *args, **options):
+        if not options['stats']:
+            AvailabilityIndex.publish_all()
+
+        for field in NORMALIZERS:
+            row = AvailabilityIndex.stats(field)
+            observed = row['observed_false_positive_rate']
+            self.stdout.write(
+                f"{field:<9} valores={row['values']:<8} memoria={row['memory_bytes'] / 1024:.1f}KB "
+                f"k={row['hashes']} FPR estimado={row['estimated_false_positive_rate']:.5f} "
+                f"observado={'-' if observed is None else f'{observed:.5f}'} "
+                f"({row['database_queries']}/{row['checks']} chequeos a la base de datos)"
+            )
+
+        if not options['stats']:
+            self.stdout.write(self.style.SUCCESS('✅ Filtros de disponibilidad publicados'))
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_userprofile_content_study_seconds"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExperienceLedgerEntry",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("amount", models.IntegerField()),
+                (
+                    "source",
+                    models.CharField(
+                        choices=[
+                            ("GENERAL", "General"),
+                            ("LESSON", "Lección de ruta"),
+                            ("CONTENT", "Unidad de contenido"),
+                            ("PATH_COMPLETION", "Ruta completada"),
+                            ("PATH_MASTERY", "Maestría de ruta"),
+                            ("ACHIEVEMENT", "Logro"),
+                            ("BATTLE", "Batalla"),
+                            ("REWARD", "Recompensa reclamada"),
+                            ("ASSESSMENT", "Evaluación"),
+                        ],
+                        default="GENERAL",
+                        max_length=20,
+                    ),
+                ),
+                ("reference", models.CharField(blank=True, default="", max_length=100)),
+                ("learning_path_id", models.IntegerField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="xp_ledger",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "users_xp_ledger",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-created_at"],
+                        name="users_xp_le_user_id_6fe56d_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:09
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_xp_ledger"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userprofile",
+            name="last_vitality_update",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:17
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+from django.db.models import CharField, Func
+from django.db.models.functions import Lower
+
+# unaccent() es STABLE y no puede usarse en índices; el wrapper con
+# diccionario explícito sí es inmutable
+DIRECTORY_FUNCTIONS_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+"""
+
+TRIGRAM_INDEXES = [
+    ("schools_name_trgm", "schools", "name"),
+    ("schools_city_trgm", "schools", "city"),
+    ("schools_department_trgm", "schools", "department"),
+    ("universities_name_trgm", "universities", "name"),
+    ("universities_city_trgm", "universities", "city"),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm y unaccent solo existen en PostgreSQL; en otros motores se usa icontains
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(DIRECTORY_FUNCTIONS_SQL)
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" '
+            f'USING gin (immutable_unaccent(LOWER("{column}")) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _table, _column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+def normalized(field_name):
+    # Igual a apps.users.directory.normalized, sin importar código de la app
+    return Func(Lower(field_name), function="immutable_unaccent", output_field=CharField())
+
+
+def trigram_index(field_name, name):
+    return django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(
+            normalized(field_name), name="gin_trgm_ops"
+        ),
+        name=name,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_vitality_anchor"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name="school", index=trigram_index("name", "schools_name_trgm")
+                ),
+                migrations.AddIndex(
+                    model_name="school", index=trigram_index("city", "schools_city_trgm")
+                ),
+                migrations.AddIndex(
+                    model_name="school",
+                    index=trigram_index("department", "schools_department_trgm"),
+                ),
+                migrations.AddIndex(
+                    model_name="university",
+                    index=trigram_index("name", "universities_name_trgm"),
+                ),
+                migrations.AddIndex(
+                    model_name="university",
+                    index=trigram_index("city", "universities_city_trgm"),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+            ],
+        ),
+    ]
@@ -3,10 +3,14 @@ Modelos de usuarios para Ciudadela del Conocimiento ICFES
 """
 
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 import uuid
 
+from .directory import normalized
+
 
 class School(models.Model):
     """Modelo de instituciones educativas"""
@@ -32,6 +36,10 @@ class School(models.Model):
         indexes = [
             models.Index(fields=['school_type']),
             models.Index(fields=['city', 'department']),
+            # Autocompletado sin acentos (ver directory.py)
+            GinIndex(OpClass(normalized('name'), name='gin_trgm_ops'), name='schools_name_trgm'),
+            GinIndex(OpClass(normalized('city'), name='gin_trgm_ops'), name='schools_city_trgm'),
+            GinIndex(OpClass(normalized('department'), name='gin_trgm_ops'), name='schools_department_trgm'),
         ]
     
     def __str__(self):
@@ -52,6 +60,10 @@ class University(models.Model):
     
     class Meta:
         db_table = 'universities'
+        indexes = [
+            GinIndex(OpClass(normalized('name'), name='gin_trgm_ops'), name='universities_name_trgm'),
+            GinIndex(OpClass(normalized('city'), name='gin_trgm_ops'), name='universities_city_trgm'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.city}"
@@ -134,29 +146,16 @@ class User(AbstractUser):
         """Retorna el nombre completo del usuario"""
         return f"{self.first_name} {self.last_name}".strip()
     
-    def can_level_up(self):
-        """Verifica si el usuario puede subir de nivel"""
-        from django.conf import settings
-        required_xp = settings.GAME_SETTINGS['LEVELS_REQUIRED_FOR_PROMOTION'].get(self.hero_class, 100)
-        return self.experience_points >= (required_xp * self.level)
-    
-    def add_experience(self, amount):
-        """Añade experiencia al usuario y verifica level up"""
-        self.experience_points += amount
-        
-        # Verificar si puede subir de nivel
-        while self.can_level_up():
-            self.level += 1
-            
-            # Verificar si puede subir de clase
-            if self.level >= 10:  # Lógica simplificada
-                classes = ['F', 'E', 'D', 'C', 'B', 'A', 'S', 'S+']
-                current_index = classes.index(self.hero_class)
-                if current_index < len(classes) - 1:
-                    self.hero_class = classes[current_index + 1]
-                    self.level = 1  # Reset level para nueva clase
-        
-        self.save()
+    def add_experience(self, amount, learning_path_id=None, source='GENERAL', reference=''):
+        """
+        Añade experiencia al usuario vía el ledger de XP (apps.users.ledger):
+        un UPDATE atómico que suma el XP y deriva nivel y clase en SQL.
+        learning_path_id indica la ruta que originó el XP (leaderboard por ruta).
+        """
+        from .ledger import ExperienceLedger
+        ExperienceLedger.award(
+            self, amount, source=source, learning_path_id=learning_path_id, reference=reference
+        )
         return self
     
     @property
@@ -174,12 +173,13 @@ class UserProfile(models.Model):
     total_questions_answered = models.IntegerField(default=0)
     total_correct_answers = models.IntegerField(default=0)
     total_study_minutes = models.IntegerField(default=0)
+    content_study_seconds = models.BigIntegerField(default=0)  # Suma exacta de UserContentProgress.total_time_seconds
     current_streak = models.IntegerField(default=0)
     max_streak = models.IntegerField(default=0)
     
     # Vitalidad (energía del juego)
     current_vitality = models.IntegerField(default=100, validators=[MinValueValidator(0), MaxValueValidator(100)])
-    last_vitality_update = models.DateTimeField(auto_now=True)
+    last_vitality_update = models.DateTimeField(default=timezone.now)  # Ancla de regeneración (apps.users.vitality)
     
     # Configuración de personalidad (para IA)
     learning_style = models.CharField(max_length=50, blank=True, null=True)  # Visual, Auditivo, Kinestésico
@@ -205,20 +205,40 @@ class UserProfile(models.Model):
             return 0.0
         return (self.total_correct_answers / self.total_questions_answered) * 100
     
-    def regenerate_vitality(self):
-        """Regenera vitalidad basada en el tiempo transcurrido"""
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        now = timezone.now()
-        time_diff = now - self.last_vitality_update
-        minutes_passed = time_diff.total_seconds() / 60
-        
-        # Regenerar 1 punto de vitalidad por minuto
-        vitality_to_add = int(minutes_passed)
-        if vitality_to_add > 0:
-            self.current_vitality = min(100, self.current_vitality + vitality_to_add)
-            self.last_vitality_update = now
-            self.save()
-        
-        return self.current_vitality 
\ No newline at end of file
+    def vitality_now(self, now=None):
+        """Vitalidad regenerada hasta ahora; solo lectura, no guarda"""
+        from .vitality import vitality_at
+        return vitality_at(self.current_vitality, self.last_vitality_update, now)
+
+
+class ExperienceLedgerEntry(models.Model):
+    """Registro inmutable de cada otorgamiento de XP (apps.users.ledger)"""
+    
+    SOURCES = [
+        ('GENERAL', 'General'),
+        ('LESSON', 'Lección de ruta'),
+        ('CONTENT', 'Unidad de contenido'),
+        ('PATH_COMPLETION', 'Ruta completada'),
+        ('PATH_MASTERY', 'Maestría de ruta'),
+        ('ACHIEVEMENT', 'Logro'),
+        ('BATTLE', 'Batalla'),
+        ('REWARD', 'Recompensa reclamada'),
+        ('ASSESSMENT', 'Evaluación'),
+    ]
+    
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='xp_ledger')
+    amount = models.IntegerField()
+    source = models.CharField(max_length=20, choices=SOURCES, default='GENERAL')
+    reference = models.CharField(max_length=100, blank=True, default='')  # p. ej. "lesson_progress:42"
+    learning_path_id = models.IntegerField(blank=True, null=True)  # Sin FK: users no depende de learning
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'users_xp_ledger'
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.amount:+d} XP ({self.source})"
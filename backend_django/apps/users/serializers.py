@@ -30,6 +30,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
     """Serializer para perfil de usuario"""
     
     accuracy = serializers.ReadOnlyField()
+    current_vitality = serializers.SerializerMethodField()
     
     class Meta:
         model = UserProfile
@@ -39,6 +40,9 @@ class UserProfileSerializer(serializers.ModelSerializer):
             'current_vitality', 'learning_style', 'difficulty_preference',
             'average_response_time', 'improvement_rate', 'accuracy'
         ]
+    
+    def get_current_vitality(self, obj):
+        return obj.vitality_now()
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -241,7 +245,7 @@ class PasswordChangeSerializer(serializers.Serializer):
         """Cambiar la contraseña"""
         user = self.context['request'].user
         user.set_password(self.validated_data['new_password'])
-        user.save()
+        user.save(update_fields=['password'])
         return user
 
 
@@ -0,0 +1,13 @@
+"""
+Tareas Celery de usuarios
+"""
+
+from celery import shared_task
+
+
+@shared_task
+def rebuild_availability_filters():
+    """Reconstruye y publica los filtros de username/email (cada hora)"""
+    from .availability import AvailabilityIndex
+
+    AvailabilityIndex.publish_all()
@@ -5,7 +5,8 @@ from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     RegisterView, CustomTokenObtainPairView, LogoutView,
     UserProfileView, PasswordChangeView, SchoolListView,
-    UniversityListView, UserStatsView, add_experience,
+    UniversityListView, SchoolAutocompleteView, UniversityAutocompleteView,
+    DirectoryManifestView, UserStatsView, add_experience, spend_vitality,
     health_check, CheckUsernameView, CheckEmailView,
     complete_assessment
 )
@@ -27,6 +28,7 @@ urlpatterns = [
     path('password/change/', PasswordChangeView.as_view(), name='password_change'),
     path('stats/', UserStatsView.as_view(), name='user_stats'),
     path('add-experience/', add_experience, name='add_experience'),
+    path('vitality/spend/', spend_vitality, name='spend_vitality'),
     path('complete-assessment/', complete_assessment, name='complete_assessment'),
     
     # Validaciones
@@ -36,6 +38,9 @@ urlpatterns = [
     # Datos auxiliares
     path('schools/', SchoolListView.as_view(), name='schools'),
     path('universities/', UniversityListView.as_view(), name='universities'),
+    path('schools/autocomplete/', SchoolAutocompleteView.as_view(), name='schools_autocomplete'),
+    path('universities/autocomplete/', UniversityAutocompleteView.as_view(), name='universities_autocomplete'),
+    path('directory/snapshots/', DirectoryManifestView.as_view(), name='directory_snapshots'),
     
     # Health check
     path('health/', health_check, name='health_check'),
@@ -14,6 +14,10 @@ from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.openapi import OpenApiTypes
 
 from .models import User, UserProfile, School, University
+from .vitality import VitalityService, VitalityError
+from .availability import AvailabilityIndex
+from .directory import DirectorySearch, DirectorySnapshot, DEFAULT_LIMIT, MIN_TERM_LENGTH
+from apps.learning.dashboard import DashboardSnapshot
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, LoginSerializer,
     CustomTokenObtainPairSerializer, PasswordChangeSerializer,
@@ -113,14 +117,17 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        # request.user viene con la proyección de autenticación; la edición usa la fila completa
+        return User.objects.select_related('profile', 'school', 'target_university').get(
+            pk=self.request.user.pk
+        )
     
     @extend_schema(
         summary="Obtener perfil del usuario",
         description="Obtener información completa del usuario autenticado"
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return Response(DashboardSnapshot.get(request.user, ['profile'])['profile'])
     
     @extend_schema(
         summary="Actualizar perfil del usuario",
@@ -235,6 +242,77 @@ class UniversityListView(generics.ListAPIView):
         return queryset.order_by('name')
 
 
+class DirectoryAutocompleteView(APIView):
+    """
+    Autocompletado de colegios o universidades para el registro: prefijo y
+    similitud sin acentos, pocos resultados por consulta
+    """
+    
+    permission_classes = [permissions.AllowAny]
+    kind = None
+    filter_params = ()
+    
+    @extend_schema(
+        summary="Autocompletar instituciones",
+        parameters=[
+            OpenApiParameter('q', OpenApiTypes.STR, description=f'Texto a buscar (mínimo {MIN_TERM_LENGTH} caracteres)'),
+            OpenApiParameter('limit', OpenApiTypes.INT, description=f'Resultados (por defecto {DEFAULT_LIMIT})'),
+            OpenApiParameter('city', OpenApiTypes.STR, description='Filtrar por ciudad'),
+            OpenApiParameter('department', OpenApiTypes.STR, description='Filtrar por departamento (solo colegios)'),
+        ]
+    )
+    def get(self, request):
+        filters = {
+            param: request.query_params.get(param)
+            for param in self.filter_params
+        }
+        results = DirectorySearch.autocomplete(
+            self.kind,
+            request.query_params.get('q', ''),
+            limit=DirectorySearch.clamp_limit(request.query_params.get('limit', DEFAULT_LIMIT)),
+            **filters
+        )
+        return Response({'results': results})
+
+
+class SchoolAutocompleteView(DirectoryAutocompleteView):
+    kind = 'schools'
+    filter_params = ('city', 'department')
+
+
+class UniversityAutocompleteView(DirectoryAutocompleteView):
+    kind = 'universities'
+    filter_params = ('city',)
+
+
+class DirectoryManifestView(APIView):
+    """URLs de los snapshots comprimidos por departamento para cachear en el cliente"""
+    
+    permission_classes = [permissions.AllowAny]
+    
+    @extend_schema(
+        summary="Snapshots del directorio",
+        description="Manifiesto con la versión y URL del JSON comprimido de cada departamento"
+    )
+    def get(self, request):
+        manifest = DirectorySnapshot.manifest()
+        if manifest is None:
+            return Response({
+                'error': 'Los snapshots del directorio no se han generado'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        def absolute(entry):
+            return {**entry, 'url': request.build_absolute_uri(entry['url'])}
+        
+        return Response({
+            'schools': {
+                department: absolute(entry)
+                for department, entry in manifest['schools'].items()
+            },
+            'universities': absolute(manifest['universities']),
+        })
+
+
 class UserStatsView(APIView):
     """Vista para estadísticas del usuario"""
     
@@ -245,42 +323,7 @@ class UserStatsView(APIView):
         description="Obtener estadísticas de progreso y gamificación del usuario"
     )
     def get(self, request):
-        user = request.user
-        profile = user.profile
-        
-        # Regenerar vitalidad
-        profile.regenerate_vitality()
-        
-        stats = {
-            'user_info': {
-                'username': user.username,
-                'hero_class': user.hero_class,
-                'level': user.level,
-                'experience_points': user.experience_points,
-                'avatar_evolution_stage': user.avatar_evolution_stage,
-            },
-            'academic_progress': {
-                'questions_answered': profile.total_questions_answered,
-                'correct_answers': profile.total_correct_answers,
-                'accuracy': profile.accuracy,
-                'study_minutes': profile.total_study_minutes,
-                'current_streak': profile.current_streak,
-                'max_streak': profile.max_streak,
-            },
-            'game_stats': {
-                'current_vitality': profile.current_vitality,
-                'improvement_rate': profile.improvement_rate,
-                'learning_style': profile.learning_style,
-                'difficulty_preference': profile.difficulty_preference,
-            },
-            'assessments': {
-                'initial_completed': user.initial_assessment_completed,
-                'vocational_completed': user.vocational_test_completed,
-                'assigned_role': user.assigned_role,
-            }
-        }
-        
-        return Response(stats)
+        return Response(DashboardSnapshot.get(request.user, ['stats'])['stats'])
 
 
 @api_view(['POST'])
@@ -311,6 +354,41 @@ def add_experience(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def spend_vitality(request):
+    """Endpoint para gastar vitalidad (UPDATE condicionado, sin re-guardar el perfil)"""
+    
+    try:
+        amount = int(request.data.get('amount', 0))
+    except (ValueError, TypeError):
+        return Response({
+            'error': 'Cantidad de vitalidad inválida'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if amount <= 0:
+        return Response({
+            'error': 'La cantidad de vitalidad debe ser positiva'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        remaining = VitalityService.spend(request.user.id, amount)
+    except UserProfile.DoesNotExist:
+        return Response({
+            'error': 'El usuario no tiene perfil'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except VitalityError as error:
+        return Response({
+            'error': str(error),
+            'current_vitality': error.available
+        }, status=status.HTTP_409_CONFLICT)
+    
+    return Response({
+        'message': f'Se gastaron {amount} puntos de vitalidad',
+        'current_vitality': remaining
+    })
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def complete_assessment(request):
@@ -338,18 +416,23 @@ def complete_assessment(request):
     
     try:
         # Actualizar usuario según el tipo de evaluación
+        # Solo los campos de la evaluación: XP, nivel y clase los escribe el ledger
+        update_fields = []
         if assessment_type == 'initial':
             user.initial_assessment_completed = True
             user.initial_assessment_date = timezone.now()
+            update_fields = ['initial_assessment_completed', 'initial_assessment_date']
         
         elif assessment_type in ['vocational', 'manual_selection']:
             user.vocational_test_completed = True
             user.assigned_role = assigned_role
+            update_fields = ['vocational_test_completed', 'assigned_role']
             
             # Dar experiencia por completar la evaluación
-            user.add_experience(200)  # Bonus por completar evaluación
+            user.add_experience(200, source='ASSESSMENT')  # Bonus por completar evaluación
         
-        user.save()
+        if update_fields:
+            user.save(update_fields=update_fields)
         
         # Actualizar perfil si existe
         if hasattr(user, 'profile'):
@@ -432,7 +515,7 @@ class CheckUsernameView(APIView):
                 'error': 'Username es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        is_available = not User.objects.filter(username=username).exists()
+        is_available = AvailabilityIndex.is_available('username', username)
         
         return Response({
             'username': username,
@@ -457,7 +540,7 @@ class CheckEmailView(APIView):
                 'error': 'Email es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        is_available = not User.objects.filter(email=email).exists()
+        is_available = AvailabilityIndex.is_available('email', email)
         
         return Response({
             'email': email,
@@ -0,0 +1,149 @@
+"""
+Vitalidad calculada al leer
+
+La vitalidad es una función pura del valor almacenado, el instante ancla
+(last_vitality_update) y GAME_SETTINGS['VITALITY_REGEN_RATE'] (puntos por
+minuto): leerla nunca escribe. Solo se persiste al gastarla o restaurarla,
+con un UPDATE condicionado al par (valor, ancla) que se leyó; si otro
+proceso lo cambió entretanto el UPDATE no afecta filas y se reintenta con
+el estado nuevo, así que dos gastos concurrentes nunca se pisan.
+
+Al persistir, el ancla avanza solo los minutos completos ya convertidos en
+puntos, de modo que la fracción de minuto en curso no se pierde; con la
+vitalidad al máximo el ancla pasa a ser el instante actual.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+
+MAX_CAS_ATTEMPTS = 5
+
+
+def _settings():
+    game = settings.GAME_SETTINGS
+    return game.get('MAX_VITALITY', 100), game.get('VITALITY_REGEN_RATE', 1)
+
+
+def regenerate(stored, anchor, now):
+    """
+    (vitalidad, ancla) vigentes en `now` para un valor almacenado y su ancla.
+    Función pura: no consulta ni escribe la base de datos.
+    """
+    maximum, rate = _settings()
+    if stored >= maximum or anchor is None or rate <= 0:
+        return min(stored, maximum), now if stored >= maximum else anchor
+
+    elapsed_minutes = max(0.0, (now - anchor).total_seconds() / 60)
+    gained = int(elapsed_minutes * rate)
+    if stored + gained >= maximum:
+        return maximum, now
+    return stored + gained, anchor + timedelta(minutes=gained / rate)
+
+
+def vitality_at(stored, anchor, now=None):
+    """Vitalidad actual (sin el ancla)"""
+    return regenerate(stored, anchor, now or timezone.now())[0]
+
+
+class VitalityError(Exception):
+    """No hay vitalidad suficiente o el estado cambió demasiadas veces"""
+
+    def __init__(self, message, available=None):
+        super().__init__(message)
+        self.available = available
+
+
+class VitalityService:
+    """
+    Gasto y restauración con UPDATE condicionados (compare-and-swap)
+    """
+
+    @staticmethod
+    def _swap(user_id, stored, anchor, new_value, new_anchor):
+        from apps.learning.dashboard import DashboardSnapshot
+        from .models import UserProfile
+
+        swapped = UserProfile.objects.filter(
+            user_id=user_id,
+            current_vitality=stored,
+            last_vitality_update=anchor
+        ).update(current_vitality=new_value, last_vitality_update=new_anchor)
+        if swapped:
+            DashboardSnapshot.invalidate(user_id, 'profile')
+        return swapped
+
+    @staticmethod
+    def _next_state(available, anchor, delta, now):
+        maximum, _rate = _settings()
+        new_value = min(maximum, available + delta)
+        # En el máximo no se acumula regeneración: el ancla es el instante actual
+        return new_value, now if new_value >= maximum or available >= maximum else anchor
+
+    @classmethod
+    def _change(cls, user_id, delta, now=None):
+        """Aplica delta sobre la vitalidad vigente; retorna el valor nuevo"""
+        from .models import UserProfile
+
+        now = now or timezone.now()
+        for _attempt in range(MAX_CAS_ATTEMPTS):
+            stored, anchor = UserProfile.objects.filter(user_id=user_id).values_list(
+                'current_vitality', 'last_vitality_update'
+            ).get()
+            available, new_anchor = regenerate(stored, anchor, now)
+            if available + delta < 0:
+                raise VitalityError('Vitalidad insuficiente', available=available)
+
+            new_value, new_anchor = cls._next_state(available, new_anchor, delta, now)
+            if cls._swap(user_id, stored, anchor, new_value, new_anchor):
+                return new_value
+
+        raise VitalityError('La vitalidad cambió durante la operación; intenta de nuevo')
+
+    @classmethod
+    def spend(cls, user_id, amount, now=None):
+        """Gasta vitalidad; VitalityError si no alcanza"""
+        return cls._change(user_id, -abs(amount), now)
+
+    @classmethod
+    def restore(cls, user_id, amount, now=None):
+        return cls._change(user_id, abs(amount), now)
+
+    @classmethod
+    def spend_many(cls, user_ids, amount, now=None):
+        """
+        Gasta la misma cantidad a varios usuarios (p. ej. una batalla grupal).
+        Retorna ({user_id: vitalidad restante}, [user_ids sin vitalidad suficiente]).
+        """
+        from .models import UserProfile
+
+        now = now or timezone.now()
+        states = {
+            user_id: (stored, anchor)
+            for user_id, stored, anchor in UserProfile.objects.filter(user_id__in=user_ids).values_list(
+                'user_id', 'current_vitality', 'last_vitality_update'
+            )
+        }
+        spent, rejected = {}, []
+        for user_id in user_ids:
+            if user_id not in states:
+                rejected.append(user_id)
+                continue
+            stored, anchor = states[user_id]
+            available, regen_anchor = regenerate(stored, anchor, now)
+            if available < abs(amount):
+                rejected.append(user_id)
+                continue
+
+            new_value, new_anchor = cls._next_state(available, regen_anchor, -abs(amount), now)
+            if cls._swap(user_id, stored, anchor, new_value, new_anchor):
+                spent[user_id] = new_value
+                continue
+            # Cambió desde la lectura inicial: reintentar con el estado vigente
+            try:
+                spent[user_id] = cls.spend(user_id, amount, now)
+            except VitalityError:
+                rejected.append(user_id)
+        return spent, rejected
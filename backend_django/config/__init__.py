@@ -1 +1,6 @@
-# Configuración Django del proyecto Ciudadela del Conocimiento ICFES 
\ No newline at end of file
+# Configuración Django del proyecto Ciudadela del Conocimiento ICFES
+
+# Cargar la app de Celery al iniciar Django para que shared_task use su configuración
+from .celery import app as celery_app
+
+__all__ = ('celery_app',)
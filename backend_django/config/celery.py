@@ -41,6 +41,31 @@ app.conf.beat_schedule = {
         'task': 'apps.notifications.tasks.send_study_reminders',
         'schedule': crontab(hour=18, minute=0),  # 6 PM todos los días
     },
+    # Recalcular similitudes item-item para recomendaciones
+    'build-item-similarities': {
+        'task': 'apps.learning.tasks.build_item_similarities',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    # Renormalizar puntajes de tendencia al iniciar cada época (día UTC)
+    'renormalize-trending-scores': {
+        'task': 'apps.learning.tasks.renormalize_trending_scores',
+        'schedule': crontab(hour=0, minute=5),
+    },
+    # Cerrar batallas contra el jefe vencidas (cola de deadlines)
+    'expire-boss-battles': {
+        'task': 'apps.learning.tasks.expire_boss_battles',
+        'schedule': crontab(minute='*'),
+    },
+    # Rellenar keys calentables que expiraron o fueron invalidadas
+    'warm-caches': {
+        'task': 'apps.learning.tasks.warm_caches',
+        'schedule': crontab(minute='*/15'),
+    },
+    # Republicar los filtros de disponibilidad de username/email
+    'rebuild-availability-filters': {
+        'task': 'apps.users.tasks.rebuild_availability_filters',
+        'schedule': crontab(minute=30),
+    },
 }
 
 app.conf.timezone = 'UTC'
@@ -0,0 +1,18 @@
+"""
+Configuración de Django para los tests
+
+`manage.py test` y pytest-django (pytest.ini) la cargan en lugar de
+config.settings.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+TESTING = True
+
+# Caché en proceso: los servicios que comparten estado por Redis usan su
+# backend local y los tests no dependen de un servidor externo
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}